@@ -0,0 +1,213 @@
+"""
+History Backfill
+ดึงแท่งเทียนย้อนหลังหลายคู่เทรด/timeframe พร้อมกัน ภายใต้ rate limit ของแต่ละ exchange
+เขียนลง CandleStore และบันทึก checkpoint เพื่อให้รันต่อจากจุดเดิมได้เมื่อถูกขัดจังหวะ
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import ccxt
+
+
+@dataclass
+class BackfillJob:
+    """งาน backfill ของหนึ่ง series ตั้งแต่ start (timestamp มิลลิวินาที) จนถึงปัจจุบัน"""
+    exchange: str
+    symbol: str
+    timeframe: str
+    start: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.exchange}|{self.symbol}|{self.timeframe}"
+
+
+class HistoryBackfiller:
+    """ดึงประวัติ OHLCV แบบแบ่งหน้าย้อนหลังด้วย since แล้วเขียนลง CandleStore"""
+
+    def __init__(self, exchange_manager, store, checkpoint_path: str = "temp/backfill_checkpoint.json",
+                 page_limit: int = 1000, flush_bars: int = 50000, concurrency: int = 4, max_retries: int = 3):
+        self.exchange_manager = exchange_manager
+        self.store = store
+        self.checkpoint_path = checkpoint_path
+        self.page_limit = page_limit
+        self.flush_bars = flush_bars    # จำนวนแท่งที่สะสมไว้ก่อนเขียนลงดิสก์และบันทึก checkpoint
+        self.concurrency = concurrency  # จำนวน series ที่ดึงพร้อมกันต่อ exchange
+        self.max_retries = max_retries
+        self.logger = logging.getLogger('HistoryBackfiller')
+        self.checkpoint = self._load_checkpoint()
+
+    def _load_checkpoint(self) -> Dict:
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            self.logger.warning(f"⚠️ อ่าน checkpoint ไม่ได้ เริ่มใหม่ทั้งหมด: {e}")
+            return {}
+
+    def _save_checkpoint(self):
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.checkpoint, f, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    async def run(self, jobs: List[BackfillJob]) -> Dict[str, Dict]:
+        """รันทุกงาน (แต่ละ exchange ทำงานพร้อมกัน) และคืนสถิติต่อ exchange"""
+        by_exchange = {}
+        for job in jobs:
+            by_exchange.setdefault(job.exchange, []).append(job)
+
+        results = await asyncio.gather(*[
+            self._run_exchange(exchange_name, exchange_jobs) for exchange_name, exchange_jobs in by_exchange.items()
+        ])
+        return dict(zip(by_exchange, results))
+
+    async def _run_exchange(self, exchange_name: str, jobs: List[BackfillJob]) -> Dict:
+        # failed: series ที่ดึงไม่สำเร็จหลังลองครบ (รันใหม่เพื่อทำต่อจาก checkpoint), errors: exception
+        stats = {'series': len(jobs), 'completed': 0, 'skipped': 0, 'failed': 0, 'errors': 0,
+                 'bars': 0, 'requests': 0, 'elapsed': 0.0, 'bars_per_sec': 0.0}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.monotonic()
+
+        async def run_job(job: BackfillJob):
+            async with semaphore:
+                try:
+                    await self._run_job(job, stats)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    stats['errors'] += 1
+                    self.logger.error(f"❌ backfill {job.key} ล้มเหลว: {e}")
+
+        try:
+            await asyncio.gather(*[run_job(job) for job in jobs])
+        finally:
+            stats['elapsed'] = time.monotonic() - started
+            stats['bars_per_sec'] = stats['bars'] / stats['elapsed'] if stats['elapsed'] > 0 else 0.0
+            self.logger.info(
+                f"📥 {exchange_name.upper()}: {stats['bars']:,} แท่ง จาก {stats['requests']} requests "
+                f"ใน {stats['elapsed']:.1f}s ({stats['bars_per_sec']:,.0f} แท่ง/วินาที)"
+            )
+        return stats
+
+    async def _run_job(self, job: BackfillJob, stats: Dict):
+        state = self.checkpoint.get(job.key, {})
+        timeframe_ms = ccxt.Exchange.parse_timeframe(job.timeframe) * 1000
+
+        # เติมช่วงที่ขาดระหว่างแท่งล่าสุดในไฟล์จนถึงปัจจุบันก่อน
+        await self._fill_forward(job, timeframe_ms, stats)
+
+        if state.get('complete') and state.get('start', 0) <= job.start:
+            stats['skipped'] += 1
+            return
+
+        if await self._fill_backward(job, timeframe_ms, stats):
+            stats['completed'] += 1
+        else:
+            stats['failed'] += 1
+
+    async def _fill_forward(self, job: BackfillJob, timeframe_ms: int, stats: Dict):
+        last = self.store.last_timestamp(job.exchange, job.symbol, job.timeframe)
+        if last is None:
+            return
+
+        cursor = last + timeframe_ms
+        while cursor + timeframe_ms <= time.time() * 1000:
+            page = await self._fetch_page(job, cursor, stats)
+            if not page:
+                return
+            written = self.store.append(job.exchange, job.symbol, job.timeframe, page)
+            stats['bars'] += written
+            if not written:
+                return
+            cursor = self.store.last_timestamp(job.exchange, job.symbol, job.timeframe) + timeframe_ms
+
+    async def _fill_backward(self, job: BackfillJob, timeframe_ms: int, stats: Dict) -> bool:
+        """ดึงย้อนหลังจากแท่งแรกในไฟล์ถึง job.start (คืน True ถ้าครบ)"""
+        # แท่งแรกในไฟล์คือจุดที่ทำต่อ checkpoint จึงเก็บเพียงว่าครบแล้วหรือยัง
+        first = self.store.first_timestamp(job.exchange, job.symbol, job.timeframe)
+        # แท่งที่ยังไม่ปิดไม่ถูกเก็บ จึงเริ่มจากต้นแท่งปัจจุบัน
+        end = first if first is not None else int(time.time() * 1000) // timeframe_ms * timeframe_ms
+        pending = []
+        complete = False
+        older_exists = False  # probe ยืนยันแล้วว่ามีแท่งเก่ากว่าช่วงที่ว่าง
+
+        try:
+            while end > job.start:
+                since = max(job.start, end - self.page_limit * timeframe_ms)
+                page = await self._fetch_page(job, since, stats)
+                if page is None:
+                    break  # ดึงไม่สำเร็จ ครั้งหน้าจะเริ่มต่อจาก checkpoint
+
+                # บาง exchange ไม่สนใจ since หรือคืนแท่งที่มีอยู่แล้ว
+                rows = [candle for candle in page if since <= candle[0] < end]
+                if not rows:
+                    if not older_exists:
+                        # หน้าว่างอาจเป็นช่วงที่ exchange หยุดซื้อขาย ถามจาก job.start ว่ายังมีแท่งเก่ากว่านี้หรือไม่
+                        probe = await self._fetch_page(job, job.start, stats)
+                        if probe is None:
+                            break
+                        if not any(candle[0] < since for candle in probe):
+                            complete = True  # ไม่มีข้อมูลเก่ากว่านี้แล้ว (ก่อนวันที่เริ่มซื้อขาย)
+                            break
+                        older_exists = True
+                    end = since  # ข้ามช่วงที่ว่างแล้วดึงหน้าที่เก่ากว่าต่อ
+                    continue
+
+                older_exists = False
+                pending = rows + pending
+                end = rows[0][0]
+
+                if len(pending) >= self.flush_bars:
+                    stats['bars'] += self._flush(job, pending, complete=False)
+                    pending = []
+            else:
+                complete = True
+        finally:
+            # บันทึกสิ่งที่ดึงมาแล้วแม้ถูกยกเลิกกลางคัน
+            stats['bars'] += self._flush(job, pending, complete)
+        return complete
+
+    def _flush(self, job: BackfillJob, rows: List[List], complete: bool) -> int:
+        """เขียนแท่งที่สะสมไว้และบันทึก checkpoint คืนจำนวนแท่งที่เขียนจริง"""
+        written = self.store.prepend(job.exchange, job.symbol, job.timeframe, rows) if rows else 0
+        self.checkpoint[job.key] = {'start': job.start, 'complete': complete}
+        self._save_checkpoint()
+        return written
+
+    async def _fetch_page(self, job: BackfillJob, since: int, stats: Dict) -> Optional[List[List]]:
+        """ดึงหนึ่งหน้า (ลองใหม่แบบ backoff เมื่อผิดพลาด)"""
+        for attempt in range(self.max_retries):
+            stats['requests'] += 1
+            page = await self.exchange_manager.fetch_ohlcv(
+                job.exchange, job.symbol, job.timeframe, self.page_limit, since=since
+            )
+            if page is not None:
+                # ตัดแท่งที่ timestamp ซ้ำกันในหน้าเดียว
+                return sorted({candle[0]: candle for candle in page}.values(), key=lambda candle: candle[0])
+            await asyncio.sleep(2 ** attempt)
+        return None
+
+
+def build_jobs(exchange_manager, timeframes: List[str], start: int,
+               exchanges: Optional[List[str]] = None, pairs: Optional[List[str]] = None) -> List[BackfillJob]:
+    """สร้างงานจาก exchange ที่เปิดใช้และคู่เทรดใน config (หรือที่ระบุ)"""
+    jobs = []
+    for exchange_name in exchanges or exchange_manager.get_enabled_exchanges():
+        if exchange_name not in exchange_manager.exchanges:
+            continue  # DEX ยังไม่รองรับ OHLCV
+        for symbol in pairs or exchange_manager.get_trading_pairs(exchange_name):
+            for timeframe in timeframes:
+                jobs.append(BackfillJob(exchange_name, symbol, timeframe, start))
+    return jobs
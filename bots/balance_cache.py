@@ -0,0 +1,172 @@
+"""
+Balance Cache
+เก็บยอดเงินของแต่ละ exchange ในหน่วยความจำ รีเฟรชตาม TTL
+และปรับยอดทันทีเมื่อบอทวาง/ยกเลิกออเดอร์หรือออเดอร์ match
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+
+class BalanceCache:
+    """แคชยอดเงินต่อ exchange (อ่านจากหน่วยความจำแทนการเรียก fetch_balance ทุกครั้ง)"""
+
+    def __init__(self, exchange_manager, ttl: float = 30):
+        self.exchange_manager = exchange_manager
+        self.logger = exchange_manager.logger
+        self.ttl = ttl
+        self.balances = {}  # {exchange_name: {'balance': {...}, 'updated_at': float, 'stale': bool, 'adjusted_at': float}}
+        self._pending = {}  # {exchange_name: asyncio.Task} request ที่กำลังดึงอยู่
+
+    async def get(self, exchange_name: str, max_age: Optional[float] = None) -> Optional[Dict]:
+        """ยอดเงินจากแคช ถ้าเก่ากว่า max_age (ค่าเริ่มต้น ttl) หรือถูก invalidate จะดึงใหม่"""
+        entry = self.balances.get(exchange_name)
+        max_age = self.ttl if max_age is None else max_age
+        if entry and not entry['stale'] and time.time() - entry['updated_at'] < max_age:
+            return entry['balance']
+        return await self.refresh(exchange_name)
+
+    def get_cached(self, exchange_name: str) -> Optional[Dict]:
+        """ยอดเงินล่าสุดในแคชโดยไม่เรียก network (อาจเก่ากว่า ttl)"""
+        entry = self.balances.get(exchange_name)
+        return entry['balance'] if entry else None
+
+    async def refresh(self, exchange_name: str) -> Optional[Dict]:
+        """ดึงยอดเงินใหม่ (request ที่ซ้อนกันของ exchange เดียวกันจะรอผลเดียวกัน)"""
+        task = self._pending.get(exchange_name)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(exchange_name))
+            self._pending[exchange_name] = task
+            task.add_done_callback(lambda done: self._clear_pending(exchange_name, done))
+        return await asyncio.shield(task)
+
+    def _clear_pending(self, exchange_name: str, task: asyncio.Task):
+        if self._pending.get(exchange_name) is task:
+            del self._pending[exchange_name]
+
+    async def _fetch(self, exchange_name: str) -> Optional[Dict]:
+        requested_at = time.time()
+        balance = await self.exchange_manager.fetch_balance(exchange_name)
+        if balance is None:
+            return None
+
+        # มีการปรับยอดระหว่างรอผล ยอดจาก exchange อาจยังไม่รวมออเดอร์นั้น ให้ดึงใหม่ในการอ่านครั้งถัดไป
+        entry = self.balances.get(exchange_name)
+        stale = bool(entry and entry.get('adjusted_at', 0) > requested_at)
+        self.balances[exchange_name] = {'balance': balance, 'updated_at': requested_at, 'stale': stale}
+        return balance
+
+    def invalidate(self, exchange_name: str):
+        """บังคับให้การอ่านครั้งถัดไปดึงยอดใหม่ และเริ่มดึงในพื้นหลังถ้ามี event loop"""
+        entry = self.balances.get(exchange_name)
+        if entry:
+            entry['stale'] = True
+        self.schedule_refresh(exchange_name)
+
+    def schedule_refresh(self, exchange_name: str):
+        """ดึงยอดใหม่ในพื้นหลัง (ไม่ทำอะไรถ้าไม่มี event loop หรือกำลังดึงอยู่)"""
+        if exchange_name in self._pending:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = asyncio.ensure_future(self.refresh(exchange_name))
+        task.add_done_callback(self._log_refresh_error)
+
+    def _log_refresh_error(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.warning(f"⚠️ รีเฟรชยอดเงินในพื้นหลังล้มเหลว: {task.exception()}")
+
+    # === ปรับยอดทันทีจากออเดอร์ของบอท ===
+
+    def on_order_placed(self, exchange_name: str, order: Dict):
+        """กันยอดสำหรับออเดอร์ที่เพิ่งวาง (free -> used)"""
+        parsed = self._parse_order(order, order.get('amount'))
+        if parsed is None:
+            self.invalidate(exchange_name)
+            return
+        base, quote, side, amount, price = parsed
+
+        if side == 'buy':
+            self._adjust(exchange_name, quote, free=-amount * price, used=amount * price)
+        else:
+            self._adjust(exchange_name, base, free=-amount, used=amount)
+
+    def on_order_canceled(self, exchange_name: str, order: Dict):
+        """คืนยอดที่กันไว้ของออเดอร์ที่ถูกยกเลิก (used -> free)"""
+        remaining = order.get('remaining')
+        if remaining is None and order.get('amount') is not None:
+            remaining = order['amount'] - (order.get('filled') or 0)
+        parsed = self._parse_order(order, remaining)
+        if parsed is None:
+            self.invalidate(exchange_name)
+            return
+        base, quote, side, amount, price = parsed
+
+        if side == 'buy':
+            self._adjust(exchange_name, quote, free=amount * price, used=-amount * price)
+        else:
+            self._adjust(exchange_name, base, free=amount, used=-amount)
+
+        # ส่วนที่ match ก่อนยกเลิกยังไม่ได้ย้ายยอด ให้ resync กับ exchange
+        if order.get('filled'):
+            self.schedule_refresh(exchange_name)
+
+    def on_order_filled(self, exchange_name: str, order: Dict, reserved: bool = True):
+        """ย้ายยอดระหว่างสองสกุลเมื่อออเดอร์ match แล้ว resync ในพื้นหลัง (ค่าธรรมเนียมไม่ได้คำนวณ)
+
+        reserved=False สำหรับออเดอร์ที่ match ทันทีโดยไม่ผ่าน on_order_placed (เช่น market order)
+        ยอดที่จ่ายจึงหักจาก free แทน used
+        """
+        filled = order.get('filled')
+        parsed = self._parse_order(order, filled if filled is not None else order.get('amount'),
+                                   order.get('average') or order.get('price'))
+        if parsed is None:
+            self.invalidate(exchange_name)
+            return
+        base, quote, side, amount, price = parsed
+        cost = amount * price
+        spent = 'used' if reserved else 'free'
+
+        if side == 'buy':
+            self._adjust(exchange_name, quote, total=-cost, **{spent: -cost})
+            self._adjust(exchange_name, base, free=amount, total=amount)
+        else:
+            self._adjust(exchange_name, base, total=-amount, **{spent: -amount})
+            self._adjust(exchange_name, quote, free=cost, total=cost)
+
+        self.schedule_refresh(exchange_name)
+
+    @staticmethod
+    def _parse_order(order: Dict, amount: Optional[float],
+                     price: Optional[float] = None) -> Optional[Tuple[str, str, str, float, float]]:
+        """(base, quote, side, amount, price) ของออเดอร์ หรือ None ถ้าข้อมูลไม่พอ (เช่น market order ที่ไม่มีราคา)"""
+        symbol = order.get('symbol') or ''
+        price = price if price is not None else order.get('price')
+        if '/' not in symbol or order.get('side') not in ('buy', 'sell') or not amount or not price:
+            return None
+        base, quote = symbol.split(':')[0].split('/')
+        return base, quote, order['side'], float(amount), float(price)
+
+    def _adjust(self, exchange_name: str, currency: str, free: float = 0.0, used: float = 0.0, total: float = 0.0):
+        entry = self.balances.get(exchange_name)
+        if not entry:
+            return
+
+        # สร้าง dict ใหม่ให้ผู้อ่านเห็นยอดที่สอดคล้องกันเสมอ
+        balance = dict(entry['balance'])
+        for key, delta in (('free', free), ('used', used), ('total', total)):
+            if not delta:
+                continue
+            amounts = dict(balance.get(key) or {})
+            amounts[currency] = (amounts.get(currency) or 0.0) + delta
+            balance[key] = amounts
+
+        # รูปแบบ ccxt: balance['USDT'] = {'free', 'used', 'total'}
+        if isinstance(balance.get(currency), dict):
+            balance[currency] = {key: balance[key].get(currency) for key in ('free', 'used', 'total') if key in balance}
+
+        entry['balance'] = balance
+        entry['adjusted_at'] = time.time()
@@ -0,0 +1,194 @@
+"""
+Candle Cache
+เก็บแท่งเทียน OHLCV ต่อ (exchange, symbol, timeframe) ใน ring buffer
+ดึงเฉพาะแท่งใหม่ตั้งแต่ timestamp ล่าสุด และแทนที่แท่งสุดท้ายที่ยังไม่ปิด
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+import ccxt
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+class CandleBuffer:
+    """ring buffer แบบ mirrored: เขียนทุกแถวสองตำแหน่ง (i และ i + capacity)
+
+    ทำให้ N แถวล่าสุดเป็นช่วงต่อเนื่องในหน่วยความจำเสมอ จึงคืนเป็น view ได้โดยไม่ต้อง copy
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.data = np.zeros((2 * capacity, len(COLUMNS)), dtype=np.float64)
+        self.pos = 0      # ตำแหน่งที่จะเขียนแถวถัดไป
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def clear(self):
+        self.pos = 0
+        self.count = 0
+
+    def append(self, row):
+        self.data[self.pos] = row
+        self.data[self.pos + self.capacity] = row
+        self.pos = (self.pos + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def replace_last(self, row):
+        index = (self.pos - 1) % self.capacity
+        self.data[index] = row
+        self.data[index + self.capacity] = row
+
+    def last_timestamp(self) -> Optional[int]:
+        if not self.count:
+            return None
+        return int(self.data[(self.pos - 1) % self.capacity, 0])
+
+    def view(self, n: Optional[int] = None) -> np.ndarray:
+        """n แถวล่าสุด (เก่าไปใหม่) เป็น view แบบอ่านอย่างเดียว"""
+        n = self.count if n is None else min(n, self.count)
+        end = self.pos + self.capacity
+        view = self.data[end - n:end]
+        view.flags.writeable = False
+        return view
+
+
+class CandleCache:
+    """แคช OHLCV ที่ดึงเฉพาะแท่งที่ขาดหายจาก exchange"""
+
+    def __init__(self, exchange_manager, capacity: int = 1000, store=None):
+        self.exchange_manager = exchange_manager
+        self.logger = exchange_manager.logger
+        self.capacity = capacity
+        self.store = store  # CandleStore สำหรับเก็บแท่งที่ปิดแล้วลงดิสก์ (None คือไม่เก็บ)
+        self.buffers = {}   # {(exchange_name, symbol, timeframe): CandleBuffer}
+        self.history = {}   # {key: limit ที่ดึงแบบเต็มครั้งล่าสุด}
+        self._locks = {}
+        self.stats = {'full_fetches': 0, 'incremental_fetches': 0, 'candles_fetched': 0, 'store_loads': 0}
+
+    async def get(self, exchange_name: str, symbol: str, timeframe: str,
+                  limit: int = 100) -> Optional[np.ndarray]:
+        """แท่งเทียนล่าสุด limit แท่ง (คอลัมน์ตาม COLUMNS) เป็น view ของ buffer
+
+        view ใช้ได้จนกว่า series เดียวกันจะถูกอัปเดตครั้งถัดไป ถ้าต้องเก็บไว้นานกว่านั้นให้ copy เอง
+        """
+        limit = min(limit, self.capacity)
+        key = (exchange_name, symbol, timeframe)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+
+        async with lock:
+            buffer = self.buffers.get(key)
+            since = self._incremental_since(key, buffer, timeframe, limit)
+            if since is None and self.store is not None:
+                # หลังเริ่มระบบใหม่ โหลดประวัติจากดิสก์แล้วดึงเฉพาะส่วนที่ขาด
+                buffer = self._load_from_store(key, timeframe, limit) or buffer
+                since = self._incremental_since(key, buffer, timeframe, limit)
+
+            if since is None:
+                ohlcv = await self.exchange_manager.fetch_ohlcv(exchange_name, symbol, timeframe, limit)
+                if not ohlcv:
+                    return None
+                buffer = buffer or CandleBuffer(self.capacity)
+                buffer.clear()
+                self.buffers[key] = buffer
+                self.history[key] = limit
+                self.stats['full_fetches'] += 1
+            else:
+                missing = self._bars_since(since, timeframe) + 1
+                ohlcv = await self.exchange_manager.fetch_ohlcv(
+                    exchange_name, symbol, timeframe, missing, since=since
+                )
+                if ohlcv is None:
+                    return None
+                self.stats['incremental_fetches'] += 1
+
+            self.stats['candles_fetched'] += len(ohlcv)
+            self._merge(buffer, ohlcv)
+            self._persist(key, ohlcv)
+            return buffer.view(limit)
+
+    async def get_dataframe(self, exchange_name: str, symbol: str, timeframe: str,
+                            limit: int = 100) -> Optional[pd.DataFrame]:
+        """แท่งเทียนเป็น DataFrame (index เป็นเวลา) ที่ใช้หน่วยความจำร่วมกับ buffer"""
+        candles = await self.get(exchange_name, symbol, timeframe, limit)
+        if candles is None or not len(candles):
+            return None
+        return to_dataframe(candles)
+
+    def _incremental_since(self, key: Tuple, buffer: Optional[CandleBuffer],
+                           timeframe: str, limit: int) -> Optional[int]:
+        """timestamp ที่จะดึงต่อ หรือ None ถ้าต้องดึงใหม่ทั้งหมด (ไม่มีข้อมูล, ต้องการย้อนหลังมากกว่าเดิม, ขาดหายมากเกิน)"""
+        if buffer is None or not len(buffer) or self.history.get(key, 0) < limit:
+            return None
+        last = buffer.last_timestamp()
+        if self._bars_since(last, timeframe) >= limit:
+            return None
+        return last
+
+    def _load_from_store(self, key: Tuple, timeframe: str, limit: int) -> Optional[CandleBuffer]:
+        """เติม buffer จาก CandleStore ถ้ามีแท่งพอและไม่เก่าเกิน limit แท่ง"""
+        try:
+            stored = self.store.tail(*key, limit)
+        except Exception as e:
+            self.logger.warning(f"⚠️ อ่าน candle store ของ {key} ไม่ได้: {e}")
+            return None
+        if stored is None or len(stored) < limit or self._bars_since(int(stored[-1, 0]), timeframe) >= limit:
+            return None
+
+        buffer = CandleBuffer(self.capacity)
+        for row in stored:
+            buffer.append(row)
+        self.buffers[key] = buffer
+        self.history[key] = limit
+        self.stats['store_loads'] += 1
+        return buffer
+
+    def _persist(self, key: Tuple, ohlcv: List[List]):
+        """ต่อท้ายแท่งที่ปิดแล้วลง CandleStore"""
+        if self.store is None:
+            return
+        try:
+            self.store.append(*key, ohlcv)
+        except Exception as e:
+            self.logger.warning(f"⚠️ เขียน candle store ของ {key} ไม่ได้: {e}")
+
+    @staticmethod
+    def _bars_since(timestamp: int, timeframe: str) -> int:
+        timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        return max(0, int((time.time() * 1000 - timestamp) // timeframe_ms))
+
+    @staticmethod
+    def _merge(buffer: CandleBuffer, ohlcv: List[List]):
+        """เพิ่มแท่งที่ใหม่กว่า แทนที่แท่งที่ timestamp ตรงกับแท่งสุดท้าย และข้ามแท่งที่เก่ากว่า"""
+        last = buffer.last_timestamp()
+        for candle in sorted(ohlcv, key=lambda c: c[0]):
+            timestamp = candle[0]
+            if last is not None and timestamp < last:
+                continue
+            row = [value if value is not None else np.nan for value in candle[:6]]
+            if timestamp == last:
+                buffer.replace_last(row)
+            else:
+                buffer.append(row)
+                last = timestamp
+
+    def invalidate(self, exchange_name: Optional[str] = None):
+        """ล้างแคชทั้งหมดหรือเฉพาะ exchange"""
+        for key in [key for key in self.buffers if exchange_name is None or key[0] == exchange_name]:
+            del self.buffers[key]
+            self.history.pop(key, None)
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'series': len(self.buffers)}
+
+
+def to_dataframe(candles: np.ndarray) -> pd.DataFrame:
+    """แปลง array OHLCV เป็น DataFrame โดยไม่ copy คอลัมน์ราคา (มีเพียง index เวลาที่สร้างใหม่)"""
+    index = pd.DatetimeIndex(pd.to_datetime(candles[:, 0], unit='ms'), name='timestamp')
+    return pd.DataFrame(candles[:, 1:], index=index, columns=COLUMNS[1:], copy=False)
@@ -0,0 +1,173 @@
+"""
+Candle Store
+เก็บแท่งเทียน OHLCV ลงดิสก์ หนึ่งไฟล์ต่อ (exchange, symbol, timeframe)
+รูปแบบไฟล์: header 16 bytes ตามด้วย record ขนาดคงที่ (float64 x 6 ตาม COLUMNS) เรียงตามเวลา
+เขียนแบบต่อท้าย (แท่งย้อนหลังใช้ prepend ซึ่งเขียนไฟล์ใหม่) และอ่านช่วงเวลาผ่าน memory map โดยไม่ copy
+"""
+
+import logging
+import os
+import struct
+import time
+from typing import List, Optional, Tuple
+
+import ccxt
+import numpy as np
+
+from .candle_cache import COLUMNS
+
+MAGIC = b'CNDL'
+VERSION = 1
+HEADER = struct.Struct('<4sHH8x')  # magic, version, จำนวนคอลัมน์
+RECORD_SIZE = len(COLUMNS) * 8
+
+
+class CandleStore:
+    """คลังแท่งเทียนบนดิสก์ (append-only + memory-mapped range reads)"""
+
+    def __init__(self, root: str = "temp/candle_store"):
+        self.root = root
+        self.logger = logging.getLogger('ExchangeManager')
+
+    def path(self, exchange_name: str, symbol: str, timeframe: str) -> str:
+        safe_symbol = symbol.replace('/', '_').replace(':', '_')
+        return os.path.join(self.root, exchange_name, f"{safe_symbol}_{timeframe}.bin")
+
+    def series(self) -> List[Tuple[str, str, str]]:
+        """รายการ (exchange, ชื่อไฟล์ symbol, timeframe) ที่มีข้อมูลบนดิสก์"""
+        result = []
+        if not os.path.isdir(self.root):
+            return result
+        for exchange_name in sorted(os.listdir(self.root)):
+            directory = os.path.join(self.root, exchange_name)
+            for filename in sorted(os.listdir(directory)):
+                if filename.endswith('.bin'):
+                    safe_symbol, timeframe = filename[:-4].rsplit('_', 1)
+                    result.append((exchange_name, safe_symbol, timeframe))
+        return result
+
+    def count(self, exchange_name: str, symbol: str, timeframe: str) -> int:
+        """จำนวนแท่งที่เก็บไว้ (record ที่เขียนไม่ครบจะไม่ถูกนับ)"""
+        try:
+            size = os.path.getsize(self.path(exchange_name, symbol, timeframe))
+        except OSError:
+            return 0
+        return max(0, (size - HEADER.size) // RECORD_SIZE)
+
+    def last_timestamp(self, exchange_name: str, symbol: str, timeframe: str) -> Optional[int]:
+        count = self.count(exchange_name, symbol, timeframe)
+        if not count:
+            return None
+        with open(self.path(exchange_name, symbol, timeframe), 'rb') as f:
+            f.seek(HEADER.size + (count - 1) * RECORD_SIZE)
+            return int(struct.unpack('<d', f.read(8))[0])
+
+    def first_timestamp(self, exchange_name: str, symbol: str, timeframe: str) -> Optional[int]:
+        if not self.count(exchange_name, symbol, timeframe):
+            return None
+        with open(self.path(exchange_name, symbol, timeframe), 'rb') as f:
+            f.seek(HEADER.size)
+            return int(struct.unpack('<d', f.read(8))[0])
+
+    def append(self, exchange_name: str, symbol: str, timeframe: str, candles: List[List],
+               closed_only: bool = True, allow_gap: bool = False) -> int:
+        """ต่อท้ายแท่งที่ใหม่กว่าแท่งสุดท้ายในไฟล์ (คืนจำนวนแท่งที่เขียน)
+
+        closed_only: ข้ามแท่งที่ยังไม่ปิด เพื่อให้ข้อมูลในไฟล์ไม่ต้องแก้ไขภายหลัง
+        allow_gap: ถ้า False จะไม่เขียนเมื่อแท่งแรกไม่ต่อเนื่องกับไฟล์ (ให้ backfill เติมช่วงที่ขาดก่อน)
+        """
+        if not candles:
+            return 0
+
+        timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        now = time.time() * 1000
+        last = self.last_timestamp(exchange_name, symbol, timeframe)
+
+        rows = [
+            candle[:len(COLUMNS)] for candle in sorted(candles, key=lambda c: c[0])
+            if (last is None or candle[0] > last) and (not closed_only or candle[0] + timeframe_ms <= now)
+        ]
+        if not rows:
+            return 0
+
+        if last is not None and not allow_gap and rows[0][0] > last + timeframe_ms:
+            self.logger.debug(f"ข้ามการเขียน {exchange_name} {symbol} {timeframe}: ข้อมูลขาดช่วงหลัง {last}")
+            return 0
+
+        # ช่องที่ exchange ส่งมาเป็น None จะถูกเก็บเป็น NaN
+        data = np.array(rows, dtype='<f8')
+        self._write(exchange_name, symbol, timeframe, data, mode='append')
+        return len(data)
+
+    def prepend(self, exchange_name: str, symbol: str, timeframe: str, candles: List[List]) -> int:
+        """เพิ่มแท่งที่เก่ากว่าแท่งแรกในไฟล์ (เขียนไฟล์ใหม่ทั้งไฟล์ ใช้สำหรับ backfill ย้อนหลัง)"""
+        first = self.first_timestamp(exchange_name, symbol, timeframe)
+        rows = [candle[:len(COLUMNS)] for candle in sorted(candles, key=lambda c: c[0])
+                if first is None or candle[0] < first]
+        if not rows:
+            return 0
+
+        data = np.array(rows, dtype='<f8')
+        existing = self.read(exchange_name, symbol, timeframe)
+        if existing is not None:
+            data = np.concatenate([data, existing])
+            del existing  # ปิด memory map ก่อนแทนที่ไฟล์
+        self._write(exchange_name, symbol, timeframe, data, mode='replace')
+        return len(rows)
+
+    def _write(self, exchange_name: str, symbol: str, timeframe: str, data: np.ndarray, mode: str):
+        path = self.path(exchange_name, symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if mode == 'replace':
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, len(COLUMNS)))
+                f.write(data.tobytes())
+            os.replace(tmp_path, path)
+            return
+
+        if not os.path.exists(path) or os.path.getsize(path) < HEADER.size:
+            with open(path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, len(COLUMNS)))
+
+        with open(path, 'r+b') as f:
+            # ตัด record ที่เขียนไม่ครบจากการปิดโปรแกรมกลางคันทิ้งก่อนต่อท้าย
+            size = f.seek(0, os.SEEK_END)
+            complete = HEADER.size + (size - HEADER.size) // RECORD_SIZE * RECORD_SIZE
+            if complete != size:
+                f.truncate(complete)
+                f.seek(complete)
+            f.write(data.tobytes())
+
+    def read(self, exchange_name: str, symbol: str, timeframe: str,
+             start: Optional[int] = None, end: Optional[int] = None) -> Optional[np.ndarray]:
+        """แท่งที่ start <= timestamp < end เป็น memory map แบบอ่านอย่างเดียว (คืน None ถ้าไม่มีข้อมูล)"""
+        count = self.count(exchange_name, symbol, timeframe)
+        if not count:
+            return None
+
+        path = self.path(exchange_name, symbol, timeframe)
+        try:
+            with open(path, 'rb') as f:
+                magic, version, columns = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION or columns != len(COLUMNS):
+                self.logger.warning(f"⚠️ ไฟล์แท่งเทียน {path} ไม่ใช่รูปแบบที่รองรับ")
+                return None
+            data = np.memmap(path, dtype='<f8', mode='r', offset=HEADER.size, shape=(count, len(COLUMNS)))
+        except Exception as e:
+            self.logger.warning(f"⚠️ อ่านไฟล์แท่งเทียน {path} ไม่ได้: {e}")
+            return None
+
+        # binary search บนคอลัมน์ timestamp แตะเพียงไม่กี่ page ของไฟล์
+        timestamps = data[:, 0]
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        hi = count if end is None else int(np.searchsorted(timestamps, end, side='left'))
+        return data[lo:hi]
+
+    def tail(self, exchange_name: str, symbol: str, timeframe: str, n: int) -> Optional[np.ndarray]:
+        """n แท่งล่าสุด"""
+        data = self.read(exchange_name, symbol, timeframe)
+        if data is None:
+            return None
+        return data[max(0, len(data) - n):]
@@ -5,14 +5,25 @@ Crypto Pairs Scanner with MACD Signals
 """
 
 import asyncio
+import inspect
+import time
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import logging
-from typing import Dict, List, Optional, Tuple
-import ta
+from functools import partial
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
 from dataclasses import dataclass
-from .exchange_manager import ExchangeManager
+from .exchange_manager import ExchangeManager, get_shared_exchange_manager
+from .indicator_graph import MACDStrengthIndicators
+from .indicators import IndicatorRegistry, apply_columns
+from .parallel_indicators import ParallelIndicators
+from .resample import plan_timeframes, required_bars, resample_dataframe
+from .scan_executor import ScanExecutor
+from .scan_scheduler import CloseScheduler, sleep_until
+from .signal_strength import signal_strength
+from .universe import filter_by_volume, spot_symbols
+from .vector_scan import BatchScanResult, align_frames, scan_matrix
 import json
 
 @dataclass
@@ -41,8 +52,24 @@ class ScannerConfig:
     macd_fast: int = 12
     macd_slow: int = 26
     macd_signal_period: int = 9
+    resample_max_bars: int = 1000  # จำนวนแท่งฐานสูงสุดที่ยอมดึงเพื่อสร้าง timeframe ใหญ่ในเครื่อง (0 คือดึงทุก timeframe แยก)
+    batch_scan: bool = False  # คำนวณ MACD ของทุกคู่พร้อมกันบนเมทริกซ์ราคาแทนการคำนวณทีละคู่
+    max_concurrent_pairs: int = 50  # จำนวนคู่ที่สแกนพร้อมกันสูงสุด (จำกัดงานและ DataFrame ที่ค้างในหน่วยความจำ)
+    max_concurrent_per_exchange: int = 10  # จำนวนคู่ที่สแกนพร้อมกันสูงสุดต่อ exchange
+    exchange_concurrency: Dict[str, int] = None  # ขีดจำกัดเฉพาะ exchange เช่น {'gateio': 4}
+    pair_timeout: float = 30  # วินาทีสูงสุดต่อคู่ (0 คือไม่จำกัด)
+    progress_interval: float = 10  # วินาทีระหว่าง log ความคืบหน้า (0 คือไม่ log)
+    universe: bool = False  # สแกนทุก spot market ของ exchange แทน trading_pairs (กรองด้วย volume จาก ticker ก่อน)
+    quote_currencies: List[str] = None  # quote ที่นับเข้า universe
+    max_pairs: int = 0  # จำนวนคู่สูงสุดต่อ exchange ในโหมด universe เรียงตาม volume (0 คือไม่จำกัด)
+    close_grace_seconds: float = 5  # วินาทีที่รอหลังแท่งปิดก่อนสแกน (สแกนต่อเนื่องตามเวลาปิดแท่ง)
+    parallel_workers: int = 0  # batch_scan: จำนวน process ที่คำนวณ indicator (0 คือ process หลัก, -1 คือทุก CPU)
     
     def __post_init__(self):
+        if self.exchange_concurrency is None:
+            self.exchange_concurrency = {}
+        if self.quote_currencies is None:
+            self.quote_currencies = ['USDT']
         if self.timeframes is None:
             self.timeframes = ['1h', '4h', '1d']
         if self.exchanges is None:
@@ -58,12 +85,19 @@ class ScannerConfig:
 class CryptoPairsScanner:
     """สแกนเนอร์สำหรับหาสัญญาณ MACD ในคู่เทรด crypto"""
     
-    def __init__(self, config_path: str = "config.json"):
-        self.exchange_manager = ExchangeManager(config_path)
+    def __init__(self, config_path: str = "config.json", exchange_manager: Optional[ExchangeManager] = None):
+        self.exchange_manager = exchange_manager or get_shared_exchange_manager(config_path)
         self.config = ScannerConfig()
         self.logger = self._setup_logger()
         self.scan_results = {}
         self.is_scanning = False
+        self._stop_event = None
+        # state ของ MACD ต่อ (exchange, symbol, timeframe) คำนวณเฉพาะแท่งใหม่ในแต่ละรอบสแกน
+        self.indicators = IndicatorRegistry(self._create_indicators)
+        # executor ของการสแกนรอบล่าสุด (ความคืบหน้าและ throughput)
+        self.executor = self._create_executor()
+        # process pool ของ batch scan (สร้างเมื่อเปิด parallel_workers)
+        self.parallel = None
         
     def _setup_logger(self) -> logging.Logger:
         """ตั้งค่า logger"""
@@ -83,6 +117,8 @@ class CryptoPairsScanner:
     async def initialize(self) -> bool:
         """เริ่มต้นการเชื่อมต่อกับ exchanges"""
         self.logger.info("🔍 เริ่มต้น Crypto Pairs Scanner")
+        if self.exchange_manager.backend == 'async':
+            return await self.exchange_manager.initialize_exchanges_async()
         return self.exchange_manager.initialize_exchanges()
     
     def update_config(self, **kwargs):
@@ -91,6 +127,21 @@ class CryptoPairsScanner:
             if hasattr(self.config, key):
                 setattr(self.config, key, value)
                 self.logger.info(f"📝 อัปเดตการตั้งค่า {key}: {value}")
+                if key.startswith('macd_'):
+                    self.indicators.clear()
+    
+    def _create_indicators(self) -> MACDStrengthIndicators:
+        return MACDStrengthIndicators(self.config.macd_fast, self.config.macd_slow, self.config.macd_signal_period)
+    
+    def _create_executor(self) -> ScanExecutor:
+        return ScanExecutor(
+            max_concurrent=self.config.max_concurrent_pairs,
+            per_exchange=self.config.max_concurrent_per_exchange,
+            timeout=self.config.pair_timeout,
+            exchange_limits=self.config.exchange_concurrency,
+            progress_interval=self.config.progress_interval,
+            logger=self.logger
+        )
     
     async def fetch_ohlcv_data(self, exchange_name: str, symbol: str, 
                               timeframe: str, limit: int = 100) -> Optional[pd.DataFrame]:
@@ -104,73 +155,35 @@ class CryptoPairsScanner:
             if exchange_name not in self.exchange_manager.exchanges:
                 return None
             
-            ohlcv_data = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-            
-            df = pd.DataFrame(ohlcv_data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df = df.set_index('timestamp')
-            
-            return df.sort_index()
+            # ดึงเฉพาะแท่งใหม่จากแคช (DataFrame ใช้หน่วยความจำร่วมกับแคช)
+            return await self.exchange_manager.candle_cache.get_dataframe(exchange_name, symbol, timeframe, limit)
             
         except Exception as e:
             self.logger.debug(f"ไม่สามารถดึงข้อมูล {symbol} จาก {exchange_name}: {e}")
             return None
     
-    def calculate_macd(self, df: pd.DataFrame) -> pd.DataFrame:
-        """คำนวณ MACD indicators"""
+    def calculate_macd(self, df: pd.DataFrame, key: Optional[Tuple] = None) -> pd.DataFrame:
+        """คำนวณ MACD indicators
+
+        key: (exchange, symbol, timeframe) เพื่อเก็บ state ไว้และคำนวณเฉพาะแท่งใหม่ในครั้งถัดไป
+        """
         try:
-            # คำนวณ MACD
-            macd_indicator = ta.trend.MACD(
-                close=df['close'],
-                window_fast=self.config.macd_fast,
-                window_slow=self.config.macd_slow,
-                window_sign=self.config.macd_signal_period
-            )
-            
-            df['macd'] = macd_indicator.macd()
-            df['macd_signal'] = macd_indicator.macd_signal()
-            df['macd_histogram'] = macd_indicator.macd_diff()
-            
-            # คำนวณ MACD crosses
-            df['macd_cross_up'] = (
-                (df['macd'] > 0) & 
-                (df['macd'].shift(1) <= 0)
-            )
-            
-            df['macd_cross_down'] = (
-                (df['macd'] < 0) & 
-                (df['macd'].shift(1) >= 0)
-            )
-            
-            # คำนวณความแรงของสัญญาณ
-            df['signal_strength'] = self._calculate_signal_strength(df)
-            
-            return df
+            if key is None:
+                indicators = self.indicators.compute(df)
+            else:
+                indicators = self.indicators.sync(key, df)
+            return apply_columns(df, indicators)
             
         except Exception as e:
             self.logger.error(f"ไม่สามารถคำนวณ MACD: {e}")
             return df
     
     def _calculate_signal_strength(self, df: pd.DataFrame) -> pd.Series:
-        """คำนวณความแรงของสัญญาณ MACD (0-100)"""
+        """คำนวณความแรงของสัญญาณ MACD (0-100) จาก histogram และ momentum"""
         try:
-            # ใช้ histogram และ momentum ในการคำนวณ
-            histogram_abs = df['macd_histogram'].abs()
-            histogram_max = histogram_abs.rolling(window=20).max()
-            
-            # ความแรงจาก histogram (0-50)
-            histogram_strength = (histogram_abs / histogram_max * 50).fillna(0)
-            
-            # ความแรงจาก momentum (0-50)
-            macd_momentum = df['macd'] - df['macd'].shift(1)
-            momentum_abs = macd_momentum.abs()
-            momentum_max = momentum_abs.rolling(window=20).max()
-            momentum_strength = (momentum_abs / momentum_max * 50).fillna(0)
-            
-            # รวมความแรง
-            total_strength = histogram_strength + momentum_strength
-            
-            return total_strength.clip(0, 100)
+            strength = signal_strength(df['macd'].to_numpy(dtype=np.float64),
+                                       df['macd_histogram'].to_numpy(dtype=np.float64))
+            return pd.Series(strength, index=df.index)
             
         except Exception as e:
             self.logger.error(f"ไม่สามารถคำนวณความแรงสัญญาณ: {e}")
@@ -232,19 +245,72 @@ class CryptoPairsScanner:
         
         return signals
     
+    async def resolve_pairs(self, exchange_name: str) -> List[str]:
+        """คู่เทรดที่จะสแกนใน exchange
+
+        universe: ทุก spot market ที่เปิดซื้อขายในสกุล quote_currencies ที่ volume 24 ชั่วโมง (หน่วย quote)
+        จาก fetch_tickers ครั้งเดียวไม่ต่ำกว่า min_volume_24h เรียงจาก volume มากไปน้อย
+        ไม่เช่นนั้นหรือเมื่อดึง markets/tickers ไม่ได้ ใช้ trading_pairs ใน config
+        """
+        if not self.config.universe:
+            return self.config.trading_pairs
+        
+        markets = await self.exchange_manager.load_markets(exchange_name)
+        symbols = spot_symbols(markets, self.config.quote_currencies)
+        if not symbols:
+            self.logger.warning(f"⚠️ {exchange_name.upper()}: ไม่มีข้อมูล markets ใช้ trading_pairs ใน config แทน")
+            return self.config.trading_pairs
+        
+        tickers = await self.exchange_manager.ticker_hub.refresh_all(exchange_name)
+        if not tickers:
+            self.logger.warning(f"⚠️ {exchange_name.upper()}: ดึง ticker ทั้งหมดไม่ได้ ใช้ trading_pairs ใน config แทน")
+            return self.config.trading_pairs
+        
+        pairs = filter_by_volume(symbols, tickers, self.config.min_volume_24h, self.config.max_pairs)
+        # ไม่เก็บ state ของ indicator สำหรับคู่ที่หลุดจาก universe ไว้
+        selected = set(pairs)
+        self.indicators.evict(lambda key: key[0] == exchange_name and key[1] not in selected)
+        self.logger.info(
+            f"🌐 {exchange_name.upper()}: spot {len(symbols)} คู่ ผ่านเกณฑ์ volume {len(pairs)} คู่"
+        )
+        return pairs
+    
+    async def fetch_timeframes(self, exchange_name: str, symbol: str, timeframes: List[str],
+                               limit: int = 100) -> Dict[str, pd.DataFrame]:
+        """ดึงข้อมูลหลาย timeframe โดยดึงเฉพาะ timeframe ฐานแล้ว resample ที่เหลือในเครื่อง"""
+        max_bars = min(self.config.resample_max_bars, self.exchange_manager.candle_cache.capacity)
+        plan = plan_timeframes(timeframes, limit, max_bars)
+        
+        async def fetch_group(base: str, derived: List[str]) -> Dict[str, pd.DataFrame]:
+            df = await self.fetch_ohlcv_data(exchange_name, symbol, base, required_bars(base, derived, limit))
+            if df is None or df.empty:
+                # DataFrame ว่างบอก scan_single_pair ว่าดึงแล้วไม่มีข้อมูล ไม่ต้องดึงซ้ำ
+                return {timeframe: pd.DataFrame() for timeframe in [base] + derived}
+            
+            frames = {base: df.iloc[-limit:]}
+            for timeframe in derived:
+                frames[timeframe] = resample_dataframe(df, timeframe).iloc[-limit:]
+            return frames
+        
+        frames = {}
+        for group in await asyncio.gather(*[fetch_group(base, derived) for base, derived in plan.items()]):
+            frames.update(group)
+        return frames
+    
     async def scan_single_pair(self, exchange_name: str, symbol: str, 
-                              timeframe: str) -> List[MACDSignal]:
-        """สแกนคู่เทรดเดียว"""
+                              timeframe: str, df: Optional[pd.DataFrame] = None) -> List[MACDSignal]:
+        """สแกนคู่เทรดเดียว (ส่ง df มาได้ถ้าดึงข้อมูลไว้แล้ว)"""
         signals = []
         
         try:
             # ดึงข้อมูล OHLCV
-            df = await self.fetch_ohlcv_data(exchange_name, symbol, timeframe, 100)
+            if df is None:
+                df = await self.fetch_ohlcv_data(exchange_name, symbol, timeframe, 100)
             if df is None or df.empty:
                 return signals
             
             # คำนวณ MACD
-            df = self.calculate_macd(df)
+            df = self.calculate_macd(df, (exchange_name, symbol, timeframe))
             
             # ตรวจหาสัญญาณ
             signals = self.detect_macd_signals(df, symbol, exchange_name, timeframe)
@@ -254,37 +320,100 @@ class CryptoPairsScanner:
         
         return signals
     
-    async def scan_all_pairs(self, timeframes: List[str] = None) -> Dict[str, List[MACDSignal]]:
-        """สแกนคู่เทรดทั้งหมด"""
+    async def _scan_pair(self, exchange_name: str, symbol: str, timeframes: List[str]) -> List[MACDSignal]:
+        """สแกนคู่เทรดเดียวทุก timeframe"""
+        # หนึ่ง request ต่อ timeframe ฐาน ส่วน timeframe ที่ใหญ่กว่าสร้างจากแท่งฐาน
+        frames = await self.fetch_timeframes(exchange_name, symbol, timeframes, 100)
+        results = await asyncio.gather(*[
+            self.scan_single_pair(exchange_name, symbol, timeframe, frames.get(timeframe))
+            for timeframe in timeframes
+        ])
+        return [signal for signals in results for signal in signals]
+    
+    async def scan_stream(self, timeframes: List[str] = None) -> AsyncIterator[MACDSignal]:
+        """สแกนคู่เทรดทั้งหมดและ yield สัญญาณทันทีที่แต่ละคู่สแกนเสร็จ
+
+        คู่ถูกรันผ่าน ScanExecutor: พร้อมกันไม่เกิน max_concurrent_pairs คู่ และไม่เกิน
+        max_concurrent_per_exchange คู่ต่อ exchange แต่ละคู่ใช้เวลาไม่เกิน pair_timeout วินาที
+        batch_scan: ดึงข้อมูลทีละคู่แบบเดียวกัน แล้วสแกนแบบ vectorized เมื่อดึงครบทั้ง exchange
+        """
         if timeframes is None:
             timeframes = self.config.timeframes
         
-        self.logger.info(f"🔍 เริ่มสแกนคู่เทรด {len(self.config.trading_pairs)} คู่ ใน {len(timeframes)} timeframes")
+        enabled = self.exchange_manager.get_enabled_exchanges()
+        exchanges = [exchange_name for exchange_name in self.config.exchanges if exchange_name in enabled]
+        pairs = dict(zip(exchanges, await asyncio.gather(*[
+            self.resolve_pairs(exchange_name) for exchange_name in exchanges
+        ])))
+        executor = self.executor = self._create_executor()
+        
+        total = sum(len(symbols) for symbols in pairs.values())
+        self.logger.info(f"🔍 เริ่มสแกนคู่เทรด {total} คู่ ใน {len(exchanges)} exchanges {len(timeframes)} timeframes")
+        
+        if not self.config.batch_scan:
+            runner = executor.run([
+                (exchange_name, symbol, partial(self._scan_pair, exchange_name, symbol, timeframes))
+                for exchange_name, symbols in pairs.items() for symbol in symbols
+            ])
+            try:
+                async for _, signals in runner:
+                    for signal in signals:
+                        yield signal
+            finally:
+                # ผู้เรียกหยุดอ่านก่อนจบ: ปิด executor ทันทีเพื่อยกเลิกคู่ที่ยังค้าง
+                await runner.aclose()
+            return
         
+        fetched = {exchange_name: {} for exchange_name in exchanges}
+        runner = executor.run(self._fetch_jobs(pairs, timeframes, 100))
+        try:
+            async for (exchange_name, symbol), frames in runner:
+                fetched[exchange_name][symbol] = frames
+                # exchange ที่ทุกคู่จบแล้ว (สำเร็จหรือล้มเหลว) สแกนได้ทันทีไม่ต้องรอ exchange อื่น
+                for name in [name for name in fetched if not executor.progress.remaining(name)]:
+                    for signal in await self._frames_signals(name, fetched.pop(name), timeframes, 100):
+                        yield signal
+        finally:
+            await runner.aclose()
+        for name, frames in fetched.items():
+            for signal in await self._frames_signals(name, frames, timeframes, 100):
+                yield signal
+    
+    async def scan_all_pairs(self, timeframes: List[str] = None,
+                             on_signal: Optional[Callable[[MACDSignal], None]] = None) -> Dict[str, List[MACDSignal]]:
+        """สแกนคู่เทรดทั้งหมด
+
+        on_signal: เรียกทันทีกับแต่ละสัญญาณที่พบระหว่างสแกน (ฟังก์ชันธรรมดาหรือ async ก็ได้)
+        """
+        signals = []
+        async for signal in self.scan_stream(timeframes):
+            signals.append(signal)
+            if on_signal is not None:
+                result = on_signal(signal)
+                if inspect.isawaitable(result):
+                    await result
+        
+        progress = self.executor.progress
+        self.logger.info(
+            f"📊 สแกน {progress.done}/{progress.total} งานใน {progress.elapsed:.1f}s "
+            f"({progress.throughput:.1f} งาน/วินาที) ล้มเหลว {progress.failed} หมดเวลา {progress.timed_out}"
+        )
+        return self._collect_signals(signals)
+    
+    def get_scan_stats(self) -> Dict:
+        """ความคืบหน้า (เสร็จ/ทั้งหมด, ETA, ล้มเหลว) และ throughput ของการสแกนรอบล่าสุดหรือที่กำลังรัน"""
+        return self.executor.get_stats()
+    
+    def _collect_signals(self, signals: List[MACDSignal]) -> Dict[str, List[MACDSignal]]:
+        """รวบรวมสัญญาณตาม exchange และ timeframe แล้วเก็บเป็นผลการสแกนล่าสุด"""
         all_signals = {}
-        tasks = []
-        
-        # สร้าง tasks สำหรับการสแกนแบบ concurrent
-        for exchange_name in self.config.exchanges:
-            if exchange_name not in self.exchange_manager.get_enabled_exchanges():
-                continue
-                
-            for symbol in self.config.trading_pairs:
-                for timeframe in timeframes:
-                    task = self.scan_single_pair(exchange_name, symbol, timeframe)
-                    tasks.append(task)
-        
-        # รันการสแกนแบบ concurrent
-        results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # รวบรวมผลลัพธ์
-        for result in results:
-            if isinstance(result, list):
-                for signal in result:
-                    key = f"{signal.exchange}_{signal.timeframe}"
-                    if key not in all_signals:
-                        all_signals[key] = []
-                    all_signals[key].append(signal)
+        for signal in signals:
+            key = f"{signal.exchange}_{signal.timeframe}"
+            if key not in all_signals:
+                all_signals[key] = []
+            all_signals[key].append(signal)
         
         # เรียงลำดับตามความแรงสัญญาณ
         for key in all_signals:
@@ -297,6 +426,116 @@ class CryptoPairsScanner:
         
         return all_signals
     
+    def _fetch_jobs(self, pairs: Dict[str, List[str]], timeframes: List[str], limit: int) -> List:
+        """งานดึงข้อมูลทุก timeframe ของแต่ละคู่ ({exchange: symbols}) สำหรับ ScanExecutor (ชื่องานคือ (exchange, symbol))"""
+        return [
+            (exchange_name, (exchange_name, symbol),
+             partial(self.fetch_timeframes, exchange_name, symbol, timeframes, limit))
+            for exchange_name, symbols in pairs.items() for symbol in symbols
+        ]
+    
+    def _scan_frames(self, frames: Dict[str, Dict[str, pd.DataFrame]], timeframes: List[str],
+                     limit: int) -> Dict[str, BatchScanResult]:
+        """สแกน DataFrame ของหลายคู่ ({symbol: {timeframe: df}}) แบบ vectorized ทีละ timeframe"""
+        results = {}
+        for timeframe in timeframes:
+            aligned = align_frames({
+                symbol: symbol_frames.get(timeframe) for symbol, symbol_frames in frames.items()
+            }, limit)
+            results[timeframe] = scan_matrix(*aligned, **self._scan_params())
+        return results
+    
+    def _scan_params(self) -> Dict:
+        """เงื่อนไขของ scan_matrix ตาม config"""
+        return {
+            'fast': self.config.macd_fast,
+            'slow': self.config.macd_slow,
+            'sign': self.config.macd_signal_period,
+            'min_signal_strength': self.config.min_signal_strength,
+            'min_volume_24h': self.config.min_volume_24h,
+        }
+    
+    def _get_parallel(self) -> ParallelIndicators:
+        workers = self.config.parallel_workers if self.config.parallel_workers > 0 else None
+        if self.parallel is None or (workers is not None and self.parallel.workers != workers):
+            if self.parallel is not None:
+                self.parallel.close()
+            self.parallel = ParallelIndicators(workers, logger=self.logger)
+        return self.parallel
+    
+    async def _frames_signals(self, exchange_name: str, frames: Dict[str, Dict[str, pd.DataFrame]],
+                              timeframes: List[str], limit: int) -> List[MACDSignal]:
+        """สัญญาณจาก DataFrame ของหลายคู่ใน exchange เดียว (parallel_workers: คำนวณใน process pool)"""
+        if not self.config.parallel_workers:
+            return self._batch_signals(exchange_name, self._scan_frames(frames, timeframes, limit))
+        
+        signals = []
+        for timeframe in timeframes:
+            symbols, timestamps, close, volume = align_frames({
+                symbol: symbol_frames.get(timeframe) for symbol, symbol_frames in frames.items()
+            }, limit)
+            if not symbols:
+                continue
+            records = await self._get_parallel().scan(close, volume, **self._scan_params())
+            timestamp = pd.Timestamp(timestamps[-1], unit='ms')
+            for record in records:
+                signals.append(MACDSignal(
+                    symbol=symbols[record['row']],
+                    exchange=exchange_name,
+                    timeframe=timeframe,
+                    signal_type='long' if record['long'] else 'short',
+                    macd_value=float(record['macd']),
+                    macd_signal=float(record['macd_signal']),
+                    macd_histogram=float(record['macd_histogram']),
+                    price=float(record['close']),
+                    volume=float(record['volume_24h']),
+                    timestamp=timestamp,
+                    strength=float(record['strength'])
+                ))
+        return signals
+    
+    async def scan_batch(self, exchange_name: str, timeframes: List[str], symbols: List[str] = None,
+                         limit: int = 100) -> Dict[str, BatchScanResult]:
+        """สแกนทุกคู่ใน exchange เดียวแบบ vectorized: ผลลัพธ์เป็น array ต่อ timeframe
+
+        ราคาของทุกคู่ถูกจัดเป็นเมทริกซ์ (symbols × time) แล้วคำนวณ MACD, จุดตัดและความแรงในครั้งเดียว
+        การดึงข้อมูลผ่าน ScanExecutor ตามขีดจำกัดของ config คู่ที่ดึงไม่สำเร็จจะไม่อยู่ในผลลัพธ์
+        """
+        if symbols is None:
+            symbols = await self.resolve_pairs(exchange_name)
+        
+        fetched = {}
+        executor = self._create_executor()
+        async for (_, symbol), frames in executor.run(self._fetch_jobs({exchange_name: symbols}, timeframes, limit)):
+            fetched[symbol] = frames
+        # เรียงตาม symbols ที่ขอ ไม่ใช่ลำดับที่ดึงเสร็จ
+        return self._scan_frames({symbol: fetched[symbol] for symbol in symbols if symbol in fetched},
+                                 timeframes, limit)
+    
+    def _batch_signals(self, exchange_name: str, results: Dict[str, BatchScanResult]) -> List[MACDSignal]:
+        """แปลงแถวที่มีสัญญาณของผล scan_batch เป็น MACDSignal"""
+        signals = []
+        for timeframe, result in results.items():
+            for row in result.signal_indices():
+                signals.append(MACDSignal(
+                    symbol=result.symbols[row],
+                    exchange=exchange_name,
+                    timeframe=timeframe,
+                    signal_type='long' if result.long[row] else 'short',
+                    macd_value=result.macd[row, -1],
+                    macd_signal=result.macd_signal[row, -1],
+                    macd_histogram=result.macd_histogram[row, -1],
+                    price=result.close[row, -1],
+                    volume=result.volume_24h[row],
+                    timestamp=pd.Timestamp(result.timestamps[-1], unit='ms'),
+                    strength=result.signal_strength[row, -1]
+                ))
+        return signals
+    
+    async def scan_exchange_batch(self, exchange_name: str, timeframes: List[str]) -> List[MACDSignal]:
+        """สแกน exchange เดียวด้วย scan_batch แล้วแปลงแถวที่มีสัญญาณเป็น MACDSignal"""
+        return self._batch_signals(exchange_name, await self.scan_batch(exchange_name, timeframes))
+    
     def get_top_signals(self, signal_type: str = None, limit: int = 10) -> List[MACDSignal]:
         """ดึงสัญญาณที่ดีที่สุด"""
         all_signals = []
@@ -313,6 +552,12 @@ class CryptoPairsScanner:
         
         return all_signals[:limit]
     
+    def print_signal(self, signal: MACDSignal):
+        """แสดงสัญญาณเดียวทันทีที่พบ (ระหว่างที่ยังสแกนคู่อื่นอยู่)"""
+        icon = "🟢" if signal.signal_type == 'long' else "🔴"
+        print(f"{icon} {signal.signal_type.upper()} {signal.symbol} ({signal.exchange.upper()}) - {signal.timeframe} | "
+              f"💰 ${signal.price:,.4f} | 📊 ความแรง: {signal.strength:.1f}%")
+    
     def print_scan_results(self, timeframes: List[str] = None):
         """แสดงผลการสแกน"""
         if not self.scan_results:
@@ -415,14 +660,31 @@ class CryptoPairsScanner:
         self.logger.info(f"📁 ส่งออกสัญญาณไปยังไฟล์: {filename}")
         return filename
     
-    async def start_continuous_scan(self, interval_minutes: int = 15):
-        """เริ่มการสแกนอย่างต่อเนื่อง"""
+    async def start_continuous_scan(self, interval_minutes: Optional[float] = None,
+                                    on_signal: Optional[Callable[[MACDSignal], None]] = None):
+        """เริ่มการสแกนอย่างต่อเนื่อง
+
+        ไม่ระบุ interval_minutes: สแกนทุก timeframe หนึ่งครั้ง แล้วตื่นเมื่อแท่งของแต่ละ timeframe ปิด
+        (บวก close_grace_seconds) และสแกนเฉพาะ timeframe ที่เพิ่งปิด
+        ระบุ interval_minutes: สแกนทุก timeframe ทุก interval_minutes นาที
+        on_signal: จัดการแต่ละสัญญาณทันทีที่พบ (ค่าเริ่มต้นคือแสดงผลด้วย print_signal)
+        stop_scanning() หยุดได้ทันทีแม้อยู่ระหว่างรอ
+        """
         self.is_scanning = True
-        self.logger.info(f"🔄 เริ่มการสแกนต่อเนื่องทุก {interval_minutes} นาที")
+        self._stop_event = asyncio.Event()
+        
+        scheduler = None
+        if interval_minutes:
+            self.logger.info(f"🔄 เริ่มการสแกนต่อเนื่องทุก {interval_minutes} นาที")
+        else:
+            scheduler = CloseScheduler(self.config.timeframes, self.config.close_grace_seconds)
+            scheduler.reset()
+            self.logger.info(f"🔄 เริ่มการสแกนต่อเนื่องตามเวลาปิดแท่ง ({', '.join(self.config.timeframes)})")
+        timeframes = self.config.timeframes
         
         while self.is_scanning:
             try:
-                await self.scan_all_pairs()
+                await self.scan_all_pairs(timeframes, on_signal=on_signal or self.print_signal)
                 self.print_scan_results()
                 
                 # ส่งออกสัญญาณที่ดี
@@ -431,65 +693,96 @@ class CryptoPairsScanner:
                     self.export_signals_to_json()
                 
                 # รอก่อนรอบถัดไป
-                await asyncio.sleep(interval_minutes * 60)
+                if scheduler is None:
+                    await sleep_until(self._stop_event, interval_minutes * 60)
+                else:
+                    wake_at, timeframes = scheduler.advance()
+                    self.logger.info(
+                        f"⏰ รอบถัดไป {datetime.fromtimestamp(wake_at).strftime('%Y-%m-%d %H:%M:%S')} "
+                        f"({', '.join(timeframes)})"
+                    )
+                    await sleep_until(self._stop_event, wake_at - time.time())
                 
             except KeyboardInterrupt:
                 self.logger.info("⏹️ หยุดการสแกนโดยผู้ใช้")
                 break
             except Exception as e:
                 self.logger.error(f"❌ เกิดข้อผิดพลาดในการสแกน: {e}")
-                await asyncio.sleep(60)  # รอ 1 นาทีก่อนลองใหม่
+                await sleep_until(self._stop_event, 60)  # รอ 1 นาทีก่อนลองใหม่
         
         self.is_scanning = False
     
     def stop_scanning(self):
-        """หยุดการสแกน"""
+        """หยุดการสแกน (ปลุกการรอรอบถัดไปทันที)"""
         self.is_scanning = False
+        if self._stop_event is not None:
+            self._stop_event.set()
         self.logger.info("⏹️ หยุดการสแกน")
 
 # === Main Functions ===
-async def run_single_scan(timeframes: List[str] = None, exchanges: List[str] = None):
-    """รันการสแกนครั้งเดียว"""
+async def run_single_scan(timeframes: List[str] = None, exchanges: List[str] = None, batch: bool = False,
+                          universe: bool = False, workers: int = 0):
+    """รันการสแกนครั้งเดียว
+
+    batch=True คำนวณทุกคู่พร้อมกันแบบ vectorized, universe=True สแกนทุก spot market
+    workers: แบ่งการคำนวณ batch ไปหลาย process (-1 คือทุก CPU, เปิด batch ให้อัตโนมัติ)
+    """
     scanner = CryptoPairsScanner()
-    
-    if not await scanner.initialize():
-        print("❌ ไม่สามารถเชื่อมต่อกับ exchange ได้")
-        return
-    
-    # อัปเดตการตั้งค่า
-    if timeframes:
-        scanner.update_config(timeframes=timeframes)
-    if exchanges:
-        scanner.update_config(exchanges=exchanges)
-    
-    # รันการสแกน
-    await scanner.scan_all_pairs()
-    scanner.print_scan_results()
-    
-    # ส่งออกผลลัพธ์
-    scanner.export_signals_to_json()
-    
-    return scanner.scan_results
+    try:
+        if not await scanner.initialize():
+            print("❌ ไม่สามารถเชื่อมต่อกับ exchange ได้")
+            return
+        
+        # อัปเดตการตั้งค่า
+        if timeframes:
+            scanner.update_config(timeframes=timeframes)
+        if exchanges:
+            scanner.update_config(exchanges=exchanges)
+        if batch:
+            scanner.update_config(batch_scan=True)
+        if universe:
+            scanner.update_config(universe=True)
+        if workers:
+            scanner.update_config(batch_scan=True, parallel_workers=workers)
+        
+        # รันการสแกน (แสดงสัญญาณทันทีที่พบ แล้วสรุปเมื่อสแกนครบ)
+        await scanner.scan_all_pairs(on_signal=scanner.print_signal)
+        scanner.print_scan_results()
+        
+        # ส่งออกผลลัพธ์
+        scanner.export_signals_to_json()
+        
+        return scanner.scan_results
+    finally:
+        await _release_scanner(scanner)
 
-async def run_continuous_scan(interval_minutes: int = 15):
-    """รันการสแกนอย่างต่อเนื่อง"""
+async def run_continuous_scan(interval_minutes: Optional[float] = None):
+    """รันการสแกนอย่างต่อเนื่อง (ไม่ระบุ interval_minutes คือสแกนตามเวลาปิดแท่ง)"""
     scanner = CryptoPairsScanner()
-    
-    if not await scanner.initialize():
-        print("❌ ไม่สามารถเชื่อมต่อกับ exchange ได้")
-        return
-    
     try:
-        await scanner.start_continuous_scan(interval_minutes)
-    except KeyboardInterrupt:
-        scanner.stop_scanning()
+        if not await scanner.initialize():
+            print("❌ ไม่สามารถเชื่อมต่อกับ exchange ได้")
+            return
+        
+        try:
+            await scanner.start_continuous_scan(interval_minutes)
+        except KeyboardInterrupt:
+            scanner.stop_scanning()
+    finally:
+        await _release_scanner(scanner)
+
+async def _release_scanner(scanner: CryptoPairsScanner):
+    """ปิด process pool และ session ของ exchange (ccxt แบบ async เตือน unclosed session ถ้าไม่ปิด)"""
+    if scanner.parallel is not None:
+        scanner.parallel.close()
+    await scanner.exchange_manager.close_all_connections_async()
 
 # === Run ===
 if __name__ == "__main__":
     import sys
     
     if len(sys.argv) > 1 and sys.argv[1] == "continuous":
-        interval = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+        interval = int(sys.argv[2]) if len(sys.argv) > 2 else None
         asyncio.run(run_continuous_scan(interval))
     else:
         # รันการสแกนครั้งเดียว
@@ -1,22 +1,67 @@
 import ccxt
+import ccxt.async_support as ccxt_async
 import asyncio
+import inspect
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Dict, List, Optional, Any
 from web3 import Web3
 import json
 import os
 from dotenv import load_dotenv
+from .rate_limiter import RateLimitScheduler, lane_for_method, weight_for_call
+from .market_cache import MarketCache
+from .ticker_hub import TickerHub
+from .balance_cache import BalanceCache
+from .candle_cache import CandleCache
+from .candle_store import CandleStore
+from .market_stream import MarketStream, ADAPTERS
 
 load_dotenv()
 
 class ExchangeManager:
     """จัดการการเชื่อมต่อกับหลาย Exchange ทั้ง CEX และ DEX"""
     
-    def __init__(self, config_path: str = "config.json"):
+    def __init__(self, config_path: str = "config.json", backend: str = None):
+        self.logger = self._setup_logger()
         self.config = self._load_config(config_path)
         self.exchanges = {}
         self.dex_connections = {}
-        self.logger = self._setup_logger()
+        self.schedulers = {}
+        self.startup_timings = {}
+        self._abandoned = set()
+        # (exchange, method) ที่ exchange ปฏิเสธการเรียกโดยไม่ระบุ symbol (ccxt.ArgumentsRequired)
+        self._symbol_required = set()
+        self._init_lock = threading.Lock()
+        self._init_once = threading.Lock()
+        self._async_init_lock = None
+        self.initialized = False
+        
+        # 'sync' ใช้ ccxt ปกติ, 'async' ใช้ ccxt.async_support เพื่อไม่บล็อก event loop
+        settings = self.config.get('bot_settings', {})
+        self.backend = backend or settings.get('exchange_backend', 'sync')
+        
+        # แคช market metadata บนดิสก์ (market_cache_ttl = 0 คือปิด)
+        cache_ttl = settings.get('market_cache_ttl', 3600)
+        self.market_cache = MarketCache(settings.get('market_cache_dir', 'temp/market_cache'), cache_ttl) if cache_ttl else None
+        self._markets_persisted = set()
+        self._background_tasks = set()
+        
+        # snapshot ticker ต่อ exchange (หนึ่ง request ต่อรอบ)
+        self.ticker_hub = TickerHub(self)
+        
+        # ยอดเงินในหน่วยความจำ ปรับตามออเดอร์ของบอทและรีเฟรชตาม TTL
+        self.balance_cache = BalanceCache(self, settings.get('balance_cache_ttl', 30))
+        
+        # แท่งเทียนต่อ (exchange, symbol, timeframe) ดึงเฉพาะแท่งใหม่ และเก็บแท่งที่ปิดแล้วลงดิสก์ (candle_store_dir = "" คือปิด)
+        store_dir = settings.get('candle_store_dir', 'temp/candle_store')
+        self.candle_store = CandleStore(store_dir) if store_dir else None
+        self.candle_cache = CandleCache(self, settings.get('candle_cache_size', 1000), self.candle_store)
+        
+        # WebSocket market data ต่อ exchange
+        self.streams = {}
         
     def _load_config(self, config_path: str) -> Dict:
         """โหลดการตั้งค่าจากไฟล์ config"""
@@ -42,28 +87,161 @@ class ExchangeManager:
         
         return logger
     
+    def _enabled_exchange_configs(self) -> List[tuple]:
+        """รายการ (ชื่อ, config) ของ exchange ที่เปิดใช้งาน"""
+        return [
+            (name, config) for name, config in self.config.get('exchanges', {}).items()
+            if config.get('enabled', False)
+        ]
+    
+    def _startup_settings(self) -> tuple:
+        """ค่า (lazy_init, init_timeout) จาก bot_settings และล้างเวลาของรอบก่อน"""
+        settings = self.config.get('bot_settings', {})
+        with self._init_lock:
+            self.startup_timings = {}
+            self._abandoned.difference_update(self.config.get('exchanges', {}))
+        return settings.get('lazy_init', True), settings.get('init_timeout', 10)
+    
+    def _init_exchange(self, exchange_name: str, config: Dict, verify: bool) -> bool:
+        """เริ่มต้น exchange หนึ่งตัวและบันทึกเวลาที่ใช้"""
+        start = time.perf_counter()
+        
+        if config.get('type') == 'cex':
+            ok = self._initialize_cex(exchange_name, config, verify=verify)
+        elif config.get('type') == 'dex':
+            ok = self._initialize_dex(exchange_name, config)
+        else:
+            ok = False
+        
+        return self._record_startup(exchange_name, start, ok)
+    
+    def _record_startup(self, exchange_name: str, start: float, ok: bool) -> bool:
+        """บันทึกเวลาเริ่มต้น (exchange ที่หมดเวลาไปแล้วจะถูกถอดออก)"""
+        with self._init_lock:
+            if exchange_name in self._abandoned:
+                self.exchanges.pop(exchange_name, None)
+                self.dex_connections.pop(exchange_name, None)
+                return False
+            
+            self.startup_timings[exchange_name] = {
+                'ms': round((time.perf_counter() - start) * 1000, 1),
+                'status': 'ok' if ok else 'failed'
+            }
+        return ok
+    
+    def _abandon(self, exchange_name: str, timeout: float) -> bool:
+        """ทิ้ง exchange ที่เริ่มต้นไม่ทันเวลา (คืน False ถ้าทำเสร็จพอดี)"""
+        with self._init_lock:
+            if exchange_name in self.startup_timings:
+                return False
+            
+            self._abandoned.add(exchange_name)
+            self.exchanges.pop(exchange_name, None)
+            self.dex_connections.pop(exchange_name, None)
+            self.startup_timings[exchange_name] = {'ms': round(timeout * 1000, 1), 'status': 'timeout'}
+        
+        self.logger.error(f"❌ {exchange_name.upper()}: เชื่อมต่อไม่สำเร็จภายใน {timeout} วินาที")
+        return True
+    
     def initialize_exchanges(self) -> bool:
-        """เริ่มต้นการเชื่อมต่อกับ exchanges ทั้งหมด"""
+        """เริ่มต้นการเชื่อมต่อกับ exchanges ทั้งหมด (เรียกซ้ำได้ เชื่อมต่อจริงเพียงครั้งเดียว)"""
+        with self._init_once:
+            if not self.initialized:
+                self.initialized = self._connect_exchanges()
+            return self.initialized
+    
+    async def initialize_exchanges_async(self) -> bool:
+        """เริ่มต้นการเชื่อมต่อสำหรับ backend แบบ async (เรียกซ้ำได้ เชื่อมต่อจริงเพียงครั้งเดียว)"""
+        if self._async_init_lock is None:
+            self._async_init_lock = asyncio.Lock()
+        
+        async with self._async_init_lock:
+            if not self.initialized:
+                self.initialized = await self._connect_exchanges_async()
+            return self.initialized
+    
+    def _connect_exchanges(self) -> bool:
+        """เชื่อมต่อ exchanges ทั้งหมดพร้อมกัน"""
+        lazy, timeout = self._startup_settings()
+        enabled = self._enabled_exchange_configs()
+        started = time.perf_counter()
         success_count = 0
-        total_count = 0
         
-        for exchange_name, exchange_config in self.config.get('exchanges', {}).items():
-            if not exchange_config.get('enabled', False):
-                continue
-                
-            total_count += 1
+        if enabled:
+            executor = ThreadPoolExecutor(max_workers=len(enabled))
+            futures = {
+                executor.submit(self._init_exchange, name, config, not lazy): name
+                for name, config in enabled
+            }
+            done, not_done = wait(futures, timeout=timeout)
             
-            if exchange_config.get('type') == 'cex':
-                if self._initialize_cex(exchange_name, exchange_config):
+            for future in done:
+                if future.result():
                     success_count += 1
-            elif exchange_config.get('type') == 'dex':
-                if self._initialize_dex(exchange_name, exchange_config):
+            for future in not_done:
+                if not self._abandon(futures[future], timeout) and future.result():
                     success_count += 1
+            
+            # ไม่รอ thread ที่ค้าง (ผลลัพธ์จะถูกทิ้งใน _record_startup)
+            executor.shutdown(wait=False)
+        
+        self._log_startup_report(started, success_count, len(enabled))
+        return success_count > 0
+    
+    async def _connect_exchanges_async(self) -> bool:
+        """เชื่อมต่อ exchanges ทั้งหมดพร้อมกันสำหรับ backend แบบ async"""
+        lazy, timeout = self._startup_settings()
+        enabled = self._enabled_exchange_configs()
+        started = time.perf_counter()
+        
+        results = await asyncio.gather(*[
+            self._init_exchange_async(name, config, not lazy, timeout) for name, config in enabled
+        ])
+        success_count = sum(1 for ok in results if ok)
         
-        self.logger.info(f"🔗 เชื่อมต่อ Exchange สำเร็จ: {success_count}/{total_count}")
+        self._log_startup_report(started, success_count, len(enabled))
         return success_count > 0
     
-    def _initialize_cex(self, exchange_name: str, config: Dict) -> bool:
+    async def _init_exchange_async(self, exchange_name: str, config: Dict,
+                                   verify: bool, timeout: float) -> bool:
+        """เริ่มต้น exchange หนึ่งตัวแบบ async ภายใต้ timeout"""
+        start = time.perf_counter()
+        
+        try:
+            if config.get('type') == 'cex':
+                ok = self._initialize_cex(exchange_name, config, verify=False)
+                if ok and verify:
+                    ok = await asyncio.wait_for(self._verify_cex_async(exchange_name), timeout)
+                return self._record_startup(exchange_name, start, ok)
+            
+            # Web3 เป็น sync จึงรันใน thread แยก
+            return await asyncio.wait_for(
+                asyncio.to_thread(self._init_exchange, exchange_name, config, verify), timeout
+            )
+            
+        except asyncio.TimeoutError:
+            exchange_data = self.exchanges.get(exchange_name)
+            if self._abandon(exchange_name, timeout) and exchange_data:
+                await self._close_instance(exchange_data['instance'])
+            return False
+    
+    async def _verify_cex_async(self, exchange_name: str) -> bool:
+        """ทดสอบการเชื่อมต่อ CEX ด้วย fetch_balance แบบ async"""
+        exchange_data = self.exchanges[exchange_name]
+        if not exchange_data.get('has_credentials'):
+            return True
+        
+        try:
+            await self._call(exchange_name, 'fetch_balance')
+            self.logger.info(f"✅ เชื่อมต่อ {exchange_name.upper()} สำเร็จ")
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ ไม่สามารถเชื่อมต่อ {exchange_name} ได้: {e}")
+            await self._close_instance(exchange_data['instance'])
+            del self.exchanges[exchange_name]
+            return False
+    
+    def _initialize_cex(self, exchange_name: str, config: Dict, verify: bool = True) -> bool:
         """เริ่มต้นการเชื่อมต่อกับ CEX"""
         try:
             # ดึง API credentials จาก environment variables
@@ -73,12 +251,15 @@ class ExchangeManager:
             sandbox = os.getenv(f"{exchange_name.upper()}_SANDBOX", str(config.get('sandbox', True))).lower() == 'true'
             
             # สร้าง exchange instance
-            exchange_class = getattr(ccxt, exchange_name)
+            ccxt_module = ccxt_async if self.backend == 'async' else ccxt
+            exchange_class = getattr(ccxt_module, exchange_name)
             exchange_params = {
                 'apiKey': api_key,
                 'secret': secret,
                 'sandbox': sandbox,
-                'enableRateLimit': True,
+                # RateLimitScheduler ใน _call จำกัดอัตราตาม exchange.rateLimit แล้ว
+                # ถ้าเปิดคิวของ ccxt (FIFO) ด้วย request จะถูกหน่วงสองชั้นและออเดอร์ต้องรอหลังงานสแกน
+                'enableRateLimit': False,
                 'timeout': 30000,
             }
             
@@ -87,18 +268,23 @@ class ExchangeManager:
                 exchange_params['password'] = passphrase
             
             exchange = exchange_class(exchange_params)
+            self._load_cached_markets(exchange_name, exchange)
             
-            # ทดสอบการเชื่อมต่อ
+            # ทดสอบการเชื่อมต่อ (backend แบบ async จะทดสอบใน initialize_exchanges_async)
             if api_key and secret:
-                balance = exchange.fetch_balance()
-                self.logger.info(f"✅ เชื่อมต่อ {exchange_name.upper()} สำเร็จ")
+                if verify and self.backend != 'async':
+                    self._get_scheduler(exchange_name, exchange).acquire_sync(
+                        lane_for_method('fetch_balance'), self._weight(exchange_name, 'fetch_balance'))
+                    balance = exchange.fetch_balance()
+                    self.logger.info(f"✅ เชื่อมต่อ {exchange_name.upper()} สำเร็จ")
             else:
                 self.logger.warning(f"⚠️ {exchange_name.upper()}: ไม่มี API credentials (ใช้โหมดอ่านอย่างเดียว)")
             
             self.exchanges[exchange_name] = {
                 'instance': exchange,
                 'config': config,
-                'type': 'cex'
+                'type': 'cex',
+                'has_credentials': bool(api_key and secret)
             }
             
             return True
@@ -107,6 +293,83 @@ class ExchangeManager:
             self.logger.error(f"❌ ไม่สามารถเชื่อมต่อ {exchange_name} ได้: {e}")
             return False
     
+    def _load_cached_markets(self, exchange_name: str, exchange) -> bool:
+        """ใช้ markets จากแคชบนดิสก์แทนการดาวน์โหลด (แคชที่หมดอายุจะอัปเดตเบื้องหลัง)"""
+        if self.market_cache is None:
+            return False
+        
+        payload = self.market_cache.load(exchange_name, MarketCache.environment(exchange))
+        if payload is None:
+            return False
+        
+        try:
+            exchange.set_markets(payload['markets'], payload.get('currencies') or None)
+        except Exception as e:
+            self.logger.warning(f"⚠️ {exchange_name.upper()}: ใช้ market cache ไม่ได้: {e}")
+            return False
+        
+        age = time.time() - payload['saved_at']
+        self.logger.info(f"📦 {exchange_name.upper()}: ใช้ market cache ({len(payload['markets'])} markets, อายุ {age:.0f}s)")
+        
+        # ไม่บันทึกทับด้วยข้อมูลจากแคชเดิม
+        self._markets_persisted.add(exchange_name)
+        if not self.market_cache.is_fresh(payload):
+            self._refresh_markets_background(exchange_name, exchange)
+        return True
+    
+    def _refresh_markets_background(self, exchange_name: str, exchange):
+        """โหลด markets ใหม่เบื้องหลังแล้วบันทึกลงแคช"""
+        if self.backend == 'async':
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            task = loop.create_task(self._refresh_markets_async(exchange_name))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+        else:
+            threading.Thread(
+                target=self._refresh_markets_sync, args=(exchange_name, exchange), daemon=True
+            ).start()
+    
+    def _refresh_markets_sync(self, exchange_name: str, exchange):
+        try:
+            # thread นี้อาจเริ่มก่อน exchange ถูกใส่ใน self.exchanges จึงส่ง instance ไปให้ scheduler
+            self._get_scheduler(exchange_name, exchange).acquire_sync(
+                lane_for_method('load_markets'), self._weight(exchange_name, 'load_markets', (True,)))
+            markets = exchange.load_markets(True)
+            self.market_cache.save(exchange_name, markets, getattr(exchange, 'currencies', None),
+                                   MarketCache.environment(exchange))
+            self.logger.info(f"🔄 {exchange_name.upper()}: อัปเดต market cache แล้ว")
+        except Exception as e:
+            self.logger.warning(f"⚠️ {exchange_name.upper()}: อัปเดต market cache ไม่สำเร็จ: {e}")
+    
+    async def _refresh_markets_async(self, exchange_name: str):
+        try:
+            markets = await self._call(exchange_name, 'load_markets', True)
+            exchange = self.exchanges[exchange_name]['instance']
+            await asyncio.to_thread(
+                self.market_cache.save, exchange_name, markets, getattr(exchange, 'currencies', None),
+                MarketCache.environment(exchange)
+            )
+            self.logger.info(f"🔄 {exchange_name.upper()}: อัปเดต market cache แล้ว")
+        except Exception as e:
+            self.logger.warning(f"⚠️ {exchange_name.upper()}: อัปเดต market cache ไม่สำเร็จ: {e}")
+    
+    def _markets_to_persist(self, exchange_name: str, exchange) -> bool:
+        """ตรวจสอบว่า ccxt โหลด markets แล้วแต่ยังไม่ได้บันทึกลงแคช"""
+        if self.market_cache is None or exchange_name in self._markets_persisted:
+            return False
+        markets = getattr(exchange, 'markets', None)
+        return isinstance(markets, dict) and bool(markets)
+    
+    def _persist_markets(self, exchange_name: str, exchange):
+        """บันทึก markets ที่ ccxt โหลดมาครั้งแรกลงแคช"""
+        self._markets_persisted.add(exchange_name)
+        currencies = getattr(exchange, 'currencies', None)
+        self.market_cache.save(exchange_name, exchange.markets, currencies if isinstance(currencies, dict) else None,
+                               MarketCache.environment(exchange))
+    
     def _initialize_dex(self, dex_name: str, config: Dict) -> bool:
         """เริ่มต้นการเชื่อมต่อกับ DEX"""
         try:
@@ -118,8 +381,9 @@ class ExchangeManager:
                 self.logger.error(f"❌ ไม่มี RPC URL สำหรับ {dex_name}")
                 return False
             
-            # เชื่อมต่อกับ Web3
-            w3 = Web3(Web3.HTTPProvider(rpc_url))
+            # เชื่อมต่อกับ Web3 (จำกัดเวลาของ RPC ไม่ให้ค้างตอนเริ่มต้น)
+            timeout = self.config.get('bot_settings', {}).get('init_timeout', 10)
+            w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={'timeout': timeout}))
             
             if not w3.is_connected():
                 self.logger.error(f"❌ ไม่สามารถเชื่อมต่อ {network} network ได้")
@@ -146,6 +410,19 @@ class ExchangeManager:
             self.logger.error(f"❌ ไม่สามารถเชื่อมต่อ {dex_name} ได้: {e}")
             return False
     
+    def _log_startup_report(self, started: float, success_count: int, total_count: int):
+        """แสดงเวลาที่ใช้เริ่มต้นแต่ละ exchange"""
+        total_ms = (time.perf_counter() - started) * 1000
+        self.logger.info(f"🔗 เชื่อมต่อ Exchange สำเร็จ: {success_count}/{total_count} ({total_ms:.0f}ms)")
+        
+        icons = {'ok': '✅', 'failed': '❌', 'timeout': '⏱️'}
+        for name, timing in sorted(self.startup_timings.items(), key=lambda item: -item[1]['ms']):
+            self.logger.info(f"   {icons[timing['status']]} {name.upper()}: {timing['ms']:.0f}ms")
+    
+    def get_startup_report(self) -> Dict[str, Dict]:
+        """เวลาเริ่มต้น (ms) และสถานะของแต่ละ exchange"""
+        return dict(self.startup_timings)
+    
     def get_exchange(self, exchange_name: str):
         """ดึง exchange instance"""
         if exchange_name in self.exchanges:
@@ -169,12 +446,51 @@ class ExchangeManager:
             return self.dex_connections[exchange_name]['config'].get('trading_pairs', [])
         return []
     
+    def _get_scheduler(self, exchange_name: str, exchange=None) -> RateLimitScheduler:
+        """คืน scheduler ของ exchange (สร้างครั้งแรกจาก rateLimit ของ ccxt)
+
+        exchange: instance ที่ยังไม่ถูกใส่ใน self.exchanges (ระหว่างเริ่มต้น)
+        """
+        scheduler = self.schedulers.get(exchange_name)
+        if scheduler is None:
+            exchange_data = self.exchanges.get(exchange_name) or {
+                'instance': exchange, 'config': self.config.get('exchanges', {}).get(exchange_name, {})
+            }
+            config = exchange_data.get('config', {})
+            rate_limit = config.get('rate_limit_ms', getattr(exchange_data['instance'], 'rateLimit', None))
+            if not isinstance(rate_limit, (int, float)) or rate_limit <= 0:
+                rate_limit = None
+            scheduler = RateLimitScheduler(rate_limit, config.get('rate_limit_capacity', 1))
+            self.schedulers[exchange_name] = scheduler
+        return scheduler
+    
+    def _weight(self, exchange_name: str, method: str, args: tuple = ()) -> float:
+        """น้ำหนักของ request ตาม request_weights ใน config (หรือค่าเริ่มต้นของ rate_limiter)"""
+        exchange_data = self.exchanges.get(exchange_name)
+        config = exchange_data.get('config', {}) if exchange_data else self.config.get('exchanges', {}).get(exchange_name, {})
+        return weight_for_call(method, args, config.get('request_weights'))
+    
+    async def _call(self, exchange_name: str, method: str, *args,
+                    lane: Optional[int] = None, **kwargs) -> Any:
+        """เรียก method ของ ccxt ผ่าน rate-limit scheduler โดยรองรับทั้ง backend แบบ sync และ async"""
+        exchange = self.exchanges[exchange_name]['instance']
+        if lane is None:
+            lane = lane_for_method(method)
+        await self._get_scheduler(exchange_name).acquire(lane, self._weight(exchange_name, method, args))
+        
+        result = getattr(exchange, method)(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        
+        if self._markets_to_persist(exchange_name, exchange):
+            await asyncio.to_thread(self._persist_markets, exchange_name, exchange)
+        return result
+    
     async def fetch_ticker(self, exchange_name: str, symbol: str) -> Optional[Dict]:
         """ดึงข้อมูล ticker จาก exchange"""
         try:
             if exchange_name in self.exchanges:
-                exchange = self.exchanges[exchange_name]['instance']
-                return exchange.fetch_ticker(symbol)
+                return await self._call(exchange_name, 'fetch_ticker', symbol)
             elif exchange_name in self.dex_connections:
                 # สำหรับ DEX จะต้องใช้วิธีการอื่น (เช่น ดึงจาก subgraph หรือ on-chain)
                 return await self._fetch_dex_price(exchange_name, symbol)
@@ -182,6 +498,18 @@ class ExchangeManager:
             self.logger.error(f"❌ ไม่สามารถดึง ticker {symbol} จาก {exchange_name}: {e}")
         return None
     
+    async def load_markets(self, exchange_name: str) -> Optional[Dict[str, Dict]]:
+        """markets ทั้งหมดของ CEX (ใช้ที่โหลดหรือได้จากแคชแล้ว ไม่เช่นนั้นโหลดผ่าน rate limiter)"""
+        try:
+            if exchange_name in self.exchanges:
+                markets = getattr(self.exchanges[exchange_name]['instance'], 'markets', None)
+                if isinstance(markets, dict) and markets:
+                    return markets
+                return await self._call(exchange_name, 'load_markets')
+        except Exception as e:
+            self.logger.error(f"❌ ไม่สามารถโหลด markets จาก {exchange_name}: {e}")
+        return None
+    
     async def _fetch_dex_price(self, dex_name: str, symbol: str) -> Optional[Dict]:
         """ดึงราคาจาก DEX (ตัวอย่างพื้นฐาน)"""
         # นี่เป็นตัวอย่างพื้นฐาน ในการใช้งานจริงควรใช้ subgraph หรือ price oracle
@@ -209,18 +537,21 @@ class ExchangeManager:
         """วางออเดอร์"""
         try:
             if exchange_name in self.exchanges:
-                exchange = self.exchanges[exchange_name]['instance']
-                
+                order = None
                 if order_type == 'market':
                     if side == 'buy':
-                        return exchange.create_market_buy_order(symbol, amount)
+                        order = await self._call(exchange_name, 'create_market_buy_order', symbol, amount)
                     else:
-                        return exchange.create_market_sell_order(symbol, amount)
+                        order = await self._call(exchange_name, 'create_market_sell_order', symbol, amount)
                 elif order_type == 'limit' and price:
                     if side == 'buy':
-                        return exchange.create_limit_buy_order(symbol, amount, price)
+                        order = await self._call(exchange_name, 'create_limit_buy_order', symbol, amount, price)
                     else:
-                        return exchange.create_limit_sell_order(symbol, amount, price)
+                        order = await self._call(exchange_name, 'create_limit_sell_order', symbol, amount, price)
+                
+                if order:
+                    self._track_placed_order(exchange_name, order, symbol, order_type, side, amount, price)
+                return order
             
             elif exchange_name in self.dex_connections:
                 return await self._place_dex_order(exchange_name, symbol, order_type, side, amount, price)
@@ -230,6 +561,123 @@ class ExchangeManager:
         
         return None
     
+    def _track_placed_order(self, exchange_name: str, order: Dict, symbol: str, order_type: str,
+                            side: str, amount: float, price: Optional[float]):
+        """ปรับยอดเงินในแคชตามออเดอร์ที่เพิ่งวาง (ค่าที่ส่งไปใช้แทนฟิลด์ที่ exchange ไม่ได้ตอบกลับ)"""
+        request = {'symbol': symbol, 'side': side, 'amount': amount, 'price': price}
+        placed = {**request, **{key: value for key, value in order.items() if value is not None}}
+        if order_type == 'market' or placed.get('status') == 'closed':
+            # match ทันทีโดยยังไม่ได้กันยอดไว้
+            self.balance_cache.on_order_filled(exchange_name, placed, reserved=False)
+        else:
+            self.balance_cache.on_order_placed(exchange_name, placed)
+    
+    async def place_orders_batch(self, exchange_name: str, orders: List[Dict]) -> List[Optional[Dict]]:
+        """วางหลายออเดอร์พร้อมกัน (คืนผลลัพธ์ตามลำดับ orders, None คือออเดอร์ที่วางไม่สำเร็จ)
+        
+        orders: [{'symbol', 'type', 'side', 'amount', 'price'}]
+        ใช้ create_orders ของ exchange ถ้ารองรับ (แบ่งตาม symbol และ max_batch_orders)
+        ไม่เช่นนั้นวางทีละออเดอร์พร้อมกันผ่าน rate limiter
+        """
+        if not orders:
+            return []
+        
+        if not self.has_capability(exchange_name, 'createOrders'):
+            return list(await asyncio.gather(*[
+                self.place_order(exchange_name, order['symbol'], order.get('type', 'limit'),
+                                 order['side'], order['amount'], order.get('price'))
+                for order in orders
+            ]))
+        
+        results = [None] * len(orders)
+        batches = self._batch_by_symbol(exchange_name, list(enumerate(orders)), lambda item: item[1]['symbol'])
+        
+        async def submit(batch):
+            requests = [{
+                'symbol': order['symbol'], 'type': order.get('type', 'limit'), 'side': order['side'],
+                'amount': order['amount'], 'price': order.get('price'), 'params': order.get('params', {})
+            } for _, order in batch]
+            try:
+                created = await self._call(exchange_name, 'create_orders', requests) or []
+            except Exception as e:
+                self.logger.error(f"❌ ไม่สามารถวางออเดอร์แบบ batch ใน {exchange_name}: {e}")
+                return
+            for (index, request), order in zip(batch, created):
+                # exchange ส่งออเดอร์ที่ถูกปฏิเสธกลับมาโดยไม่มี id
+                if order and order.get('id'):
+                    results[index] = order
+                    self._track_placed_order(exchange_name, order, request['symbol'], request.get('type', 'limit'),
+                                             request['side'], request['amount'], request.get('price'))
+        
+        await asyncio.gather(*[submit(batch) for batch in batches])
+        return results
+    
+    async def cancel_orders_batch(self, exchange_name: str, orders: List[Dict]) -> List[Optional[Dict]]:
+        """ยกเลิกหลายออเดอร์พร้อมกัน (orders: [{'id', 'symbol'}], คืนผลลัพธ์ตามลำดับ)
+        
+        ใช้ cancel_orders ของ exchange ถ้ารองรับ ไม่เช่นนั้นยกเลิกทีละออเดอร์พร้อมกัน
+        """
+        if not orders:
+            return []
+        
+        if not self.has_capability(exchange_name, 'cancelOrders'):
+            return list(await asyncio.gather(*[
+                self.cancel_order(exchange_name, order['id'], order['symbol']) for order in orders
+            ]))
+        
+        results = [None] * len(orders)
+        batches = self._batch_by_symbol(exchange_name, list(enumerate(orders)), lambda item: item[1]['symbol'])
+        
+        async def submit(batch):
+            symbol = batch[0][1]['symbol']
+            ids = [order['id'] for _, order in batch]
+            try:
+                canceled = await self._call(exchange_name, 'cancel_orders', ids, symbol)
+            except Exception as e:
+                self.logger.error(f"❌ ไม่สามารถยกเลิกออเดอร์แบบ batch ใน {exchange_name}: {e}")
+                return
+            by_id = {order.get('id'): order for order in canceled or [] if isinstance(order, dict)}
+            for index, order in batch:
+                # บาง exchange ไม่ส่งรายละเอียดออเดอร์กลับมา
+                results[index] = by_id.get(order['id']) or {'id': order['id'], 'symbol': symbol, 'status': 'canceled'}
+                self._track_canceled_order(exchange_name, results[index], symbol)
+        
+        await asyncio.gather(*[submit(batch) for batch in batches])
+        return results
+    
+    def _track_canceled_order(self, exchange_name: str, order: Optional[Dict], symbol: str):
+        """คืนยอดที่กันไว้ในแคช (ถ้า exchange ไม่ส่งรายละเอียดกลับมาจะดึงยอดใหม่แทน)"""
+        if isinstance(order, dict):
+            self.balance_cache.on_order_canceled(exchange_name, {**order, 'symbol': order.get('symbol') or symbol})
+        else:
+            self.balance_cache.invalidate(exchange_name)
+    
+    async def cancel_all_orders(self, exchange_name: str, symbol: Optional[str] = None) -> bool:
+        """ยกเลิกทุกออเดอร์ที่เปิดอยู่ของ symbol (รวมออเดอร์ที่ไม่ได้วางโดยบอท) ใน request เดียว"""
+        try:
+            if exchange_name in self.exchanges and self.has_capability(exchange_name, 'cancelAllOrders'):
+                await self._call(exchange_name, 'cancel_all_orders', symbol)
+                self.balance_cache.invalidate(exchange_name)
+                return True
+        except Exception as e:
+            self.logger.error(f"❌ ไม่สามารถยกเลิกออเดอร์ทั้งหมดใน {exchange_name}: {e}")
+        return False
+    
+    def _batch_by_symbol(self, exchange_name: str, items: List, key) -> List[List]:
+        """แบ่งรายการตาม symbol และขนาด batch สูงสุดของ exchange (`max_batch_orders`, ค่าเริ่มต้น 5)"""
+        config = self.exchanges.get(exchange_name, {}).get('config', {})
+        max_batch = max(1, config.get('max_batch_orders', 5))
+        
+        groups = {}
+        for item in items:
+            groups.setdefault(key(item), []).append(item)
+        
+        return [
+            group[start:start + max_batch]
+            for group in groups.values()
+            for start in range(0, len(group), max_batch)
+        ]
+    
     async def _place_dex_order(self, dex_name: str, symbol: str, order_type: str,
                               side: str, amount: float, price: float = None) -> Optional[Dict]:
         """วางออเดอร์ใน DEX (ต้องการการพัฒนาเพิ่มเติม)"""
@@ -245,12 +693,126 @@ class ExchangeManager:
             'timestamp': asyncio.get_event_loop().time() * 1000
         }
     
+    async def fetch_ohlcv(self, exchange_name: str, symbol: str, timeframe: str = '1m',
+                          limit: int = 100, since: int = None) -> Optional[List[List]]:
+        """ดึงข้อมูล OHLCV จาก CEX"""
+        try:
+            if exchange_name in self.exchanges:
+                return await self._call(exchange_name, 'fetch_ohlcv', symbol, timeframe,
+                                        since=since, limit=limit)
+        except Exception as e:
+            self.logger.warning(f"⚠️ ไม่สามารถดึง OHLCV {symbol} ({timeframe}) จาก {exchange_name}: {e}")
+        return None
+    
+    async def fetch_order(self, exchange_name: str, order_id: str, symbol: str) -> Optional[Dict]:
+        """ดึงสถานะออเดอร์จาก CEX"""
+        try:
+            if exchange_name in self.exchanges:
+                return await self._call(exchange_name, 'fetch_order', order_id, symbol)
+        except Exception as e:
+            self.logger.error(f"❌ ไม่สามารถดึงสถานะออเดอร์ {order_id} จาก {exchange_name}: {e}")
+        return None
+    
+    async def fetch_open_orders(self, exchange_name: str, symbol: Optional[str] = None) -> Optional[List[Dict]]:
+        """ดึงออเดอร์ที่ยังเปิดอยู่ทั้งหมดใน request เดียว (symbol = None คือทุกคู่)"""
+        try:
+            if exchange_name in self.exchanges:
+                return await self._call(exchange_name, 'fetch_open_orders', symbol)
+        except ccxt.ArgumentsRequired as e:
+            if not self._remember_symbol_required(exchange_name, 'fetch_open_orders', symbol):
+                self.logger.error(f"❌ ไม่สามารถดึงออเดอร์ที่เปิดอยู่จาก {exchange_name}: {e}")
+        except Exception as e:
+            self.logger.error(f"❌ ไม่สามารถดึงออเดอร์ที่เปิดอยู่จาก {exchange_name}: {e}")
+        return None
+    
+    async def fetch_closed_orders(self, exchange_name: str, symbol: Optional[str] = None,
+                                  since: Optional[int] = None, limit: Optional[int] = None) -> Optional[List[Dict]]:
+        """ดึงออเดอร์ที่ปิดแล้วล่าสุด (since เป็น timestamp มิลลิวินาที)"""
+        try:
+            if exchange_name in self.exchanges:
+                return await self._call(exchange_name, 'fetch_closed_orders', symbol, since, limit)
+        except ccxt.ArgumentsRequired as e:
+            if not self._remember_symbol_required(exchange_name, 'fetch_closed_orders', symbol):
+                self.logger.error(f"❌ ไม่สามารถดึงออเดอร์ที่ปิดแล้วจาก {exchange_name}: {e}")
+        except Exception as e:
+            self.logger.error(f"❌ ไม่สามารถดึงออเดอร์ที่ปิดแล้วจาก {exchange_name}: {e}")
+        return None
+    
+    def requires_symbol(self, exchange_name: str, method: str) -> bool:
+        """exchange ต้องระบุ symbol สำหรับ method นี้หรือไม่ (เช่น 'fetch_open_orders')
+
+        ดูจากผลที่จำไว้เมื่อ exchange ตอบ ArgumentsRequired และ option warnWithoutSymbol ของ ccxt
+        ซึ่งทำให้การเรียกโดยไม่ระบุ symbol ล้มเหลวทุกครั้ง (เช่น binance fetchOpenOrders)
+        """
+        if (exchange_name, method) in self._symbol_required:
+            return True
+        exchange_data = self.exchanges.get(exchange_name)
+        options = getattr(exchange_data['instance'], 'options', None) if exchange_data else None
+        if not isinstance(options, dict):
+            return False
+        head, *rest = method.split('_')
+        method_options = options.get(head + ''.join(part.capitalize() for part in rest))
+        if isinstance(method_options, dict) and method_options.get('warnWithoutSymbol'):
+            return True
+        return method == 'fetch_open_orders' and bool(options.get('warnOnFetchOpenOrdersWithoutSymbol'))
+    
+    def _remember_symbol_required(self, exchange_name: str, method: str, symbol: Optional[str]) -> bool:
+        """จำว่า exchange ต้องระบุ symbol เมื่อการเรียกแบบไม่ระบุ symbol ได้ ArgumentsRequired"""
+        if symbol is not None:
+            return False
+        if (exchange_name, method) not in self._symbol_required:
+            self._symbol_required.add((exchange_name, method))
+            self.logger.info(f"ℹ️ {exchange_name} ต้องระบุ symbol สำหรับ {method} จะดึงทีละ symbol")
+        return True
+    
+    def has_capability(self, exchange_name: str, capability: str) -> bool:
+        """ตรวจสอบ `exchange.has[capability]` ของ ccxt (DEX หรือ exchange ที่ไม่รู้จักคืน False)"""
+        exchange_data = self.exchanges.get(exchange_name)
+        if not exchange_data:
+            return False
+        has = getattr(exchange_data['instance'], 'has', None)
+        return isinstance(has, dict) and bool(has.get(capability))
+    
+    async def cancel_order(self, exchange_name: str, order_id: str, symbol: str) -> Optional[Dict]:
+        """ยกเลิกออเดอร์ใน CEX"""
+        try:
+            if exchange_name in self.exchanges:
+                order = await self._call(exchange_name, 'cancel_order', order_id, symbol)
+                self._track_canceled_order(exchange_name, order, symbol)
+                return order
+        except Exception as e:
+            self.logger.error(f"❌ ไม่สามารถยกเลิกออเดอร์ {order_id} ใน {exchange_name}: {e}")
+        return None
+    
     def get_balance(self, exchange_name: str) -> Optional[Dict]:
-        """ดึงยอดเงินคงเหลือ"""
+        """ดึงยอดเงินคงเหลือ (สำหรับ backend แบบ sync)"""
         try:
             if exchange_name in self.exchanges:
                 exchange = self.exchanges[exchange_name]['instance']
-                return exchange.fetch_balance()
+                if self.backend == 'async':
+                    self.logger.error("❌ backend แบบ async ต้องใช้ fetch_balance() แทน get_balance()")
+                    return None
+                self._get_scheduler(exchange_name).acquire_sync(
+                    lane_for_method('fetch_balance'), self._weight(exchange_name, 'fetch_balance'))
+                balance = exchange.fetch_balance()
+                if inspect.isawaitable(balance):
+                    balance.close()
+                    self.logger.error("❌ backend แบบ async ต้องใช้ fetch_balance() แทน get_balance()")
+                    return None
+                if self._markets_to_persist(exchange_name, exchange):
+                    self._persist_markets(exchange_name, exchange)
+                return balance
+            elif exchange_name in self.dex_connections:
+                return self._get_dex_balance(exchange_name)
+        except Exception as e:
+            self.logger.error(f"❌ ไม่สามารถดึงยอดเงินจาก {exchange_name}: {e}")
+        return None
+    
+    async def fetch_balance(self, exchange_name: str) -> Optional[Dict]:
+        """ดึงยอดเงินคงเหลือโดยไม่บล็อก event loop"""
+        try:
+            if exchange_name in self.exchanges:
+                return await self._call(exchange_name, 'fetch_balance')
             elif exchange_name in self.dex_connections:
                 return self._get_dex_balance(exchange_name)
         except Exception as e:
@@ -284,13 +846,142 @@ class ExchangeManager:
             self.logger.error(f"❌ ไม่สามารถดึงยอดเงิน DEX: {e}")
         return None
     
+    def attach_stream(self, exchange_name: str, stream: MarketStream):
+        """ผูก MarketStream เข้ากับ exchange (ticker จาก stream จะถูกใช้ก่อน REST)"""
+        self.streams[exchange_name] = stream
+    
+    def get_stream(self, exchange_name: str) -> Optional[MarketStream]:
+        return self.streams.get(exchange_name)
+    
+    async def start_streams(self) -> int:
+        """เริ่ม stream ของ exchange ที่ตั้งค่า `stream.enabled` ไว้ (คืนจำนวน stream ที่เริ่ม)"""
+        started = 0
+        
+        for exchange_name in self.get_enabled_exchanges():
+            if exchange_name in self.streams:
+                continue
+            
+            config = self.config.get('exchanges', {}).get(exchange_name, {})
+            stream_config = config.get('stream', {})
+            if not stream_config.get('enabled') or not stream_config.get('url'):
+                continue
+            
+            adapter_class = ADAPTERS.get(stream_config.get('adapter', exchange_name), ADAPTERS['normalized'])
+            stream = MarketStream(exchange_name, stream_config['url'], adapter_class())
+            stream.add_gap_listener(
+                lambda symbol, name=exchange_name: self._schedule_book_resync(name, symbol)
+            )
+            for symbol in config.get('trading_pairs', []):
+                for channel in stream_config.get('channels', ['ticker', 'book']):
+                    await stream.subscribe(channel, symbol)
+            
+            await stream.start()
+            self.attach_stream(exchange_name, stream)
+            self.logger.info(f"📡 {exchange_name.upper()}: เริ่ม market stream ({stream_config['url']})")
+            started += 1
+        
+        return started
+    
+    def _schedule_book_resync(self, exchange_name: str, symbol: str):
+        """ดึง snapshot ของ order book ผ่าน REST เมื่อ stream ขาดความต่อเนื่อง"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.resync_order_book(exchange_name, symbol))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    async def resync_order_book(self, exchange_name: str, symbol: str) -> bool:
+        """โหลด order book snapshot จาก REST แล้วใส่ให้ stream"""
+        stream = self.streams.get(exchange_name)
+        if stream is None:
+            return False
+        
+        try:
+            order_book = await self._call(exchange_name, 'fetch_order_book', symbol)
+            stream.resync_book(symbol, order_book['bids'], order_book['asks'], order_book.get('nonce'))
+            self.logger.info(f"📚 {exchange_name.upper()}: resync order book ของ {symbol} แล้ว")
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ ไม่สามารถ resync order book {symbol} จาก {exchange_name}: {e}")
+            return False
+    
+    def get_order_book(self, exchange_name: str, symbol: str):
+        """L2OrderBook จาก stream ที่พร้อมใช้งาน (คืน None ถ้าไม่มีหรือกำลัง resync)"""
+        stream = self.streams.get(exchange_name)
+        if stream is None:
+            return None
+        return stream.get_order_book(symbol)
+    
+    async def stop_streams(self):
+        """หยุด stream ทั้งหมด"""
+        for stream in self.streams.values():
+            await stream.stop()
+        self.streams.clear()
+    
+    def get_scheduler_stats(self) -> Dict[str, Dict]:
+        """สถิติคิว request (queue depth และเวลารอ) แยกตาม exchange และ lane"""
+        return {name: scheduler.get_stats() for name, scheduler in self.schedulers.items()}
+    
     def close_all_connections(self):
         """ปิดการเชื่อมต่อทั้งหมด"""
         for exchange_name, exchange_data in self.exchanges.items():
             try:
                 if hasattr(exchange_data['instance'], 'close'):
-                    exchange_data['instance'].close()
+                    result = exchange_data['instance'].close()
+                    if inspect.isawaitable(result):
+                        # instance ของ ccxt.async_support ต้องปิดภายใน event loop
+                        try:
+                            asyncio.get_running_loop().create_task(result)
+                        except RuntimeError:
+                            asyncio.run(result)
             except:
                 pass
         
-        self.logger.info("🔌 ปิดการเชื่อมต่อทั้งหมดแล้ว") 
\ No newline at end of file
+        self.initialized = False
+        self.logger.info("🔌 ปิดการเชื่อมต่อทั้งหมดแล้ว")
+    
+    async def close_all_connections_async(self):
+        """ปิดการเชื่อมต่อทั้งหมดจากภายใน event loop"""
+        await self.stop_streams()
+        for exchange_name, exchange_data in self.exchanges.items():
+            await self._close_instance(exchange_data['instance'])
+        
+        self.initialized = False
+        self.logger.info("🔌 ปิดการเชื่อมต่อทั้งหมดแล้ว")
+    
+    async def _close_instance(self, exchange):
+        """ปิด session ของ exchange instance หนึ่งตัว"""
+        try:
+            if hasattr(exchange, 'close'):
+                result = exchange.close()
+                if inspect.isawaitable(result):
+                    await result
+        except Exception:
+            pass
+
+
+# ExchangeManager ที่ใช้ร่วมกันทั้ง process (หนึ่งตัวต่อไฟล์ config และ backend)
+_shared_managers: Dict[tuple, ExchangeManager] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_exchange_manager(config_path: str = "config.json", backend: str = None) -> ExchangeManager:
+    """คืน ExchangeManager ตัวเดียวกันให้ทุก component ที่ใช้ config เดียวกัน
+
+    bot, analyzer และ scanner จะใช้ connection pool, market cache และ rate limit ชุดเดียวกัน
+    """
+    key = (os.path.abspath(config_path), backend)
+    with _shared_lock:
+        manager = _shared_managers.get(key)
+        if manager is None:
+            manager = ExchangeManager(config_path, backend=backend)
+            _shared_managers[key] = manager
+        return manager
+
+
+def reset_shared_exchange_managers():
+    """ล้าง registry (ใช้ในการทดสอบหรือเมื่อโหลด config ใหม่)"""
+    with _shared_lock:
+        _shared_managers.clear()
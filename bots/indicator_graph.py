@@ -0,0 +1,215 @@
+"""
+Indicator Graph
+ชุด indicator แบบกราฟ: แต่ละ indicator ประกาศ input ของตัวเองเป็นโหนด (EMA, SMA, true range, ...)
+โหนดที่การคำนวณเหมือนกันทุกประการ (ชนิด, พารามิเตอร์, input) เป็นโหนดเดียวกันและคำนวณครั้งเดียวต่อแท่ง
+เช่น sma_20 กับ bb_middle หรือ EMA12/EMA26 ที่ macd, macd_signal และ signal_strength ใช้ร่วมกัน
+
+สร้างเฉพาะโหนดที่คอลัมน์ที่ขอต้องใช้ คอลัมน์อื่นใน catalog จะไม่ถูกคำนวณเลย
+"""
+
+import operator
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .indicators import (
+    EMA, RSI, AverageTrueRange, IndicatorSet, Lag, RollingMean, RollingStd, TrueRange
+)
+from .signal_strength import SignalStrength
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+@dataclass(frozen=True)
+class Node:
+    """โหนดในกราฟ: op และ params ระบุการคำนวณ inputs คือโหนดที่ต้องคำนวณก่อน"""
+    op: str
+    params: Tuple = ()
+    inputs: Tuple['Node', ...] = ()
+
+
+def field(name: str) -> Node:
+    return Node('field', (FIELDS.index(name),))
+
+
+def ema(source: Node, span: int) -> Node:
+    return Node('ema', (span,), (source,))
+
+
+def sma(source: Node, window: int) -> Node:
+    return Node('sma', (window,), (source,))
+
+
+def std(source: Node, window: int, ddof: int = 0) -> Node:
+    return Node('std', (window, ddof), (source,))
+
+
+def lag(source: Node) -> Node:
+    return Node('lag', (), (source,))
+
+
+def true_range() -> Node:
+    return Node('true_range', (), (field('high'), field('low'), field('close')))
+
+
+def atr(window: int = 14) -> Node:
+    return Node('atr', (window,), (true_range(),))
+
+
+def rsi(source: Node, window: int = 14) -> Node:
+    return Node('rsi', (window,), (source,))
+
+
+def signal_strength(macd: Node, histogram: Node, window: int = 20) -> Node:
+    return Node('signal_strength', (window,), (macd, histogram))
+
+
+def apply(op: str, *inputs: Node, params: Tuple = ()) -> Node:
+    """โหนดที่ไม่มี state: ค่าเป็นฟังก์ชันของ input ในแท่งเดียวกัน (op ตาม FUNCTIONS)"""
+    return Node(op, params, inputs)
+
+
+# op ที่มี state: สร้าง streaming indicator จาก params
+STATEFUL: Dict[str, Callable] = {
+    'ema': lambda span: EMA(span=span, min_periods=span),
+    'sma': RollingMean,
+    'std': lambda window, ddof: RollingStd(window, ddof=ddof),
+    'lag': Lag,
+    'true_range': TrueRange,
+    'atr': AverageTrueRange,
+    'rsi': RSI,
+    'signal_strength': SignalStrength,
+}
+
+
+# op ที่ไม่มี state: รับ params ตามด้วยค่าของ inputs
+FUNCTIONS: Dict[str, Callable] = {
+    'sub': operator.sub,
+    'band': lambda dev, mavg, mstd: mavg + dev * mstd,
+    'cross_up': lambda value, previous: value > 0 and previous <= 0,
+    'cross_down': lambda value, previous: value < 0 and previous >= 0,
+}
+
+
+def indicator_catalog(macd_fast: int = 12, macd_slow: int = 26, macd_sign: int = 9,
+                      strength_window: int = 20) -> Dict[str, Node]:
+    """คอลัมน์ทั้งหมดที่ขอได้ (สูตรเดียวกับ ta และ CryptoPairsScanner)"""
+    close, volume = field('close'), field('volume')
+
+    macd = apply('sub', ema(close, macd_fast), ema(close, macd_slow))
+    signal = ema(macd, macd_sign)
+    histogram = apply('sub', macd, signal)
+    previous_macd = lag(macd)
+
+    mavg, mstd = sma(close, 20), std(close, 20)
+
+    return {
+        'sma_20': sma(close, 20),
+        'ema_20': ema(close, 20),
+        'sma_50': sma(close, 50),
+        'rsi': rsi(close, 14),
+        'macd': macd,
+        'macd_signal': signal,
+        'macd_histogram': histogram,
+        'bb_upper': apply('band', mavg, mstd, params=(2,)),
+        'bb_middle': mavg,
+        'bb_lower': apply('band', mavg, mstd, params=(-2,)),
+        'volume_sma': sma(volume, 20),
+        'atr': atr(14),
+        'macd_cross_up': apply('cross_up', macd, previous_macd),
+        'macd_cross_down': apply('cross_down', macd, previous_macd),
+        'signal_strength': signal_strength(macd, histogram, strength_window),
+    }
+
+
+BOOL_COLUMNS = ('macd_cross_up', 'macd_cross_down')
+
+
+class IndicatorGraph(IndicatorSet):
+    """คำนวณคอลัมน์ที่เลือกจาก catalog โดยประเมินแต่ละโหนดที่ต้องใช้ครั้งเดียวต่อแท่งตามลำดับ dependency"""
+
+    def __init__(self, catalog: Dict[str, Node], columns: Optional[Sequence[str]] = None):
+        columns = tuple(catalog if columns is None else columns)
+        unknown = [column for column in columns if column not in catalog]
+        if unknown:
+            raise ValueError(f"ไม่รู้จัก indicator: {', '.join(unknown)}")
+
+        self.columns = columns
+        self.bool_columns = tuple(column for column in columns if column in BOOL_COLUMNS)
+        nodes = [node for node in self._resolve([catalog[column] for column in columns]) if node.op != 'field']
+
+        # ค่าต่อแท่งเก็บใน list เดียว: ตำแหน่ง 0-4 คือ FIELDS ของแท่ง ต่อด้วยโหนดตามลำดับ
+        positions = {field(name): index for index, name in enumerate(FIELDS)}
+        positions.update({node: len(FIELDS) + index for index, node in enumerate(nodes)})
+        self.nodes = nodes
+        self.outputs = [positions[catalog[column]] for column in columns]
+        compiled = [self._compile(node) for node in nodes]
+        self._update_steps = [(update, tuple(positions[source] for source in node.inputs))
+                              for node, (update, _) in zip(nodes, compiled)]
+        self._amend_steps = [(amend, inputs) for (_, amend), (_, inputs) in zip(compiled, self._update_steps)]
+
+    @staticmethod
+    def _resolve(outputs: List[Node]) -> List[Node]:
+        """โหนดที่ต้องใช้ทั้งหมด (ไม่ซ้ำ) เรียงให้ input มาก่อนโหนดที่ใช้"""
+        order, seen = [], set()
+
+        def visit(node: Node):
+            if node in seen:
+                return
+            seen.add(node)
+            for source in node.inputs:
+                visit(source)
+            order.append(node)
+
+        for node in outputs:
+            visit(node)
+        return order
+
+    @staticmethod
+    def _compile(node: Node) -> Tuple[Callable, Callable]:
+        """ฟังก์ชัน (update, amend) ที่รับค่าของ inputs ตามลำดับ"""
+        if node.op in STATEFUL:
+            indicator = STATEFUL[node.op](*node.params)
+            if len(node.inputs) == 1:
+                return indicator.update, indicator.amend
+            return (lambda *values: indicator.update(values)), (lambda *values: indicator.amend(values))
+
+        function = FUNCTIONS[node.op]
+        if node.params:
+            function = partial(function, *node.params)
+        return function, function
+
+    def _feed(self, bar: Sequence[float], amend: bool) -> Tuple:
+        values = list(bar)
+        append = values.append
+        for step, inputs in (self._amend_steps if amend else self._update_steps):
+            if len(inputs) == 1:
+                append(step(values[inputs[0]]))
+            elif len(inputs) == 2:
+                append(step(values[inputs[0]], values[inputs[1]]))
+            else:
+                append(step(*[values[position] for position in inputs]))
+        return tuple([values[position] for position in self.outputs])
+
+
+MARKET_COLUMNS = ('sma_20', 'ema_20', 'sma_50', 'rsi', 'macd', 'macd_signal', 'macd_histogram',
+                  'bb_upper', 'bb_middle', 'bb_lower', 'volume_sma', 'atr')
+
+MACD_STRENGTH_COLUMNS = ('macd', 'macd_signal', 'macd_histogram', 'macd_cross_up', 'macd_cross_down',
+                         'signal_strength')
+
+
+class MarketIndicators(IndicatorGraph):
+    """indicator ของ MultiExchangeMarketAnalyzer (bar = open, high, low, close, volume)"""
+
+    def __init__(self, columns: Optional[Sequence[str]] = None):
+        super().__init__(indicator_catalog(), columns or MARKET_COLUMNS)
+
+
+class MACDStrengthIndicators(IndicatorGraph):
+    """MACD, จุดตัดศูนย์ และความแรงสัญญาณของ CryptoPairsScanner (bar = open, high, low, close, volume)"""
+
+    def __init__(self, window_fast: int = 12, window_slow: int = 26, window_sign: int = 9,
+                 strength_window: int = 20, columns: Optional[Sequence[str]] = None):
+        super().__init__(indicator_catalog(window_fast, window_slow, window_sign, strength_window),
+                         columns or MACD_STRENGTH_COLUMNS)
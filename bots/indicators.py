@@ -0,0 +1,544 @@
+"""
+Streaming Indicators
+คำนวณ indicator แบบ incremental ต่อ series: เก็บ state ของ EMA/Wilder, ผลรวมแบบ rolling และค่าสูงสุดแบบ rolling
+ป้อนทีละแท่งด้วย update() และแก้แท่งล่าสุดที่ยังไม่ปิดด้วย amend() โดยใช้เวลาคงที่ต่อแท่ง
+
+ทุกขั้นตอนทำซ้ำลำดับการคำนวณ floating point ของ pandas/ta จึงได้ผลตรงกับ ta ทุกบิต
+เมื่อป้อนแท่งชุดเดียวกันตั้งแต่แท่งแรก
+"""
+
+import math
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+NAN = float('nan')
+# จำนวนแท่งที่เก็บผลต่อ series เริ่มต้น (scanner/analyzer อ่าน 100 แท่งล่าสุด) ขยายเองถ้า df ยาวกว่า
+DEFAULT_HISTORY = 100
+# series ที่ไม่ถูก sync นานเกินนี้ (วินาที) จะถูกลบออกจาก IndicatorRegistry
+DEFAULT_MAX_IDLE = 6 * 3600.0
+
+
+def _is_nan(value: float) -> bool:
+    return value != value
+
+
+class StreamingIndicator:
+    """ฐานของ indicator แบบ streaming
+
+    update(x) เพิ่มแท่งใหม่, amend(x) แทนค่าของแท่งล่าสุด (คืนค่า indicator ของแท่งนั้นทั้งคู่)
+    คลาสลูก implement _step(x) ที่เปลี่ยน state จาก self._state และคืน (state ใหม่, ค่า)
+    """
+
+    def __init__(self):
+        self._state = self._initial_state()
+        self._prev_state = None
+        self.value = NAN
+
+    def _initial_state(self) -> Tuple:
+        raise NotImplementedError
+
+    def _step(self, state: Tuple, x: float) -> Tuple[Tuple, float]:
+        raise NotImplementedError
+
+    def update(self, x: float) -> float:
+        self._prev_state = self._state
+        self._state, self.value = self._step(self._state, x)
+        return self.value
+
+    def amend(self, x: float) -> float:
+        if self._prev_state is None:
+            return self.update(x)
+        self._state, self.value = self._step(self._prev_state, x)
+        return self.value
+
+
+class EMA(StreamingIndicator):
+    """Series.ewm(span=... หรือ alpha=..., adjust=False, min_periods=...).mean()"""
+
+    def __init__(self, span: Optional[float] = None, alpha: Optional[float] = None, min_periods: int = 0):
+        # pandas แปลงเป็น center of mass แล้วคำนวณ alpha ใหม่ ต้องทำลำดับเดียวกันเพื่อให้ได้บิตเดียวกัน
+        com = (span - 1) / 2 if span is not None else (1 - alpha) / alpha
+        self.alpha = 1.0 / (1.0 + com)
+        self.old_wt_factor = 1.0 - self.alpha
+        self.min_periods = max(min_periods, 1)
+        super().__init__()
+
+    def _initial_state(self) -> Tuple:
+        return (NAN, 1.0, 0)  # weighted, old_wt, nobs
+
+    def _step(self, state: Tuple, x: float) -> Tuple[Tuple, float]:
+        weighted, old_wt, nobs = state
+        is_observation = not _is_nan(x)
+        nobs += is_observation
+        if not _is_nan(weighted):
+            old_wt *= self.old_wt_factor
+            if is_observation:
+                if weighted != x:
+                    weighted = old_wt * weighted + self.alpha * x
+                    weighted /= old_wt + self.alpha
+                old_wt = 1.0
+        elif is_observation:
+            weighted = x
+        return (weighted, old_wt, nobs), (weighted if nobs >= self.min_periods else NAN)
+
+
+class _RollingWindow(StreamingIndicator):
+    """หน้าต่างขนาดคงที่: แท่งที่หลุดหน้าต่างถูกลบก่อนเพิ่มแท่งใหม่ (ลำดับเดียวกับ pandas)"""
+
+    def __init__(self, window: int, min_periods: Optional[int] = None):
+        self.window = window
+        self.min_periods = max(window if min_periods is None else min_periods, 1)
+        self.values = deque()
+        self._evicted = None
+        super().__init__()
+
+    def update(self, x: float) -> float:
+        x = self._clean(x)
+        self._evicted = self.values.popleft() if len(self.values) == self.window else None
+        self.values.append(x)
+        self._prev_state = self._state
+        self._state, self.value = self._roll(self._state, self._evicted, x)
+        return self.value
+
+    def amend(self, x: float) -> float:
+        if self._prev_state is None:
+            return self.update(x)
+        x = self._clean(x)
+        self.values[-1] = x
+        self._state, self.value = self._roll(self._prev_state, self._evicted, x)
+        return self.value
+
+    @staticmethod
+    def _clean(x: float) -> float:
+        # pandas แปลง inf เป็น NaN ก่อนส่งเข้า rolling aggregation
+        return NAN if x is None or math.isinf(x) else float(x)
+
+    def _roll(self, state: Tuple, evicted: Optional[float], x: float) -> Tuple[Tuple, float]:
+        raise NotImplementedError
+
+
+class RollingMean(_RollingWindow):
+    """Series.rolling(window).mean() (ผลรวมแบบ Kahan แยกตัวชดเชยของการเพิ่มและการลบ)"""
+
+    def _initial_state(self) -> Tuple:
+        # sum_x, compensation_add, compensation_remove, nobs, neg_ct, num_consecutive_same_value, prev_value
+        return (0.0, 0.0, 0.0, 0, 0, 0, NAN)
+
+    def _roll(self, state: Tuple, evicted: Optional[float], x: float) -> Tuple[Tuple, float]:
+        sum_x, comp_add, comp_remove, nobs, neg_ct, same_count, prev_value = state
+
+        if evicted is not None and not _is_nan(evicted):
+            nobs -= 1
+            y = -evicted - comp_remove
+            t = sum_x + y
+            comp_remove = t - sum_x - y
+            sum_x = t
+            if math.copysign(1.0, evicted) < 0:
+                neg_ct -= 1
+
+        if not _is_nan(x):
+            nobs += 1
+            y = x - comp_add
+            t = sum_x + y
+            comp_add = t - sum_x - y
+            sum_x = t
+            if math.copysign(1.0, x) < 0:
+                neg_ct += 1
+            same_count = same_count + 1 if x == prev_value else 1
+            prev_value = x
+
+        if nobs >= self.min_periods and nobs > 0:
+            result = sum_x / nobs
+            if same_count >= nobs:
+                result = prev_value
+            elif neg_ct == 0 and result < 0:
+                result = 0.0
+            elif neg_ct == nobs and result > 0:
+                result = 0.0
+        else:
+            result = NAN
+        return (sum_x, comp_add, comp_remove, nobs, neg_ct, same_count, prev_value), result
+
+
+class RollingStd(_RollingWindow):
+    """Series.rolling(window).std(ddof) (Welford + Kahan แบบเดียวกับ pandas)"""
+
+    def __init__(self, window: int, ddof: int = 1, min_periods: Optional[int] = None):
+        self.ddof = ddof
+        super().__init__(window, min_periods)
+
+    def _initial_state(self) -> Tuple:
+        # nobs, mean_x, ssqdm_x, compensation_add, compensation_remove, num_consecutive_same_value, prev_value
+        return (0.0, 0.0, 0.0, 0.0, 0.0, 0, NAN)
+
+    def _roll(self, state: Tuple, evicted: Optional[float], x: float) -> Tuple[Tuple, float]:
+        nobs, mean_x, ssqdm_x, comp_add, comp_remove, same_count, prev_value = state
+
+        if evicted is not None and not _is_nan(evicted):
+            nobs -= 1
+            if nobs:
+                prev_mean = mean_x - comp_remove
+                y = evicted - comp_remove
+                t = y - mean_x
+                comp_remove = t + mean_x - y
+                mean_x = mean_x - t / nobs
+                ssqdm_x = ssqdm_x - (evicted - prev_mean) * (evicted - mean_x)
+            else:
+                mean_x = 0.0
+                ssqdm_x = 0.0
+
+        if not _is_nan(x):
+            same_count = same_count + 1 if x == prev_value else 1
+            prev_value = x
+            nobs += 1
+            prev_mean = mean_x - comp_add
+            y = x - comp_add
+            t = y - mean_x
+            comp_add = t + mean_x - y
+            mean_x = mean_x + t / nobs
+            ssqdm_x = ssqdm_x + (x - prev_mean) * (x - mean_x)
+
+        if nobs >= self.min_periods and nobs > self.ddof:
+            if nobs == 1 or same_count >= nobs:
+                result = 0.0
+            else:
+                variance = ssqdm_x / (nobs - self.ddof)
+                result = math.sqrt(variance) if variance > 0 else 0.0
+        else:
+            result = NAN
+        return (nobs, mean_x, ssqdm_x, comp_add, comp_remove, same_count, prev_value), result
+
+
+class RollingMax:
+    """Series.rolling(window).max() ด้วย monotonic deque (O(1) เฉลี่ยต่อแท่ง)"""
+
+    def __init__(self, window: int, min_periods: Optional[int] = None):
+        self.window = window
+        self.min_periods = max(window if min_periods is None else min_periods, 1)
+        self.index = -1
+        self.candidates = deque()    # (index, value) ค่าลดลงจากหน้าไปหลัง
+        self.observations = deque()  # index ของค่าที่ไม่ใช่ NaN ในหน้าต่าง
+        self._pushed = None          # สิ่งที่แท่งล่าสุดเปลี่ยน ใช้ย้อนกลับตอน amend
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        self.index += 1
+        expired = self.index - self.window
+        while self.candidates and self.candidates[0][0] <= expired:
+            self.candidates.popleft()
+        if self.observations and self.observations[0] <= expired:
+            self.observations.popleft()
+        return self._push(x)
+
+    def amend(self, x: float) -> float:
+        if self._pushed is None:
+            return self.update(x)
+        observed, removed = self._pushed
+        if observed:
+            self.candidates.pop()
+            self.observations.pop()
+        self.candidates.extend(reversed(removed))
+        return self._push(x)
+
+    def _push(self, x: float) -> float:
+        removed = []
+        observed = not _is_nan(x)
+        if observed:
+            while self.candidates and self.candidates[-1][1] <= x:
+                removed.append(self.candidates.pop())
+            self.candidates.append((self.index, x))
+            self.observations.append(self.index)
+        self._pushed = (observed, removed)
+
+        self.value = self.candidates[0][1] if len(self.observations) >= self.min_periods else NAN
+        return self.value
+
+
+class TrueRange(StreamingIndicator):
+    """max(high - low, |high - prev_close|, |low - prev_close|) โดยข้าม NaN (แท่งแรกใช้ high - low)"""
+
+    def _initial_state(self) -> Tuple:
+        return (NAN,)  # prev_close
+
+    def _step(self, state: Tuple, bar: Tuple[float, float, float]) -> Tuple[Tuple, float]:
+        high, low, close = bar
+        prev_close, = state
+        ranges = [value for value in (high - low, abs(high - prev_close), abs(low - prev_close)) if not _is_nan(value)]
+        return (close,), (max(ranges) if ranges else NAN)
+
+
+class AverageTrueRange(StreamingIndicator):
+    """ค่าเฉลี่ยของ true range (ป้อนค่า true range): window แรกใช้ค่าเฉลี่ยธรรมดา แล้วเฉลี่ยแบบ Wilder (ก่อนหน้านั้นเป็น 0)"""
+
+    def __init__(self, window: int = 14):
+        self.window = window
+        self.seed = []
+        super().__init__()
+
+    def _initial_state(self) -> Tuple:
+        return (0, 0.0)  # จำนวนแท่ง, atr
+
+    def _step(self, state: Tuple, true_range: float) -> Tuple[Tuple, float]:
+        count, atr = state
+        if count < self.window:
+            # แก้แท่งล่าสุดในช่วงเริ่มต้นต้องแทนค่าเดิมในรายการ
+            del self.seed[count:]
+            self.seed.append(true_range)
+            if count == self.window - 1:
+                atr = pd.Series(self.seed, dtype=np.float64).mean()
+        else:
+            atr = (atr * (self.window - 1) + true_range) / float(self.window)
+        return (count + 1, atr), atr
+
+
+class ATR(AverageTrueRange):
+    """ta.volatility.average_true_range จากแท่ง (high, low, close)"""
+
+    def __init__(self, window: int = 14):
+        self.true_range = TrueRange()
+        super().__init__(window)
+
+    def update(self, bar: Tuple[float, float, float]) -> float:
+        return super().update(self.true_range.update(bar))
+
+    def amend(self, bar: Tuple[float, float, float]) -> float:
+        return super().amend(self.true_range.amend(bar))
+
+
+class Lag(StreamingIndicator):
+    """ค่าของแท่งก่อนหน้า (Series.shift(1))"""
+
+    def _initial_state(self) -> Tuple:
+        return (NAN,)
+
+    def _step(self, state: Tuple, x: float) -> Tuple[Tuple, float]:
+        return (x,), state[0]
+
+
+class RSI(StreamingIndicator):
+    """ta.momentum.rsi: EMA แบบ Wilder (alpha = 1/window) ของการขึ้นและลงของราคา"""
+
+    def __init__(self, window: int = 14):
+        self.up = EMA(alpha=1 / window, min_periods=window)
+        self.down = EMA(alpha=1 / window, min_periods=window)
+        super().__init__()
+
+    def _initial_state(self) -> Tuple:
+        return (NAN,)  # prev_close
+
+    def update(self, close: float) -> float:
+        self._prev_state = self._state
+        return self._apply(self._state, close, self.up.update, self.down.update)
+
+    def amend(self, close: float) -> float:
+        if self._prev_state is None:
+            return self.update(close)
+        return self._apply(self._prev_state, close, self.up.amend, self.down.amend)
+
+    def _apply(self, state: Tuple, close: float, feed_up: Callable, feed_down: Callable) -> float:
+        prev_close, = state
+        diff = close - prev_close
+        emaup = feed_up(diff if diff > 0 else 0.0)
+        emadn = feed_down(-(diff if diff < 0 else 0.0))
+        self._state = (close,)
+        if emadn == 0:
+            self.value = 100.0
+        else:
+            self.value = 100 - (100 / (1 + emaup / emadn))
+        return self.value
+
+
+class MACD:
+    """ta.trend.MACD: (macd, signal, histogram)"""
+
+    def __init__(self, window_fast: int = 12, window_slow: int = 26, window_sign: int = 9):
+        self.fast = EMA(span=window_fast, min_periods=window_fast)
+        self.slow = EMA(span=window_slow, min_periods=window_slow)
+        self.signal = EMA(span=window_sign, min_periods=window_sign)
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        macd = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(macd)
+        return macd, signal, macd - signal
+
+    def amend(self, close: float) -> Tuple[float, float, float]:
+        macd = self.fast.amend(close) - self.slow.amend(close)
+        signal = self.signal.amend(macd)
+        return macd, signal, macd - signal
+
+
+class BollingerBands:
+    """ta.volatility.BollingerBands: (upper, middle, lower) จากค่าเฉลี่ยและส่วนเบี่ยงเบนมาตรฐาน (ddof=0)"""
+
+    def __init__(self, window: int = 20, window_dev: int = 2):
+        self.window_dev = window_dev
+        self.mean = RollingMean(window)
+        self.std = RollingStd(window, ddof=0)
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        return self._bands(self.mean.update(close), self.std.update(close))
+
+    def amend(self, close: float) -> Tuple[float, float, float]:
+        return self._bands(self.mean.amend(close), self.std.amend(close))
+
+    def _bands(self, mavg: float, mstd: float) -> Tuple[float, float, float]:
+        return mavg + self.window_dev * mstd, mavg, mavg - self.window_dev * mstd
+
+
+class IndicatorSet:
+    """ฐานของชุด indicator ต่อแท่ง: columns คือชื่อคอลัมน์ผลลัพธ์ตามลำดับที่ _feed คืน"""
+
+    columns: Tuple[str, ...] = ()
+    bool_columns: Tuple[str, ...] = ()
+
+    def update(self, bar: Sequence[float]) -> Tuple:
+        return self._feed(bar, amend=False)
+
+    def amend(self, bar: Sequence[float]) -> Tuple:
+        return self._feed(bar, amend=True)
+
+    def _feed(self, bar: Sequence[float], amend: bool) -> Tuple:
+        raise NotImplementedError
+
+    @staticmethod
+    def _call(indicator, value, amend: bool):
+        return indicator.amend(value) if amend else indicator.update(value)
+
+
+class SeriesIndicators:
+    """state ของชุด indicator สำหรับหนึ่ง series ที่ผูกกับ timestamp ของแท่ง
+
+    sync(df) ป้อนเฉพาะแท่งที่ใหม่กว่าแท่งล่าสุดที่เคยเห็น และแก้แท่งล่าสุดถ้ายังอยู่ใน df
+    ถ้า df ไม่ต่อเนื่องกับข้อมูลเดิม (ขาดช่วงหรือย้อนหลังเกินที่เก็บไว้) จะเริ่มคำนวณใหม่จาก df
+    history คือจำนวนแท่งที่เก็บผลไว้ ขยายเป็นความยาวของ df ที่ยาวที่สุดที่เคยส่งมา
+    """
+
+    def __init__(self, factory: Callable[[], IndicatorSet], history: int = DEFAULT_HISTORY):
+        self.factory = factory
+        self.history = history
+        self.reset()
+
+    def reset(self):
+        self.indicators = self.factory()
+        self.timestamps = deque(maxlen=self.history)
+        self.outputs = deque(maxlen=self.history)
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return self.indicators.columns
+
+    def sync(self, df: pd.DataFrame) -> pd.DataFrame:
+        """คืน DataFrame ของ indicator ที่ index ตรงกับ df"""
+        timestamps = df.index.to_numpy()
+        bars = df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=np.float64).tolist()
+        self._ensure_history(len(df))
+        start = self._resume_position(timestamps)
+
+        if start is None:
+            self.reset()
+            start = 0
+        else:
+            # แท่งล่าสุดที่เคยป้อนอาจเปลี่ยนค่า (แท่งที่ยังไม่ปิด)
+            self.outputs[-1] = self.indicators.amend(bars[start - 1])
+
+        for position in range(start, len(df)):
+            self.outputs.append(self.indicators.update(bars[position]))
+            self.timestamps.append(timestamps[position])
+
+        rows = list(self.outputs)[-len(df):] if len(df) else []
+        result = pd.DataFrame(rows, index=df.index, columns=list(self.columns), dtype=np.float64)
+        for column in self.indicators.bool_columns:
+            result[column] = result[column].astype(bool)
+        return result
+
+    def _ensure_history(self, length: int):
+        """ขยาย deque ให้เก็บผลได้อย่างน้อย length แท่ง (ผลที่ต้องคืนต้องอยู่ครบ)"""
+        if length <= self.history:
+            return
+        self.history = length
+        self.timestamps = deque(self.timestamps, maxlen=length)
+        self.outputs = deque(self.outputs, maxlen=length)
+
+    def _resume_position(self, timestamps: np.ndarray) -> Optional[int]:
+        """ตำแหน่งใน df ถัดจากแท่งล่าสุดที่เคยป้อน หรือ None ถ้าต้องเริ่มใหม่"""
+        if not self.timestamps or not len(timestamps):
+            return None
+        last = self.timestamps[-1]
+        position = int(np.searchsorted(timestamps, last))
+        if position >= len(timestamps) or timestamps[position] != last:
+            return None
+        # แถวของ df ก่อนแท่งใหม่ต้องเป็นแท่งที่เก็บผลไว้แล้วทั้งหมด
+        if position + 1 > len(self.timestamps) or self.timestamps[-position - 1] != timestamps[0]:
+            return None
+        return position + 1
+
+
+class IndicatorRegistry:
+    """SeriesIndicators ต่อ key (เช่น (exchange, symbol, timeframe))
+
+    series ที่ไม่ถูก sync นานเกิน max_idle วินาทีจะถูกลบเมื่อ sync ครั้งถัดไป (None คือไม่ลบ)
+    และลบ series ของ symbol ที่ออกจาก universe ได้ด้วย evict()
+    """
+
+    def __init__(self, factory: Callable[[], IndicatorSet], history: int = DEFAULT_HISTORY,
+                 max_idle: Optional[float] = DEFAULT_MAX_IDLE):
+        self.factory = factory
+        self.history = history
+        self.max_idle = max_idle
+        self.series: Dict = {}
+        # key เต็ม -> (key ที่ผู้เรียกส่งมา, เวลา sync ล่าสุดจาก time.monotonic())
+        self.last_used: Dict = {}
+        self._last_sweep = time.monotonic()
+
+    def sync(self, key, df: pd.DataFrame, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """columns: คำนวณเฉพาะคอลัมน์ที่ระบุ (factory ต้องรับ columns) state แยกตามชุดคอลัมน์"""
+        now = time.monotonic()
+        self._evict_stale(now)
+        series_key = key if columns is None else (key, tuple(columns))
+        state = self.series.get(series_key)
+        if state is None:
+            state = self.series[series_key] = SeriesIndicators(self._factory(columns), self.history)
+        self.last_used[series_key] = (key, now)
+        return state.sync(df)
+
+    def compute(self, df: pd.DataFrame, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """คำนวณทั้ง df ครั้งเดียวโดยไม่เก็บ state"""
+        return SeriesIndicators(self._factory(columns), max(len(df), 1)).sync(df)
+
+    def _factory(self, columns: Optional[Sequence[str]]) -> Callable[[], IndicatorSet]:
+        if columns is None:
+            return self.factory
+        return lambda: self.factory(columns=columns)
+
+    def evict(self, predicate: Callable[[object], bool]) -> int:
+        """ลบ series ที่ predicate(key) เป็นจริง (key ตามที่ส่งให้ sync) คืนจำนวนที่ลบ"""
+        removed = [series_key for series_key, (key, _) in self.last_used.items() if predicate(key)]
+        for series_key in removed:
+            del self.series[series_key]
+            del self.last_used[series_key]
+        return len(removed)
+
+    def _evict_stale(self, now: float):
+        # กวาดไม่เกินหนึ่งครั้งต่อ max_idle เพื่อให้ sync ยังเป็นเวลาคงที่โดยเฉลี่ย
+        if self.max_idle is None or now - self._last_sweep < self.max_idle:
+            return
+        self._last_sweep = now
+        stale = [series_key for series_key, (_, used) in self.last_used.items() if now - used > self.max_idle]
+        for series_key in stale:
+            del self.series[series_key]
+            del self.last_used[series_key]
+
+    def clear(self):
+        self.series.clear()
+        self.last_used.clear()
+
+
+def apply_columns(df: pd.DataFrame, indicators: pd.DataFrame) -> pd.DataFrame:
+    """เพิ่มคอลัมน์ indicator ลงใน df (แทนที่คอลัมน์ชื่อเดิม)"""
+    for column in indicators.columns:
+        df[column] = indicators[column]
+    return df
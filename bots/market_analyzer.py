@@ -3,17 +3,26 @@ import pandas as pd
 from datetime import datetime
 import time
 import logging
-from typing import Dict, List, Optional
-import ta
-from .exchange_manager import ExchangeManager
+from typing import Dict, List, Optional, Sequence
+from .exchange_manager import ExchangeManager, get_shared_exchange_manager
+from .indicator_graph import MarketIndicators
+from .indicators import IndicatorRegistry, apply_columns
+from .support_resistance import SupportResistanceIndex, cluster_levels, find_pivots, nearest_levels
 
 class MultiExchangeMarketAnalyzer:
     """วิเคราะห์ตลาดจากหลาย Exchange พร้อมกับสร้างคำแนะนำ config"""
     
-    def __init__(self, config_path: str = "config.json"):
-        self.exchange_manager = ExchangeManager(config_path)
+    # คอลัมน์ที่ analyze_market_condition ใช้
+    ANALYSIS_COLUMNS = ('sma_20', 'sma_50', 'rsi', 'macd', 'macd_signal')
+    
+    def __init__(self, config_path: str = "config.json", exchange_manager: Optional[ExchangeManager] = None):
+        self.exchange_manager = exchange_manager or get_shared_exchange_manager(config_path)
         self.logger = self._setup_logger()
         self.analysis_results = {}
+        # state ของ indicator ต่อ (exchange, symbol, timeframe) คำนวณเฉพาะแท่งใหม่
+        self.indicators = IndicatorRegistry(MarketIndicators)
+        # pivot ของ support/resistance ต่อ (exchange, symbol, timeframe) อัปเดตเฉพาะแท่งใหม่
+        self.levels: Dict[tuple, SupportResistanceIndex] = {}
         
     def _setup_logger(self) -> logging.Logger:
         """ตั้งค่า logger"""
@@ -32,6 +41,8 @@ class MultiExchangeMarketAnalyzer:
     
     async def initialize(self) -> bool:
         """เริ่มต้นการเชื่อมต่อกับ exchanges"""
+        if self.exchange_manager.backend == 'async':
+            return await self.exchange_manager.initialize_exchanges_async()
         return self.exchange_manager.initialize_exchanges()
     
     async def fetch_ohlc_data(self, exchange_name: str, symbol: str, 
@@ -45,13 +56,8 @@ class MultiExchangeMarketAnalyzer:
             
             # สำหรับ CEX
             if exchange_name in self.exchange_manager.exchanges:
-                ohlc_data = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-                
-                df = pd.DataFrame(ohlc_data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                df = df.set_index('timestamp')
-                
-                return df.sort_index()
+                # ดึงเฉพาะแท่งใหม่จากแคช (DataFrame ใช้หน่วยความจำร่วมกับแคช)
+                return await self.exchange_manager.candle_cache.get_dataframe(exchange_name, symbol, timeframe, limit)
             
             # สำหรับ DEX (ต้องการการพัฒนาเพิ่มเติม)
             else:
@@ -62,43 +68,26 @@ class MultiExchangeMarketAnalyzer:
             self.logger.error(f"❌ ไม่สามารถดึงข้อมูล OHLC จาก {exchange_name}: {e}")
             return None
     
-    def calculate_technical_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        """คำนวณ technical indicators"""
+    def calculate_technical_indicators(self, df: pd.DataFrame, key: Optional[tuple] = None,
+                                       columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """คำนวณ technical indicators (SMA, EMA, RSI, MACD, Bollinger Bands, volume SMA, ATR)
+
+        key: (exchange, symbol, timeframe) เพื่อเก็บ state ไว้และคำนวณเฉพาะแท่งใหม่ในครั้งถัดไป
+        columns: คำนวณเฉพาะคอลัมน์ที่ระบุ (เช่น ANALYSIS_COLUMNS) แทนทั้งหมด
+        """
         try:
-            # Moving Averages
-            df['sma_20'] = ta.trend.sma_indicator(df['close'], window=20)
-            df['ema_20'] = ta.trend.ema_indicator(df['close'], window=20)
-            df['sma_50'] = ta.trend.sma_indicator(df['close'], window=50)
-            
-            # RSI
-            df['rsi'] = ta.momentum.rsi(df['close'], window=14)
-            
-            # MACD
-            macd = ta.trend.MACD(df['close'])
-            df['macd'] = macd.macd()
-            df['macd_signal'] = macd.macd_signal()
-            df['macd_histogram'] = macd.macd_diff()
-            
-            # Bollinger Bands
-            bollinger = ta.volatility.BollingerBands(df['close'])
-            df['bb_upper'] = bollinger.bollinger_hband()
-            df['bb_middle'] = bollinger.bollinger_mavg()
-            df['bb_lower'] = bollinger.bollinger_lband()
-            
-            # Volume indicators
-            df['volume_sma'] = ta.volume.volume_sma(df['close'], df['volume'], window=20)
-            
-            # Volatility
-            df['atr'] = ta.volatility.average_true_range(df['high'], df['low'], df['close'])
-            
-            return df
+            if key is None:
+                indicators = self.indicators.compute(df, columns)
+            else:
+                indicators = self.indicators.sync(key, df, columns)
+            return apply_columns(df, indicators)
             
         except Exception as e:
             self.logger.error(f"❌ ไม่สามารถคำนวณ technical indicators: {e}")
             return df
     
-    def analyze_market_condition(self, df: pd.DataFrame, symbol: str) -> Dict:
-        """วิเคราะห์สภาพตลาด"""
+    def analyze_market_condition(self, df: pd.DataFrame, symbol: str, key: Optional[tuple] = None) -> Dict:
+        """วิเคราะห์สภาพตลาด (key ใช้เก็บ state ของ support/resistance ต่อ series)"""
         if df is None or df.empty:
             return {"error": "ไม่มีข้อมูลสำหรับการวิเคราะห์"}
         
@@ -121,7 +110,7 @@ class MultiExchangeMarketAnalyzer:
         momentum_signal = self._analyze_momentum(df)
         
         # วิเคราะห์ support/resistance
-        support_resistance = self._find_support_resistance(df)
+        support_resistance = self._find_support_resistance(df, key)
         
         analysis = {
             "symbol": symbol,
@@ -186,29 +175,27 @@ class MultiExchangeMarketAnalyzer:
         else:
             return "neutral"
     
-    def _find_support_resistance(self, df: pd.DataFrame) -> Dict:
-        """หา support และ resistance levels"""
+    def _find_support_resistance(self, df: pd.DataFrame, key: Optional[tuple] = None) -> Dict:
+        """หา support และ resistance levels จากโซนของ swing high/low หลายขนาดหน้าต่าง
+
+        key: (exchange, symbol, timeframe) เพื่อเก็บ pivot ไว้และตรวจเฉพาะแท่งใหม่ในครั้งถัดไป
+        """
         try:
-            # ใช้ pivot points แบบง่าย
-            recent_data = df.tail(50)  # ดูข้อมูล 50 periods ล่าสุด
-            
-            # หา local highs และ lows
-            highs = recent_data['high'].rolling(window=5, center=True).max()
-            lows = recent_data['low'].rolling(window=5, center=True).min()
-            
-            resistance_levels = recent_data[recent_data['high'] == highs]['high'].unique()
-            support_levels = recent_data[recent_data['low'] == lows]['low'].unique()
-            
-            # เอาเฉพาะ levels ที่ใกล้ราคาปัจจุบัน
             current_price = df['close'].iloc[-1]
             
-            resistance = [r for r in resistance_levels if r > current_price and r < current_price * 1.1]
-            support = [s for s in support_levels if s < current_price and s > current_price * 0.9]
+            if key is None:
+                zones = cluster_levels(*find_pivots(df['high'].to_numpy(dtype=float), df['low'].to_numpy(dtype=float)))
+            else:
+                index = self.levels.get(key)
+                if index is None:
+                    index = self.levels[key] = SupportResistanceIndex()
+                zones = index.sync(df)
             
-            return {
-                "resistance": sorted(resistance)[:3],  # เอา 3 levels ที่ใกล้ที่สุด
-                "support": sorted(support, reverse=True)[:3]
-            }
+            # เอาเฉพาะ 3 levels ที่ใกล้ราคาปัจจุบันที่สุดในแต่ละฝั่ง (ไม่เกิน 10%)
+            levels = nearest_levels(zones, current_price)
+            nearby = set(levels["resistance"] + levels["support"])
+            levels["zones"] = [zone.to_dict() for zone in zones if zone.level in nearby]
+            return levels
             
         except Exception as e:
             self.logger.error(f"❌ ไม่สามารถหา support/resistance: {e}")
@@ -314,10 +301,10 @@ class MultiExchangeMarketAnalyzer:
                     continue
                 
                 # คำนวณ technical indicators
-                df = self.calculate_technical_indicators(df)
+                df = self.calculate_technical_indicators(df, (exchange_name, symbol, "1m"), self.ANALYSIS_COLUMNS)
                 
                 # วิเคราะห์ตลาด
-                analysis = self.analyze_market_condition(df, symbol)
+                analysis = self.analyze_market_condition(df, symbol, (exchange_name, symbol, "1m"))
                 
                 # สร้าง config
                 config = self.generate_trading_config(analysis, exchange_name)
@@ -401,17 +388,20 @@ class MultiExchangeMarketAnalyzer:
 async def run_market_analysis():
     """รันการวิเคราะห์ตลาดแบบใหม่"""
     analyzer = MultiExchangeMarketAnalyzer()
-    
-    # เริ่มต้นการเชื่อมต่อ
-    if not await analyzer.initialize():
-        print("❌ ไม่สามารถเชื่อมต่อกับ exchange ใดๆ ได้")
-        return
-    
-    # วิเคราะห์ครั้งเดียว
-    results = await analyzer.analyze_all_exchanges("BTC/USDT")
-    analyzer.print_analysis_summary(results)
-    
-    return results
+    try:
+        # เริ่มต้นการเชื่อมต่อ
+        if not await analyzer.initialize():
+            print("❌ ไม่สามารถเชื่อมต่อกับ exchange ใดๆ ได้")
+            return
+        
+        # วิเคราะห์ครั้งเดียว
+        results = await analyzer.analyze_all_exchanges("BTC/USDT")
+        analyzer.print_analysis_summary(results)
+        
+        return results
+    finally:
+        # backend แบบ async เปิด session ของ aiohttp ไว้
+        await analyzer.exchange_manager.close_all_connections_async()
 
 # === Run ===
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+"""
+Market Cache
+เก็บ market metadata (symbols, precision, limits) ของ ccxt ลงดิสก์เพื่อให้เริ่มระบบได้เร็ว
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import ccxt
+
+
+class MarketCache:
+    """แคชผลลัพธ์ load_markets ของแต่ละ exchange เป็นไฟล์ JSON พร้อม TTL"""
+
+    VERSION = 1
+
+    def __init__(self, cache_dir: str = "temp/market_cache", ttl: float = 3600):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.logger = logging.getLogger('ExchangeManager')
+
+    @staticmethod
+    def environment(exchange) -> str:
+        """สภาพแวดล้อมของ instance ('sandbox' หรือ 'live' ตามด้วย hostname ของ API) ใช้แยกไฟล์แคช"""
+        mode = 'sandbox' if getattr(exchange, 'isSandboxModeEnabled', False) is True else 'live'
+        api = getattr(exchange, 'urls', None)
+        api = api.get('api') if isinstance(api, dict) else None
+        while isinstance(api, dict):
+            api = next(iter(api.values()), None)
+        if not isinstance(api, str):
+            return mode
+        hostname = getattr(exchange, 'hostname', None)
+        if isinstance(hostname, str):
+            api = api.replace('{hostname}', hostname)
+        host = urlparse(api).hostname
+        return f"{mode}-{host}" if host else mode
+
+    def _path(self, exchange_name: str, environment: str = '') -> str:
+        name = f"{exchange_name}.{environment}" if environment else exchange_name
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    def load(self, exchange_name: str, environment: str = '') -> Optional[Dict]:
+        """โหลดแคชของ exchange (คืน None ถ้าไม่มีหรือเวอร์ชันไม่ตรง)"""
+        try:
+            with open(self._path(exchange_name, environment), 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"⚠️ อ่าน market cache ของ {exchange_name} ไม่ได้: {e}")
+            return None
+
+        # โครงสร้าง market อาจเปลี่ยนตามเวอร์ชันของ ccxt
+        if payload.get('version') != self.VERSION or payload.get('ccxt_version') != ccxt.__version__:
+            return None
+        if not payload.get('markets'):
+            return None
+
+        return payload
+
+    def is_fresh(self, payload: Dict) -> bool:
+        """ตรวจสอบว่าแคชยังไม่หมดอายุ"""
+        return time.time() - payload.get('saved_at', 0) < self.ttl
+
+    def save(self, exchange_name: str, markets: Dict, currencies: Optional[Dict] = None,
+             environment: str = '') -> bool:
+        """บันทึก markets/currencies ลงไฟล์ (เขียนไฟล์ชั่วคราวแล้ว rename)"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            payload = {
+                'version': self.VERSION,
+                'ccxt_version': ccxt.__version__,
+                'saved_at': time.time(),
+                'markets': markets,
+                'currencies': currencies or {},
+            }
+
+            path = self._path(exchange_name, environment)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, default=str)
+            os.replace(tmp_path, path)
+            return True
+
+        except Exception as e:
+            self.logger.warning(f"⚠️ บันทึก market cache ของ {exchange_name} ไม่ได้: {e}")
+            return False
@@ -0,0 +1,318 @@
+"""
+Market Stream
+รับข้อมูลตลาดแบบ real-time (ticker, trades, order book) ผ่าน WebSocket
+พร้อม reconnect และ subscribe ใหม่อัตโนมัติ
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from .order_book import L2OrderBook
+
+CHANNELS = ('ticker', 'trades', 'book')
+
+
+class NormalizedAdapter:
+    """โปรโตคอลกลางของระบบ (ใช้กับ MarketStreamServer)
+
+    client -> server: {"op": "subscribe", "channel": "ticker", "symbol": "BTC/USDT"}
+    server -> client: {"channel": "ticker", "symbol": "BTC/USDT", "data": {...}}
+
+    data ของ book: {"type": "snapshot" | "update", "bids": [[price, amount]], "asks": [...], "seq": n}
+    (update ที่ amount = 0 คือลบระดับราคานั้น)
+    """
+
+    def subscribe_message(self, channel: str, symbol: str) -> Dict:
+        return {'op': 'subscribe', 'channel': channel, 'symbol': symbol}
+
+    def parse(self, message: Dict) -> List[Tuple[str, str, object]]:
+        # ข้อความตอบรับ เช่น {"event": "subscribed", ...} ไม่มี data
+        if message.get('channel') not in CHANNELS or 'symbol' not in message or message.get('data') is None:
+            return []
+        return [(message['channel'], message['symbol'], message.get('data'))]
+
+
+class BinanceAdapter:
+    """แปลงข้อความจาก combined stream ของ Binance (wss://stream.binance.com:9443/stream)"""
+
+    def __init__(self):
+        self._request_id = 0
+        self._symbols = {}  # {'btcusdt': 'BTC/USDT'}
+
+    @staticmethod
+    def _stream_name(channel: str, market_id: str) -> str:
+        return {
+            'ticker': f"{market_id}@ticker",
+            'trades': f"{market_id}@trade",
+            'book': f"{market_id}@depth20@100ms",
+        }[channel]
+
+    def subscribe_message(self, channel: str, symbol: str) -> Dict:
+        market_id = symbol.replace('/', '').lower()
+        self._symbols[market_id] = symbol
+        self._request_id += 1
+        return {'method': 'SUBSCRIBE', 'params': [self._stream_name(channel, market_id)], 'id': self._request_id}
+
+    def parse(self, message: Dict) -> List[Tuple[str, str, object]]:
+        stream = message.get('stream', '')
+        data = message.get('data')
+        if '@' not in stream or not isinstance(data, dict):
+            return []
+
+        market_id, kind = stream.split('@', 1)
+        symbol = self._symbols.get(market_id)
+        if symbol is None:
+            return []
+
+        if kind == 'ticker':
+            return [('ticker', symbol, {
+                'bid': float(data['b']), 'ask': float(data['a']), 'last': float(data['c']),
+                'baseVolume': float(data['v']), 'quoteVolume': float(data['q']), 'timestamp': data['E'],
+            })]
+        if kind == 'trade':
+            return [('trades', symbol, [{
+                'price': float(data['p']), 'amount': float(data['q']),
+                'side': 'sell' if data['m'] else 'buy', 'timestamp': data['T'],
+            }])]
+        if kind.startswith('depth'):
+            return [('book', symbol, {
+                'type': 'snapshot', 'seq': data['lastUpdateId'],
+                'bids': [[float(p), float(a)] for p, a in data['bids']],
+                'asks': [[float(p), float(a)] for p, a in data['asks']],
+            })]
+        return []
+
+
+ADAPTERS = {
+    'normalized': NormalizedAdapter,
+    'binance': BinanceAdapter,
+}
+
+
+class MarketStream:
+    """เก็บ ticker, trades และ L2 book ล่าสุดของแต่ละ symbol จาก WebSocket feed"""
+
+    def __init__(self, exchange_name: str, url: str, adapter=None,
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0,
+                 max_trades: int = 500):
+        self.exchange_name = exchange_name
+        self.url = url
+        self.adapter = adapter or NormalizedAdapter()
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.max_trades = max_trades
+        self.logger = logging.getLogger('MarketStream')
+
+        self.subscriptions = []  # [(channel, symbol)] ตามลำดับที่ subscribe
+        self.tickers = {}        # {symbol: ticker}
+        self.trades = {}         # {symbol: deque ของ trade}
+        self.books = {}          # {symbol: L2OrderBook}
+        self.updated_at = {}     # {symbol: เวลาที่ได้รับข้อมูลล่าสุด (ทุก channel)}
+        self.ticker_updated_at = {}  # {symbol: เวลาที่ได้รับ ticker ล่าสุด}
+
+        self.connected = asyncio.Event()
+        self.update_event = asyncio.Event()
+        self.stats = {'messages': 0, 'reconnects': 0, 'errors': 0, 'gaps': 0}
+
+        self._listeners = []
+        self._gap_listeners = []
+        self._resyncing = set()
+        self._ws = None
+        self._task = None
+        self._running = False
+
+    def add_listener(self, callback: Callable[[str, str, object], None]):
+        """ลงทะเบียน callback(channel, symbol, data) ที่จะถูกเรียกทุกครั้งที่มีข้อมูลใหม่"""
+        self._listeners.append(callback)
+
+    def add_gap_listener(self, callback: Callable[[str], None]):
+        """ลงทะเบียน callback(symbol) เมื่อ book ขาดความต่อเนื่องและต้องการ snapshot ใหม่"""
+        self._gap_listeners.append(callback)
+
+    async def subscribe(self, channel: str, symbol: str):
+        """subscribe channel ของ symbol (ถูกส่งใหม่อัตโนมัติเมื่อ reconnect)"""
+        if channel not in CHANNELS:
+            raise ValueError(f"ไม่รู้จัก channel: {channel}")
+        if (channel, symbol) in self.subscriptions:
+            return
+        self.subscriptions.append((channel, symbol))
+        if self._ws is not None and not self._ws.closed:
+            await self._ws.send_json(self.adapter.subscribe_message(channel, symbol))
+
+    async def start(self):
+        """เริ่มเชื่อมต่อใน background task"""
+        if self._task is None or self._task.done():
+            self._running = True
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """หยุด stream และปิดการเชื่อมต่อ"""
+        self._running = False
+        if self._ws is not None and not self._ws.closed:
+            await self._ws.close()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        self.connected.clear()
+
+    async def _run(self):
+        """เชื่อมต่อและ reconnect แบบ exponential backoff จนกว่าจะ stop"""
+        delay = self.reconnect_delay
+        first_connect = True
+
+        async with aiohttp.ClientSession() as session:
+            while self._running:
+                try:
+                    async with session.ws_connect(self.url, heartbeat=30) as ws:
+                        self._ws = ws
+                        if not first_connect:
+                            self.stats['reconnects'] += 1
+                            self.logger.info(f"🔌 {self.exchange_name.upper()}: เชื่อมต่อ stream ใหม่แล้ว")
+                        first_connect = False
+                        delay = self.reconnect_delay
+
+                        for channel, symbol in self.subscriptions:
+                            await ws.send_json(self.adapter.subscribe_message(channel, symbol))
+                        self.connected.set()
+
+                        # diff ที่พลาดไประหว่างหลุดทำให้ book เดิมใช้ไม่ได้
+                        for symbol, book in self.books.items():
+                            if book.in_sync:
+                                book.in_sync = False
+                                self._notify_gap(symbol)
+
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                self._handle_message(msg.data)
+                            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    self.logger.warning(f"⚠️ {self.exchange_name.upper()}: stream ขาดการเชื่อมต่อ: {e}")
+                finally:
+                    self._ws = None
+                    self.connected.clear()
+
+                if self._running:
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _handle_message(self, raw: str):
+        """แปลงข้อความแล้วอัปเดตข้อมูลในหน่วยความจำ"""
+        try:
+            events = self.adapter.parse(json.loads(raw))
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.logger.warning(f"⚠️ {self.exchange_name.upper()}: ข้อความ stream ไม่ถูกต้อง: {e}")
+            return
+
+        for channel, symbol, data in events:
+            try:
+                if channel == 'ticker':
+                    self.tickers[symbol] = dict(data, symbol=symbol)
+                    self.ticker_updated_at[symbol] = time.time()
+                elif channel == 'trades':
+                    self.trades.setdefault(symbol, deque(maxlen=self.max_trades)).extend(data)
+                elif channel == 'book':
+                    self._apply_book(symbol, data)
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.logger.warning(f"⚠️ {self.exchange_name.upper()}: ข้อมูล {channel} ของ {symbol} ไม่ถูกต้อง: {e}")
+                continue
+
+            self.stats['messages'] += 1
+            self.updated_at[symbol] = time.time()
+
+            for callback in self._listeners:
+                try:
+                    callback(channel, symbol, data)
+                except Exception as e:
+                    self.logger.error(f"❌ listener ของ stream ผิดพลาด: {e}")
+
+        if events:
+            self.update_event.set()
+
+    def _apply_book(self, symbol: str, data: Dict):
+        """อัปเดต L2 book ด้วย snapshot หรือ diff"""
+        book = self.books.get(symbol)
+        if book is None:
+            book = L2OrderBook(symbol)
+            self.books[symbol] = book
+
+        if data.get('type') == 'snapshot':
+            book.apply_snapshot(data.get('bids', []), data.get('asks', []), data.get('seq'))
+            self._resyncing.discard(symbol)
+        elif not book.apply_diff(data.get('bids', []), data.get('asks', []), data.get('seq')):
+            if not book.in_sync:
+                self._notify_gap(symbol)
+
+    def _notify_gap(self, symbol: str):
+        """แจ้งว่า book ต้องการ snapshot ใหม่ (ครั้งเดียวต่อการขาดความต่อเนื่อง)"""
+        if symbol in self._resyncing:
+            return
+        self._resyncing.add(symbol)
+        self.stats['gaps'] += 1
+        self.logger.warning(f"⚠️ {self.exchange_name.upper()}: order book ของ {symbol} ขาดความต่อเนื่อง รอ snapshot ใหม่")
+
+        for callback in self._gap_listeners:
+            try:
+                callback(symbol)
+            except Exception as e:
+                self.logger.error(f"❌ gap listener ของ stream ผิดพลาด: {e}")
+
+    def resync_book(self, symbol: str, bids: List, asks: List, seq: Optional[int] = None):
+        """ใส่ snapshot ที่ได้จากภายนอก (เช่น REST) ให้ book กลับมาใช้งานได้"""
+        self._apply_book(symbol, {'type': 'snapshot', 'bids': bids, 'asks': asks, 'seq': seq})
+
+    def get_ticker(self, symbol: str, max_age: Optional[float] = None) -> Optional[Dict]:
+        """ticker ล่าสุด (คืน None ถ้า ticker เก่ากว่า max_age วินาที แม้ channel อื่นของ symbol ยังส่งข้อมูลอยู่)"""
+        ticker = self.tickers.get(symbol)
+        if ticker is None:
+            return None
+        if max_age is not None and time.time() - self.ticker_updated_at.get(symbol, 0) > max_age:
+            return None
+        return ticker
+
+    def get_trades(self, symbol: str) -> List[Dict]:
+        """รายการ trade ล่าสุดของ symbol"""
+        return list(self.trades.get(symbol, []))
+
+    def get_book(self, symbol: str, depth: int = 20) -> Optional[Dict]:
+        """L2 book เรียงตามราคา (bids มากไปน้อย, asks น้อยไปมาก)"""
+        book = self.books.get(symbol)
+        if book is None:
+            return None
+        return {
+            'bids': book.levels('bids', depth),
+            'asks': book.levels('asks', depth),
+            'seq': book.seq,
+            'in_sync': book.in_sync,
+        }
+
+    def get_order_book(self, symbol: str) -> Optional[L2OrderBook]:
+        """L2OrderBook ที่พร้อมใช้งาน (คืน None ถ้ายังไม่มี snapshot หรือขาดความต่อเนื่อง)"""
+        book = self.books.get(symbol)
+        return book if book is not None and book.in_sync else None
+
+    async def wait_for_update(self, timeout: float) -> bool:
+        """รอข้อมูลใหม่ (คืน False ถ้าหมดเวลา)"""
+        try:
+            await asyncio.wait_for(self.update_event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.update_event.clear()
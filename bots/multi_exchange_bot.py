@@ -4,17 +4,17 @@ import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import pandas as pd
-from .exchange_manager import ExchangeManager
+from .exchange_manager import ExchangeManager, get_shared_exchange_manager
 from .market_analyzer import MultiExchangeMarketAnalyzer
 from .risk_manager import RiskManager
 
 class MultiExchangeTradingBot:
     """บอทเทรดดิ้งที่รองรับหลาย Exchange ทั้ง CEX และ DEX"""
     
-    def __init__(self, config_path: str = "config.json"):
+    def __init__(self, config_path: str = "config.json", exchange_manager: Optional[ExchangeManager] = None):
         self.config_path = config_path
-        self.exchange_manager = ExchangeManager(config_path)
-        self.market_analyzer = MultiExchangeMarketAnalyzer(config_path)
+        self.exchange_manager = exchange_manager or get_shared_exchange_manager(config_path)
+        self.market_analyzer = MultiExchangeMarketAnalyzer(config_path, exchange_manager=self.exchange_manager)
         self.risk_manager = RiskManager()
         self.logger = self._setup_logger()
         
@@ -48,10 +48,18 @@ class MultiExchangeTradingBot:
         self.logger.info("🤖 เริ่มต้นระบบ Multi-Exchange Trading Bot")
         
         # เริ่มต้น exchange manager
-        if not self.exchange_manager.initialize_exchanges():
+        if self.exchange_manager.backend == 'async':
+            connected = await self.exchange_manager.initialize_exchanges_async()
+        else:
+            connected = self.exchange_manager.initialize_exchanges()
+        
+        if not connected:
             self.logger.error("❌ ไม่สามารถเชื่อมต่อกับ exchange ใดๆ ได้")
             return False
         
+        # เริ่ม WebSocket market stream (ถ้าตั้งค่าไว้)
+        await self.exchange_manager.start_streams()
+        
         # เริ่มต้น market analyzer
         if not await self.market_analyzer.initialize():
             self.logger.error("❌ ไม่สามารถเริ่มต้น market analyzer ได้")
@@ -86,8 +94,10 @@ class MultiExchangeTradingBot:
                 try:
                     df = await self.market_analyzer.fetch_ohlc_data(exchange_name, symbol, "1m", 100)
                     if df is not None and not df.empty:
-                        df = self.market_analyzer.calculate_technical_indicators(df)
-                        analysis = self.market_analyzer.analyze_market_condition(df, symbol)
+                        df = self.market_analyzer.calculate_technical_indicators(
+                            df, (exchange_name, symbol, "1m"), self.market_analyzer.ANALYSIS_COLUMNS
+                        )
+                        analysis = self.market_analyzer.analyze_market_condition(df, symbol, (exchange_name, symbol, "1m"))
                         config = self.market_analyzer.generate_trading_config(analysis, exchange_name)
                         
                         if exchange_name not in self.trading_config:
@@ -102,7 +112,7 @@ class MultiExchangeTradingBot:
     async def _get_initial_balance(self, exchange_name: str) -> Dict:
         """ดึงยอดเงินเริ่มต้น"""
         try:
-            balance = self.exchange_manager.get_balance(exchange_name)
+            balance = await self.exchange_manager.balance_cache.get(exchange_name)
             return balance if balance else {}
         except Exception as e:
             self.logger.error(f"❌ ไม่สามารถดึงยอดเงินจาก {exchange_name}: {e}")
@@ -148,6 +158,18 @@ class MultiExchangeTradingBot:
         while self.is_running:
             try:
                 trading_pairs = self.exchange_manager.get_trading_pairs(exchange_name)
+                stream = self.exchange_manager.get_stream(exchange_name)
+                
+                # ดึง ticker ทุกคู่ที่ไม่มีข้อมูลสดจาก stream ในครั้งเดียว แล้วให้ _process_symbol อ่านจาก snapshot
+                stale_pairs = [
+                    symbol for symbol in trading_pairs
+                    if stream is None or stream.get_ticker(symbol, max_age=60) is None
+                ]
+                if stale_pairs:
+                    await self.exchange_manager.ticker_hub.refresh(exchange_name, stale_pairs)
+                
+                # ตรวจสอบสถานะออเดอร์ทั้ง exchange ในครั้งเดียว
+                await self._reconcile_orders(exchange_name)
                 
                 for symbol in trading_pairs:
                     if not self.is_running:
@@ -155,8 +177,12 @@ class MultiExchangeTradingBot:
                     
                     await self._process_symbol(exchange_name, symbol)
                 
-                # รอก่อนรอบถัดไป
-                await asyncio.sleep(30)  # 30 วินาที
+                # รอก่อนรอบถัดไป (มี stream: รอข้อมูลใหม่ แต่ไม่ถี่กว่า stream_cycle_interval)
+                if stream is not None:
+                    await asyncio.sleep(self.exchange_manager.config.get('bot_settings', {}).get('stream_cycle_interval', 1))
+                    await stream.wait_for_update(30)
+                else:
+                    await asyncio.sleep(30)  # 30 วินาที
                 
             except Exception as e:
                 self.logger.error(f"❌ ข้อผิดพลาดในลูปการเทรด {exchange_name}: {e}")
@@ -174,16 +200,15 @@ class MultiExchangeTradingBot:
             if not await self._check_risk_limits(exchange_name, symbol):
                 return
             
-            # ดึงข้อมูลตลาดปัจจุบัน
-            ticker = await self.exchange_manager.fetch_ticker(exchange_name, symbol)
+            # ดึงข้อมูลตลาดปัจจุบัน (จาก snapshot ของรอบนี้ ถ้าไม่มีจึงดึงใหม่)
+            ticker = self.exchange_manager.ticker_hub.get(exchange_name, symbol, max_age=60)
+            if not ticker:
+                ticker = await self.exchange_manager.fetch_ticker(exchange_name, symbol)
             if not ticker:
                 return
             
             current_price = ticker['last']
             
-            # ตรวจสอบออเดอร์ที่มีอยู่
-            await self._check_existing_orders(exchange_name, symbol)
-            
             # ตัดสินใจเทรด
             await self._make_trading_decision(exchange_name, symbol, current_price, config)
             
@@ -194,7 +219,7 @@ class MultiExchangeTradingBot:
         """ตรวจสอบขอบเขตความเสี่ยง"""
         try:
             # ตรวจสอบยอดเงิน
-            balance = self.exchange_manager.get_balance(exchange_name)
+            balance = await self.exchange_manager.balance_cache.get(exchange_name)
             if not balance:
                 return False
             
@@ -220,8 +245,102 @@ class MultiExchangeTradingBot:
             self.logger.error(f"❌ ข้อผิดพลาดในการตรวจสอบความเสี่ยง: {e}")
             return False
     
+    async def _reconcile_orders(self, exchange_name: str):
+        """เทียบออเดอร์ในเครื่องกับออเดอร์ที่เปิด/ปิดใน exchange แบบ bulk
+        
+        ใช้ fetch_open_orders หนึ่งครั้ง และ fetch_closed_orders เฉพาะเมื่อมีออเดอร์หายไปจากรายการที่เปิดอยู่
+        exchange ที่ไม่รองรับจะตรวจสอบทีละออเดอร์เหมือนเดิม
+        """
+        try:
+            symbols = {
+                symbol: orders for symbol, orders in self.active_orders.get(exchange_name, {}).items() if orders
+            }
+            if not symbols:
+                return
+            
+            manager = self.exchange_manager
+            if exchange_name not in manager.exchanges or not manager.has_capability(exchange_name, 'fetchOpenOrders'):
+                for symbol in symbols:
+                    await self._check_existing_orders(exchange_name, symbol)
+                return
+            
+            open_orders = None
+            if not manager.requires_symbol(exchange_name, 'fetch_open_orders'):
+                open_orders = await manager.fetch_open_orders(exchange_name)
+                if open_orders is None and not manager.requires_symbol(exchange_name, 'fetch_open_orders'):
+                    return  # ดึงไม่ได้ชั่วคราว คงออเดอร์ไว้จนกว่าจะตรวจสอบได้ในรอบถัดไป
+            if open_orders is None:
+                # exchange ที่ต้องระบุ symbol: หนึ่ง request ต่อ symbol
+                open_orders = []
+                for symbol in symbols:
+                    result = await manager.fetch_open_orders(exchange_name, symbol)
+                    if result is None:
+                        return  # ไม่รู้สถานะจริง คงออเดอร์ไว้จนกว่าจะตรวจสอบได้
+                    open_orders.extend(result)
+            
+            open_by_id = {order['id']: order for order in open_orders}
+            missing = []
+            
+            for symbol, orders in symbols.items():
+                for order in orders:
+                    live = open_by_id.get(order['id'])
+                    if live is not None:
+                        # อัปเดตยอดที่ match บางส่วนแล้ว
+                        order.update({key: live[key] for key in ('filled', 'remaining', 'status') if live.get(key) is not None})
+                    else:
+                        missing.append((symbol, order))
+            
+            if not missing:
+                return
+            
+            closed_by_id = {}
+            if manager.has_capability(exchange_name, 'fetchClosedOrders'):
+                closed_orders = None
+                if not manager.requires_symbol(exchange_name, 'fetch_closed_orders'):
+                    closed_orders = await manager.fetch_closed_orders(exchange_name, since=self._oldest_timestamp(missing))
+                    if closed_orders is None and not manager.requires_symbol(exchange_name, 'fetch_closed_orders'):
+                        return  # ดึงไม่ได้ชั่วคราว ตรวจสอบออเดอร์ที่หายไปในรอบถัดไป
+                if closed_orders is None:
+                    # exchange ที่ต้องระบุ symbol: หนึ่ง request ต่อ symbol ที่มีออเดอร์หายไป
+                    closed_orders = []
+                    for symbol in dict.fromkeys(symbol for symbol, _ in missing):
+                        since = self._oldest_timestamp([item for item in missing if item[0] == symbol])
+                        closed_orders.extend(await manager.fetch_closed_orders(exchange_name, symbol, since=since) or [])
+                closed_by_id = {order['id']: order for order in closed_orders}
+            
+            for symbol, order in missing:
+                order_status = closed_by_id.get(order['id'])
+                if order_status is None:
+                    # ไม่อยู่ในผลลัพธ์ bulk (เช่นเก่าเกิน limit) ถามทีละออเดอร์
+                    order_status = await manager.fetch_order(exchange_name, order['id'], symbol)
+                await self._apply_order_status(exchange_name, symbol, order, order_status)
+                
+        except Exception as e:
+            self.logger.error(f"❌ ข้อผิดพลาดในการ reconcile ออเดอร์ {exchange_name}: {e}")
+    
+    @staticmethod
+    def _oldest_timestamp(missing: List) -> Optional[int]:
+        """timestamp เก่าสุดของออเดอร์ [(symbol, order)] (since ของ fetch_closed_orders)"""
+        return min((order.get('timestamp') for _, order in missing if order.get('timestamp')), default=None)
+    
+    async def _apply_order_status(self, exchange_name: str, symbol: str, order: Dict, order_status: Optional[Dict]):
+        """ลบออเดอร์ที่ปิดแล้วออกจากรายการ และจัดการออเดอร์ที่ match"""
+        if not order_status or order_status.get('status') not in ['closed', 'canceled']:
+            return
+        
+        orders = self.active_orders[exchange_name][symbol]
+        if order in orders:
+            orders.remove(order)
+        
+        if order_status['status'] == 'closed':
+            await self._handle_filled_order(exchange_name, symbol, order_status)
+        else:
+            self.exchange_manager.balance_cache.on_order_canceled(
+                exchange_name, {**order, **order_status, 'symbol': order_status.get('symbol') or symbol}
+            )
+    
     async def _check_existing_orders(self, exchange_name: str, symbol: str):
-        """ตรวจสอบและอัปเดตออเดอร์ที่มีอยู่"""
+        """ตรวจสอบและอัปเดตออเดอร์ที่มีอยู่ทีละออเดอร์ (สำหรับ exchange ที่ไม่รองรับ fetch_open_orders)"""
         try:
             if exchange_name not in self.active_orders:
                 self.active_orders[exchange_name] = {}
@@ -229,21 +348,13 @@ class MultiExchangeTradingBot:
             if symbol not in self.active_orders[exchange_name]:
                 self.active_orders[exchange_name][symbol] = []
             
-            # ตรวจสอบสถานะออเดอร์
-            orders_to_remove = []
-            
-            for order in self.active_orders[exchange_name][symbol]:
+            # ตรวจสอบสถานะออเดอร์ (ออเดอร์ที่เสร็จสิ้นแล้วจะถูกลบออกจากรายการ)
+            for order in list(self.active_orders[exchange_name][symbol]):
                 try:
                     # สำหรับ CEX
                     if exchange_name in self.exchange_manager.exchanges:
-                        exchange = self.exchange_manager.get_exchange(exchange_name)
-                        order_status = exchange.fetch_order(order['id'], symbol)
-                        
-                        if order_status['status'] in ['closed', 'canceled']:
-                            orders_to_remove.append(order)
-                            
-                            if order_status['status'] == 'closed':
-                                await self._handle_filled_order(exchange_name, symbol, order_status)
+                        order_status = await self.exchange_manager.fetch_order(exchange_name, order['id'], symbol)
+                        await self._apply_order_status(exchange_name, symbol, order, order_status)
                     
                     # สำหรับ DEX (ต้องการการพัฒนาเพิ่มเติม)
                     else:
@@ -252,10 +363,6 @@ class MultiExchangeTradingBot:
                         
                 except Exception as e:
                     self.logger.error(f"❌ ไม่สามารถตรวจสอบออเดอร์ {order['id']}: {e}")
-            
-            # ลบออเดอร์ที่เสร็จสิ้นแล้ว
-            for order in orders_to_remove:
-                self.active_orders[exchange_name][symbol].remove(order)
                 
         except Exception as e:
             self.logger.error(f"❌ ข้อผิดพลาดในการตรวจสอบออเดอร์: {e}")
@@ -269,6 +376,11 @@ class MultiExchangeTradingBot:
             
             self.logger.info(f"✅ ออเดอร์เสร็จสิ้น: {side} {amount} {symbol} @ {price} ใน {exchange_name}")
             
+            # ปรับยอดเงินในแคชทันที (resync กับ exchange ในพื้นหลัง)
+            self.exchange_manager.balance_cache.on_order_filled(
+                exchange_name, {**order, 'symbol': order.get('symbol') or symbol}
+            )
+            
             # อัปเดตสถิติ
             performance = self.performance[exchange_name]
             performance['total_trades'] += 1
@@ -297,8 +409,9 @@ class MultiExchangeTradingBot:
             min_amount = risk_mgmt.get('min_order_amount', 10.0)
             
             # คำนวณราคา bid และ ask
-            bid_price = current_price * (1 - bid_spread)
-            ask_price = current_price * (1 + ask_spread)
+            bid_price, ask_price = self._quote_prices(
+                exchange_name, symbol, current_price, bid_spread, ask_spread, min_amount
+            )
             
             # ตรวจสอบว่ามีออเดอร์ในระดับราคานี้อยู่แล้วหรือไม่
             existing_orders = self.active_orders.get(exchange_name, {}).get(symbol, [])
@@ -308,17 +421,45 @@ class MultiExchangeTradingBot:
             has_sell_order = any(order['side'] == 'sell' and abs(order['price'] - ask_price) < current_price * 0.001 
                                 for order in existing_orders)
             
-            # วางออเดอร์ buy ถ้ายังไม่มี
+            # วางออเดอร์ buy/sell ที่ยังไม่มีใน request เดียว
+            orders = []
             if not has_buy_order:
-                await self._place_order(exchange_name, symbol, 'buy', 'limit', min_amount, bid_price)
-            
-            # วางออเดอร์ sell ถ้ายังไม่มี
+                orders.append({'symbol': symbol, 'type': 'limit', 'side': 'buy', 'amount': min_amount, 'price': bid_price})
             if not has_sell_order:
-                await self._place_order(exchange_name, symbol, 'sell', 'limit', min_amount, ask_price)
+                orders.append({'symbol': symbol, 'type': 'limit', 'side': 'sell', 'amount': min_amount, 'price': ask_price})
+            
+            if orders:
+                await self._place_orders(exchange_name, orders)
                 
         except Exception as e:
             self.logger.error(f"❌ ข้อผิดพลาดในการตัดสินใจเทรด: {e}")
     
+    def _quote_prices(self, exchange_name: str, symbol: str, current_price: float,
+                      bid_spread: float, ask_spread: float, amount: float):
+        """คำนวณราคา bid/ask จาก order book ถ้ามี (ราคากลาง + spread ไม่น้อยกว่า slippage ของขนาดออเดอร์)"""
+        book = self.exchange_manager.get_order_book(exchange_name, symbol)
+        mid_price = book.mid_price() if book is not None else None
+        if not mid_price:
+            return current_price * (1 - bid_spread), current_price * (1 + ask_spread)
+        
+        sell_vwap = book.vwap('bids', amount)
+        if sell_vwap is not None:
+            bid_spread = max(bid_spread, (mid_price - sell_vwap) / mid_price)
+        buy_vwap = book.vwap('asks', amount)
+        if buy_vwap is not None:
+            ask_spread = max(ask_spread, (buy_vwap - mid_price) / mid_price)
+        
+        # ราคาที่ถึงฝั่งตรงข้ามจะ match ทันที (เป็น taker) ให้ถอยไปต่อคิวที่ราคาดีที่สุดของฝั่งตัวเองแทน
+        # ราคาภายใน spread ยังวางได้ตามปกติ
+        best_bid, best_ask = book.best_bid()[0], book.best_ask()[0]
+        bid_price = mid_price * (1 - bid_spread)
+        if bid_price >= best_ask:
+            bid_price = best_bid
+        ask_price = mid_price * (1 + ask_spread)
+        if ask_price <= best_bid:
+            ask_price = best_ask
+        return bid_price, ask_price
+    
     async def _place_order(self, exchange_name: str, symbol: str, side: str, 
                           order_type: str, amount: float, price: float = None):
         """วางออเดอร์"""
@@ -328,19 +469,35 @@ class MultiExchangeTradingBot:
             )
             
             if order:
-                # เก็บข้อมูลออเดอร์
-                if exchange_name not in self.active_orders:
-                    self.active_orders[exchange_name] = {}
-                if symbol not in self.active_orders[exchange_name]:
-                    self.active_orders[exchange_name][symbol] = []
-                
-                self.active_orders[exchange_name][symbol].append(order)
-                
-                self.logger.info(f"📝 วางออเดอร์: {side} {amount} {symbol} @ {price} ใน {exchange_name}")
+                self._record_order(exchange_name, symbol, order, side, amount, price)
                 
         except Exception as e:
             self.logger.error(f"❌ ไม่สามารถวางออเดอร์ได้: {e}")
     
+    async def _place_orders(self, exchange_name: str, orders: List[Dict]):
+        """วางหลายออเดอร์ด้วย batch API ของ exchange"""
+        try:
+            results = await self.exchange_manager.place_orders_batch(exchange_name, orders)
+            
+            for request, order in zip(orders, results):
+                if order:
+                    self._record_order(exchange_name, request['symbol'], order,
+                                       request['side'], request['amount'], request.get('price'))
+                    
+        except Exception as e:
+            self.logger.error(f"❌ ไม่สามารถวางออเดอร์ได้: {e}")
+    
+    def _record_order(self, exchange_name: str, symbol: str, order: Dict, side: str, amount: float, price: float):
+        """เก็บข้อมูลออเดอร์ที่วางสำเร็จ"""
+        # บาง exchange ตอบกลับ batch โดยไม่มีราคา/ฝั่ง ใช้ค่าที่ส่งไปแทน
+        order.setdefault('side', side)
+        if order.get('price') is None:
+            order['price'] = price
+        
+        self.active_orders.setdefault(exchange_name, {}).setdefault(symbol, []).append(order)
+        
+        self.logger.info(f"📝 วางออเดอร์: {side} {amount} {symbol} @ {price} ใน {exchange_name}")
+    
     async def _config_update_loop(self):
         """ลูปการอัปเดต config"""
         while self.is_running:
@@ -398,13 +555,20 @@ class MultiExchangeTradingBot:
             
             # ยอดเงินปัจจุบัน
             try:
-                balance = self.exchange_manager.get_balance(exchange_name)
+                balance = await self.exchange_manager.balance_cache.get(exchange_name)
                 if balance and 'total' in balance:
                     for currency, amount in balance['total'].items():
                         if amount > 0:
                             print(f"💳 {currency}: {amount:.4f}")
             except:
                 pass
+            
+            # คิว request ตาม lane ของ rate limiter
+            lane_stats = self.exchange_manager.get_scheduler_stats().get(exchange_name, {})
+            for lane, stats in lane_stats.items():
+                if stats['completed'] or stats['queued']:
+                    print(f"🚦 {lane}: รอคิว {stats['queued']} | "
+                          f"รอเฉลี่ย {stats['avg_wait_ms']:.1f}ms | สูงสุด {stats['max_wait_ms']:.1f}ms")
         
         print("\n" + "="*80)
     
@@ -417,22 +581,32 @@ class MultiExchangeTradingBot:
         # await self._cancel_all_orders()
         
         # ปิดการเชื่อมต่อ
-        self.exchange_manager.close_all_connections()
+        await self.exchange_manager.close_all_connections_async()
         
         self.logger.info("✅ หยุดการเทรดเรียบร้อย")
     
     async def _cancel_all_orders(self):
-        """ยกเลิกออเดอร์ทั้งหมด"""
-        for exchange_name, symbols in self.active_orders.items():
-            for symbol, orders in symbols.items():
-                for order in orders:
-                    try:
-                        if exchange_name in self.exchange_manager.exchanges:
-                            exchange = self.exchange_manager.get_exchange(exchange_name)
-                            exchange.cancel_order(order['id'], symbol)
-                            self.logger.info(f"❌ ยกเลิกออเดอร์ {order['id']} ใน {exchange_name}")
-                    except Exception as e:
-                        self.logger.error(f"❌ ไม่สามารถยกเลิกออเดอร์ {order['id']}: {e}")
+        """ยกเลิกออเดอร์ทั้งหมด (batch ต่อ exchange และทุก exchange พร้อมกัน)"""
+        async def cancel_exchange(exchange_name: str, symbols: Dict):
+            orders = [
+                {'id': order['id'], 'symbol': symbol}
+                for symbol, symbol_orders in symbols.items() for order in symbol_orders
+            ]
+            try:
+                results = await self.exchange_manager.cancel_orders_batch(exchange_name, orders)
+                for order, result in zip(orders, results):
+                    if result:
+                        self.logger.info(f"❌ ยกเลิกออเดอร์ {order['id']} ใน {exchange_name}")
+                    else:
+                        self.logger.error(f"❌ ไม่สามารถยกเลิกออเดอร์ {order['id']}")
+            except Exception as e:
+                self.logger.error(f"❌ ไม่สามารถยกเลิกออเดอร์ใน {exchange_name}: {e}")
+        
+        await asyncio.gather(*[
+            cancel_exchange(exchange_name, symbols)
+            for exchange_name, symbols in self.active_orders.items()
+            if exchange_name in self.exchange_manager.exchanges
+        ])
 
 # === Main function ===
 async def run_multi_exchange_bot():
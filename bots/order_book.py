@@ -0,0 +1,186 @@
+"""
+Order Book
+L2 order book ในหน่วยความจำ เก็บระดับราคาใน SortedDict (sortedcontainers)
+รองรับ snapshot + diff และตรวจจับ sequence ที่ขาดหาย
+"""
+
+from itertools import islice
+from typing import List, Optional, Tuple
+
+from sortedcontainers import SortedDict
+
+
+class BookSide:
+    """ระดับราคาฝั่งเดียว เก็บ key ที่เรียงจากดีที่สุดไปแย่ที่สุด
+
+    ฝั่ง bid เก็บ key เป็นราคาติดลบ เพื่อให้ทั้งสองฝั่งเรียงจากน้อยไปมากและ key แรกคือราคาดีที่สุด
+    เพิ่ม/ลบ/ค้นหาระดับราคาเป็น O(log n) จึงใช้กับ book เต็มความลึกที่ป้อนด้วย diff ได้
+    """
+
+    def __init__(self, is_bid: bool):
+        self.is_bid = is_bid
+        self.book = SortedDict()  # {key: ขนาด} key คือราคา (ติดลบสำหรับ bid)
+        self.bound = None         # key แย่สุดที่รู้ค่าจริงหลัง truncate (None คือไม่จำกัด)
+
+    def _key(self, price: float) -> float:
+        return -price if self.is_bid else price
+
+    def _price(self, key: float) -> float:
+        return -key if self.is_bid else key
+
+    def __len__(self) -> int:
+        return len(self.book)
+
+    def clear(self):
+        self.book.clear()
+        self.bound = None
+
+    def update(self, price: float, size: float):
+        """ตั้งขนาดของระดับราคา (size = 0 คือลบระดับนั้น)
+
+        ระดับที่ลึกกว่า bound ถูกข้ามไป เพราะ book ไม่รู้ระดับที่ถูกตัดทิ้งระหว่างนั้น
+        """
+        key = self._key(price)
+        if self.bound is not None and key > self.bound:
+            return
+        if size > 0:
+            self.book[key] = size
+        else:
+            self.book.pop(key, None)
+
+    def truncate(self, max_depth: int):
+        """ตัดระดับราคาที่ลึกเกิน max_depth ทิ้ง และไม่รับ diff ของระดับที่ลึกกว่านั้นจนกว่าจะ clear"""
+        if len(self.book) <= max_depth:
+            return
+        for key in list(self.book.islice(max_depth)):
+            del self.book[key]
+        self.bound = self.book.peekitem(-1)[0] if self.book else None
+
+    def best(self) -> Optional[Tuple[float, float]]:
+        if not self.book:
+            return None
+        key, size = self.book.peekitem(0)
+        return self._price(key), size
+
+    def size_at(self, price: float) -> float:
+        return self.book.get(self._key(price), 0.0)
+
+    def size_through(self, price: float) -> float:
+        """ขนาดรวมของทุกระดับที่ดีกว่าหรือเท่ากับ price"""
+        return sum(self.book[key] for key in self.book.irange(maximum=self._key(price)))
+
+    def items(self):
+        """(ราคา, ขนาด) เรียงจากดีที่สุด"""
+        return ((self._price(key), size) for key, size in self.book.items())
+
+    def levels(self, depth: Optional[int] = None) -> List[Tuple[float, float]]:
+        return list(islice(self.items(), depth))
+
+
+class L2OrderBook:
+    """L2 order book ของ (exchange, symbol) หนึ่งคู่"""
+
+    def __init__(self, symbol: str, max_depth: Optional[int] = None):
+        self.symbol = symbol
+        self.max_depth = max_depth
+        self.bids = BookSide(is_bid=True)
+        self.asks = BookSide(is_bid=False)
+        self.seq = None
+        self.in_sync = False  # False จนกว่าจะได้ snapshot และเมื่อ sequence ขาดหาย
+        self.gaps = 0
+
+    def apply_snapshot(self, bids: List, asks: List, seq: Optional[int] = None):
+        """แทนที่ทั้ง book ด้วย snapshot (ตัดเหลือ max_depth ระดับถ้ากำหนด)"""
+        self.bids.clear()
+        self.asks.clear()
+        self._apply_levels(bids, asks)
+        if self.max_depth:
+            # ตัดเฉพาะตอน snapshot: diff ต่อจากนี้ใช้ได้เฉพาะระดับที่ยังอยู่ในช่วงที่รู้ค่าจริง
+            self.bids.truncate(self.max_depth)
+            self.asks.truncate(self.max_depth)
+        self.seq = seq
+        self.in_sync = True
+
+    def apply_diff(self, bids: List, asks: List, seq: Optional[int] = None) -> bool:
+        """ใช้ diff กับ book (คืน False ถ้ายังไม่มี snapshot, diff เก่า หรือ sequence ขาดหาย)"""
+        if not self.in_sync:
+            return False
+
+        if seq is not None and self.seq is not None:
+            if seq <= self.seq:
+                return False  # diff ซ้ำหรือเก่ากว่า snapshot
+            if seq != self.seq + 1:
+                self.in_sync = False
+                self.gaps += 1
+                return False
+
+        self._apply_levels(bids, asks)
+        self.seq = seq
+        return True
+
+    def _apply_levels(self, bids: List, asks: List):
+        # บาง exchange ส่ง [price, size, count] จึงใช้เฉพาะสองค่าแรก
+        for level in bids:
+            self.bids.update(float(level[0]), float(level[1]))
+        for level in asks:
+            self.asks.update(float(level[0]), float(level[1]))
+
+    def _side(self, side: str) -> BookSide:
+        if side in ('bid', 'bids', 'buy'):
+            return self.bids
+        if side in ('ask', 'asks', 'sell'):
+            return self.asks
+        raise ValueError(f"ไม่รู้จักฝั่ง: {side}")
+
+    def best_bid(self) -> Optional[Tuple[float, float]]:
+        return self.bids.best()
+
+    def best_ask(self) -> Optional[Tuple[float, float]]:
+        return self.asks.best()
+
+    def mid_price(self) -> Optional[float]:
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return (bid[0] + ask[0]) / 2
+
+    def spread(self) -> Optional[float]:
+        """spread สัมพัทธ์กับราคากลาง (เช่น 0.001 = 0.1%)"""
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return (ask[0] - bid[0]) / ((ask[0] + bid[0]) / 2)
+
+    def depth_at(self, side: str, price: float) -> float:
+        """ขนาดที่ระดับราคา price พอดี"""
+        return self._side(side).size_at(price)
+
+    def depth_through(self, side: str, price: float) -> float:
+        """ขนาดรวมตั้งแต่ราคาดีที่สุดจนถึง price"""
+        return self._side(side).size_through(price)
+
+    def vwap(self, side: str, size: float) -> Optional[float]:
+        """ราคาเฉลี่ยถ่วงน้ำหนักเมื่อ take ขนาด size จากฝั่ง side ('bids' = ขาย, 'asks' = ซื้อ)
+
+        คืน None ถ้าสภาพคล่องใน book ไม่พอ
+        """
+        book_side = self._side(side)
+        if size <= 0:
+            best = book_side.best()
+            return best[0] if best else None
+
+        remaining = size
+        cost = 0.0
+
+        for price, level_size in book_side.items():
+            take = min(remaining, level_size)
+            cost += take * price
+            remaining -= take
+            if remaining <= 0:
+                return cost / size
+
+        return None
+
+    def levels(self, side: str, depth: Optional[int] = None) -> List[Tuple[float, float]]:
+        """ระดับราคา (ราคา, ขนาด) เรียงจากดีที่สุด"""
+        return self._side(side).levels(depth)
@@ -0,0 +1,137 @@
+"""
+Parallel Indicators
+กระจายการคำนวณ MACD, ความแรงสัญญาณ และการตรวจสัญญาณของเมทริกซ์ราคา (symbols × time) ไปหลาย process
+
+เมทริกซ์ close/volume ถูกคัดลอกลง shared memory ครั้งเดียว worker แต่ละตัวเปิด view ของแถวที่ได้รับ
+(ไม่ต้อง pickle ราคา) คำนวณด้วย scan_matrix แล้วคืนเฉพาะแถวที่มีสัญญาณเป็น record ขนาดเล็ก
+ทุกแถวคำนวณแยกกัน ผลลัพธ์จึงตรงกับ scan_matrix บนเมทริกซ์เต็มทุกบิต
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .vector_scan import scan_matrix
+
+# record ของหนึ่งสัญญาณ (แท่งล่าสุดของแถว row)
+SIGNAL_DTYPE = np.dtype([
+    ('row', np.int64),
+    ('long', np.bool_),
+    ('macd', np.float64),
+    ('macd_signal', np.float64),
+    ('macd_histogram', np.float64),
+    ('close', np.float64),
+    ('volume_24h', np.float64),
+    ('strength', np.float64),
+])
+
+
+def signal_records(close: np.ndarray, volume: np.ndarray, row_offset: int = 0, **params) -> np.ndarray:
+    """สแกนเมทริกซ์แล้วคืนเฉพาะแถวที่มีสัญญาณที่แท่งล่าสุดเป็น array ของ SIGNAL_DTYPE
+
+    params ส่งต่อให้ scan_matrix (fast, slow, sign, min_signal_strength, min_volume_24h)
+    """
+    result = scan_matrix([None] * len(close), np.empty(0, dtype=np.int64), close, volume, **params)
+    rows = result.signal_indices()
+    records = np.empty(len(rows), dtype=SIGNAL_DTYPE)
+    records['row'] = rows + row_offset
+    records['long'] = result.long[rows]
+    records['macd'] = result.macd[rows, -1]
+    records['macd_signal'] = result.macd_signal[rows, -1]
+    records['macd_histogram'] = result.macd_histogram[rows, -1]
+    records['close'] = result.close[rows, -1]
+    records['volume_24h'] = result.volume_24h[rows]
+    records['strength'] = result.signal_strength[rows, -1]
+    return records
+
+
+def _scan_chunk(name: str, shape: Tuple[int, int, int], start: int, stop: int, params: Dict) -> np.ndarray:
+    """งานใน worker: เปิด shared memory แล้วสแกนแถว start:stop"""
+    # worker ของ pool ใช้ resource tracker ตัวเดียวกับ process หลัก ซึ่งเป็นผู้ unlink
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        matrix = np.ndarray(shape, dtype=np.float64, buffer=memory.buf)
+        # คัดลอกเฉพาะส่วนของ chunk ก่อนปิด view ของ shared memory
+        close = np.array(matrix[0, start:stop])
+        volume = np.array(matrix[1, start:stop])
+        del matrix
+        return signal_records(close, volume, row_offset=start, **params)
+    finally:
+        memory.close()
+
+
+class ParallelIndicators:
+    """pool ของ process สำหรับสแกนเมทริกซ์ขนาดใหญ่
+
+    workers: จำนวน process (None คือจำนวน CPU)
+    chunk_rows: จำนวนแถวต่องาน (None คือแบ่งให้ worker ละประมาณ 4 งาน)
+    min_rows: เมทริกซ์ที่มีแถวน้อยกว่านี้คำนวณใน process หลักเลย (ถูกกว่าค่าส่งงาน)
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_rows: Optional[int] = None, min_rows: int = 64,
+                 logger: Optional[logging.Logger] = None):
+        self.workers = max(int(workers or os.cpu_count() or 1), 1)
+        self.chunk_rows = chunk_rows
+        self.min_rows = min_rows
+        self.logger = logger or logging.getLogger('ParallelIndicators')
+        self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def _chunks(self, rows: int) -> List[Tuple[int, int]]:
+        size = self.chunk_rows or max(-(-rows // (self.workers * 4)), 1)
+        return [(start, min(start + size, rows)) for start in range(0, rows, size)]
+
+    async def scan(self, close: np.ndarray, volume: np.ndarray, **params) -> np.ndarray:
+        """record ของทุกแถวที่มีสัญญาณ เรียงตามแถว (params เหมือน scan_matrix)"""
+        close = np.asarray(close, dtype=np.float64)
+        volume = np.asarray(volume, dtype=np.float64)
+        if len(close) < max(self.min_rows, 1) or self.workers == 1:
+            return signal_records(close, volume, **params)
+
+        try:
+            return await self._scan_shared(close, volume, params)
+        except Exception as e:
+            # เช่น ไม่มี /dev/shm หรือ worker ตาย: คำนวณใน process หลักแทน
+            self.logger.warning(f"⚠️ คำนวณแบบหลาย process ไม่ได้ คำนวณใน process หลักแทน: {e}")
+            self.close()
+            return signal_records(close, volume, **params)
+
+    async def _scan_shared(self, close: np.ndarray, volume: np.ndarray, params: Dict) -> np.ndarray:
+        shape = (2,) + close.shape
+        memory = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * 8, 1))
+        try:
+            matrix = np.ndarray(shape, dtype=np.float64, buffer=memory.buf)
+            matrix[0] = close
+            matrix[1] = volume
+            del matrix
+
+            pool = self._get_pool()
+            futures = [
+                asyncio.wrap_future(pool.submit(_scan_chunk, memory.name, shape, start, stop, params))
+                for start, stop in self._chunks(len(close))
+            ]
+            try:
+                chunks = await asyncio.gather(*futures)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+            return np.concatenate(chunks) if chunks else np.empty(0, dtype=SIGNAL_DTYPE)
+        finally:
+            memory.close()
+            memory.unlink()
+
+    def close(self):
+        """ปิด pool (เรียก scan ใหม่ได้ จะสร้าง pool ใหม่เมื่อจำเป็น)"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,224 @@
+"""
+Rate Limiter
+จัดคิว request ต่อ exchange ด้วย token bucket และ priority lanes
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Union
+
+# ลำดับความสำคัญของ lane (ค่าน้อย = ได้คิวก่อน)
+LANE_ORDER = 0          # วาง/ยกเลิกออเดอร์
+LANE_ORDER_STATUS = 1   # สถานะออเดอร์และยอดเงิน
+LANE_TICKER = 2         # ticker / ราคาปัจจุบัน
+LANE_OHLCV = 3          # OHLCV และงานสแกน
+
+LANE_NAMES = {
+    LANE_ORDER: 'order',
+    LANE_ORDER_STATUS: 'order_status',
+    LANE_TICKER: 'ticker',
+    LANE_OHLCV: 'ohlcv',
+}
+
+# จับคู่ method ของ ccxt กับ lane
+METHOD_LANES = {
+    'create_order': LANE_ORDER,
+    'create_orders': LANE_ORDER,
+    'create_market_buy_order': LANE_ORDER,
+    'create_market_sell_order': LANE_ORDER,
+    'create_limit_buy_order': LANE_ORDER,
+    'create_limit_sell_order': LANE_ORDER,
+    'cancel_order': LANE_ORDER,
+    'cancel_orders': LANE_ORDER,
+    'cancel_all_orders': LANE_ORDER,
+    'fetch_order': LANE_ORDER_STATUS,
+    'fetch_orders': LANE_ORDER_STATUS,
+    'fetch_open_orders': LANE_ORDER_STATUS,
+    'fetch_closed_orders': LANE_ORDER_STATUS,
+    'fetch_balance': LANE_ORDER_STATUS,
+    'fetch_ticker': LANE_TICKER,
+    'fetch_tickers': LANE_TICKER,
+    'fetch_order_book': LANE_TICKER,
+    'fetch_ohlcv': LANE_OHLCV,
+    'load_markets': LANE_OHLCV,
+}
+
+
+# น้ำหนักเริ่มต้นของ method ที่แพงกว่า request ปกติ (หน่วยเดียวกับ rateLimit ของ ccxt)
+# อิงต้นทุนของ Binance spot ใน ccxt ('noSymbol' คือเรียกโดยไม่ระบุ symbol) ปรับต่อ exchange ได้ด้วย request_weights
+DEFAULT_WEIGHTS = {
+    'fetch_tickers': {'cost': 1, 'noSymbol': 16},
+    'fetch_open_orders': {'cost': 1.2, 'noSymbol': 16},
+    'fetch_closed_orders': {'cost': 4, 'noSymbol': 16},
+    'fetch_orders': {'cost': 4, 'noSymbol': 16},
+    'fetch_balance': 4,
+    'load_markets': 4,
+}
+
+
+def lane_for_method(method: str) -> int:
+    """หา lane ของ method (method ที่ไม่รู้จักถือเป็นงานข้อมูลตลาด)"""
+    return METHOD_LANES.get(method, LANE_TICKER)
+
+
+def weight_for_call(method: str, args: Sequence = (), weights: Optional[Dict] = None) -> float:
+    """น้ำหนักของการเรียก method ด้วย args (weights จาก config ทับ DEFAULT_WEIGHTS)
+
+    ค่าเป็นตัวเลข หรือ {'cost': n, 'noSymbol': m} แบบ api ของ ccxt ซึ่งใช้ noSymbol เมื่อ argument แรก (symbol) เป็น None
+    """
+    weight: Union[float, Dict] = (weights or {}).get(method, DEFAULT_WEIGHTS.get(method, 1))
+    if isinstance(weight, dict):
+        symbol = args[0] if args else None
+        if symbol is None and 'noSymbol' in weight:
+            return float(weight['noSymbol'])
+        return float(weight.get('cost', 1))
+    return float(weight)
+
+
+@dataclass
+class LaneStats:
+    """สถิติของแต่ละ lane"""
+    queued: int = 0          # จำนวน request ที่กำลังรอ
+    completed: int = 0       # จำนวน request ที่ได้คิวแล้ว
+    total_wait: float = 0.0  # เวลารอรวม (วินาที)
+    max_wait: float = 0.0    # เวลารอนานที่สุด (วินาที)
+
+    @property
+    def avg_wait(self) -> float:
+        return self.total_wait / self.completed if self.completed else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'queued': self.queued,
+            'completed': self.completed,
+            'avg_wait_ms': round(self.avg_wait * 1000, 2),
+            'max_wait_ms': round(self.max_wait * 1000, 2),
+        }
+
+
+class RateLimitScheduler:
+    """จัดคิว request ของ exchange หนึ่งๆ ตาม rateLimit ของ ccxt
+
+    rate_limit_ms คือระยะห่างขั้นต่ำระหว่าง request (เหมือน exchange.rateLimit)
+    ถ้าเป็น None จะไม่จำกัดอัตรา แต่ยังเก็บสถิติและลำดับความสำคัญ
+    capacity คือ burst ของ request ปกติ request ที่หนักกว่านั้นรอจนสะสม token ครบน้ำหนักของตัวเอง
+    """
+
+    def __init__(self, rate_limit_ms: Optional[float] = 50, capacity: float = 1):
+        self.rate = 1000.0 / rate_limit_ms if rate_limit_ms else None  # tokens ต่อวินาที
+        self.capacity = max(float(capacity), 1.0)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._queue = []
+        self._seq = itertools.count()
+        self._timer = None
+        self._loop = None  # event loop ที่คิวและ timer ผูกอยู่
+        self._lock = threading.Lock()  # acquire_sync ถูกเรียกจาก thread อื่นได้
+        self.stats = {lane: LaneStats() for lane in LANE_NAMES}
+
+    async def acquire(self, lane: int = LANE_OHLCV, weight: float = 1.0):
+        """รอจนกว่าจะได้ token สำหรับ request หนึ่งครั้ง"""
+        weight = float(weight)
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._bind(loop)
+        future = loop.create_future()
+        heapq.heappush(self._queue, (lane, next(self._seq), weight, future, time.monotonic()))
+        self.stats[lane].queued += 1
+        self._dispatch()
+        await future
+
+    def _bind(self, loop: asyncio.AbstractEventLoop):
+        """ผูกกับ event loop ใหม่ (เช่น manager ถูกใช้ซ้ำใน asyncio.run ครั้งถัดไป)
+
+        timer และ future ที่ค้างจาก loop เดิมจะไม่ถูกปลุกอีก ถ้าเก็บไว้ request ใหม่จะรอตลอดไป
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+        for lane, *_ in self._queue:
+            self.stats[lane].queued -= 1
+        self._queue = []
+        self._loop = loop
+
+    def acquire_sync(self, lane: int = LANE_OHLCV, weight: float = 1.0):
+        """สำหรับโค้ดแบบ sync: จอง token ทันที (ติดลบได้) แล้ว sleep จนกว่า token ที่จองจะเติมครบ
+
+        ไม่ผ่านคิวตามลำดับความสำคัญ แต่ request ในคิวจะรอจนหนี้ token นี้ถูกเติมคืน
+        """
+        weight = float(weight)
+        with self._lock:
+            self._refill(weight)
+            delay = 0.0
+            if self.rate is not None:
+                delay = max(weight - self.tokens, 0.0) / self.rate
+                self.tokens -= weight
+            stats = self.stats[lane]
+            stats.completed += 1
+            stats.total_wait += delay
+            stats.max_wait = max(stats.max_wait, delay)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _refill(self, weight: float = 0.0):
+        """เติม token ตามเวลาที่ผ่านไป (สะสมได้ถึง capacity หรือ weight ของ request ที่รออยู่ ถ้ามากกว่า)"""
+        now = time.monotonic()
+        limit = max(self.capacity, weight)
+        if self.rate is None:
+            self.tokens = limit
+        else:
+            self.tokens = min(limit, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _dispatch(self):
+        """ปล่อย request ที่สำคัญที่สุดเท่าที่ token มีพอ"""
+        with self._lock:
+            self._dispatch_locked()
+
+    def _dispatch_locked(self):
+        self._refill(self._queue[0][2] if self._queue else 0.0)
+
+        while self._queue:
+            lane, _, weight, future, enqueued_at = self._queue[0]
+
+            # request ที่ถูกยกเลิกระหว่างรอไม่ต้องใช้ token
+            if future.done():
+                heapq.heappop(self._queue)
+                self.stats[lane].queued -= 1
+                continue
+
+            if self.rate is not None and self.tokens < weight:
+                break
+
+            heapq.heappop(self._queue)
+            if self.rate is not None:
+                self.tokens -= weight
+
+            waited = time.monotonic() - enqueued_at
+            stats = self.stats[lane]
+            stats.queued -= 1
+            stats.completed += 1
+            stats.total_wait += waited
+            stats.max_wait = max(stats.max_wait, waited)
+            future.set_result(None)
+
+        if self._queue and self._timer is None:
+            deficit = self._queue[0][2] - self.tokens
+            delay = max(deficit / self.rate, 0.001)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def queue_depth(self) -> Dict[str, int]:
+        """จำนวน request ที่รออยู่ในแต่ละ lane"""
+        return {LANE_NAMES[lane]: stats.queued for lane, stats in self.stats.items()}
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """สถิติของทุก lane"""
+        return {LANE_NAMES[lane]: stats.to_dict() for lane, stats in self.stats.items()}
@@ -0,0 +1,135 @@
+"""
+Candle Resampling
+สร้างแท่งเทียน timeframe ที่ใหญ่กว่าจากแท่งฐาน (เช่น 4h และ 1d จาก 1h) ในหน่วยความจำ
+จัดแนวช่วงเวลาแบบเดียวกับ exchange: นับจาก epoch UTC, สัปดาห์เริ่มวันจันทร์ และเดือนตามปฏิทิน
+"""
+
+from typing import Dict, List
+
+import ccxt
+import numpy as np
+import pandas as pd
+
+from .candle_cache import COLUMNS, to_dataframe
+
+DAY_MS = 86_400_000
+WEEK_MS = 7 * DAY_MS
+MONDAY_OFFSET_MS = 4 * DAY_MS  # 1970-01-01 เป็นวันพฤหัส วันจันทร์แรกคือ 1970-01-05
+
+
+def timeframe_ms(timeframe: str) -> int:
+    return ccxt.Exchange.parse_timeframe(timeframe) * 1000
+
+
+def can_resample(base: str, target: str) -> bool:
+    """สร้าง target จาก base ได้พอดีหรือไม่ (ทุกแท่ง target ประกอบด้วยแท่ง base เต็มจำนวน)"""
+    try:
+        base_ms, target_ms = timeframe_ms(base), timeframe_ms(target)
+    except Exception:
+        return False
+    if target_ms <= base_ms:
+        return False
+    if target.endswith('M') or target.endswith('w'):
+        # สัปดาห์/เดือนเริ่มที่ต้นวัน แท่งฐานจึงต้องแบ่งวันได้ลงตัว
+        return DAY_MS % base_ms == 0
+    if target.endswith('y'):
+        return False
+    return target_ms % base_ms == 0
+
+
+def bars_needed(base: str, target: str, limit: int) -> int:
+    """จำนวนแท่ง base ที่ต้องใช้เพื่อให้ได้ target ครบ limit แท่ง (เผื่อแท่งแรกที่ไม่ครบ)"""
+    base_ms = timeframe_ms(base)
+    if target.endswith('M'):
+        ratio = -(-31 * DAY_MS * int(target[:-1]) // base_ms)
+    else:
+        ratio = timeframe_ms(target) // base_ms
+    return limit * ratio + ratio - 1
+
+
+def bucket_starts(timestamps: np.ndarray, timeframe: str, offset_ms: int = 0) -> np.ndarray:
+    """เวลาเริ่มของแท่ง timeframe ที่แต่ละ timestamp (มิลลิวินาที) ตกอยู่
+
+    offset_ms: เลื่อนจุดเริ่ม session (เช่น 8 ชั่วโมงสำหรับแท่งรายวันตามเวลา UTC+8)
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64) - offset_ms
+    if timeframe.endswith('M'):
+        months = timestamps.astype('datetime64[ms]').astype('datetime64[M]').astype(np.int64)
+        step = int(timeframe[:-1])
+        months = months // step * step
+        starts = months.astype('datetime64[M]').astype('datetime64[ms]').astype(np.int64)
+    elif timeframe.endswith('w'):
+        size = WEEK_MS * int(timeframe[:-1])
+        starts = (timestamps - MONDAY_OFFSET_MS) // size * size + MONDAY_OFFSET_MS
+    else:
+        size = timeframe_ms(timeframe)
+        starts = timestamps // size * size
+    return starts + offset_ms
+
+
+def resample_ohlcv(candles: np.ndarray, timeframe: str, offset_ms: int = 0,
+                   drop_partial_first: bool = True) -> np.ndarray:
+    """รวมแท่งฐาน (เรียงตามเวลา คอลัมน์ตาม COLUMNS) เป็นแท่ง timeframe
+
+    open = open แรก, high = สูงสุด, low = ต่ำสุด, close = close สุดท้าย, volume = ผลรวม
+    แท่งสุดท้ายอาจยังไม่ปิด (เหมือนที่ exchange ส่งมา) ส่วนแท่งแรกที่ข้อมูลเริ่มกลางช่วงจะถูกตัดทิ้ง
+    """
+    candles = np.asarray(candles, dtype=np.float64)
+    if not len(candles):
+        return np.empty((0, len(COLUMNS)), dtype=np.float64)
+
+    starts = bucket_starts(candles[:, 0], timeframe, offset_ms)
+    first_rows = np.flatnonzero(np.diff(starts)) + 1
+    first_rows = np.concatenate(([0], first_rows))
+    last_rows = np.concatenate((first_rows[1:], [len(candles)])) - 1
+
+    result = np.empty((len(first_rows), len(COLUMNS)), dtype=np.float64)
+    result[:, 0] = starts[first_rows]
+    result[:, 1] = candles[first_rows, 1]
+    result[:, 2] = np.fmax.reduceat(candles[:, 2], first_rows)
+    result[:, 3] = np.fmin.reduceat(candles[:, 3], first_rows)
+    result[:, 4] = candles[last_rows, 4]
+    result[:, 5] = np.add.reduceat(np.nan_to_num(candles[:, 5]), first_rows)
+
+    if drop_partial_first and candles[0, 0] != result[0, 0]:
+        result = result[1:]
+    return result
+
+
+def resample_dataframe(df: pd.DataFrame, timeframe: str, offset_ms: int = 0) -> pd.DataFrame:
+    """resample_ohlcv สำหรับ DataFrame ที่ index เป็นเวลา (รูปแบบเดียวกับ CandleCache.get_dataframe)"""
+    candles = np.empty((len(df), len(COLUMNS)), dtype=np.float64)
+    candles[:, 0] = df.index.values.astype('datetime64[ms]').astype(np.int64)
+    candles[:, 1:] = df[COLUMNS[1:]].to_numpy(dtype=np.float64)
+    return to_dataframe(resample_ohlcv(candles, timeframe, offset_ms))
+
+
+def plan_timeframes(timeframes: List[str], limit: int, max_bars: int) -> Dict[str, List[str]]:
+    """เลือก timeframe ฐานที่ต้องดึงจริง: {base: [timeframe ที่สร้างจาก base]}
+
+    timeframe ที่เล็กที่สุดเป็นฐาน ส่วน timeframe อื่นสร้างจากฐานถ้าใช้แท่งไม่เกิน max_bars
+    มิฉะนั้นจะถูกดึงแยก
+    """
+    plan = {}
+    for timeframe in sorted(set(timeframes), key=_sort_key):
+        base = next((
+            base for base in plan
+            if can_resample(base, timeframe) and bars_needed(base, timeframe, limit) <= max_bars
+        ), None)
+        if base is None:
+            plan[timeframe] = []
+        else:
+            plan[base].append(timeframe)
+    return plan
+
+
+def required_bars(base: str, derived: List[str], limit: int) -> int:
+    """จำนวนแท่งฐานที่ต้องดึงเพื่อครอบคลุมทุก timeframe ใน derived"""
+    return max([limit] + [bars_needed(base, timeframe, limit) for timeframe in derived])
+
+
+def _sort_key(timeframe: str) -> float:
+    try:
+        return timeframe_ms(timeframe)
+    except Exception:
+        return float('inf')
@@ -0,0 +1,221 @@
+"""
+Scan Executor
+รันงานสแกนจำนวนมากโดยจำกัดจำนวนที่ทำพร้อมกันทั้งหมดและต่อ exchange พร้อม timeout ต่องาน
+และเก็บความคืบหน้า (เสร็จ/ทั้งหมด, ETA, ล้มเหลว) กับ throughput ระหว่างรัน
+
+งานของแต่ละ exchange รอในคิวของตัวเอง และเริ่มเฉพาะเมื่อ exchange นั้นยังมีช่องว่าง
+exchange ที่ช้าจึงไม่กินช่องรวมจน exchange อื่นไม่ได้ทำงาน และไม่มี coroutine ค้างรอเป็นพัน
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+# งานหนึ่งงาน: (exchange, ชื่องาน, ฟังก์ชันที่สร้าง coroutine เมื่อถึงคิว)
+ScanJob = Tuple[str, Any, Callable[[], Awaitable]]
+
+
+@dataclass
+class ExchangeProgress:
+    """ความคืบหน้าของ exchange หนึ่ง"""
+    total: int = 0
+    done: int = 0         # งานที่จบแล้ว (รวมที่ล้มเหลว)
+    failed: int = 0       # error หรือหมดเวลา
+    timed_out: int = 0
+    in_flight: int = 0
+    peak: int = 0         # จำนวนงานพร้อมกันสูงสุดที่เกิดขึ้นจริง
+    busy_time: float = 0.0  # เวลารวมของงานที่จบแล้ว (วินาที)
+
+    @property
+    def avg_latency(self) -> float:
+        return self.busy_time / self.done if self.done else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'total': self.total,
+            'done': self.done,
+            'failed': self.failed,
+            'timed_out': self.timed_out,
+            'in_flight': self.in_flight,
+            'peak': self.peak,
+            'avg_latency_ms': round(self.avg_latency * 1000, 2),
+        }
+
+
+@dataclass
+class ScanProgress:
+    """ความคืบหน้าของการรันหนึ่งรอบ"""
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+    exchanges: Dict[str, ExchangeProgress] = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return sum(progress.total for progress in self.exchanges.values())
+
+    @property
+    def done(self) -> int:
+        return sum(progress.done for progress in self.exchanges.values())
+
+    @property
+    def failed(self) -> int:
+        return sum(progress.failed for progress in self.exchanges.values())
+
+    @property
+    def timed_out(self) -> int:
+        return sum(progress.timed_out for progress in self.exchanges.values())
+
+    @property
+    def in_flight(self) -> int:
+        return sum(progress.in_flight for progress in self.exchanges.values())
+
+    def remaining(self, exchange_name: Optional[str] = None) -> int:
+        """จำนวนงานที่ยังไม่จบ (ทั้งหมด หรือของ exchange เดียว)"""
+        if exchange_name is None:
+            return self.total - self.done
+        progress = self.exchanges.get(exchange_name)
+        return progress.total - progress.done if progress else 0
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def throughput(self) -> float:
+        """งานที่จบต่อวินาที"""
+        elapsed = self.elapsed
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """วินาทีที่คาดว่าจะเหลือ (None ถ้ายังไม่มีงานจบให้ประมาณ)"""
+        remaining = self.remaining()
+        if not remaining:
+            return 0.0
+        throughput = self.throughput
+        return remaining / throughput if throughput > 0 else None
+
+    def to_dict(self) -> Dict:
+        eta = self.eta
+        return {
+            'total': self.total,
+            'done': self.done,
+            'failed': self.failed,
+            'timed_out': self.timed_out,
+            'in_flight': self.in_flight,
+            'elapsed': round(self.elapsed, 3),
+            'throughput': round(self.throughput, 2),
+            'eta': round(eta, 1) if eta is not None else None,
+            'exchanges': {name: progress.to_dict() for name, progress in self.exchanges.items()},
+        }
+
+
+class ScanExecutor:
+    """รันงานภายใต้ขีดจำกัดรวม (max_concurrent) และต่อ exchange (per_exchange) พร้อม timeout ต่องาน
+
+    exchange_limits กำหนดขีดจำกัดเฉพาะบาง exchange ทับ per_exchange ได้
+    timeout เป็น None หรือ 0 คือไม่จำกัดเวลา
+    progress_interval: log ความคืบหน้าทุกกี่วินาทีระหว่างรัน (None หรือ 0 คือไม่ log)
+    """
+
+    def __init__(self, max_concurrent: int = 50, per_exchange: int = 10, timeout: Optional[float] = 30.0,
+                 exchange_limits: Optional[Dict[str, int]] = None, progress_interval: Optional[float] = None,
+                 logger: Optional[logging.Logger] = None):
+        self.max_concurrent = max(int(max_concurrent), 1)
+        self.per_exchange = max(int(per_exchange), 1)
+        self.timeout = timeout or None
+        self.exchange_limits = dict(exchange_limits or {})
+        self.progress_interval = progress_interval or None
+        self.logger = logger or logging.getLogger('ScanExecutor')
+        self.progress = ScanProgress()
+
+    def limit_for(self, exchange_name: str) -> int:
+        return max(int(self.exchange_limits.get(exchange_name, self.per_exchange)), 1)
+
+    async def run(self, jobs: Iterable[ScanJob]) -> AsyncIterator[Tuple[Any, Any]]:
+        """yield (ชื่องาน, ผลลัพธ์) ทันทีที่แต่ละงานเสร็จ งานที่ error หรือหมดเวลาถูกนับและข้ามไป
+
+        ถ้าผู้เรียกหยุดอ่านก่อนจบ งานที่ยังค้างจะถูกยกเลิก
+        """
+        queues: Dict[str, deque] = {}
+        progress = self.progress = ScanProgress()
+        for exchange_name, name, factory in jobs:
+            queues.setdefault(exchange_name, deque()).append((name, factory))
+            progress.exchanges.setdefault(exchange_name, ExchangeProgress()).total += 1
+
+        running: Dict[asyncio.Future, Tuple[str, Any, float]] = {}
+        logged = progress.started
+        try:
+            while True:
+                self._launch(queues, running)
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    exchange_name, name, started = running.pop(task)
+                    stats = progress.exchanges[exchange_name]
+                    stats.in_flight -= 1
+                    stats.done += 1
+                    stats.busy_time += time.monotonic() - started
+
+                    error = task.exception()
+                    if isinstance(error, asyncio.TimeoutError):
+                        stats.failed += 1
+                        stats.timed_out += 1
+                        self.logger.debug(f"⏱️ {name} ใน {exchange_name} ใช้เวลาเกิน {self.timeout} วินาที")
+                    elif error is not None:
+                        stats.failed += 1
+                        self.logger.debug(f"ไม่สามารถสแกน {name} ใน {exchange_name}: {error}")
+                    else:
+                        yield name, task.result()
+
+                if self.progress_interval and time.monotonic() - logged >= self.progress_interval:
+                    logged = time.monotonic()
+                    self._log_progress()
+        finally:
+            progress.finished = time.monotonic()
+            for task in running:
+                task.cancel()
+            if running:
+                # รอให้งานที่ยกเลิกจบจริงก่อนคืนการควบคุม (ไม่มีงานค้างยิง request ต่อหลังปิด)
+                await asyncio.gather(*running, return_exceptions=True)
+
+    def _launch(self, queues: Dict[str, deque], running: Dict[asyncio.Future, Tuple[str, Any, float]]):
+        """เริ่มงานวนทีละ exchange จนกว่าช่องรวมเต็มหรือทุก exchange ที่มีงานรอเต็มขีดจำกัดของตัวเอง"""
+        progress = self.progress
+        launched = True
+        while launched and len(running) < self.max_concurrent:
+            launched = False
+            for exchange_name, queue in queues.items():
+                stats = progress.exchanges[exchange_name]
+                if not queue or stats.in_flight >= self.limit_for(exchange_name):
+                    continue
+                name, factory = queue.popleft()
+                task = asyncio.ensure_future(self._call(factory))
+                running[task] = (exchange_name, name, time.monotonic())
+                stats.in_flight += 1
+                stats.peak = max(stats.peak, stats.in_flight)
+                launched = True
+                if len(running) >= self.max_concurrent:
+                    return
+
+    def _log_progress(self):
+        progress = self.progress
+        eta = progress.eta
+        self.logger.info(
+            f"⏳ สแกนแล้ว {progress.done}/{progress.total} ({progress.throughput:.1f} งาน/วินาที"
+            f", ล้มเหลว {progress.failed}) เหลืออีกประมาณ {f'{eta:.0f}s' if eta is not None else '-'}"
+        )
+
+    async def _call(self, factory: Callable[[], Awaitable]):
+        if self.timeout is None:
+            return await factory()
+        return await asyncio.wait_for(factory(), self.timeout)
+
+    def get_stats(self) -> Dict:
+        """ความคืบหน้าและ throughput ของรอบล่าสุด (หรือรอบที่กำลังรัน)"""
+        return self.progress.to_dict()
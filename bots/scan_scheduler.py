@@ -0,0 +1,77 @@
+"""
+Scan Scheduler
+กำหนดเวลาสแกนต่อเนื่องตามเวลาปิดแท่งของแต่ละ timeframe แทนการรอเป็นช่วงคงที่
+ตื่นหลังแท่งปิด grace วินาที (ให้ exchange ปิดแท่งเรียบร้อย) และคืนเฉพาะ timeframe ที่เพิ่งปิด
+เช่น 1h ถูกสแกนทุกชั่วโมง ส่วน 1d ถูกสแกนวันละครั้งตอน 00:00 UTC พร้อม 1h และ 4h
+"""
+
+import asyncio
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .resample import DAY_MS, WEEK_MS, bucket_starts, timeframe_ms
+
+
+def next_close(timeframe: str, now_ms: int, offset_ms: int = 0) -> int:
+    """เวลาปิด (มิลลิวินาที) ของแท่งที่ now_ms อยู่ ตามการจัดแนวของ exchange (สัปดาห์เริ่มวันจันทร์ เดือนตามปฏิทิน)"""
+    start = int(bucket_starts(np.array([now_ms]), timeframe, offset_ms)[0])
+    if timeframe.endswith('M'):
+        # ยาวกว่าทุกช่วงเดือนแต่ไม่ถึงช่วงถัดไป แล้วปัดลงเป็นต้นเดือน
+        span = 31 * DAY_MS * int(timeframe[:-1])
+    elif timeframe.endswith('w'):
+        span = WEEK_MS * int(timeframe[:-1])
+    else:
+        span = timeframe_ms(timeframe)
+    return int(bucket_starts(np.array([start + span]), timeframe, offset_ms)[0])
+
+
+async def sleep_until(stop: asyncio.Event, seconds: float) -> bool:
+    """รอ seconds วินาทีหรือจนกว่า stop ถูก set (คืน True ถ้าถูกหยุดก่อนครบเวลา)"""
+    if stop.is_set():
+        return True
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=max(seconds, 0))
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+class CloseScheduler:
+    """หาเวลาปิดแท่งถัดไปของชุด timeframe
+
+    timeframe ที่ปิดพร้อมกันถูกรวมเป็นรอบเดียว offset_ms เลื่อนจุดเริ่มแท่ง (เหมือน resample)
+    จำเวลาที่สแกนครอบคลุมแล้ว ถ้าการสแกนนานจนเลยเวลาปิดถัดไป รอบถัดไปจะเริ่มทันที
+    โดยรวมทุก timeframe ที่ปิดระหว่างนั้นเป็นรอบเดียว (ไม่ข้ามแท่งและไม่สะสมงานค้าง)
+    """
+
+    def __init__(self, timeframes: Sequence[str], grace_seconds: float = 5.0, offset_ms: int = 0):
+        self.timeframes = list(timeframes)
+        self.grace_seconds = grace_seconds
+        self.offset_ms = offset_ms
+        self.covered_ms = None  # แท่งที่ปิดไม่เกินเวลานี้ถูกสแกนแล้ว
+
+    def reset(self, now: Optional[float] = None):
+        """บันทึกว่าได้สแกนทุก timeframe ณ now แล้ว (เรียกก่อนการสแกนเต็มรอบแรก)"""
+        now_ms = int((time.time() if now is None else now) * 1000)
+        self.covered_ms = now_ms - int(self.grace_seconds * 1000)
+
+    def advance(self, now: Optional[float] = None) -> Tuple[float, List[str]]:
+        """(เวลาตื่นเป็นวินาที epoch, timeframe ที่ต้องสแกนตอนนั้น) ของรอบถัดไป แล้วนับรอบนั้นว่าครอบคลุมแล้ว"""
+        if not self.timeframes:
+            raise ValueError("ไม่มี timeframe ให้กำหนดเวลา")
+        now_ms = int((time.time() if now is None else now) * 1000)
+        grace_ms = int(self.grace_seconds * 1000)
+        if self.covered_ms is None:
+            self.covered_ms = now_ms - grace_ms
+
+        closes = {timeframe: next_close(timeframe, self.covered_ms, self.offset_ms) for timeframe in self.timeframes}
+        overdue = [timeframe for timeframe in self.timeframes if closes[timeframe] + grace_ms <= now_ms]
+        if overdue:
+            self.covered_ms = now_ms - grace_ms
+            return now_ms / 1000, overdue
+
+        earliest = min(closes.values())
+        self.covered_ms = earliest
+        return (earliest + grace_ms) / 1000, [timeframe for timeframe in self.timeframes if closes[timeframe] == earliest]
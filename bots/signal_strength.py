@@ -0,0 +1,99 @@
+"""
+Signal Strength
+ความแรงสัญญาณ MACD (0-100): histogram และ momentum ของ MACD อย่างละ 0-50 เทียบกับค่าสูงสุดใน window แท่ง
+
+- signal_strength(): ทั้ง array ครั้งเดียว ใช้ rolling max แบบ van Herk/Gil-Werman (O(n) ไม่ขึ้นกับ window)
+- SignalStrength: ทีละแท่ง ใช้ RollingMax แบบ monotonic deque
+
+ผลลัพธ์ตรงกับสูตร pandas เดิม (rolling(window).max() และ fillna(0)) ทุกบิต
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+from .indicators import NAN, Lag, RollingMax, _is_nan
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """ค่าสูงสุดย้อนหลัง window แท่งตามแกนสุดท้าย (NaN ถ้าแท่งไม่ครบหรือมี NaN ในหน้าต่าง เหมือน rolling().max())
+
+    แบ่งเป็นบล็อกละ window แท่ง แล้วหา max สะสมจากซ้ายและจากขวาในแต่ละบล็อก
+    หน้าต่างที่จบที่ i = max(สะสมจากขวาที่ i - window + 1, สะสมจากซ้ายที่ i)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    length = values.shape[-1]
+    result = np.full(values.shape, np.nan)
+    if length < window:
+        return result
+
+    blocks = -(-length // window)
+    padded = np.full(values.shape[:-1] + (blocks * window,), -np.inf)
+    padded[..., :length] = values
+    padded = padded.reshape(values.shape[:-1] + (blocks, window))
+
+    prefix = np.maximum.accumulate(padded, axis=-1).reshape(values.shape[:-1] + (-1,))
+    suffix = np.maximum.accumulate(padded[..., ::-1], axis=-1)[..., ::-1].reshape(values.shape[:-1] + (-1,))
+    np.maximum(suffix[..., :length - window + 1], prefix[..., window - 1:length], out=result[..., window - 1:])
+    return result
+
+
+def _add_ratio(total: np.ndarray, values: np.ndarray, window: int):
+    """total += values / rolling max * 50 (NaN และ 0/0 นับเป็น 0)"""
+    ratio = rolling_max(values, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        np.divide(values, ratio, out=ratio)
+    ratio *= 50
+    ratio[np.isnan(ratio)] = 0.0
+    total += ratio
+
+
+def signal_strength(macd: np.ndarray, histogram: np.ndarray, window: int = 20) -> np.ndarray:
+    """ความแรงสัญญาณของทุกแท่ง (ตามแกนสุดท้าย รองรับ array หลายคู่แบบ symbols × time)"""
+    macd = np.asarray(macd, dtype=np.float64)
+    histogram = np.asarray(histogram, dtype=np.float64)
+
+    momentum = np.empty_like(macd)
+    momentum[..., :1] = np.nan
+    np.subtract(macd[..., 1:], macd[..., :-1], out=momentum[..., 1:])
+    np.abs(momentum, out=momentum)
+
+    total = np.zeros(macd.shape)
+    _add_ratio(total, np.abs(histogram), window)
+    _add_ratio(total, momentum, window)
+    return np.clip(total, 0, 100, out=total)
+
+
+def _ratio(value: float, maximum: float) -> float:
+    # NaN และ 0/0 นับเป็น 0 (เหมือน fillna(0))
+    if not maximum > 0 or _is_nan(value):
+        return 0.0
+    return value / maximum * 50
+
+
+class SignalStrength:
+    """ความแรงสัญญาณทีละแท่ง: update((macd, histogram)) เพิ่มแท่งใหม่, amend(...) แก้แท่งล่าสุด"""
+
+    def __init__(self, window: int = 20):
+        self.previous_macd = Lag()
+        self.histogram_max = RollingMax(window)
+        self.momentum_max = RollingMax(window)
+        self.value = NAN
+
+    def update(self, bar: Tuple[float, float]) -> float:
+        macd, histogram = bar
+        return self._strength(macd, histogram, self.previous_macd.update(macd),
+                              self.histogram_max.update, self.momentum_max.update)
+
+    def amend(self, bar: Tuple[float, float]) -> float:
+        macd, histogram = bar
+        return self._strength(macd, histogram, self.previous_macd.amend(macd),
+                              self.histogram_max.amend, self.momentum_max.amend)
+
+    def _strength(self, macd: float, histogram: float, previous: float, feed_histogram, feed_momentum) -> float:
+        histogram_abs = abs(histogram)
+        momentum_abs = abs(macd - previous)
+        strength = (_ratio(histogram_abs, feed_histogram(histogram_abs))
+                    + _ratio(momentum_abs, feed_momentum(momentum_abs)))
+        self.value = min(max(strength, 0.0), 100.0)
+        return self.value
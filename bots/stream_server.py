@@ -0,0 +1,141 @@
+"""
+Market Stream Server
+WebSocket server จำลองสำหรับทดสอบ MarketStream แบบ offline (ใช้โปรโตคอลของ NormalizedAdapter)
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, List, Optional
+
+from aiohttp import web, WSMsgType
+
+
+class MarketStreamServer:
+    """server จำลองที่ส่งข้อมูลตลาดไปยัง client ที่ subscribe ไว้"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.logger = logging.getLogger('MarketStreamServer')
+        self.clients = {}  # {websocket: set((channel, symbol))}
+        self.book_seq = {}
+        self._runner = None
+        self._simulation = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/ws"
+
+    async def start(self) -> str:
+        """เริ่ม server (port = 0 จะสุ่ม port ว่างให้) และคืน URL"""
+        app = web.Application()
+        app.router.add_get('/ws', self._handle_client)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        self.logger.info(f"🛰️ Market stream server พร้อมใช้งานที่ {self.url}")
+        return self.url
+
+    async def stop(self):
+        """หยุด server และตัดการเชื่อมต่อทั้งหมด"""
+        if self._simulation is not None:
+            self._simulation.cancel()
+            self._simulation = None
+        await self.drop_connections()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_client(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.clients[ws] = set()
+
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    data = msg.json()
+                except ValueError:
+                    continue
+                if data.get('op') == 'subscribe':
+                    self.clients[ws].add((data['channel'], data['symbol']))
+                    await ws.send_json({'event': 'subscribed', 'channel': data['channel'], 'symbol': data['symbol']})
+        finally:
+            self.clients.pop(ws, None)
+
+        return ws
+
+    def subscribers(self, channel: str, symbol: str) -> int:
+        """จำนวน client ที่ subscribe channel/symbol นี้"""
+        return sum(1 for subs in self.clients.values() if (channel, symbol) in subs)
+
+    async def wait_for_subscribers(self, channel: str, symbol: str, count: int = 1, timeout: float = 5):
+        """รอจนกว่าจะมี client subscribe ครบตามจำนวน"""
+        deadline = time.monotonic() + timeout
+        while self.subscribers(channel, symbol) < count:
+            if time.monotonic() > deadline:
+                raise asyncio.TimeoutError(f"ไม่มี client subscribe {channel} {symbol}")
+            await asyncio.sleep(0.01)
+
+    async def publish(self, channel: str, symbol: str, data) -> int:
+        """ส่งข้อมูลไปยัง client ที่ subscribe ไว้ (คืนจำนวน client ที่ได้รับ)"""
+        message = {'channel': channel, 'symbol': symbol, 'data': data}
+        sent = 0
+        for ws, subs in list(self.clients.items()):
+            if (channel, symbol) in subs and not ws.closed:
+                await ws.send_json(message)
+                sent += 1
+        return sent
+
+    async def publish_ticker(self, symbol: str, last: float, spread: float = 0.0002) -> int:
+        half = last * spread / 2
+        return await self.publish('ticker', symbol, {
+            'bid': last - half, 'ask': last + half, 'last': last, 'timestamp': int(time.time() * 1000)
+        })
+
+    async def publish_book(self, symbol: str, bids: List, asks: List, snapshot: bool = False,
+                           seq: Optional[int] = None) -> int:
+        """ส่ง book snapshot หรือ diff (seq เพิ่มขึ้นทีละ 1 อัตโนมัติถ้าไม่ระบุ)"""
+        if seq is None:
+            seq = self.book_seq.get(symbol, 0) + 1
+        self.book_seq[symbol] = seq
+        return await self.publish('book', symbol, {
+            'type': 'snapshot' if snapshot else 'update', 'bids': bids, 'asks': asks, 'seq': seq
+        })
+
+    async def drop_connections(self):
+        """ตัดการเชื่อมต่อ client ทั้งหมด (ใช้ทดสอบการ reconnect)"""
+        for ws in list(self.clients):
+            await ws.close()
+        self.clients.clear()
+
+    def start_simulation(self, prices: Dict[str, float], interval: float = 0.5, volatility: float = 0.001):
+        """ส่ง ticker, trades และ book แบบ random walk เป็นระยะ (ใช้รันบอทแบบ offline)"""
+        async def simulate():
+            current = dict(prices)
+            while True:
+                for symbol, price in current.items():
+                    price *= 1 + random.gauss(0, volatility)
+                    current[symbol] = price
+                    step = price * 0.0001
+                    await self.publish_ticker(symbol, price)
+                    await self.publish('trades', symbol, [{
+                        'price': price, 'amount': round(random.uniform(0.01, 1), 4),
+                        'side': random.choice(['buy', 'sell']), 'timestamp': int(time.time() * 1000)
+                    }])
+                    await self.publish_book(
+                        symbol,
+                        [[price - step * (i + 1), round(random.uniform(0.1, 5), 4)] for i in range(10)],
+                        [[price + step * (i + 1), round(random.uniform(0.1, 5), 4)] for i in range(10)],
+                        snapshot=True
+                    )
+                await asyncio.sleep(interval)
+
+        self._simulation = asyncio.create_task(simulate())
+        return self._simulation
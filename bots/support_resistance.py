@@ -0,0 +1,219 @@
+"""
+Support / Resistance
+หา swing high/low (pivot) หลายขนาดหน้าต่างพร้อมกัน แล้วรวม level ที่ใกล้กันเป็นโซนพร้อมจำนวนครั้งที่ราคาแตะ
+
+- find_pivots(): ทั้ง array ครั้งเดียว (vectorized, rolling max แบบ O(n) ต่อขนาดหน้าต่าง)
+- SupportResistanceIndex: เก็บ pivot ต่อ series และอัปเดตทีละแท่งโดยไม่ต้องสแกนประวัติใหม่
+
+pivot ขนาด k คือแท่งที่ high (หรือ low) สูงสุด (ต่ำสุด) ในหน้าต่าง k แท่งก่อนและหลัง
+จึงยืนยันได้เมื่อมีแท่งถัดไปครบ k แท่ง scale ของ pivot คือ k ที่ใหญ่ที่สุดที่ยืนยันแล้ว
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .signal_strength import rolling_max
+
+DEFAULT_WINDOWS = (2, 5, 10)
+
+
+@dataclass
+class Zone:
+    """โซนราคาที่รวม pivot ใกล้กัน"""
+    level: float      # ค่าเฉลี่ยของ pivot ในโซน
+    low: float
+    high: float
+    touches: int      # จำนวน pivot (ครั้งที่ราคากลับตัวที่โซนนี้)
+    scale: int        # ขนาดหน้าต่างที่ใหญ่ที่สุดของ pivot ในโซน
+    last_index: int   # ตำแหน่งแท่งของ pivot ล่าสุด
+
+    def to_dict(self) -> Dict:
+        return {
+            "level": self.level, "low": self.low, "high": self.high,
+            "touches": self.touches, "scale": self.scale, "last_index": self.last_index,
+        }
+
+
+def _pivot_scales(values: np.ndarray, windows: Sequence[int]) -> np.ndarray:
+    """scale ของแต่ละแท่งที่เป็นค่าสูงสุดในหน้าต่างกึ่งกลาง (0 ถ้าไม่ใช่ pivot)"""
+    scales = np.zeros(len(values), dtype=np.int64)
+    for k in sorted(windows):
+        if len(values) < 2 * k + 1:
+            break
+        # rolling max ที่จบที่ i + k คือหน้าต่างกึ่งกลางของแท่ง i
+        centered = rolling_max(values, 2 * k + 1)[2 * k:]
+        scales[k:len(values) - k][values[k:len(values) - k] == centered] = k
+    return scales
+
+
+def find_pivots(high: np.ndarray, low: np.ndarray,
+                windows: Sequence[int] = DEFAULT_WINDOWS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """pivot ทุกขนาดหน้าต่างในครั้งเดียว: คืน (index, price, scale) เรียงตาม index
+
+    swing high ใช้ราคา high, swing low ใช้ราคา low (แท่งที่เป็นทั้งสองแบบได้สอง pivot)
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    high_scales = _pivot_scales(high, windows)
+    low_scales = _pivot_scales(-low, windows)
+
+    high_index = np.flatnonzero(high_scales)
+    low_index = np.flatnonzero(low_scales)
+    index = np.concatenate((high_index, low_index))
+    price = np.concatenate((high[high_index], low[low_index]))
+    scale = np.concatenate((high_scales[high_index], low_scales[low_index]))
+
+    order = np.argsort(index, kind='stable')
+    return index[order], price[order], scale[order]
+
+
+def cluster_levels(index: np.ndarray, price: np.ndarray, scale: np.ndarray,
+                   tolerance: float = 0.005) -> List[Zone]:
+    """รวม pivot เป็นโซนเรียงตามราคา: แต่ละโซนกว้างไม่เกิน tolerance (สัดส่วนของราคา) จาก pivot ต่ำสุดของโซน"""
+    if not len(price):
+        return []
+    order = np.argsort(price, kind='stable')
+    price, index, scale = price[order], index[order], scale[order]
+
+    # กระโดดทีละโซน (วนเท่าจำนวนโซน ไม่ใช่จำนวน pivot)
+    starts, start = [], 0
+    while start < len(price):
+        starts.append(start)
+        start = int(np.searchsorted(price, price[start] * (1 + tolerance), side='right'))
+    starts = np.array(starts)
+    touches = np.diff(np.append(starts, len(price)))
+    levels = np.add.reduceat(price, starts) / touches
+    lows = price[starts]
+    highs = price[np.append(starts[1:], len(price)) - 1]
+    scales = np.maximum.reduceat(scale, starts)
+    last = np.maximum.reduceat(index, starts)
+
+    return [
+        Zone(float(level), float(zone_low), float(zone_high), int(count), int(zone_scale), int(last_index))
+        for level, zone_low, zone_high, count, zone_scale, last_index
+        in zip(levels, lows, highs, touches, scales, last)
+    ]
+
+
+def nearest_levels(zones: List[Zone], current_price: float, max_distance: float = 0.1,
+                   count: int = 3) -> Dict[str, List[float]]:
+    """level ของโซนเหนือ (resistance) และใต้ (support) ราคาปัจจุบันภายใน max_distance เรียงจากใกล้ไปไกล"""
+    resistance = [zone.level for zone in zones
+                  if current_price < zone.level < current_price * (1 + max_distance)]
+    support = [zone.level for zone in zones
+               if current_price * (1 - max_distance) < zone.level < current_price]
+    return {
+        "resistance": sorted(resistance)[:count],
+        "support": sorted(support, reverse=True)[:count],
+    }
+
+
+class SupportResistanceIndex:
+    """pivot ของหนึ่ง series ที่อัปเดตทีละแท่ง
+
+    update(high, low) เพิ่มแท่งใหม่: ตรวจเฉพาะแท่งที่เพิ่งมีแท่งถัดไปครบ k แท่งในแต่ละขนาดหน้าต่าง
+    amend(high, low) แก้แท่งล่าสุด (แท่งที่ยังไม่ปิด) โดยย้อน pivot ที่แท่งนั้นยืนยันไป
+    pivot ที่เก่ากว่า history แท่งจะถูกลบ
+    """
+
+    def __init__(self, windows: Sequence[int] = DEFAULT_WINDOWS, tolerance: float = 0.005, history: int = 500):
+        self.windows = tuple(sorted(windows))
+        self.tolerance = tolerance
+        self.history = history
+        self.reset()
+
+    def reset(self):
+        size = 2 * self.windows[-1] + 1
+        self.highs = deque(maxlen=size)
+        self.lows = deque(maxlen=size)
+        self.count = 0
+        self.pivots: Dict[Tuple[int, bool], Tuple[float, int]] = {}  # (index, is_high) -> (price, scale)
+        self.order = deque()  # key ตามลำดับที่ยืนยัน ใช้ลบ pivot ที่เก่าเกิน
+        self._changes = []    # (key, scale เดิม หรือ None) ของแท่งล่าสุด ใช้ย้อนตอน amend
+        self.last_timestamp = None
+
+    def update(self, high: float, low: float):
+        self.highs.append(high)
+        self.lows.append(low)
+        self.count += 1
+        self._confirm()
+
+    def amend(self, high: float, low: float):
+        if not self.count:
+            return self.update(high, low)
+        for key, previous in reversed(self._changes):
+            if previous is None:
+                del self.pivots[key]
+                self.order.pop()
+            else:
+                self.pivots[key] = (self.pivots[key][0], previous)
+        self.highs[-1] = high
+        self.lows[-1] = low
+        self._confirm()
+
+    def _confirm(self):
+        self._changes = []
+        last = self.count - 1
+        highs, lows = list(self.highs), list(self.lows)
+        for k in self.windows:
+            if self.count < 2 * k + 1:
+                break
+            window_highs, window_lows = highs[-2 * k - 1:], lows[-2 * k - 1:]
+            # หน้าต่างที่มี NaN ไม่นับเป็น pivot (เหมือน rolling max)
+            if window_highs[k] == max(window_highs) and not any(value != value for value in window_highs):
+                self._add((last - k, True), window_highs[k], k)
+            if window_lows[k] == min(window_lows) and not any(value != value for value in window_lows):
+                self._add((last - k, False), window_lows[k], k)
+
+        expired = last - self.history
+        while self.order and self.order[0][0] <= expired:
+            self.pivots.pop(self.order.popleft(), None)
+
+    def _add(self, key: Tuple[int, bool], price: float, scale: int):
+        existing = self.pivots.get(key)
+        if existing is None:
+            self.order.append(key)
+            self._changes.append((key, None))
+        else:
+            self._changes.append((key, existing[1]))
+        self.pivots[key] = (price, scale)
+
+    def zones(self) -> List[Zone]:
+        """โซนจาก pivot ที่ยืนยันแล้ว (index นับจากแท่งแรกที่ป้อน)"""
+        if not self.pivots:
+            return []
+        keys = list(self.pivots)
+        values = [self.pivots[key] for key in keys]
+        return cluster_levels(
+            np.array([key[0] for key in keys], dtype=np.int64),
+            np.array([value[0] for value in values], dtype=np.float64),
+            np.array([value[1] for value in values], dtype=np.int64),
+            self.tolerance
+        )
+
+    def sync(self, df: pd.DataFrame) -> List[Zone]:
+        """ป้อนเฉพาะแท่งของ df ที่ใหม่กว่าแท่งล่าสุดที่เคยป้อน (แท่งล่าสุดเดิมถูก amend) แล้วคืนโซน"""
+        timestamps = df.index.to_numpy()
+        highs = df['high'].to_numpy(dtype=np.float64)
+        lows = df['low'].to_numpy(dtype=np.float64)
+
+        start = None
+        if self.last_timestamp is not None and len(timestamps):
+            position = int(np.searchsorted(timestamps, self.last_timestamp))
+            if position < len(timestamps) and timestamps[position] == self.last_timestamp:
+                self.amend(highs[position], lows[position])
+                start = position + 1
+        if start is None:
+            # ข้อมูลไม่ต่อเนื่องกับที่เคยป้อน เริ่มใหม่จาก df
+            self.reset()
+            start = max(len(df) - self.history, 0)
+
+        for position in range(start, len(df)):
+            self.update(highs[position], lows[position])
+        if len(timestamps):
+            self.last_timestamp = timestamps[-1]
+        return self.zones()
@@ -0,0 +1,77 @@
+"""
+Ticker Hub
+ดึง ticker ของทุกคู่เทรดในหนึ่ง request ต่อ exchange แล้วเก็บ snapshot ไว้ในหน่วยความจำ
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+
+class TickerHub:
+    """รวบรวม ticker ต่อ exchange ด้วย fetch_tickers (หรือดึงทีละคู่พร้อมกันถ้าไม่รองรับ)"""
+
+    def __init__(self, exchange_manager):
+        self.exchange_manager = exchange_manager
+        self.logger = exchange_manager.logger
+        self.snapshots = {}  # {exchange_name: {'tickers': {symbol: ticker}, 'updated_at': float}}
+
+    def supports_bulk(self, exchange_name: str) -> bool:
+        """ตรวจสอบว่า exchange รองรับ fetch_tickers"""
+        return self.exchange_manager.has_capability(exchange_name, 'fetchTickers')
+
+    async def refresh(self, exchange_name: str, symbols: List[str]) -> Dict[str, Dict]:
+        """ดึง ticker ของทุก symbol แล้วเผยแพร่ snapshot ใหม่"""
+        tickers = {}
+
+        if symbols and self.supports_bulk(exchange_name):
+            try:
+                result = await self.exchange_manager._call(exchange_name, 'fetch_tickers', symbols)
+                tickers = {symbol: result[symbol] for symbol in symbols if symbol in (result or {})}
+            except Exception as e:
+                self.logger.warning(f"⚠️ fetch_tickers ของ {exchange_name} ล้มเหลว ดึงทีละคู่แทน: {e}")
+
+        # exchange ที่ไม่รองรับ (รวม DEX) หรือคู่ที่ไม่มีในผลลัพธ์ ดึงทีละคู่พร้อมกัน
+        missing = [symbol for symbol in symbols if symbol not in tickers]
+        if missing:
+            results = await asyncio.gather(*[
+                self.exchange_manager.fetch_ticker(exchange_name, symbol) for symbol in missing
+            ])
+            tickers.update({symbol: ticker for symbol, ticker in zip(missing, results) if ticker})
+
+        # แทนที่ทั้ง dict เพื่อให้ผู้อ่านเห็น snapshot ที่สอดคล้องกันเสมอ
+        self.snapshots[exchange_name] = {'tickers': tickers, 'updated_at': time.time()}
+        return tickers
+
+    async def refresh_all(self, exchange_name: str) -> Dict[str, Dict]:
+        """ดึง ticker ของทุกคู่ใน exchange ด้วย fetch_tickers ครั้งเดียว (คืน {} ถ้าไม่รองรับหรือล้มเหลว)"""
+        if not self.supports_bulk(exchange_name):
+            return {}
+        try:
+            tickers = await self.exchange_manager._call(exchange_name, 'fetch_tickers') or {}
+        except Exception as e:
+            self.logger.warning(f"⚠️ fetch_tickers ของ {exchange_name} ล้มเหลว: {e}")
+            return {}
+
+        self.snapshots[exchange_name] = {'tickers': tickers, 'updated_at': time.time()}
+        return tickers
+
+    def get(self, exchange_name: str, symbol: str, max_age: Optional[float] = None) -> Optional[Dict]:
+        """อ่าน ticker ล่าสุด จาก stream ก่อน แล้วจึงจาก snapshot (คืน None ถ้าไม่มีหรือเก่ากว่า max_age วินาที)"""
+        stream = self.exchange_manager.streams.get(exchange_name)
+        if stream is not None:
+            ticker = stream.get_ticker(symbol, max_age=max_age)
+            if ticker is not None:
+                return ticker
+
+        snapshot = self.snapshots.get(exchange_name)
+        if not snapshot:
+            return None
+        if max_age is not None and time.time() - snapshot['updated_at'] > max_age:
+            return None
+        return snapshot['tickers'].get(symbol)
+
+    def get_snapshot(self, exchange_name: str) -> Dict[str, Dict]:
+        """ticker ทั้งหมดของ exchange จาก snapshot ล่าสุด"""
+        snapshot = self.snapshots.get(exchange_name)
+        return snapshot['tickers'] if snapshot else {}
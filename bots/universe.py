@@ -0,0 +1,53 @@
+"""
+Scan Universe
+เลือกคู่เทรดที่จะสแกนจาก market ทั้งหมดของ exchange: เฉพาะ spot ที่ยังเปิดซื้อขาย
+แล้วกรองด้วย volume 24 ชั่วโมง (หน่วย quote) จาก ticker ที่ดึงครั้งเดียวทั้ง exchange ก่อนดึงแท่งเทียน
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+
+def spot_symbols(markets: Dict[str, Dict], quote_currencies: Optional[Iterable[str]] = None) -> List[str]:
+    """symbol ของ spot market ที่ยังเปิดซื้อขาย (กรองตาม quote ถ้าระบุ) เรียงตามตัวอักษร"""
+    quotes = set(quote_currencies) if quote_currencies else None
+    symbols = []
+    for symbol, market in (markets or {}).items():
+        if market.get('active') is False:
+            continue
+        if not (market.get('spot') or market.get('type') == 'spot'):
+            continue
+        if quotes is not None and market.get('quote') not in quotes:
+            continue
+        symbols.append(market.get('symbol', symbol))
+    return sorted(symbols)
+
+
+def quote_volume(ticker: Optional[Dict]) -> Optional[float]:
+    """volume 24 ชั่วโมงหน่วย quote จาก ticker ของ ccxt (ประมาณจาก baseVolume × ราคาถ้าไม่มี quoteVolume)"""
+    if not ticker:
+        return None
+    volume = ticker.get('quoteVolume')
+    if volume is not None:
+        return float(volume)
+    base_volume = ticker.get('baseVolume')
+    price = ticker.get('vwap') or ticker.get('last') or ticker.get('close')
+    if base_volume is None or price is None:
+        return None
+    return float(base_volume) * float(price)
+
+
+def filter_by_volume(symbols: Iterable[str], tickers: Dict[str, Dict], min_volume: float,
+                     max_pairs: int = 0) -> List[str]:
+    """คู่ที่ volume หน่วย quote ไม่ต่ำกว่า min_volume เรียงจาก volume มากไปน้อย
+
+    คู่ที่ไม่มี ticker หรือไม่มีข้อมูล volume ถูกตัดออก max_pairs > 0 จำกัดจำนวนคู่ที่คืน
+    """
+    volumes = []
+    for symbol in symbols:
+        volume = quote_volume(tickers.get(symbol))
+        if volume is not None and volume >= min_volume:
+            volumes.append((volume, symbol))
+    volumes.sort(key=lambda item: item[0], reverse=True)
+    if max_pairs > 0:
+        volumes = volumes[:max_pairs]
+    return [symbol for _, symbol in volumes]
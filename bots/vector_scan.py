@@ -0,0 +1,140 @@
+"""
+Vectorized MACD Scan
+สแกนสัญญาณ MACD ของหลายคู่เทรดพร้อมกันบนเมทริกซ์ราคา (symbols × time)
+
+ทุกฟังก์ชันรับ array รูป (จำนวนคู่, จำนวนแท่ง) ที่จัดแนวเวลาเดียวกันแล้ว ช่องที่ไม่มีข้อมูลเป็น NaN
+ผลลัพธ์เท่ากับ pipeline ทีละคู่ของ CryptoPairsScanner (ta.trend.MACD + signal_strength)
+ทุกบิตเมื่อแต่ละคู่มีข้อมูลครบทุกแท่ง
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .signal_strength import signal_strength
+
+
+@dataclass
+class BatchScanResult:
+    """ผลการสแกนแบบ batch: คอลัมน์ตาม timestamps แถวตาม symbols"""
+    symbols: List[str]
+    timestamps: np.ndarray  # (T,) มิลลิวินาที
+    close: np.ndarray  # (N, T)
+    macd: np.ndarray
+    macd_signal: np.ndarray
+    macd_histogram: np.ndarray
+    signal_strength: np.ndarray
+    cross_up: np.ndarray  # (N, T) bool
+    cross_down: np.ndarray
+    volume_24h: np.ndarray  # (N,)
+    long: np.ndarray  # (N,) bool สัญญาณ Long ที่แท่งล่าสุด
+    short: np.ndarray  # (N,) bool สัญญาณ Short ที่แท่งล่าสุด
+
+    def signal_indices(self) -> np.ndarray:
+        """ตำแหน่งแถวที่มีสัญญาณที่แท่งล่าสุด"""
+        return np.flatnonzero(self.long | self.short)
+
+
+def align_frames(frames: Dict[str, pd.DataFrame], length: int) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """จัด DataFrame OHLCV ของแต่ละคู่ลงเมทริกซ์ตามเวลาล่าสุด length แท่ง
+
+    คืนค่า (symbols, timestamps, close, volume) โดยช่องที่คู่นั้นไม่มีแท่งเป็น NaN
+    """
+    symbols, stamps = [], []
+    for symbol, df in frames.items():
+        if df is None or df.empty:
+            continue
+        symbols.append(symbol)
+        stamps.append(df.index.values.astype('datetime64[ms]').astype(np.int64))
+
+    if not symbols:
+        empty = np.empty((0, 0), dtype=np.float64)
+        return [], np.empty(0, dtype=np.int64), empty, empty
+
+    timestamps = np.unique(np.concatenate(stamps))[-length:]
+    close = np.full((len(symbols), len(timestamps)), np.nan)
+    volume = np.full((len(symbols), len(timestamps)), np.nan)
+
+    for row, (symbol, stamp) in enumerate(zip(symbols, stamps)):
+        df = frames[symbol]
+        positions = np.searchsorted(timestamps, stamp)
+        found = positions < len(timestamps)
+        found[found] = timestamps[positions[found]] == stamp[found]
+        close[row, positions[found]] = df['close'].to_numpy(dtype=np.float64)[found]
+        volume[row, positions[found]] = df['volume'].to_numpy(dtype=np.float64)[found]
+
+    return symbols, timestamps, close, volume
+
+
+def ema_matrix(values: np.ndarray, span: int, min_periods: Optional[int] = None) -> np.ndarray:
+    """EMA ตามแกนเวลา (adjust=False เหมือน pandas ewm) คำนวณทุกคู่พร้อมกันทีละแท่ง"""
+    if min_periods is None:
+        min_periods = span
+    # แปลงผ่าน center of mass เหมือน pandas เพื่อให้ได้ alpha บิตเดียวกัน
+    alpha = 1.0 / (1.0 + (span - 1) / 2)
+    factor = 1.0 - alpha
+    min_periods = max(min_periods, 1)
+
+    columns = np.ascontiguousarray(values.T, dtype=np.float64)
+    result = np.empty_like(columns)
+    weighted = np.full(columns.shape[1], np.nan)
+    old_wt = np.ones(columns.shape[1])
+    nobs = np.zeros(columns.shape[1], dtype=np.int64)
+
+    with np.errstate(invalid='ignore'):
+        for t, value in enumerate(columns):
+            observed = ~np.isnan(value)
+            nobs += observed
+            started = ~np.isnan(weighted)
+            old_wt = np.where(started, old_wt * factor, old_wt)
+
+            step = started & observed
+            blended = (old_wt * weighted + alpha * value) / (old_wt + alpha)
+            weighted = np.where(step & (weighted != value), blended, weighted)
+            old_wt = np.where(step, 1.0, old_wt)
+            weighted = np.where(~started & observed, value, weighted)
+
+            result[t] = np.where(nobs >= min_periods, weighted, np.nan)
+
+    return result.T
+
+
+def macd_matrix(close: np.ndarray, fast: int = 12, slow: int = 26,
+                sign: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD, signal line และ histogram ของทุกคู่ (สูตรเดียวกับ ta.trend.MACD)"""
+    macd = ema_matrix(close, fast) - ema_matrix(close, slow)
+    signal = ema_matrix(macd, sign)
+    return macd, signal, macd - signal
+
+
+def zero_crosses(macd: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """จุดที่ MACD ข้ามขึ้นเหนือ 0 และข้ามลงใต้ 0"""
+    previous = np.full(macd.shape, np.nan)
+    previous[:, 1:] = macd[:, :-1]
+    with np.errstate(invalid='ignore'):
+        return (macd > 0) & (previous <= 0), (macd < 0) & (previous >= 0)
+
+
+def scan_matrix(symbols: List[str], timestamps: np.ndarray, close: np.ndarray, volume: np.ndarray,
+                fast: int = 12, slow: int = 26, sign: int = 9, min_signal_strength: float = 60,
+                min_volume_24h: float = 100000) -> BatchScanResult:
+    """คำนวณ MACD, จุดตัดและความแรงของทุกคู่ แล้วคัดสัญญาณที่แท่งล่าสุดตามเงื่อนไขของ scanner"""
+    macd, signal, histogram = macd_matrix(close, fast, slow, sign)
+    strength = signal_strength(macd, histogram)
+    cross_up, cross_down = zero_crosses(macd)
+    volume_24h = np.nansum(volume[:, -24:], axis=1)
+
+    if close.shape[1] >= 2:
+        eligible = (volume_24h >= min_volume_24h) & (strength[:, -1] >= min_signal_strength)
+        long = eligible & cross_up[:, -1]
+        short = eligible & cross_down[:, -1] & ~long
+    else:
+        long = short = np.zeros(len(symbols), dtype=bool)
+
+    return BatchScanResult(
+        symbols=list(symbols), timestamps=timestamps, close=close,
+        macd=macd, macd_signal=signal, macd_histogram=histogram, signal_strength=strength,
+        cross_up=cross_up, cross_down=cross_down, volume_24h=volume_24h, long=long, short=short
+    )
@@ -57,7 +57,7 @@ def list_exchanges(config):
 def status(config):
     """📊 แสดงสถานะการเชื่อมต่อ exchanges"""
     try:
-        exchange_manager = ExchangeManager(config)
+        exchange_manager = ExchangeManager(config, backend='sync')
         
         if exchange_manager.initialize_exchanges():
             click.echo("✅ สถานะการเชื่อมต่อ:")
@@ -110,7 +110,14 @@ def monitor(symbol, interval, config):
     
     try:
         analyzer = MultiExchangeMarketAnalyzer(config)
-        asyncio.run(analyzer.run_continuous_analysis(symbol, interval))
+        
+        async def run_monitor():
+            try:
+                await analyzer.run_continuous_analysis(symbol, interval)
+            finally:
+                await analyzer.exchange_manager.close_all_connections_async()
+        
+        asyncio.run(run_monitor())
     except KeyboardInterrupt:
         click.echo("\n⏹️ หยุดการติดตาม")
     except Exception as e:
@@ -284,7 +291,7 @@ TELEGRAM_CHAT_ID=your_telegram_chat_id_here
 def balance(exchange, symbol, config):
     """💰 แสดงยอดเงินคงเหลือ"""
     try:
-        exchange_manager = ExchangeManager(config)
+        exchange_manager = ExchangeManager(config, backend='sync')
         
         if not exchange_manager.initialize_exchanges():
             click.echo("❌ ไม่สามารถเชื่อมต่อกับ exchange ได้")
@@ -324,7 +331,7 @@ def test_connection(config):
     click.echo("🔧 ทดสอบการเชื่อมต่อ...")
     
     try:
-        exchange_manager = ExchangeManager(config)
+        exchange_manager = ExchangeManager(config, backend='sync')
         
         # โหลด config
         with open(config, 'r', encoding='utf-8') as f:
@@ -368,8 +375,11 @@ def test_connection(config):
 @click.option('--pairs', '-p', multiple=True, help='Trading pairs ที่ต้องการสแกน')
 @click.option('--min-strength', '-s', default=60, help='ความแรงสัญญาณขั้นต่ำ (0-100)')
 @click.option('--min-volume', '-v', default=100000, help='ปริมาณการเทรดขั้นต่ำ 24h')
+@click.option('--batch', is_flag=True, help='คำนวณ MACD ของทุกคู่พร้อมกันแบบ vectorized')
+@click.option('--universe', is_flag=True, help='สแกนทุก spot market ที่ volume 24h ผ่านเกณฑ์ แทนคู่เทรดใน config')
+@click.option('--workers', '-w', type=int, default=0, help='จำนวน process ที่คำนวณ indicator แบบ batch (-1 คือทุก CPU)')
 @click.option('--config', '-c', default='config.json', help='ไฟล์ config')
-def scan(timeframes, exchanges, pairs, min_strength, min_volume, config):
+def scan(timeframes, exchanges, pairs, min_strength, min_volume, batch, universe, workers, config):
     """🔍 สแกนคู่เทรด crypto ด้วยสัญญาณ MACD"""
     click.echo("🔍 เริ่มสแกนคู่เทรด crypto ด้วยสัญญาณ MACD")
     click.echo("=" * 60)
@@ -386,7 +396,7 @@ def scan(timeframes, exchanges, pairs, min_strength, min_volume, config):
         click.echo()
         
         # รันการสแกน
-        results = asyncio.run(run_single_scan(tf_list, ex_list))
+        results = asyncio.run(run_single_scan(tf_list, ex_list, batch, universe, workers))
         
         if results:
             total_signals = sum(len(signals) for signals in results.values())
@@ -398,12 +408,15 @@ def scan(timeframes, exchanges, pairs, min_strength, min_volume, config):
         click.echo(f"❌ เกิดข้อผิดพลาด: {e}")
 
 @cli.command()
-@click.option('--interval', '-i', default=15, help='ช่วงเวลาการสแกน (นาที)')
+@click.option('--interval', '-i', type=int, default=None, help='ช่วงเวลาการสแกน (นาที) ไม่ระบุคือสแกนเมื่อแท่งปิด')
 @click.option('--timeframes', '-t', multiple=True, help='Timeframes ที่ต้องการสแกน')
 @click.option('--config', '-c', default='config.json', help='ไฟล์ config')
 def scan_continuous(interval, timeframes, config):
     """🔄 สแกนคู่เทรด crypto อย่างต่อเนื่อง"""
-    click.echo(f"🔄 เริ่มสแกนคู่เทรด crypto อย่างต่อเนื่องทุก {interval} นาที")
+    if interval:
+        click.echo(f"🔄 เริ่มสแกนคู่เทรด crypto อย่างต่อเนื่องทุก {interval} นาที")
+    else:
+        click.echo("🔄 เริ่มสแกนคู่เทรด crypto อย่างต่อเนื่องทุกครั้งที่แท่งเทียนปิด")
     click.echo("กด Ctrl+C เพื่อหยุด")
     
     try:
@@ -426,48 +439,112 @@ def macd_check(symbol, timeframe, exchange, config):
     try:
         async def check_single():
             scanner = CryptoPairsScanner(config)
-            if not await scanner.initialize():
-                click.echo("❌ ไม่สามารถเชื่อมต่อกับ exchange ได้")
-                return
-            
-            # สแกนคู่เทรดเดียว
-            signals = await scanner.scan_single_pair(exchange, symbol, timeframe)
-            
-            if signals:
-                for signal in signals:
-                    signal_emoji = "🟢" if signal.signal_type == "long" else "🔴"
-                    click.echo(f"{signal_emoji} สัญญาณ {signal.signal_type.upper()} พบ!")
-                    click.echo(f"   💰 ราคา: ${signal.price:,.4f}")
-                    click.echo(f"   📊 ความแรง: {signal.strength:.1f}%")
-                    click.echo(f"   📈 MACD: {signal.macd_value:.6f}")
-                    click.echo(f"   📉 Signal: {signal.macd_signal:.6f}")
-                    click.echo(f"   📊 Histogram: {signal.macd_histogram:.6f}")
-                    click.echo(f"   📅 เวลา: {signal.timestamp.strftime('%Y-%m-%d %H:%M:%S')}")
-            else:
-                click.echo("❌ ไม่พบสัญญาณ MACD")
+            try:
+                if not await scanner.initialize():
+                    click.echo("❌ ไม่สามารถเชื่อมต่อกับ exchange ได้")
+                    return
                 
-                # แสดงข้อมูล MACD ปัจจุบัน
-                df = await scanner.fetch_ohlcv_data(exchange, symbol, timeframe, 50)
-                if df is not None and not df.empty:
-                    df = scanner.calculate_macd(df)
-                    latest = df.iloc[-1]
-                    
-                    click.echo("\n📊 ข้อมูล MACD ปัจจุบัน:")
-                    click.echo(f"   💰 ราคา: ${latest['close']:,.4f}")
-                    click.echo(f"   📈 MACD: {latest['macd']:.6f}")
-                    click.echo(f"   📉 Signal: {latest['macd_signal']:.6f}")
-                    click.echo(f"   📊 Histogram: {latest['macd_histogram']:.6f}")
+                # สแกนคู่เทรดเดียว
+                signals = await scanner.scan_single_pair(exchange, symbol, timeframe)
+                
+                if signals:
+                    for signal in signals:
+                        signal_emoji = "🟢" if signal.signal_type == "long" else "🔴"
+                        click.echo(f"{signal_emoji} สัญญาณ {signal.signal_type.upper()} พบ!")
+                        click.echo(f"   💰 ราคา: ${signal.price:,.4f}")
+                        click.echo(f"   📊 ความแรง: {signal.strength:.1f}%")
+                        click.echo(f"   📈 MACD: {signal.macd_value:.6f}")
+                        click.echo(f"   📉 Signal: {signal.macd_signal:.6f}")
+                        click.echo(f"   📊 Histogram: {signal.macd_histogram:.6f}")
+                        click.echo(f"   📅 เวลา: {signal.timestamp.strftime('%Y-%m-%d %H:%M:%S')}")
+                else:
+                    click.echo("❌ ไม่พบสัญญาณ MACD")
                     
-                    if latest['macd'] > 0:
-                        click.echo("   🟢 MACD อยู่เหนือ 0 (แนวโน้มบวก)")
-                    else:
-                        click.echo("   🔴 MACD อยู่ใต้ 0 (แนวโน้มลบ)")
+                    # แสดงข้อมูล MACD ปัจจุบัน
+                    df = await scanner.fetch_ohlcv_data(exchange, symbol, timeframe, 50)
+                    if df is not None and not df.empty:
+                        df = scanner.calculate_macd(df)
+                        latest = df.iloc[-1]
+                        
+                        click.echo("\n📊 ข้อมูล MACD ปัจจุบัน:")
+                        click.echo(f"   💰 ราคา: ${latest['close']:,.4f}")
+                        click.echo(f"   📈 MACD: {latest['macd']:.6f}")
+                        click.echo(f"   📉 Signal: {latest['macd_signal']:.6f}")
+                        click.echo(f"   📊 Histogram: {latest['macd_histogram']:.6f}")
+                        
+                        if latest['macd'] > 0:
+                            click.echo("   🟢 MACD อยู่เหนือ 0 (แนวโน้มบวก)")
+                        else:
+                            click.echo("   🔴 MACD อยู่ใต้ 0 (แนวโน้มลบ)")
+            finally:
+                await scanner.exchange_manager.close_all_connections_async()
         
         asyncio.run(check_single())
         
     except Exception as e:
         click.echo(f"❌ เกิดข้อผิดพลาด: {e}")
 
+@cli.command()
+@click.option('--exchanges', '-e', multiple=True, help='Exchanges ที่ต้องการดึงประวัติ (ค่าเริ่มต้น: ทั้งหมดที่เปิดใช้)')
+@click.option('--pairs', '-p', multiple=True, help='Trading pairs (ค่าเริ่มต้น: trading_pairs ใน config)')
+@click.option('--timeframes', '-t', multiple=True, help='Timeframes (เช่น 1m,1h,1d)')
+@click.option('--days', '-d', default=365, help='จำนวนวันย้อนหลัง')
+@click.option('--since', default=None, help='วันที่เริ่มต้น (YYYY-MM-DD) แทน --days')
+@click.option('--page-limit', default=1000, help='จำนวนแท่งต่อ request')
+@click.option('--config', '-c', default='config.json', help='ไฟล์ config')
+def backfill(exchanges, pairs, timeframes, days, since, page_limit, config):
+    """📥 ดึงแท่งเทียนย้อนหลังลง candle store (รันซ้ำเพื่อทำต่อจากจุดเดิม)"""
+    from datetime import timedelta, timezone
+    from bots.backfill import HistoryBackfiller, build_jobs
+    from bots.candle_store import CandleStore
+
+    tf_list = list(timeframes) if timeframes else ['1h']
+    if since:
+        start_date = datetime.strptime(since, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    else:
+        start_date = datetime.now(timezone.utc) - timedelta(days=days)
+    start = int(start_date.timestamp() * 1000)
+
+    click.echo(f"📥 ดึงแท่งเทียนย้อนหลังตั้งแต่ {start_date.strftime('%Y-%m-%d')}")
+    click.echo(f"📊 Timeframes: {', '.join(tf_list)}")
+    click.echo("กด Ctrl+C เพื่อหยุด (รันคำสั่งเดิมอีกครั้งเพื่อทำต่อ)")
+    click.echo("=" * 60)
+
+    try:
+        async def run_backfill():
+            manager = ExchangeManager(config, backend='async')
+            if not await manager.initialize_exchanges_async():
+                click.echo("❌ ไม่สามารถเชื่อมต่อกับ exchange ได้")
+                return
+
+            try:
+                jobs = build_jobs(manager, tf_list, start, list(exchanges) or None, list(pairs) or None)
+                if not jobs:
+                    click.echo("❌ ไม่มีคู่เทรดที่ต้องดึงข้อมูล")
+                    return
+
+                store = manager.candle_store or CandleStore()
+                backfiller = HistoryBackfiller(manager, store, page_limit=page_limit)
+                results = await backfiller.run(jobs)
+
+                click.echo("\n📊 สรุปผล:")
+                for exchange_name, stats in results.items():
+                    click.echo(f"🏢 {exchange_name.upper()}: {stats['bars']:,} แท่ง, "
+                               f"{stats['requests']} requests, {stats['elapsed']:.1f}s "
+                               f"({stats['bars_per_sec']:,.0f} แท่ง/วินาที)")
+                    failed = stats['failed'] + stats['errors']
+                    if failed:
+                        click.echo(f"   ⚠️ ล้มเหลว {failed}/{stats['series']} series (รันคำสั่งเดิมอีกครั้งเพื่อทำต่อ)")
+            finally:
+                await manager.close_all_connections_async()
+
+        asyncio.run(run_backfill())
+
+    except KeyboardInterrupt:
+        click.echo("\n⏹️ หยุดการดึงข้อมูล (บันทึก checkpoint แล้ว)")
+    except Exception as e:
+        click.echo(f"❌ เกิดข้อผิดพลาด: {e}")
+
 @cli.command()
 @click.option('--action', type=click.Choice(['create', 'validate', 'backup', 'show', 'export', 'summary']), 
               default='show', help='การดำเนินการกับ config')
@@ -12,20 +12,26 @@ import os
 # เพิ่ม path สำหรับ import
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from bots.exchange_manager import ExchangeManager
+from bots.exchange_manager import ExchangeManager, get_shared_exchange_manager
 from bots.market_analyzer import MultiExchangeMarketAnalyzer
 from bots.multi_exchange_bot import MultiExchangeTradingBot
 
+async def connect(exchange_manager: ExchangeManager) -> bool:
+    """เชื่อมต่อตาม exchange_backend ใน config (async เป็นค่าเริ่มต้นของ config.template.json)"""
+    if exchange_manager.backend == 'async':
+        return await exchange_manager.initialize_exchanges_async()
+    return exchange_manager.initialize_exchanges()
+
 async def example_1_basic_connection():
     """ตัวอย่างที่ 1: การเชื่อมต่อพื้นฐาน"""
     print("🔗 ตัวอย่างที่ 1: การเชื่อมต่อพื้นฐาน")
     print("=" * 50)
     
-    # สร้าง ExchangeManager
-    exchange_manager = ExchangeManager("config.json")
+    # ใช้ ExchangeManager ตัวเดียวกับ analyzer และบอทในตัวอย่างอื่น
+    exchange_manager = get_shared_exchange_manager("config.json")
     
     # เชื่อมต่อกับ exchanges
-    if exchange_manager.initialize_exchanges():
+    if await connect(exchange_manager):
         print("✅ เชื่อมต่อสำเร็จ!")
         
         # แสดงรายการ exchanges ที่เชื่อมต่อได้
@@ -35,7 +41,7 @@ async def example_1_basic_connection():
         # ดูยอดเงินในแต่ละ exchange
         for exchange_name in enabled_exchanges:
             try:
-                balance = exchange_manager.get_balance(exchange_name)
+                balance = await exchange_manager.fetch_balance(exchange_name)
                 print(f"💰 {exchange_name}: {balance}")
             except Exception as e:
                 print(f"❌ ไม่สามารถดึงยอดเงินจาก {exchange_name}: {e}")
@@ -121,9 +127,9 @@ async def example_4_price_comparison():
     print("⚖️ ตัวอย่างที่ 4: เปรียบเทียบราคาระหว่าง exchanges")
     print("=" * 50)
     
-    exchange_manager = ExchangeManager("config.json")
+    exchange_manager = get_shared_exchange_manager("config.json")
     
-    if exchange_manager.initialize_exchanges():
+    if await connect(exchange_manager):
         symbol = "BTC/USDT"
         enabled_exchanges = exchange_manager.get_enabled_exchanges()
         
@@ -272,6 +278,9 @@ async def main():
         print("\n⏹️ หยุดการทำงานโดยผู้ใช้")
     except Exception as e:
         print(f"\n❌ เกิดข้อผิดพลาด: {e}")
+    finally:
+        # ปิด session ของ aiohttp (backend แบบ async)
+        await get_shared_exchange_manager("config.json").close_all_connections_async()
 
 if __name__ == "__main__":
     # ตรวจสอบว่ามีไฟล์ config หรือไม่
@@ -6,12 +6,32 @@ import pytest
 import json
 import os
 import tempfile
+import time
 from unittest.mock import Mock, patch
 from pathlib import Path
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+
+def pytest_addoption(parser):
+    parser.addoption("--run-slow", action="store_true", default=False,
+                     help="run tests marked slow (wall-clock benchmarks)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: wall-clock benchmark, skipped unless --run-slow or RUN_SLOW=1")
+
+
+def pytest_collection_modifyitems(config, items):
+    # benchmark ที่วัดเวลาจริงไม่เสถียรบนเครื่องที่มีงานอื่น จึงรันเฉพาะเมื่อขอ
+    if config.getoption("--run-slow") or os.getenv("RUN_SLOW") == "1":
+        return
+    skip_slow = pytest.mark.skip(reason="slow benchmark: use --run-slow or RUN_SLOW=1")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
 # Test data fixtures
 @pytest.fixture
 def sample_config():
@@ -56,6 +76,7 @@ def sample_config():
             "check_interval": 30,
             "log_level": "INFO",
             "log_file": "temp/trading_bot.log",
+            "candle_store_dir": "",
             "telegram_notifications": {
                 "enabled": False,
                 "bot_token": "",
@@ -249,6 +270,20 @@ def mock_ccxt_exchange(mock_exchange, sample_ticker_data, sample_ohlcv_data,
     
     return mock_exchange
 
+# แท่ง 1 นาทีสำหรับ test ของ candle cache/store/backfill
+MINUTE = 60_000
+
+
+def make_candles(start, count, close=100.0):
+    """count แท่ง 1 นาทีเริ่มที่ start (มิลลิวินาที) ราคาเพิ่มขึ้นแท่งละ 1"""
+    return [[start + i * MINUTE, close + i, close + i + 1, close + i - 1, close + i, 10.0] for i in range(count)]
+
+
+@pytest.fixture
+def now_ms():
+    """Start of the current minute in milliseconds"""
+    return int(time.time() * 1000) // MINUTE * MINUTE
+
 @pytest.fixture
 def temp_directory():
     """Create a temporary directory for testing"""
@@ -336,6 +371,14 @@ def setup_test_environment(monkeypatch):
     for key, value in test_env.items():
         monkeypatch.setenv(key, value)
 
+@pytest.fixture(autouse=True)
+def reset_shared_managers():
+    """Give every test its own shared ExchangeManager registry"""
+    from bots.exchange_manager import reset_shared_exchange_managers
+    reset_shared_exchange_managers()
+    yield
+    reset_shared_exchange_managers()
+
 # Cleanup fixtures
 @pytest.fixture(autouse=True)
 def cleanup_temp_files():
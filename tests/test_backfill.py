@@ -0,0 +1,227 @@
+"""
+Tests for bots/backfill.py
+"""
+
+import pytest
+import asyncio
+import json
+import os
+from unittest.mock import Mock
+
+from bots.backfill import BackfillJob, HistoryBackfiller, build_jobs
+from bots.candle_store import CandleStore
+from bots.exchange_manager import ExchangeManager
+
+from .conftest import MINUTE
+
+
+def make_exchange(listed_at, now_ms):
+    """Mock exchange that honours since/limit and has candles from listed_at up to now"""
+    def fetch_ohlcv(symbol, timeframe, since=None, limit=100):
+        first = max(since if since is not None else now_ms - limit * MINUTE, listed_at)
+        return [[ts, 1.0, 2.0, 0.5, 1.5, 10.0] for ts in range(first, min(first + limit * MINUTE, now_ms + MINUTE), MINUTE)]
+
+    exchange = Mock()
+    exchange.fetch_ohlcv = Mock(side_effect=fetch_ohlcv)
+    return exchange
+
+
+@pytest.fixture
+def manager(temp_config_file):
+    """ExchangeManager without real exchanges"""
+    return ExchangeManager(temp_config_file)
+
+
+@pytest.fixture
+def store(temp_directory):
+    return CandleStore(os.path.join(temp_directory, 'candles'))
+
+
+@pytest.fixture
+def checkpoint_path(temp_directory):
+    return os.path.join(temp_directory, 'checkpoint.json')
+
+
+class TestHistoryBackfiller:
+    """Test cases for HistoryBackfiller"""
+
+    @pytest.mark.asyncio
+    async def test_paginates_backwards(self, manager, store, checkpoint_path, now_ms):
+        """Test that history is fetched page by page back to the start"""
+        exchange = make_exchange(0, now_ms)
+        manager.exchanges['binance'] = {'instance': exchange}
+        start = now_ms - 250 * MINUTE
+
+        backfiller = HistoryBackfiller(manager, store, checkpoint_path, page_limit=100)
+        results = await backfiller.run([BackfillJob('binance', 'BTC/USDT', '1m', start)])
+
+        data = store.read('binance', 'BTC/USDT', '1m')
+        assert len(data) == 250
+        assert data[0, 0] == start
+        assert data[-1, 0] == now_ms - MINUTE  # แท่งที่ยังไม่ปิดไม่ถูกเก็บ
+        assert exchange.fetch_ohlcv.call_count == 3
+        assert exchange.fetch_ohlcv.call_args_list[0].kwargs['since'] == now_ms - 100 * MINUTE
+
+        stats = results['binance']
+        assert stats['bars'] == 250
+        assert stats['requests'] == 3
+        assert stats['completed'] == 1
+        assert stats['bars_per_sec'] > 0
+
+    @pytest.mark.asyncio
+    async def test_stops_at_listing_date(self, manager, store, checkpoint_path, now_ms):
+        """Test that an empty page marks the series complete"""
+        listed_at = now_ms - 150 * MINUTE
+        manager.exchanges['binance'] = {'instance': make_exchange(listed_at, now_ms)}
+
+        backfiller = HistoryBackfiller(manager, store, checkpoint_path, page_limit=100)
+        await backfiller.run([BackfillJob('binance', 'BTC/USDT', '1m', now_ms - 1000 * MINUTE)])
+
+        assert store.first_timestamp('binance', 'BTC/USDT', '1m') == listed_at
+        with open(checkpoint_path) as f:
+            assert json.load(f)['binance|BTC/USDT|1m']['complete'] is True
+
+    @pytest.mark.asyncio
+    async def test_gap_longer_than_page_is_skipped(self, manager, store, checkpoint_path, now_ms):
+        """Test that an empty page inside the history probes for older bars instead of stopping"""
+        exchange = make_exchange(0, now_ms)
+        fetch = exchange.fetch_ohlcv.side_effect
+        gap = range(now_ms - 350 * MINUTE, now_ms - 100 * MINUTE)
+        exchange.fetch_ohlcv.side_effect = lambda *args, **kwargs: [
+            candle for candle in fetch(*args, **kwargs) if candle[0] not in gap
+        ]
+        manager.exchanges['binance'] = {'instance': exchange}
+        start = now_ms - 500 * MINUTE
+
+        backfiller = HistoryBackfiller(manager, store, checkpoint_path, page_limit=100)
+        results = await backfiller.run([BackfillJob('binance', 'BTC/USDT', '1m', start)])
+
+        assert store.first_timestamp('binance', 'BTC/USDT', '1m') == start
+        assert store.count('binance', 'BTC/USDT', '1m') == 250
+        assert results['binance']['bars'] == 250
+        assert results['binance']['completed'] == 1
+
+    @pytest.mark.asyncio
+    async def test_bars_counts_rows_written(self, manager, store, checkpoint_path, now_ms):
+        """Test that duplicate candles in a page are not counted twice"""
+        exchange = make_exchange(0, now_ms)
+        fetch = exchange.fetch_ohlcv.side_effect
+        exchange.fetch_ohlcv.side_effect = lambda *args, **kwargs: fetch(*args, **kwargs) * 2
+        manager.exchanges['binance'] = {'instance': exchange}
+
+        backfiller = HistoryBackfiller(manager, store, checkpoint_path, page_limit=100)
+        results = await backfiller.run([BackfillJob('binance', 'BTC/USDT', '1m', now_ms - 150 * MINUTE)])
+
+        assert store.count('binance', 'BTC/USDT', '1m') == 150
+        assert results['binance']['bars'] == 150
+
+    @pytest.mark.asyncio
+    async def test_resumes_from_checkpoint(self, manager, store, checkpoint_path, now_ms):
+        """Test that a second run only fetches the missing tail and skips finished history"""
+        exchange = make_exchange(0, now_ms)
+        manager.exchanges['binance'] = {'instance': exchange}
+        job = BackfillJob('binance', 'BTC/USDT', '1m', now_ms - 200 * MINUTE)
+
+        await HistoryBackfiller(manager, store, checkpoint_path, page_limit=100).run([job])
+        exchange.fetch_ohlcv.reset_mock()
+
+        results = await HistoryBackfiller(manager, store, checkpoint_path, page_limit=100).run([job])
+
+        assert results['binance']['skipped'] == 1
+        # เรียกเฉพาะการเติมแท่งล่าสุด ไม่ดึงประวัติซ้ำ
+        assert all(call.kwargs['since'] >= now_ms - MINUTE for call in exchange.fetch_ohlcv.call_args_list)
+        assert store.count('binance', 'BTC/USDT', '1m') == 200
+
+    @pytest.mark.asyncio
+    async def test_interrupted_run_keeps_fetched_pages(self, manager, store, checkpoint_path, now_ms):
+        """Test that cancellation flushes pages already fetched"""
+        calls = []
+        fetch = make_exchange(0, now_ms).fetch_ohlcv
+
+        def fetch_ohlcv(symbol, timeframe, since=None, limit=100):
+            calls.append(since)
+            if len(calls) == 3:
+                raise asyncio.CancelledError()
+            return fetch(symbol, timeframe, since=since, limit=limit)
+
+        manager.exchanges['binance'] = {'instance': Mock(fetch_ohlcv=Mock(side_effect=fetch_ohlcv))}
+        backfiller = HistoryBackfiller(manager, store, checkpoint_path, page_limit=50, flush_bars=1000)
+
+        with pytest.raises(asyncio.CancelledError):
+            await backfiller.run([BackfillJob('binance', 'BTC/USDT', '1m', now_ms - 500 * MINUTE)])
+
+        assert store.count('binance', 'BTC/USDT', '1m') == 100
+        with open(checkpoint_path) as f:
+            state = json.load(f)['binance|BTC/USDT|1m']
+        assert state == {'start': now_ms - 500 * MINUTE, 'complete': False}
+        assert store.first_timestamp('binance', 'BTC/USDT', '1m') == now_ms - 100 * MINUTE
+
+    @pytest.mark.asyncio
+    async def test_flushes_in_chunks(self, manager, store, checkpoint_path, now_ms):
+        """Test that long runs are written to disk before they finish"""
+        manager.exchanges['binance'] = {'instance': make_exchange(0, now_ms)}
+        backfiller = HistoryBackfiller(manager, store, checkpoint_path, page_limit=10, flush_bars=20)
+        original_prepend = store.prepend
+        sizes = []
+
+        def prepend(*args):
+            sizes.append(len(args[-1]))
+            return original_prepend(*args)
+
+        store.prepend = prepend
+        await backfiller.run([BackfillJob('binance', 'BTC/USDT', '1m', now_ms - 50 * MINUTE)])
+
+        assert sizes == [20, 20, 10]
+        assert store.count('binance', 'BTC/USDT', '1m') == 50
+
+    @pytest.mark.asyncio
+    async def test_failed_fetch_is_retried_then_abandoned(self, manager, store, checkpoint_path, now_ms, monkeypatch):
+        """Test retries with backoff and that failures leave the series resumable"""
+        exchange = Mock()
+        exchange.fetch_ohlcv = Mock(side_effect=Exception("rate limited"))
+        manager.exchanges['binance'] = {'instance': exchange}
+
+        async def no_sleep(_):
+            pass
+
+        monkeypatch.setattr('bots.backfill.asyncio.sleep', no_sleep)
+        backfiller = HistoryBackfiller(manager, store, checkpoint_path, max_retries=3)
+        results = await backfiller.run([BackfillJob('binance', 'BTC/USDT', '1m', now_ms - 10 * MINUTE)])
+
+        assert exchange.fetch_ohlcv.call_count == 3
+        assert results['binance']['requests'] == 3
+        assert results['binance']['failed'] == 1
+        assert results['binance']['completed'] == 0
+        assert backfiller.checkpoint['binance|BTC/USDT|1m']['complete'] is False
+
+    @pytest.mark.asyncio
+    async def test_exchanges_run_concurrently(self, manager, store, checkpoint_path, now_ms):
+        """Test that each exchange gets its own stats"""
+        manager.exchanges['binance'] = {'instance': make_exchange(0, now_ms)}
+        manager.exchanges['okx'] = {'instance': make_exchange(0, now_ms)}
+        jobs = [BackfillJob(name, symbol, '1m', now_ms - 30 * MINUTE)
+                for name in ('binance', 'okx') for symbol in ('BTC/USDT', 'ETH/USDT')]
+
+        results = await HistoryBackfiller(manager, store, checkpoint_path).run(jobs)
+
+        assert set(results) == {'binance', 'okx'}
+        assert all(stats['bars'] == 60 and stats['series'] == 2 for stats in results.values())
+
+    def test_corrupt_checkpoint_starts_fresh(self, manager, store, checkpoint_path):
+        """Test that an unreadable checkpoint is ignored"""
+        with open(checkpoint_path, 'w') as f:
+            f.write('{not json')
+        assert HistoryBackfiller(manager, store, checkpoint_path).checkpoint == {}
+
+
+def test_build_jobs(manager):
+    """Test job expansion from config and CLI filters"""
+    manager.exchanges['binance'] = {'instance': Mock(), 'config': {'trading_pairs': ['BTC/USDT', 'ETH/USDT']}}
+    manager.dex_connections['uniswap_v3'] = {'config': {'trading_pairs': ['ETH/USDC']}}
+
+    jobs = build_jobs(manager, ['1h', '1d'], 0)
+    assert [(job.exchange, job.symbol, job.timeframe) for job in jobs] == [
+        ('binance', 'BTC/USDT', '1h'), ('binance', 'BTC/USDT', '1d'),
+        ('binance', 'ETH/USDT', '1h'), ('binance', 'ETH/USDT', '1d'),
+    ]
+    assert len(build_jobs(manager, ['1h'], 0, pairs=['SOL/USDT'])) == 1
@@ -0,0 +1,238 @@
+"""
+Tests for bots/balance_cache.py
+"""
+
+import pytest
+import asyncio
+from unittest.mock import Mock, AsyncMock
+
+from bots.balance_cache import BalanceCache
+from bots.exchange_manager import ExchangeManager
+
+
+def make_balance(usdt=1000.0, btc=1.0):
+    return {
+        'free': {'USDT': usdt, 'BTC': btc},
+        'used': {'USDT': 0.0, 'BTC': 0.0},
+        'total': {'USDT': usdt, 'BTC': btc},
+        'USDT': {'free': usdt, 'used': 0.0, 'total': usdt},
+    }
+
+
+@pytest.fixture
+def manager(temp_config_file):
+    """ExchangeManager with a mocked async exchange"""
+    manager = ExchangeManager(temp_config_file)
+    exchange = Mock()
+    exchange.fetch_balance = AsyncMock(side_effect=lambda: make_balance())
+    manager.exchanges['binance'] = {'instance': exchange}
+    return manager
+
+
+class TestBalanceCache:
+    """Test cases for BalanceCache"""
+
+    @pytest.mark.asyncio
+    async def test_reads_from_memory_within_ttl(self, manager):
+        """Test that repeated reads make a single REST call"""
+        cache = manager.balance_cache
+        exchange = manager.exchanges['binance']['instance']
+
+        first = await cache.get('binance')
+        second = await cache.get('binance')
+
+        assert first is second
+        assert exchange.fetch_balance.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_refreshes(self, manager):
+        """Test TTL expiry"""
+        cache = manager.balance_cache
+        await cache.get('binance')
+        cache.balances['binance']['updated_at'] -= cache.ttl + 1
+
+        await cache.get('binance')
+        assert manager.exchanges['binance']['instance'].fetch_balance.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_reads_share_request(self, manager):
+        """Test that concurrent misses wait on one request"""
+        results = await asyncio.gather(*[manager.balance_cache.get('binance') for _ in range(5)])
+
+        assert all(result is results[0] for result in results)
+        assert manager.exchanges['binance']['instance'].fetch_balance.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_fetch_failure(self, manager):
+        """Test that a failed fetch returns None and is retried next time"""
+        exchange = manager.exchanges['binance']['instance']
+        exchange.fetch_balance = AsyncMock(side_effect=Exception("timeout"))
+
+        assert await manager.balance_cache.get('binance') is None
+        assert manager.balance_cache.get_cached('binance') is None
+
+    @pytest.mark.asyncio
+    async def test_order_lifecycle_adjustments(self, manager):
+        """Test optimistic adjustments for place, cancel and fill"""
+        cache = manager.balance_cache
+        await cache.get('binance')
+
+        buy = {'symbol': 'BTC/USDT', 'side': 'buy', 'amount': 0.5, 'price': 100}
+        cache.on_order_placed('binance', buy)
+        balance = cache.get_cached('binance')
+        assert balance['free']['USDT'] == 950
+        assert balance['used']['USDT'] == 50
+        assert balance['USDT'] == {'free': 950, 'used': 50, 'total': 1000}
+
+        cache.on_order_canceled('binance', {**buy, 'filled': 0.2})
+        assert cache.get_cached('binance')['used']['USDT'] == pytest.approx(20)
+
+        cache.on_order_filled('binance', {**buy, 'filled': 0.2, 'average': 100})
+        balance = cache.get_cached('binance')
+        assert balance['used']['USDT'] == pytest.approx(0)
+        assert balance['total']['USDT'] == pytest.approx(980)
+        assert balance['free']['BTC'] == pytest.approx(1.2)
+        assert balance['total']['BTC'] == pytest.approx(1.2)
+
+    @pytest.mark.asyncio
+    async def test_sell_adjustments(self, manager):
+        """Test that sells reserve the base currency"""
+        cache = manager.balance_cache
+        await cache.get('binance')
+
+        sell = {'symbol': 'BTC/USDT:USDT', 'side': 'sell', 'amount': 0.4, 'price': 200}
+        cache.on_order_placed('binance', sell)
+        assert cache.get_cached('binance')['free']['BTC'] == pytest.approx(0.6)
+
+        cache.on_order_filled('binance', sell)
+        balance = cache.get_cached('binance')
+        assert balance['total']['BTC'] == pytest.approx(0.6)
+        assert balance['free']['USDT'] == pytest.approx(1080)
+
+    @pytest.mark.asyncio
+    async def test_unreserved_fill_debits_free(self, manager):
+        """Test fills that never went through on_order_placed"""
+        cache = manager.balance_cache
+        await cache.get('binance')
+
+        cache.on_order_filled('binance', {'symbol': 'BTC/USDT', 'side': 'buy', 'amount': 0.5, 'price': 100},
+                              reserved=False)
+        balance = cache.get_cached('binance')
+        assert balance['free']['USDT'] == pytest.approx(950)
+        assert balance['used']['USDT'] == 0
+        assert balance['total']['USDT'] == pytest.approx(950)
+
+        cache.on_order_filled('binance', {'symbol': 'BTC/USDT', 'side': 'sell', 'amount': 0.2, 'price': 100},
+                              reserved=False)
+        balance = cache.get_cached('binance')
+        assert balance['free']['BTC'] == pytest.approx(1.3)
+        assert balance['used']['BTC'] == 0
+
+    @pytest.mark.asyncio
+    async def test_partially_filled_cancel_triggers_resync(self, manager):
+        cache = manager.balance_cache
+        await cache.get('binance')
+        buy = {'symbol': 'BTC/USDT', 'side': 'buy', 'amount': 0.5, 'price': 100}
+        cache.on_order_placed('binance', buy)
+
+        cache.on_order_canceled('binance', {**buy, 'filled': 0.2})
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert manager.exchanges['binance']['instance'].fetch_balance.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_fill_triggers_background_resync(self, manager):
+        """Test that fills schedule a refresh without blocking"""
+        cache = manager.balance_cache
+        await cache.get('binance')
+        cache.on_order_filled('binance', {'symbol': 'BTC/USDT', 'side': 'buy', 'amount': 1, 'price': 10})
+
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert manager.exchanges['binance']['instance'].fetch_balance.await_count == 2
+        assert cache.get_cached('binance')['free']['BTC'] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_incomplete_order_invalidates(self, manager):
+        """Test that orders without a price force a refetch"""
+        cache = manager.balance_cache
+        await cache.get('binance')
+        cache.on_order_placed('binance', {'symbol': 'BTC/USDT', 'side': 'buy', 'amount': 1})
+
+        assert cache.balances['binance']['stale'] is True
+        await cache.get('binance')
+        assert manager.exchanges['binance']['instance'].fetch_balance.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_adjustment_during_fetch_marks_stale(self, manager):
+        """Test that a fetch racing with an adjustment is not trusted"""
+        cache = manager.balance_cache
+        await cache.get('binance')
+        release = asyncio.Event()
+
+        async def slow_balance():
+            await release.wait()
+            return make_balance()
+
+        manager.exchanges['binance']['instance'].fetch_balance = AsyncMock(side_effect=slow_balance)
+        refresh = asyncio.ensure_future(cache.refresh('binance'))
+        for _ in range(3):
+            await asyncio.sleep(0.001)
+        cache.on_order_placed('binance', {'symbol': 'BTC/USDT', 'side': 'buy', 'amount': 1, 'price': 10})
+        release.set()
+        await refresh
+
+        assert cache.balances['binance']['stale'] is True
+
+    def test_adjust_without_entry_is_noop(self, manager):
+        """Test adjustments before the first fetch"""
+        cache = BalanceCache(manager, ttl=30)
+        cache.on_order_placed('binance', {'symbol': 'BTC/USDT', 'side': 'buy', 'amount': 1, 'price': 10})
+        assert cache.get_cached('binance') is None
+
+
+class TestExchangeManagerBalanceCache:
+    """Test that ExchangeManager keeps the cache in step with its orders"""
+
+    @pytest.mark.asyncio
+    async def test_place_and_cancel_order_adjust_cache(self, manager):
+        """Test place_order and cancel_order hooks"""
+        exchange = manager.exchanges['binance']['instance']
+        exchange.create_limit_buy_order = AsyncMock(return_value={'id': '1', 'price': None})
+        exchange.cancel_order = AsyncMock(return_value={
+            'id': '1', 'side': 'buy', 'price': 100, 'amount': 2, 'remaining': 2
+        })
+        await manager.balance_cache.get('binance')
+
+        await manager.place_order('binance', 'BTC/USDT', 'limit', 'buy', 2, 100)
+        assert manager.balance_cache.get_cached('binance')['free']['USDT'] == 800
+
+        await manager.cancel_order('binance', '1', 'BTC/USDT')
+        assert manager.balance_cache.get_cached('binance')['free']['USDT'] == 1000
+
+    @pytest.mark.asyncio
+    async def test_market_order_debits_free(self, manager):
+        """Test that a market buy moves free quote, not the never-reserved used balance"""
+        exchange = manager.exchanges['binance']['instance']
+        exchange.create_market_buy_order = AsyncMock(return_value={
+            'id': '2', 'status': 'closed', 'filled': 0.001, 'average': 100000
+        })
+        await manager.balance_cache.get('binance')
+
+        await manager.place_order('binance', 'BTC/USDT', 'market', 'buy', 0.001)
+        balance = manager.balance_cache.get_cached('binance')
+        assert balance['free']['USDT'] == pytest.approx(900)
+        assert balance['used']['USDT'] == 0
+        assert balance['free']['BTC'] == pytest.approx(1.001)
+
+    def test_ttl_from_config(self, sample_config, temp_directory):
+        """Test balance_cache_ttl setting"""
+        import json
+        import os
+
+        sample_config['bot_settings']['balance_cache_ttl'] = 5
+        config_path = os.path.join(temp_directory, "config.json")
+        with open(config_path, 'w') as f:
+            json.dump(sample_config, f)
+
+        assert ExchangeManager(config_path).balance_cache.ttl == 5
@@ -0,0 +1,179 @@
+"""
+Tests for bots/candle_cache.py
+"""
+
+import pytest
+import asyncio
+import numpy as np
+import pandas as pd
+from unittest.mock import Mock
+
+from bots.candle_cache import CandleBuffer, to_dataframe
+from bots.exchange_manager import ExchangeManager
+
+from .conftest import MINUTE, make_candles
+
+
+@pytest.fixture
+def manager(temp_config_file):
+    """ExchangeManager with a mocked exchange"""
+    manager = ExchangeManager(temp_config_file)
+    manager.exchanges['binance'] = {'instance': Mock()}
+    return manager
+
+
+class TestCandleBuffer:
+    """Test cases for the mirrored ring buffer"""
+
+    def test_view_is_contiguous_after_wraparound(self):
+        """Test that the newest rows stay contiguous without copying"""
+        buffer = CandleBuffer(4)
+        for i in range(7):
+            buffer.append([i, i, i, i, i, i])
+
+        view = buffer.view()
+        assert list(view[:, 0]) == [3, 4, 5, 6]
+        assert view.flags['C_CONTIGUOUS']
+        assert np.shares_memory(view, buffer.data)
+        assert list(buffer.view(2)[:, 0]) == [5, 6]
+        assert buffer.last_timestamp() == 6
+
+    def test_replace_last(self):
+        """Test updating the still-open candle"""
+        buffer = CandleBuffer(3)
+        for i in range(4):
+            buffer.append([i, 1, 1, 1, 1, 1])
+        buffer.replace_last([3, 2, 2, 2, 2, 2])
+
+        assert list(buffer.view()[:, 1]) == [1, 1, 2]
+        assert len(buffer) == 3
+
+    def test_view_is_read_only(self):
+        """Test that callers cannot write into the cache"""
+        buffer = CandleBuffer(3)
+        buffer.append([1, 1, 1, 1, 1, 1])
+        with pytest.raises(ValueError):
+            buffer.view()[0, 1] = 5
+
+    def test_empty_buffer(self):
+        """Test an empty buffer"""
+        buffer = CandleBuffer(3)
+        assert buffer.last_timestamp() is None
+        assert len(buffer.view()) == 0
+
+
+class TestCandleCache:
+    """Test cases for CandleCache"""
+
+    @pytest.mark.asyncio
+    async def test_incremental_fetch(self, manager, now_ms):
+        """Test that the second call fetches only candles since the last one"""
+        exchange = manager.exchanges['binance']['instance']
+        start = now_ms - 99 * MINUTE
+        exchange.fetch_ohlcv.return_value = make_candles(start, 100)
+
+        candles = await manager.candle_cache.get('binance', 'BTC/USDT', '1m', 100)
+        assert len(candles) == 100
+        exchange.fetch_ohlcv.assert_called_once_with('BTC/USDT', '1m', since=None, limit=100)
+
+        # แท่งล่าสุดเปลี่ยนค่า และมีแท่งใหม่หนึ่งแท่ง
+        updated = make_candles(now_ms, 2, close=500.0)
+        exchange.fetch_ohlcv.return_value = updated
+        candles = await manager.candle_cache.get('binance', 'BTC/USDT', '1m', 100)
+
+        call = exchange.fetch_ohlcv.call_args
+        assert call.kwargs['since'] == now_ms
+        assert call.kwargs['limit'] <= 3
+        assert len(candles) == 100
+        assert candles[-2, 4] == 500.0
+        assert candles[-1, 0] == now_ms + MINUTE
+        assert candles[0, 0] == start + MINUTE
+        assert manager.candle_cache.stats['candles_fetched'] == 102
+
+    @pytest.mark.asyncio
+    async def test_older_candles_ignored(self, manager, now_ms):
+        """Test exchanges that return candles before since"""
+        exchange = manager.exchanges['binance']['instance']
+        exchange.fetch_ohlcv.return_value = make_candles(now_ms - 9 * MINUTE, 10)
+        await manager.candle_cache.get('binance', 'BTC/USDT', '1m', 10)
+
+        candles = await manager.candle_cache.get('binance', 'BTC/USDT', '1m', 10)
+        assert list(candles[:, 0]) == [now_ms - (9 - i) * MINUTE for i in range(10)]
+
+    @pytest.mark.asyncio
+    async def test_larger_limit_refetches(self, manager, now_ms):
+        """Test that asking for more history than stored does a full fetch"""
+        exchange = manager.exchanges['binance']['instance']
+        exchange.fetch_ohlcv.return_value = make_candles(now_ms - 49 * MINUTE, 50)
+        await manager.candle_cache.get('binance', 'BTC/USDT', '1m', 50)
+
+        exchange.fetch_ohlcv.return_value = make_candles(now_ms - 99 * MINUTE, 100)
+        candles = await manager.candle_cache.get('binance', 'BTC/USDT', '1m', 100)
+
+        assert exchange.fetch_ohlcv.call_args.kwargs == {'since': None, 'limit': 100}
+        assert len(candles) == 100
+        assert manager.candle_cache.stats['full_fetches'] == 2
+
+        # limit ที่น้อยกว่าเดิมใช้ข้อมูลที่มีอยู่
+        await manager.candle_cache.get('binance', 'BTC/USDT', '1m', 20)
+        assert manager.candle_cache.stats['incremental_fetches'] == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_series_refetches(self, manager, now_ms):
+        """Test that a gap longer than limit triggers a full fetch"""
+        exchange = manager.exchanges['binance']['instance']
+        exchange.fetch_ohlcv.return_value = make_candles(now_ms - 500 * MINUTE, 10)
+        await manager.candle_cache.get('binance', 'BTC/USDT', '1m', 10)
+
+        exchange.fetch_ohlcv.return_value = make_candles(now_ms - 9 * MINUTE, 10)
+        candles = await manager.candle_cache.get('binance', 'BTC/USDT', '1m', 10)
+
+        assert exchange.fetch_ohlcv.call_args.kwargs['since'] is None
+        assert candles[-1, 0] == now_ms
+
+    @pytest.mark.asyncio
+    async def test_fetch_failure(self, manager):
+        """Test that fetch errors return None"""
+        exchange = manager.exchanges['binance']['instance']
+        exchange.fetch_ohlcv.side_effect = Exception("API Error")
+        assert await manager.candle_cache.get('binance', 'BTC/USDT', '1m') is None
+        assert await manager.candle_cache.get_dataframe('binance', 'BTC/USDT', '1m') is None
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_fetch(self, manager, now_ms):
+        """Test that concurrent requests for one series fetch once"""
+        exchange = manager.exchanges['binance']['instance']
+        exchange.fetch_ohlcv.return_value = make_candles(now_ms - 9 * MINUTE, 10)
+
+        await asyncio.gather(*[manager.candle_cache.get('binance', 'BTC/USDT', '1m', 10) for _ in range(3)])
+        assert manager.candle_cache.stats['full_fetches'] == 1
+
+    @pytest.mark.asyncio
+    async def test_dataframe_shares_memory(self, manager, now_ms):
+        """Test that the DataFrame is a view of the buffer"""
+        exchange = manager.exchanges['binance']['instance']
+        exchange.fetch_ohlcv.return_value = make_candles(now_ms - 9 * MINUTE, 10)
+
+        df = await manager.candle_cache.get_dataframe('binance', 'BTC/USDT', '1m', 10)
+        buffer = manager.candle_cache.buffers[('binance', 'BTC/USDT', '1m')]
+
+        assert list(df.columns) == ['open', 'high', 'low', 'close', 'volume']
+        assert isinstance(df.index, pd.DatetimeIndex)
+        assert df.index[-1] == pd.to_datetime(now_ms, unit='ms')
+        assert np.shares_memory(df['close'].to_numpy(), buffer.data)
+
+    def test_invalidate(self, manager):
+        """Test clearing cached series"""
+        cache = manager.candle_cache
+        cache.buffers[('binance', 'BTC/USDT', '1m')] = CandleBuffer(2)
+        cache.buffers[('okx', 'BTC/USDT', '1m')] = CandleBuffer(2)
+
+        cache.invalidate('binance')
+        assert list(cache.buffers) == [('okx', 'BTC/USDT', '1m')]
+        assert cache.get_stats()['series'] == 1
+
+    def test_to_dataframe(self):
+        """Test array to DataFrame conversion"""
+        df = to_dataframe(np.array(make_candles(0, 3), dtype=np.float64))
+        assert len(df) == 3
+        assert df['close'].iloc[-1] == 102
@@ -0,0 +1,146 @@
+"""
+Tests for bots/candle_store.py
+"""
+
+import pytest
+import os
+import numpy as np
+from unittest.mock import Mock
+
+from bots.candle_store import CandleStore, HEADER, RECORD_SIZE
+from bots.candle_cache import CandleCache
+from bots.exchange_manager import ExchangeManager
+
+from .conftest import MINUTE, make_candles
+
+
+@pytest.fixture
+def store(temp_directory):
+    """CandleStore in a temporary directory"""
+    return CandleStore(os.path.join(temp_directory, "candles"))
+
+
+class TestCandleStore:
+    """Test cases for CandleStore"""
+
+    def test_append_and_read(self, store):
+        """Test round-tripping candles through the file"""
+        assert store.append('binance', 'BTC/USDT', '1m', make_candles(0, 5)) == 5
+
+        data = store.read('binance', 'BTC/USDT', '1m')
+        assert isinstance(data, np.memmap)
+        assert data.shape == (5, 6)
+        assert list(data[:, 0]) == [i * MINUTE for i in range(5)]
+        assert store.count('binance', 'BTC/USDT', '1m') == 5
+        assert store.first_timestamp('binance', 'BTC/USDT', '1m') == 0
+        assert store.last_timestamp('binance', 'BTC/USDT', '1m') == 4 * MINUTE
+        assert os.path.getsize(store.path('binance', 'BTC/USDT', '1m')) == HEADER.size + 5 * RECORD_SIZE
+
+    def test_append_only_newer(self, store):
+        """Test that overlapping candles are not written twice"""
+        store.append('binance', 'BTC/USDT', '1m', make_candles(0, 5))
+        assert store.append('binance', 'BTC/USDT', '1m', make_candles(3 * MINUTE, 4)) == 2
+        assert store.count('binance', 'BTC/USDT', '1m') == 7
+
+    def test_open_candle_not_written(self, store, now_ms):
+        """Test that the still-open candle is skipped by default"""
+        candles = make_candles(now_ms - 2 * MINUTE, 3)
+        assert store.append('binance', 'BTC/USDT', '1m', candles) == 2
+        assert store.last_timestamp('binance', 'BTC/USDT', '1m') == now_ms - MINUTE
+
+    def test_gap_not_appended(self, store):
+        """Test that a non-contiguous append is refused unless allowed"""
+        store.append('binance', 'BTC/USDT', '1m', make_candles(0, 2))
+        assert store.append('binance', 'BTC/USDT', '1m', make_candles(10 * MINUTE, 2)) == 0
+        assert store.append('binance', 'BTC/USDT', '1m', make_candles(10 * MINUTE, 2), allow_gap=True) == 2
+
+    def test_range_read(self, store):
+        """Test start/end range reads"""
+        store.append('binance', 'BTC/USDT', '1m', make_candles(0, 10))
+
+        data = store.read('binance', 'BTC/USDT', '1m', start=2 * MINUTE, end=5 * MINUTE)
+        assert list(data[:, 0]) == [2 * MINUTE, 3 * MINUTE, 4 * MINUTE]
+        assert len(store.read('binance', 'BTC/USDT', '1m', start=100 * MINUTE)) == 0
+        assert list(store.tail('binance', 'BTC/USDT', '1m', 2)[:, 0]) == [8 * MINUTE, 9 * MINUTE]
+
+    def test_read_is_read_only(self, store):
+        """Test that memory-mapped reads cannot modify the file"""
+        store.append('binance', 'BTC/USDT', '1m', make_candles(0, 2))
+        with pytest.raises(ValueError):
+            store.read('binance', 'BTC/USDT', '1m')[0, 1] = 0
+
+    def test_missing_series(self, store):
+        """Test reads for series that were never written"""
+        assert store.read('binance', 'ETH/USDT', '1m') is None
+        assert store.last_timestamp('binance', 'ETH/USDT', '1m') is None
+        assert store.count('binance', 'ETH/USDT', '1m') == 0
+
+    def test_partial_record_recovered(self, store):
+        """Test that a torn write is ignored and truncated on next append"""
+        store.append('binance', 'BTC/USDT', '1m', make_candles(0, 2))
+        with open(store.path('binance', 'BTC/USDT', '1m'), 'ab') as f:
+            f.write(b'\x00' * 10)
+
+        assert store.count('binance', 'BTC/USDT', '1m') == 2
+        assert store.append('binance', 'BTC/USDT', '1m', make_candles(2 * MINUTE, 1)) == 1
+        assert list(store.read('binance', 'BTC/USDT', '1m')[:, 0]) == [0, MINUTE, 2 * MINUTE]
+
+    def test_invalid_header(self, store):
+        """Test that unknown file formats are rejected"""
+        path = store.path('binance', 'BTC/USDT', '1m')
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(b'XXXX' + b'\x00' * (HEADER.size - 4 + RECORD_SIZE))
+        assert store.read('binance', 'BTC/USDT', '1m') is None
+
+    def test_prepend(self, store):
+        """Test adding older history in front of the file"""
+        store.append('binance', 'BTC/USDT', '1m', make_candles(5 * MINUTE, 3))
+        assert store.prepend('binance', 'BTC/USDT', '1m', make_candles(0, 6)) == 5
+        assert list(store.read('binance', 'BTC/USDT', '1m')[:, 0]) == [i * MINUTE for i in range(8)]
+
+    def test_series_listing(self, store):
+        """Test listing stored series"""
+        store.append('binance', 'BTC/USDT', '1h', make_candles(0, 1))
+        store.append('okx', 'ETH/USDT:USDT', '1m', make_candles(0, 1))
+        assert store.series() == [('binance', 'BTC_USDT', '1h'), ('okx', 'ETH_USDT_USDT', '1m')]
+
+
+class TestCandleCacheWithStore:
+    """Test that CandleCache persists to and warms up from the store"""
+
+    @pytest.mark.asyncio
+    async def test_restart_loads_history_from_disk(self, temp_config_file, store, now_ms):
+        """Test that a new cache reads stored bars and fetches only the gap"""
+        manager = ExchangeManager(temp_config_file)
+        exchange = Mock()
+        manager.exchanges['binance'] = {'instance': exchange}
+
+        exchange.fetch_ohlcv.return_value = make_candles(now_ms - 49 * MINUTE, 50)
+        await CandleCache(manager, store=store).get('binance', 'BTC/USDT', '1m', 50)
+        assert store.count('binance', 'BTC/USDT', '1m') == 49
+
+        # เริ่มระบบใหม่: แคชว่างแต่ไฟล์ยังอยู่
+        restarted = CandleCache(manager, store=store)
+        exchange.fetch_ohlcv.return_value = make_candles(now_ms, 1)
+        candles = await restarted.get('binance', 'BTC/USDT', '1m', 40)
+
+        assert restarted.stats['store_loads'] == 1
+        assert restarted.stats['full_fetches'] == 0
+        assert exchange.fetch_ohlcv.call_args.kwargs['since'] == now_ms - MINUTE
+        assert len(candles) == 40
+        assert candles[-1, 0] == now_ms
+
+    def test_manager_store_setting(self, temp_config_file, sample_config, temp_directory):
+        """Test candle_store_dir configuration"""
+        import json
+
+        assert ExchangeManager(temp_config_file).candle_store is None
+
+        sample_config['bot_settings']['candle_store_dir'] = os.path.join(temp_directory, "store")
+        config_path = os.path.join(temp_directory, "config.json")
+        with open(config_path, 'w') as f:
+            json.dump(sample_config, f)
+        manager = ExchangeManager(config_path)
+        assert manager.candle_cache.store is manager.candle_store
+        assert manager.candle_store.root.endswith("store")
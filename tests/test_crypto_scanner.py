@@ -10,6 +10,7 @@ from unittest.mock import Mock, patch, AsyncMock
 import asyncio
 import json
 import os
+import time
 
 from bots.crypto_scanner import (
     CryptoPairsScanner, MACDSignal, ScannerConfig,
@@ -566,6 +567,30 @@ class TestCryptoPairsScanner:
         scanner.scan_all_pairs.assert_called()
         scanner.print_scan_results.assert_called()
     
+    @pytest.mark.asyncio
+    async def test_continuous_scan_aligned_to_closes(self, temp_config_file):
+        """Test that later rounds scan only the timeframes the scheduler reports as closed"""
+        scanner = CryptoPairsScanner(temp_config_file)
+        scanner.update_config(timeframes=['1h', '4h', '1d'])
+        scanner.print_scan_results = Mock()
+        scanner.get_top_signals = Mock(return_value=[])
+        
+        rounds = []
+        
+        async def scan_all_pairs(timeframes=None, on_signal=None):
+            rounds.append(timeframes)
+            if len(rounds) == 3:
+                scanner.stop_scanning()
+            return {}
+        scanner.scan_all_pairs = scan_all_pairs
+        
+        with patch('bots.crypto_scanner.CloseScheduler.advance',
+                   side_effect=[(time.time(), ['1h']), (time.time(), ['1h', '4h'])]):
+            await asyncio.wait_for(scanner.start_continuous_scan(), timeout=5)
+        
+        assert rounds == [['1h', '4h', '1d'], ['1h'], ['1h', '4h']]
+        assert scanner.is_scanning is False
+    
     def test_stop_scanning(self, temp_config_file):
         """Test stopping scan"""
         scanner = CryptoPairsScanner(temp_config_file)
@@ -576,6 +601,200 @@ class TestCryptoPairsScanner:
         assert scanner.is_scanning is False
 
 
+def make_signal(symbol, strength=70.0):
+    return MACDSignal(symbol, 'binance', '1h', 'long', 0.001, 0.0005, 0.0005, 100.0, 1000000.0,
+                      datetime.now(), strength)
+
+
+class TestScanStream:
+    """Test cases for the streaming scan"""
+
+    def make_scanner(self, temp_config_file, pairs, concurrency=50):
+        scanner = CryptoPairsScanner(temp_config_file)
+        scanner.exchange_manager.get_enabled_exchanges = Mock(return_value=['binance'])
+        scanner.update_config(exchanges=['binance'], trading_pairs=pairs, max_concurrent_pairs=concurrency)
+        return scanner
+
+    @pytest.mark.asyncio
+    async def test_yields_before_slow_pairs_finish(self, temp_config_file):
+        """Test that a fast pair's signal arrives while a slow pair is still running"""
+        scanner = self.make_scanner(temp_config_file, ['SLOW/USDT', 'FAST/USDT'])
+        release = asyncio.Event()
+
+        async def scan_pair(exchange_name, symbol, timeframes):
+            if symbol == 'SLOW/USDT':
+                await release.wait()
+            return [make_signal(symbol)]
+        scanner._scan_pair = scan_pair
+
+        stream = scanner.scan_stream(['1h'])
+        first = await stream.__anext__()
+        assert first.symbol == 'FAST/USDT'
+        assert not release.is_set()
+
+        release.set()
+        assert [signal.symbol async for signal in stream] == ['SLOW/USDT']
+
+    @pytest.mark.asyncio
+    async def test_bounded_concurrency(self, temp_config_file):
+        scanner = self.make_scanner(temp_config_file, [f"C{i}/USDT" for i in range(10)], concurrency=3)
+        active, peak = 0, 0
+
+        async def scan_pair(exchange_name, symbol, timeframes):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return [make_signal(symbol)]
+        scanner._scan_pair = scan_pair
+
+        signals = [signal async for signal in scanner.scan_stream(['1h'])]
+        assert len(signals) == 10
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_failed_pair_does_not_stop_stream(self, temp_config_file):
+        scanner = self.make_scanner(temp_config_file, ['BAD/USDT', 'GOOD/USDT'])
+
+        async def scan_pair(exchange_name, symbol, timeframes):
+            if symbol == 'BAD/USDT':
+                raise RuntimeError('boom')
+            return [make_signal(symbol)]
+        scanner._scan_pair = scan_pair
+
+        assert [signal.symbol async for signal in scanner.scan_stream(['1h'])] == ['GOOD/USDT']
+
+    @pytest.mark.asyncio
+    async def test_closing_stream_cancels_pending(self, temp_config_file):
+        scanner = self.make_scanner(temp_config_file, ['FAST/USDT', 'SLOW/USDT'])
+        cancelled = asyncio.Event()
+
+        async def scan_pair(exchange_name, symbol, timeframes):
+            if symbol == 'SLOW/USDT':
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+            return [make_signal(symbol)]
+        scanner._scan_pair = scan_pair
+
+        stream = scanner.scan_stream(['1h'])
+        await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0)
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_scan_all_pairs_on_signal(self, temp_config_file):
+        """Test that on_signal (sync or async) sees every signal and results are still grouped"""
+        scanner = self.make_scanner(temp_config_file, ['BTC/USDT', 'ETH/USDT'])
+        strengths = {'BTC/USDT': 60.0, 'ETH/USDT': 90.0}
+        scanner._scan_pair = AsyncMock(side_effect=lambda exchange_name, symbol, timeframes:
+                                       [make_signal(symbol, strengths[symbol])])
+
+        seen = []
+        results = await scanner.scan_all_pairs(['1h'], on_signal=seen.append)
+        assert sorted(signal.symbol for signal in seen) == ['BTC/USDT', 'ETH/USDT']
+        assert [signal.symbol for signal in results['binance_1h']] == ['ETH/USDT', 'BTC/USDT']
+
+        handler = AsyncMock()
+        await scanner.scan_all_pairs(['1h'], on_signal=handler)
+        assert handler.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_per_exchange_limit_and_stats(self, temp_config_file):
+        """Test the per-exchange limit, pair timeout and progress numbers"""
+        scanner = self.make_scanner(temp_config_file, [f"C{i}/USDT" for i in range(6)] + ['HANG/USDT'])
+        scanner.exchange_manager.get_enabled_exchanges = Mock(return_value=['binance', 'okx'])
+        scanner.update_config(exchanges=['binance', 'okx'], max_concurrent_per_exchange=2,
+                              exchange_concurrency={'okx': 1}, pair_timeout=0.1)
+        active, peak = {}, {}
+
+        async def scan_pair(exchange_name, symbol, timeframes):
+            active[exchange_name] = active.get(exchange_name, 0) + 1
+            peak[exchange_name] = max(peak.get(exchange_name, 0), active[exchange_name])
+            try:
+                await asyncio.sleep(10 if symbol == 'HANG/USDT' else 0.005)
+            finally:
+                active[exchange_name] -= 1
+            return [make_signal(symbol)]
+        scanner._scan_pair = scan_pair
+
+        await scanner.scan_all_pairs(['1h'])
+
+        assert peak == {'binance': 2, 'okx': 1}
+        stats = scanner.get_scan_stats()
+        assert (stats['total'], stats['done'], stats['failed'], stats['timed_out']) == (14, 14, 2, 2)
+        assert stats['exchanges']['okx']['peak'] == 1
+        assert len(scanner.get_top_signals(limit=20)) == 12
+
+
+class TestUniverse:
+    """Test cases for universe mode"""
+
+    def make_scanner(self, temp_config_file, tickers):
+        scanner = CryptoPairsScanner(temp_config_file)
+        scanner.exchange_manager.get_enabled_exchanges = Mock(return_value=['binance'])
+        scanner.exchange_manager.load_markets = AsyncMock(return_value={
+            symbol: {'symbol': symbol, 'spot': True, 'active': True, 'quote': symbol.split('/')[1]}
+            for symbol in ['AAA/USDT', 'BBB/USDT', 'CCC/USDT', 'DDD/BTC']
+        })
+        scanner.exchange_manager.ticker_hub.refresh_all = AsyncMock(return_value=tickers)
+        scanner.update_config(exchanges=['binance'], universe=True, min_volume_24h=100000)
+        return scanner
+
+    @pytest.mark.asyncio
+    async def test_resolve_pairs_prefilters_by_quote_volume(self, temp_config_file):
+        scanner = self.make_scanner(temp_config_file, {
+            'AAA/USDT': {'quoteVolume': 2e5}, 'BBB/USDT': {'quoteVolume': 5e4},
+            'CCC/USDT': {'quoteVolume': 9e5}, 'DDD/BTC': {'quoteVolume': 1e9},
+        })
+
+        assert await scanner.resolve_pairs('binance') == ['CCC/USDT', 'AAA/USDT']
+        scanner.update_config(max_pairs=1)
+        assert await scanner.resolve_pairs('binance') == ['CCC/USDT']
+
+    @pytest.mark.asyncio
+    async def test_pairs_leaving_universe_drop_indicator_state(self, temp_config_file, sample_ohlcv_data):
+        """Test that indicator state is evicted for pairs that no longer pass the filter"""
+        scanner = self.make_scanner(temp_config_file, {
+            'AAA/USDT': {'quoteVolume': 2e5}, 'CCC/USDT': {'quoteVolume': 9e5},
+        })
+        for symbol in ['AAA/USDT', 'CCC/USDT']:
+            scanner.calculate_macd(sample_ohlcv_data.copy(), ('binance', symbol, '1h'))
+        scanner.calculate_macd(sample_ohlcv_data.copy(), ('okx', 'AAA/USDT', '1h'))
+
+        scanner.update_config(max_pairs=1)
+        assert await scanner.resolve_pairs('binance') == ['CCC/USDT']
+        assert set(scanner.indicators.series) == {('binance', 'CCC/USDT', '1h'), ('okx', 'AAA/USDT', '1h')}
+
+    @pytest.mark.asyncio
+    async def test_only_survivors_are_fetched(self, temp_config_file):
+        """Test that pairs below the volume threshold never reach the OHLCV fetch"""
+        scanner = self.make_scanner(temp_config_file, {
+            'AAA/USDT': {'quoteVolume': 2e5}, 'BBB/USDT': {'quoteVolume': 5e4}, 'CCC/USDT': {'quoteVolume': 9e5},
+        })
+        scanner.fetch_timeframes = AsyncMock(return_value={})
+
+        await scanner.scan_all_pairs(['1h'])
+
+        fetched = sorted(call.args[1] for call in scanner.fetch_timeframes.await_args_list)
+        assert fetched == ['AAA/USDT', 'CCC/USDT']
+        scanner.exchange_manager.ticker_hub.refresh_all.assert_awaited_once_with('binance')
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_configured_pairs(self, temp_config_file):
+        """Test that missing tickers fall back to trading_pairs instead of scanning everything"""
+        scanner = self.make_scanner(temp_config_file, {})
+        assert await scanner.resolve_pairs('binance') == scanner.config.trading_pairs
+
+        scanner.update_config(universe=False)
+        scanner.exchange_manager.load_markets.reset_mock()
+        assert await scanner.resolve_pairs('binance') == scanner.config.trading_pairs
+        scanner.exchange_manager.load_markets.assert_not_called()
+
 class TestRunSingleScan:
     """Test cases for run_single_scan function"""
     
@@ -584,6 +803,7 @@ class TestRunSingleScan:
         """Test successful single scan run"""
         with patch('bots.crypto_scanner.CryptoPairsScanner') as mock_scanner_class:
             mock_scanner = Mock()
+            mock_scanner.exchange_manager.close_all_connections_async = AsyncMock()
             mock_scanner.initialize = AsyncMock(return_value=True)
             mock_scanner.scan_all_pairs = AsyncMock(return_value={'binance_1h': []})
             mock_scanner.print_scan_results = Mock()
@@ -599,12 +819,30 @@ class TestRunSingleScan:
             mock_scanner.scan_all_pairs.assert_called_once()
             mock_scanner.print_scan_results.assert_called_once()
             mock_scanner.export_signals_to_json.assert_called_once()
+            mock_scanner.exchange_manager.close_all_connections_async.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_run_single_scan_releases_resources_on_error(self):
+        """Test that sessions and the process pool are closed when the scan raises"""
+        with patch('bots.crypto_scanner.CryptoPairsScanner') as mock_scanner_class:
+            mock_scanner = Mock()
+            mock_scanner.exchange_manager.close_all_connections_async = AsyncMock()
+            mock_scanner.initialize = AsyncMock(return_value=True)
+            mock_scanner.scan_all_pairs = AsyncMock(side_effect=RuntimeError('boom'))
+            mock_scanner_class.return_value = mock_scanner
+            
+            with pytest.raises(RuntimeError):
+                await run_single_scan(workers=2)
+            
+            mock_scanner.parallel.close.assert_called_once()
+            mock_scanner.exchange_manager.close_all_connections_async.assert_awaited_once()
     
     @pytest.mark.asyncio
     async def test_run_single_scan_initialization_failure(self):
         """Test single scan run with initialization failure"""
         with patch('bots.crypto_scanner.CryptoPairsScanner') as mock_scanner_class:
             mock_scanner = Mock()
+            mock_scanner.exchange_manager.close_all_connections_async = AsyncMock()
             mock_scanner.initialize = AsyncMock(return_value=False)
             mock_scanner_class.return_value = mock_scanner
             
@@ -613,6 +851,7 @@ class TestRunSingleScan:
             assert result is None
             mock_scanner.initialize.assert_called_once()
             mock_scanner.scan_all_pairs.assert_not_called()
+            mock_scanner.exchange_manager.close_all_connections_async.assert_awaited_once()
 
 
 class TestRunContinuousScan:
@@ -623,6 +862,7 @@ class TestRunContinuousScan:
         """Test successful continuous scan run"""
         with patch('bots.crypto_scanner.CryptoPairsScanner') as mock_scanner_class:
             mock_scanner = Mock()
+            mock_scanner.exchange_manager.close_all_connections_async = AsyncMock()
             mock_scanner.initialize = AsyncMock(return_value=True)
             mock_scanner.start_continuous_scan = AsyncMock()
             mock_scanner_class.return_value = mock_scanner
@@ -634,12 +874,14 @@ class TestRunContinuousScan:
             
             mock_scanner.initialize.assert_called_once()
             mock_scanner.start_continuous_scan.assert_called_once_with(1)
+            mock_scanner.exchange_manager.close_all_connections_async.assert_awaited_once()
     
     @pytest.mark.asyncio
     async def test_run_continuous_scan_initialization_failure(self):
         """Test continuous scan run with initialization failure"""
         with patch('bots.crypto_scanner.CryptoPairsScanner') as mock_scanner_class:
             mock_scanner = Mock()
+            mock_scanner.exchange_manager.close_all_connections_async = AsyncMock()
             mock_scanner.initialize = AsyncMock(return_value=False)
             mock_scanner_class.return_value = mock_scanner
             
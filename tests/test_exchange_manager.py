@@ -7,8 +7,11 @@ import json
 import os
 from unittest.mock import Mock, patch, AsyncMock
 import asyncio
+import time
 
-from bots.exchange_manager import ExchangeManager
+from bots.exchange_manager import (
+    ExchangeManager, get_shared_exchange_manager, reset_shared_exchange_managers
+)
 
 
 class TestExchangeManager:
@@ -67,7 +70,8 @@ class TestExchangeManager:
         assert 'apiKey' in call_args
         assert 'secret' in call_args
         assert call_args['sandbox'] is True
-        assert call_args['enableRateLimit'] is True
+        # RateLimitScheduler เป็นผู้จำกัดอัตราเพียงชั้นเดียว
+        assert call_args['enableRateLimit'] is False
     
     @patch('ccxt.binance')
     def test_initialize_cex_no_credentials(self, mock_binance_class, sample_config):
@@ -453,6 +457,577 @@ class TestExchangeManager:
         mock_exchange2.close.assert_called_once()
 
 
+class TestExchangeManagerAsyncBackend:
+    """Test cases for the ccxt.async_support backend"""
+    
+    def test_backend_defaults_to_sync(self, temp_config_file):
+        """Test that the sync backend is used when nothing is configured"""
+        manager = ExchangeManager(temp_config_file)
+        assert manager.backend == 'sync'
+    
+    def test_backend_from_config(self, sample_config, temp_directory):
+        """Test backend selection from bot_settings"""
+        sample_config['bot_settings']['exchange_backend'] = 'async'
+        config_path = os.path.join(temp_directory, "config.json")
+        with open(config_path, 'w') as f:
+            json.dump(sample_config, f)
+        
+        assert ExchangeManager(config_path).backend == 'async'
+        assert ExchangeManager(config_path, backend='sync').backend == 'sync'
+    
+    @patch('ccxt.async_support.binance')
+    def test_initialize_cex_async_backend(self, mock_binance_class, sample_config):
+        """Test that the async backend creates async instances without blocking calls"""
+        mock_exchange = Mock()
+        mock_binance_class.return_value = mock_exchange
+        
+        manager = ExchangeManager(backend='async')
+        result = manager._initialize_cex('binance', sample_config['exchanges']['binance'])
+        
+        assert result is True
+        assert manager.exchanges['binance']['instance'] is mock_exchange
+        mock_exchange.fetch_balance.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_initialize_exchanges_async(self, sample_config, temp_directory):
+        """Test async initialization verifies credentials with awaited calls"""
+        sample_config['bot_settings']['lazy_init'] = False
+        config_path = os.path.join(temp_directory, "config.json")
+        with open(config_path, 'w') as f:
+            json.dump(sample_config, f)
+        
+        mock_exchange = Mock()
+        mock_exchange.fetch_balance = AsyncMock(return_value={'total': {}})
+        
+        with patch('ccxt.async_support.binance', return_value=mock_exchange):
+            manager = ExchangeManager(config_path, backend='async')
+            result = await manager.initialize_exchanges_async()
+        
+        assert result is True
+        assert 'binance' in manager.exchanges
+        mock_exchange.fetch_balance.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_initialize_exchanges_async_verify_failure(self, sample_config, temp_directory):
+        """Test that an exchange failing verification is dropped and closed"""
+        sample_config['bot_settings']['lazy_init'] = False
+        config_path = os.path.join(temp_directory, "config.json")
+        with open(config_path, 'w') as f:
+            json.dump(sample_config, f)
+        
+        mock_exchange = Mock()
+        mock_exchange.fetch_balance = AsyncMock(side_effect=Exception("Invalid key"))
+        mock_exchange.close = AsyncMock()
+        
+        with patch('ccxt.async_support.binance', return_value=mock_exchange):
+            manager = ExchangeManager(config_path, backend='async')
+            result = await manager.initialize_exchanges_async()
+        
+        assert result is False
+        assert 'binance' not in manager.exchanges
+        mock_exchange.close.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_async_calls_overlap(self):
+        """Test that concurrent requests on the async backend overlap"""
+        manager = ExchangeManager()
+        
+        async def slow_ticker(symbol):
+            await asyncio.sleep(0.1)
+            return {'symbol': symbol, 'last': 1.0}
+        
+        mock_exchange = Mock()
+        mock_exchange.fetch_ticker = slow_ticker
+        manager.exchanges['binance'] = {'instance': mock_exchange}
+        
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        results = await asyncio.gather(*[
+            manager.fetch_ticker('binance', f"COIN{i}/USDT") for i in range(10)
+        ])
+        elapsed = loop.time() - started
+        
+        assert [r['symbol'] for r in results] == [f"COIN{i}/USDT" for i in range(10)]
+        assert elapsed < 0.5
+    
+    @pytest.mark.asyncio
+    async def test_fetch_ohlcv_success(self):
+        """Test OHLCV fetching through the manager"""
+        manager = ExchangeManager()
+        mock_exchange = Mock()
+        candles = [[1640995200000, 1.0, 2.0, 0.5, 1.5, 100.0]]
+        mock_exchange.fetch_ohlcv = AsyncMock(return_value=candles)
+        manager.exchanges['binance'] = {'instance': mock_exchange}
+        
+        result = await manager.fetch_ohlcv('binance', 'BTC/USDT', '1h', 50)
+        assert result == candles
+        mock_exchange.fetch_ohlcv.assert_awaited_once_with('BTC/USDT', '1h', since=None, limit=50)
+    
+    @pytest.mark.asyncio
+    async def test_fetch_ohlcv_failure(self):
+        """Test OHLCV fetching failure returns None"""
+        manager = ExchangeManager()
+        mock_exchange = Mock()
+        mock_exchange.fetch_ohlcv.side_effect = Exception("API Error")
+        manager.exchanges['binance'] = {'instance': mock_exchange}
+        
+        assert await manager.fetch_ohlcv('binance', 'BTC/USDT', '1h') is None
+        assert await manager.fetch_ohlcv('nonexistent', 'BTC/USDT', '1h') is None
+    
+    @pytest.mark.asyncio
+    async def test_load_markets(self):
+        """Test that loaded markets are reused and missing ones are loaded once"""
+        manager = ExchangeManager()
+        loaded = Mock()
+        loaded.markets = {'BTC/USDT': {'symbol': 'BTC/USDT'}}
+        fresh = Mock()
+        fresh.markets = None
+        fresh.load_markets = AsyncMock(return_value={'ETH/USDT': {'symbol': 'ETH/USDT'}})
+        manager.exchanges['binance'] = {'instance': loaded}
+        manager.exchanges['okx'] = {'instance': fresh}
+        
+        assert await manager.load_markets('binance') == loaded.markets
+        assert list(await manager.load_markets('okx')) == ['ETH/USDT']
+        fresh.load_markets.assert_awaited_once()
+        
+        fresh.markets = None
+        fresh.load_markets.side_effect = Exception("API Error")
+        assert await manager.load_markets('okx') is None
+        assert await manager.load_markets('nonexistent') is None
+    
+    @pytest.mark.asyncio
+    async def test_fetch_and_cancel_order(self):
+        """Test order status and cancellation through the manager"""
+        manager = ExchangeManager()
+        mock_exchange = Mock()
+        mock_exchange.fetch_order = AsyncMock(return_value={'id': '1', 'status': 'open'})
+        mock_exchange.cancel_order = AsyncMock(return_value={'id': '1', 'status': 'canceled'})
+        manager.exchanges['binance'] = {'instance': mock_exchange}
+        
+        order = await manager.fetch_order('binance', '1', 'BTC/USDT')
+        assert order['status'] == 'open'
+        
+        canceled = await manager.cancel_order('binance', '1', 'BTC/USDT')
+        assert canceled['status'] == 'canceled'
+        mock_exchange.cancel_order.assert_awaited_once_with('1', 'BTC/USDT')
+    
+    @pytest.mark.asyncio
+    async def test_fetch_balance_async(self, sample_balance_data):
+        """Test awaiting balances from the async backend"""
+        manager = ExchangeManager()
+        mock_exchange = Mock()
+        mock_exchange.fetch_balance = AsyncMock(return_value=sample_balance_data)
+        manager.exchanges['binance'] = {'instance': mock_exchange}
+        
+        assert await manager.fetch_balance('binance') == sample_balance_data
+        assert await manager.fetch_balance('nonexistent') is None
+    
+    def test_get_balance_rejects_async_backend(self):
+        """Test that the sync balance API does not leak coroutines"""
+        manager = ExchangeManager()
+        mock_exchange = Mock()
+        mock_exchange.fetch_balance = AsyncMock(return_value={'total': {}})
+        manager.exchanges['binance'] = {'instance': mock_exchange}
+        
+        assert manager.get_balance('binance') is None
+    
+    @pytest.mark.asyncio
+    async def test_close_all_connections_async(self):
+        """Test closing async sessions from inside the event loop"""
+        manager = ExchangeManager()
+        mock_exchange = Mock()
+        mock_exchange.close = AsyncMock()
+        manager.exchanges['binance'] = {'instance': mock_exchange}
+        
+        await manager.close_all_connections_async()
+        mock_exchange.close.assert_awaited_once()
+
+
+class TestExchangeManagerRateLimit:
+    """Test cases for the per-exchange rate-limit scheduler"""
+    
+    def test_scheduler_sized_from_rate_limit(self):
+        """Test that the scheduler uses ccxt rateLimit and config overrides"""
+        manager = ExchangeManager()
+        mock_exchange = Mock()
+        mock_exchange.rateLimit = 100
+        manager.exchanges['binance'] = {'instance': mock_exchange, 'config': {'rate_limit_capacity': 5}}
+        manager.exchanges['okx'] = {'instance': Mock(), 'config': {'rate_limit_ms': 250}}
+        
+        binance = manager._get_scheduler('binance')
+        assert binance.rate == pytest.approx(10.0)
+        assert binance.capacity == 5
+        assert manager._get_scheduler('binance') is binance
+        assert manager._get_scheduler('okx').rate == pytest.approx(4.0)
+    
+    def test_scheduler_without_numeric_rate_limit(self):
+        """Test that instances without a numeric rateLimit are not throttled"""
+        manager = ExchangeManager()
+        manager.exchanges['binance'] = {'instance': Mock()}
+        
+        assert manager._get_scheduler('binance').rate is None
+    
+    @pytest.mark.asyncio
+    async def test_bulk_call_uses_its_weight(self):
+        """Test that fetch_tickers without symbols pays its no-symbol cost"""
+        manager = ExchangeManager()
+        mock_exchange = Mock()
+        mock_exchange.rateLimit = 2
+        mock_exchange.fetch_tickers = AsyncMock(return_value={})
+        manager.exchanges['binance'] = {'instance': mock_exchange, 'config': {}}
+        
+        start = time.monotonic()
+        await manager._call('binance', 'fetch_tickers')
+        await manager._call('binance', 'fetch_tickers')
+        # 2 × 16 tokens ที่ 500 tokens/วินาที
+        assert time.monotonic() - start >= 0.05
+    
+    def test_sync_balance_goes_through_scheduler(self):
+        """Test that the sync get_balance path is metered"""
+        manager = ExchangeManager()
+        mock_exchange = Mock()
+        mock_exchange.rateLimit = 10
+        mock_exchange.fetch_balance.return_value = {'free': {}}
+        manager.exchanges['binance'] = {'instance': mock_exchange, 'config': {}}
+        
+        start = time.monotonic()
+        manager.get_balance('binance')
+        manager.get_balance('binance')
+        assert time.monotonic() - start >= 0.035
+        assert manager.get_scheduler_stats()['binance']['order_status']['completed'] == 2
+    
+    @pytest.mark.asyncio
+    async def test_calls_are_routed_through_lanes(self, sample_ohlcv_data):
+        """Test that each API call is counted in its priority lane"""
+        manager = ExchangeManager()
+        mock_exchange = Mock()
+        mock_exchange.rateLimit = 1
+        mock_exchange.fetch_ohlcv = AsyncMock(return_value=sample_ohlcv_data)
+        mock_exchange.fetch_ticker = AsyncMock(return_value={'last': 1})
+        mock_exchange.fetch_order = AsyncMock(return_value={'status': 'open'})
+        mock_exchange.create_limit_buy_order = AsyncMock(return_value={'id': '1'})
+        manager.exchanges['binance'] = {'instance': mock_exchange, 'config': {}}
+        
+        await manager.fetch_ohlcv('binance', 'BTC/USDT', '1h', 100)
+        await manager.fetch_ticker('binance', 'BTC/USDT')
+        await manager.fetch_order('binance', '1', 'BTC/USDT')
+        await manager.place_order('binance', 'BTC/USDT', 'limit', 'buy', 0.1, 50000)
+        
+        stats = manager.get_scheduler_stats()['binance']
+        assert stats['ohlcv']['completed'] == 1
+        assert stats['ticker']['completed'] == 1
+        assert stats['order_status']['completed'] == 1
+        assert stats['order']['completed'] == 1
+    
+    @pytest.mark.asyncio
+    async def test_orders_not_starved_by_scan(self, sample_ohlcv_data):
+        """Test that an order placed during a large scan is served first"""
+        manager = ExchangeManager()
+        mock_exchange = Mock()
+        mock_exchange.rateLimit = 20
+        mock_exchange.fetch_ohlcv = AsyncMock(return_value=sample_ohlcv_data)
+        mock_exchange.create_market_buy_order = AsyncMock(return_value={'id': '1'})
+        manager.exchanges['binance'] = {'instance': mock_exchange, 'config': {}}
+        
+        scan = [asyncio.create_task(manager.fetch_ohlcv('binance', f'PAIR{i}/USDT')) for i in range(10)]
+        await asyncio.sleep(0)
+        
+        start = asyncio.get_running_loop().time()
+        await manager.place_order('binance', 'BTC/USDT', 'market', 'buy', 0.1)
+        order_latency = asyncio.get_running_loop().time() - start
+        
+        # ออเดอร์ต้องรอ token เดียว ไม่ใช่ต่อท้ายคิวสแกนทั้ง 10 รายการ
+        assert order_latency < 0.1
+        await asyncio.gather(*scan)
+        assert manager.get_scheduler_stats()['binance']['ohlcv']['completed'] == 10
+
+
+class TestExchangeManagerStartup:
+    """Test cases for parallel, lazy initialization and startup timings"""
+    
+    @staticmethod
+    def _write_config(sample_config, temp_directory, names, **settings):
+        for name in names:
+            sample_config['exchanges'][name] = dict(sample_config['exchanges']['binance'])
+        sample_config['bot_settings'].update(settings)
+        config_path = os.path.join(temp_directory, "config.json")
+        with open(config_path, 'w') as f:
+            json.dump(sample_config, f)
+        return config_path
+    
+    def test_exchanges_initialize_concurrently(self, sample_config, temp_directory):
+        """Test that slow handshakes overlap instead of adding up"""
+        config_path = self._write_config(sample_config, temp_directory, ['okx', 'kucoin'])
+        manager = ExchangeManager(config_path)
+        
+        def slow_init(name, config, verify=True):
+            time.sleep(0.2)
+            manager.exchanges[name] = {'instance': Mock(), 'config': config, 'type': 'cex'}
+            return True
+        
+        with patch.object(manager, '_initialize_cex', side_effect=slow_init):
+            start = time.perf_counter()
+            assert manager.initialize_exchanges() is True
+            elapsed = time.perf_counter() - start
+        
+        assert elapsed < 0.5
+        report = manager.get_startup_report()
+        assert set(report) == {'binance', 'okx', 'kucoin'}
+        assert all(timing['status'] == 'ok' and timing['ms'] >= 150 for timing in report.values())
+    
+    @patch('ccxt.binance')
+    def test_lazy_init_defers_balance(self, mock_binance_class, sample_config, temp_directory):
+        """Test that lazy mode skips the fetch_balance handshake"""
+        mock_exchange = Mock()
+        mock_binance_class.return_value = mock_exchange
+        config_path = self._write_config(sample_config, temp_directory, [])
+        
+        manager = ExchangeManager(config_path)
+        assert manager.initialize_exchanges() is True
+        mock_exchange.fetch_balance.assert_not_called()
+        mock_exchange.load_markets.assert_not_called()
+    
+    @patch('ccxt.binance')
+    def test_eager_init_verifies_balance(self, mock_binance_class, sample_config, temp_directory):
+        """Test that lazy_init=false keeps the startup credential check"""
+        mock_exchange = Mock()
+        mock_exchange.fetch_balance.return_value = {'total': {}}
+        mock_binance_class.return_value = mock_exchange
+        config_path = self._write_config(sample_config, temp_directory, [], lazy_init=False)
+        
+        manager = ExchangeManager(config_path)
+        assert manager.initialize_exchanges() is True
+        mock_exchange.fetch_balance.assert_called_once()
+    
+    def test_init_timeout(self, sample_config, temp_directory):
+        """Test that a hung exchange is dropped without blocking the others"""
+        config_path = self._write_config(sample_config, temp_directory, ['okx'], init_timeout=0.1)
+        manager = ExchangeManager(config_path)
+        
+        def init(name, config, verify=True):
+            if name == 'okx':
+                time.sleep(0.3)
+            manager.exchanges[name] = {'instance': Mock(), 'config': config, 'type': 'cex'}
+            return True
+        
+        with patch.object(manager, '_initialize_cex', side_effect=init):
+            start = time.perf_counter()
+            assert manager.initialize_exchanges() is True
+            assert time.perf_counter() - start < 0.25
+            
+            report = manager.get_startup_report()
+            assert report['binance']['status'] == 'ok'
+            assert report['okx']['status'] == 'timeout'
+            
+            # การเชื่อมต่อที่เสร็จหลังหมดเวลาต้องไม่ถูกนำมาใช้
+            time.sleep(0.4)
+        
+        assert manager.get_enabled_exchanges() == ['binance']
+    
+    @pytest.mark.asyncio
+    async def test_async_init_timeout(self, sample_config, temp_directory):
+        """Test that a hanging async verification is abandoned and closed"""
+        config_path = self._write_config(sample_config, temp_directory, [],
+                                         lazy_init=False, init_timeout=0.1)
+        
+        async def hang():
+            await asyncio.sleep(1)
+        
+        mock_exchange = Mock()
+        mock_exchange.fetch_balance = AsyncMock(side_effect=hang)
+        mock_exchange.close = AsyncMock()
+        
+        with patch('ccxt.async_support.binance', return_value=mock_exchange):
+            manager = ExchangeManager(config_path, backend='async')
+            assert await manager.initialize_exchanges_async() is False
+        
+        assert 'binance' not in manager.exchanges
+        assert manager.get_startup_report()['binance']['status'] == 'timeout'
+        mock_exchange.close.assert_awaited_once()
+
+
+class TestExchangeManagerBatchOrders:
+    """Test cases for batch order placement and cancellation"""
+    
+    @staticmethod
+    def _manager(has, **config):
+        manager = ExchangeManager()
+        mock_exchange = Mock()
+        mock_exchange.has = has
+        manager.exchanges['binance'] = {'instance': mock_exchange, 'config': config}
+        return manager, mock_exchange
+    
+    @pytest.mark.asyncio
+    async def test_place_orders_native_batch(self):
+        """Test that create_orders is used per symbol and results keep request order"""
+        manager, exchange = self._manager({'createOrders': True})
+        exchange.create_orders = AsyncMock(side_effect=lambda requests: [
+            {'id': f"{r['symbol']}-{r['side']}"} if r['amount'] > 0 else {'info': 'rejected'} for r in requests
+        ])
+        
+        results = await manager.place_orders_batch('binance', [
+            {'symbol': 'BTC/USDT', 'side': 'buy', 'amount': 1, 'price': 100},
+            {'symbol': 'ETH/USDT', 'side': 'buy', 'amount': 1, 'price': 10},
+            {'symbol': 'BTC/USDT', 'side': 'sell', 'amount': 0, 'price': 110},
+        ])
+        
+        assert exchange.create_orders.await_count == 2
+        assert [r and r['id'] for r in results] == ['BTC/USDT-buy', 'ETH/USDT-buy', None]
+        first_batch = exchange.create_orders.await_args_list[0].args[0]
+        assert first_batch[0] == {'symbol': 'BTC/USDT', 'type': 'limit', 'side': 'buy',
+                                  'amount': 1, 'price': 100, 'params': {}}
+    
+    @pytest.mark.asyncio
+    async def test_place_orders_respects_batch_size(self):
+        """Test that large ladders are split by max_batch_orders"""
+        manager, exchange = self._manager({'createOrders': True}, max_batch_orders=2)
+        exchange.create_orders = AsyncMock(side_effect=lambda requests: [{'id': str(r['price'])} for r in requests])
+        
+        orders = [{'symbol': 'BTC/USDT', 'side': 'buy', 'amount': 1, 'price': p} for p in range(5)]
+        results = await manager.place_orders_batch('binance', orders)
+        
+        assert exchange.create_orders.await_count == 3
+        assert [r['id'] for r in results] == ['0', '1', '2', '3', '4']
+    
+    @pytest.mark.asyncio
+    async def test_place_orders_fallback(self):
+        """Test concurrent single orders when create_orders is unsupported"""
+        manager, exchange = self._manager({})
+        exchange.create_limit_buy_order = AsyncMock(return_value={'id': 'b'})
+        exchange.create_limit_sell_order = AsyncMock(side_effect=Exception("insufficient balance"))
+        
+        results = await manager.place_orders_batch('binance', [
+            {'symbol': 'BTC/USDT', 'side': 'buy', 'amount': 1, 'price': 100},
+            {'symbol': 'BTC/USDT', 'side': 'sell', 'amount': 1, 'price': 110},
+        ])
+        
+        assert results == [{'id': 'b'}, None]
+        assert await manager.place_orders_batch('binance', []) == []
+    
+    @pytest.mark.asyncio
+    async def test_place_orders_batch_failure(self):
+        """Test that a failed batch reports every order as not placed"""
+        manager, exchange = self._manager({'createOrders': True})
+        exchange.create_orders = AsyncMock(side_effect=Exception("batch rejected"))
+        
+        results = await manager.place_orders_batch('binance', [
+            {'symbol': 'BTC/USDT', 'side': 'buy', 'amount': 1, 'price': 100},
+        ])
+        assert results == [None]
+    
+    @pytest.mark.asyncio
+    async def test_cancel_orders_native_batch(self):
+        """Test cancel_orders grouped by symbol"""
+        manager, exchange = self._manager({'cancelOrders': True})
+        exchange.cancel_orders = AsyncMock(side_effect=lambda ids, symbol: [{'id': ids[0], 'status': 'canceled'}])
+        
+        results = await manager.cancel_orders_batch('binance', [
+            {'id': '1', 'symbol': 'BTC/USDT'},
+            {'id': '2', 'symbol': 'BTC/USDT'},
+            {'id': '3', 'symbol': 'ETH/USDT'},
+        ])
+        
+        exchange.cancel_orders.assert_any_await(['1', '2'], 'BTC/USDT')
+        exchange.cancel_orders.assert_any_await(['3'], 'ETH/USDT')
+        assert [r['id'] for r in results] == ['1', '2', '3']
+        assert results[1] == {'id': '2', 'symbol': 'BTC/USDT', 'status': 'canceled'}
+    
+    @pytest.mark.asyncio
+    async def test_cancel_orders_fallback(self):
+        """Test concurrent single cancels when cancel_orders is unsupported"""
+        manager, exchange = self._manager({})
+        exchange.cancel_order = AsyncMock(side_effect=lambda order_id, symbol: {'id': order_id})
+        
+        results = await manager.cancel_orders_batch('binance', [
+            {'id': '1', 'symbol': 'BTC/USDT'}, {'id': '2', 'symbol': 'ETH/USDT'}
+        ])
+        assert results == [{'id': '1'}, {'id': '2'}]
+    
+    @pytest.mark.asyncio
+    async def test_cancel_all_orders(self):
+        """Test cancel_all_orders capability handling"""
+        manager, exchange = self._manager({'cancelAllOrders': True})
+        exchange.cancel_all_orders = AsyncMock(return_value=[])
+        
+        assert await manager.cancel_all_orders('binance', 'BTC/USDT') is True
+        exchange.cancel_all_orders.assert_awaited_once_with('BTC/USDT')
+        
+        exchange.has = {}
+        assert await manager.cancel_all_orders('binance', 'BTC/USDT') is False
+
+
+class TestSharedExchangeManager:
+    """Test cases for the process-wide ExchangeManager registry"""
+    
+    def test_same_config_returns_same_manager(self, temp_config_file):
+        """Test that components asking for the same config share one manager"""
+        manager = get_shared_exchange_manager(temp_config_file)
+        assert get_shared_exchange_manager(os.path.relpath(temp_config_file)) is manager
+        assert get_shared_exchange_manager(temp_config_file, backend='sync') is not manager
+        
+        reset_shared_exchange_managers()
+        assert get_shared_exchange_manager(temp_config_file) is not manager
+    
+    def test_components_share_manager(self, temp_config_file):
+        """Test that bot, analyzer and scanner use one connection pool"""
+        from bots.multi_exchange_bot import MultiExchangeTradingBot
+        from bots.market_analyzer import MultiExchangeMarketAnalyzer
+        from bots.crypto_scanner import CryptoPairsScanner
+        
+        bot = MultiExchangeTradingBot(temp_config_file)
+        scanner = CryptoPairsScanner(temp_config_file)
+        analyzer = MultiExchangeMarketAnalyzer(temp_config_file)
+        
+        assert bot.market_analyzer.exchange_manager is bot.exchange_manager
+        assert scanner.exchange_manager is bot.exchange_manager
+        assert analyzer.exchange_manager is bot.exchange_manager
+    
+    def test_explicit_manager_injection(self, temp_config_file):
+        """Test passing a dedicated manager instead of the shared one"""
+        from bots.crypto_scanner import CryptoPairsScanner
+        
+        manager = ExchangeManager(temp_config_file)
+        assert CryptoPairsScanner(temp_config_file, exchange_manager=manager).exchange_manager is manager
+    
+    def test_initialize_connects_once(self, temp_config_file):
+        """Test that repeated initialization reuses the existing connections"""
+        manager = ExchangeManager(temp_config_file)
+        
+        with patch.object(manager, '_connect_exchanges', return_value=True) as mock_connect:
+            assert manager.initialize_exchanges() is True
+            assert manager.initialize_exchanges() is True
+            mock_connect.assert_called_once()
+            
+            # หลังปิดการเชื่อมต่อแล้วต้องเชื่อมต่อใหม่ได้
+            manager.close_all_connections()
+            assert manager.initialize_exchanges() is True
+            assert mock_connect.call_count == 2
+    
+    def test_failed_initialize_can_retry(self, temp_config_file):
+        """Test that a failed initialization is not cached"""
+        manager = ExchangeManager(temp_config_file)
+        
+        with patch.object(manager, '_connect_exchanges', side_effect=[False, True]) as mock_connect:
+            assert manager.initialize_exchanges() is False
+            assert manager.initialize_exchanges() is True
+            assert mock_connect.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_async_initialize(self, temp_config_file):
+        """Test that components initializing at the same time connect once"""
+        manager = ExchangeManager(temp_config_file, backend='async')
+        
+        async def connect():
+            await asyncio.sleep(0.05)
+            return True
+        
+        with patch.object(manager, '_connect_exchanges_async', side_effect=connect) as mock_connect:
+            results = await asyncio.gather(*[manager.initialize_exchanges_async() for _ in range(3)])
+        
+        assert results == [True, True, True]
+        mock_connect.assert_called_once()
+
+
 class TestExchangeManagerIntegration:
     """Integration tests for ExchangeManager"""
     
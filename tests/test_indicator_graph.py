@@ -0,0 +1,89 @@
+"""
+Tests for bots/indicator_graph.py
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from bots.indicator_graph import (
+    MACD_STRENGTH_COLUMNS, MARKET_COLUMNS, IndicatorGraph, MACDStrengthIndicators, MarketIndicators,
+    indicator_catalog
+)
+from bots.indicators import IndicatorRegistry
+from bots.market_analyzer import MultiExchangeMarketAnalyzer
+
+
+def make_ohlcv(count=200, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    return pd.DataFrame({
+        'open': close,
+        'high': close + rng.random(count),
+        'low': close - rng.random(count),
+        'close': close,
+        'volume': rng.random(count) * 1000,
+    }, index=pd.date_range('2024-01-01', periods=count, freq='1h'))
+
+
+def count_ops(graph, op):
+    return sum(node.op == op for node in graph.nodes)
+
+
+class TestSharedNodes:
+    """Test that identical intermediates are built once"""
+
+    def test_sma_shared_with_bollinger_middle(self):
+        graph = IndicatorGraph(indicator_catalog(), ['sma_20', 'bb_upper', 'bb_middle', 'bb_lower'])
+        assert count_ops(graph, 'sma') == 1
+        assert count_ops(graph, 'std') == 1
+
+    def test_macd_emas_shared(self):
+        """Test that MACD, crosses and strength use a single set of EMAs"""
+        graph = IndicatorGraph(indicator_catalog(), MARKET_COLUMNS + MACD_STRENGTH_COLUMNS[3:])
+        spans = sorted(node.params[0] for node in graph.nodes if node.op == 'ema')
+        assert spans == [9, 12, 20, 26]
+        assert count_ops(graph, 'lag') == 1
+
+    def test_only_requested_columns_are_built(self):
+        graph = IndicatorGraph(indicator_catalog(), ['rsi'])
+        assert [node.op for node in graph.nodes] == ['rsi']
+
+    def test_unknown_column(self):
+        with pytest.raises(ValueError):
+            IndicatorGraph(indicator_catalog(), ['nope'])
+
+
+class TestGraphValues:
+    """Test that subsets and combined graphs match the full indicator sets"""
+
+    def test_combined_graph_matches_separate_sets(self):
+        df = make_ohlcv()
+        combined = IndicatorRegistry(lambda: IndicatorGraph(indicator_catalog())).compute(df)
+        market = IndicatorRegistry(MarketIndicators).compute(df)
+        scanner = IndicatorRegistry(MACDStrengthIndicators).compute(df)
+
+        pd.testing.assert_frame_equal(combined[list(MARKET_COLUMNS)], market)
+        pd.testing.assert_frame_equal(combined[list(MACD_STRENGTH_COLUMNS)], scanner)
+
+    def test_subset_matches_full(self):
+        df = make_ohlcv()
+        columns = MultiExchangeMarketAnalyzer.ANALYSIS_COLUMNS
+        full = IndicatorRegistry(MarketIndicators).compute(df)
+        subset = IndicatorRegistry(MarketIndicators).compute(df, columns)
+
+        assert list(subset.columns) == list(columns)
+        pd.testing.assert_frame_equal(subset, full[list(columns)])
+
+    def test_registry_keeps_state_per_column_set(self):
+        df = make_ohlcv()
+        registry = IndicatorRegistry(MarketIndicators)
+        registry.sync('series', df)
+        registry.sync('series', df, ['rsi'])
+        assert set(registry.series) == {'series', ('series', ('rsi',))}
+
+    def test_analyzer_columns(self, temp_config_file):
+        analyzer = MultiExchangeMarketAnalyzer(temp_config_file)
+        df = analyzer.calculate_technical_indicators(make_ohlcv(), columns=['sma_20', 'rsi'])
+        assert 'sma_20' in df.columns and 'rsi' in df.columns
+        assert 'atr' not in df.columns
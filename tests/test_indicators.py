@@ -0,0 +1,246 @@
+"""
+Tests for bots/indicators.py
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import ta
+
+from bots.indicator_graph import MACDStrengthIndicators, MarketIndicators
+from bots.indicators import (
+    ATR, EMA, MACD, RSI, BollingerBands, IndicatorRegistry, RollingMax, RollingMean, RollingStd, SeriesIndicators
+)
+
+
+def make_series(count=300, seed=7, nan_ratio=0.0):
+    rng = np.random.default_rng(seed)
+    values = 100 + np.cumsum(rng.normal(0, 1, count))
+    if nan_ratio:
+        values[rng.random(count) < nan_ratio] = np.nan
+    return pd.Series(values)
+
+
+def make_ohlcv(count=300, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + rng.random(count),
+        'low': np.minimum(open_, close) - rng.random(count),
+        'close': close,
+        'volume': rng.random(count) * 1000,
+    }, index=pd.date_range('2024-01-01', periods=count, freq='1min'))
+
+
+def stream(indicator, values):
+    return np.array([indicator.update(value) for value in values], dtype=np.float64)
+
+
+def assert_identical(actual, expected):
+    """Bit-for-bit equality (NaN positions included)"""
+    actual = np.asarray(actual, dtype=np.float64)
+    expected = np.asarray(expected, dtype=np.float64)
+    assert np.array_equal(np.isnan(actual), np.isnan(expected))
+    mask = ~np.isnan(expected)
+    assert np.array_equal(actual[mask].view(np.int64), expected[mask].view(np.int64))
+
+
+class TestPrimitives:
+    """Streaming primitives against pandas"""
+
+    @pytest.mark.parametrize('nan_ratio', [0.0, 0.1])
+    def test_ema(self, nan_ratio):
+        series = make_series(nan_ratio=nan_ratio)
+        assert_identical(stream(EMA(span=12, min_periods=12), series),
+                         series.ewm(span=12, min_periods=12, adjust=False).mean())
+        assert_identical(stream(EMA(alpha=1 / 14, min_periods=14), series),
+                         series.ewm(alpha=1 / 14, min_periods=14, adjust=False).mean())
+
+    @pytest.mark.parametrize('nan_ratio', [0.0, 0.1])
+    def test_rolling_mean_and_std(self, nan_ratio):
+        series = make_series(nan_ratio=nan_ratio)
+        assert_identical(stream(RollingMean(20), series), series.rolling(20).mean())
+        assert_identical(stream(RollingStd(20, ddof=0), series), series.rolling(20).std(ddof=0))
+        assert_identical(stream(RollingStd(20), series), series.rolling(20).std())
+
+    def test_rolling_constant_runs(self):
+        """Test pandas' handling of repeated and negative values"""
+        series = pd.Series([-1.5] * 30 + [2.0] * 30 + list(make_series(40) - 100))
+        assert_identical(stream(RollingMean(10), series), series.rolling(10).mean())
+        assert_identical(stream(RollingStd(10, ddof=0), series), series.rolling(10).std(ddof=0))
+
+    @pytest.mark.parametrize('nan_ratio', [0.0, 0.1])
+    def test_rolling_max(self, nan_ratio):
+        series = make_series(nan_ratio=nan_ratio)
+        assert_identical(stream(RollingMax(20), series), series.rolling(20).max())
+
+    @pytest.mark.parametrize('indicator', [
+        lambda: EMA(span=12, min_periods=12), lambda: RollingMean(20), lambda: RollingStd(20, ddof=0),
+        lambda: RollingMax(5), lambda: RSI(14), lambda: MACD(), lambda: BollingerBands(),
+    ])
+    def test_amend_matches_final_value(self, indicator):
+        """Test that revising the open bar ends in the same state as feeding the final value"""
+        values = make_series(120)
+        direct, revised = indicator(), indicator()
+        for value in values:
+            expected = direct.update(value)
+            revised.update(value + 5)
+            revised.amend(value - 3)
+            assert np.array_equal(revised.amend(value), expected, equal_nan=True)
+
+
+class TestTaCompatibility:
+    """Indicators against the ta library"""
+
+    def test_rsi(self):
+        close = make_ohlcv()['close']
+        assert_identical(stream(RSI(14), close), ta.momentum.rsi(close, window=14))
+
+    def test_atr(self):
+        df = make_ohlcv()
+        bars = zip(df['high'], df['low'], df['close'])
+        assert_identical(stream(ATR(14), bars), ta.volatility.average_true_range(df['high'], df['low'], df['close']))
+
+    def test_macd(self):
+        close = make_ohlcv()['close']
+        macd = MACD()
+        result = np.array([macd.update(value) for value in close])
+        expected = ta.trend.MACD(close)
+        assert_identical(result[:, 0], expected.macd())
+        assert_identical(result[:, 1], expected.macd_signal())
+        assert_identical(result[:, 2], expected.macd_diff())
+
+    def test_bollinger(self):
+        close = make_ohlcv()['close']
+        bands = BollingerBands()
+        result = np.array([bands.update(value) for value in close])
+        expected = ta.volatility.BollingerBands(close)
+        assert_identical(result[:, 0], expected.bollinger_hband())
+        assert_identical(result[:, 1], expected.bollinger_mavg())
+        assert_identical(result[:, 2], expected.bollinger_lband())
+
+    def test_market_indicators(self):
+        """Test the analyzer's indicator set column by column"""
+        df = make_ohlcv()
+        result = IndicatorRegistry(MarketIndicators).compute(df)
+
+        macd = ta.trend.MACD(df['close'])
+        bollinger = ta.volatility.BollingerBands(df['close'])
+        expected = {
+            'sma_20': ta.trend.sma_indicator(df['close'], window=20),
+            'ema_20': ta.trend.ema_indicator(df['close'], window=20),
+            'sma_50': ta.trend.sma_indicator(df['close'], window=50),
+            'rsi': ta.momentum.rsi(df['close'], window=14),
+            'macd': macd.macd(),
+            'macd_signal': macd.macd_signal(),
+            'macd_histogram': macd.macd_diff(),
+            'bb_upper': bollinger.bollinger_hband(),
+            'bb_middle': bollinger.bollinger_mavg(),
+            'bb_lower': bollinger.bollinger_lband(),
+            'volume_sma': ta.trend.sma_indicator(df['volume'], window=20),
+            'atr': ta.volatility.average_true_range(df['high'], df['low'], df['close']),
+        }
+        assert list(result.columns) == list(expected)
+        for column, values in expected.items():
+            assert_identical(result[column], values)
+
+    def test_macd_strength_indicators(self):
+        """Test the scanner's MACD set against the pandas formulation"""
+        df = make_ohlcv()
+        result = IndicatorRegistry(MACDStrengthIndicators).compute(df)
+
+        macd = ta.trend.MACD(df['close'])
+        line, histogram = macd.macd(), macd.macd_diff()
+        histogram_abs = histogram.abs()
+        momentum_abs = (line - line.shift(1)).abs()
+        strength = ((histogram_abs / histogram_abs.rolling(window=20).max() * 50).fillna(0)
+                    + (momentum_abs / momentum_abs.rolling(window=20).max() * 50).fillna(0)).clip(0, 100)
+
+        assert_identical(result['macd'], line)
+        assert_identical(result['macd_histogram'], histogram)
+        assert_identical(result['signal_strength'], strength)
+        assert result['macd_cross_up'].dtype == bool
+        assert (result['macd_cross_up'] == ((line > 0) & (line.shift(1) <= 0))).all()
+        assert (result['macd_cross_down'] == ((line < 0) & (line.shift(1) >= 0))).all()
+
+
+class TestSeriesIndicators:
+    """Test per-series state across repeated windows"""
+
+    def test_incremental_sync_matches_full_run(self):
+        """Test that sliding windows only feed new bars and match one continuous run"""
+        df = make_ohlcv(200)
+        state = SeriesIndicators(MarketIndicators)
+        full = IndicatorRegistry(MarketIndicators).compute(df)
+
+        state.sync(df.iloc[:100])
+        fed = []
+        original_update = state.indicators.update
+        state.indicators.update = lambda bar: fed.append(bar) or original_update(bar)
+
+        result = state.sync(df.iloc[50:200])
+        assert len(fed) == 100
+        pd.testing.assert_frame_equal(result, full.iloc[50:200])
+
+    def test_open_bar_revision(self):
+        """Test that a changed last bar is amended rather than appended"""
+        df = make_ohlcv(80)
+        state = SeriesIndicators(MarketIndicators)
+        provisional = df.copy()
+        provisional.iloc[-1, provisional.columns.get_loc('close')] += 10
+
+        state.sync(provisional.iloc[:-1])
+        state.sync(provisional)
+        result = state.sync(df)
+
+        pd.testing.assert_frame_equal(result, IndicatorRegistry(MarketIndicators).compute(df))
+
+    def test_gap_reseeds(self):
+        """Test that a window not overlapping the stored bars starts over"""
+        df = make_ohlcv(200)
+        state = SeriesIndicators(MarketIndicators)
+        state.sync(df.iloc[:50])
+
+        result = state.sync(df.iloc[100:])
+        pd.testing.assert_frame_equal(result, IndicatorRegistry(MarketIndicators).compute(df.iloc[100:]))
+
+    def test_registry_keys(self):
+        """Test that series are tracked independently"""
+        registry = IndicatorRegistry(MarketIndicators)
+        registry.sync(('binance', 'BTC/USDT', '1m'), make_ohlcv(30, seed=1))
+        registry.sync(('okx', 'BTC/USDT', '1m'), make_ohlcv(30, seed=2))
+        assert len(registry.series) == 2
+        registry.clear()
+        assert not registry.series
+
+    def test_history_defaults_to_read_window_and_grows(self):
+        """Test that stored outputs stay at the window size unless a longer df is synced"""
+        df = make_ohlcv(300)
+        state = SeriesIndicators(MarketIndicators)
+        for end in range(100, 300, 10):
+            state.sync(df.iloc[end - 100:end])
+        assert len(state.outputs) == 100
+
+        result = state.sync(df.iloc[:300])
+        assert state.history == 300
+        pd.testing.assert_frame_equal(result, IndicatorRegistry(MarketIndicators).compute(df))
+
+    def test_registry_evicts_by_key_and_idle_time(self, monkeypatch):
+        """Test that evict() drops matching series and idle series are swept on sync"""
+        clock = [1000.0]
+        monkeypatch.setattr('bots.indicators.time.monotonic', lambda: clock[0])
+        registry = IndicatorRegistry(MarketIndicators, max_idle=60)
+        registry.sync(('binance', 'BTC/USDT', '1m'), make_ohlcv(30, seed=1))
+        registry.sync(('binance', 'ETH/USDT', '1m'), make_ohlcv(30, seed=2), ['rsi'])
+        registry.sync(('okx', 'ETH/USDT', '1m'), make_ohlcv(30, seed=3))
+
+        assert registry.evict(lambda key: key[0] == 'binance' and key[1] == 'ETH/USDT') == 1
+        assert len(registry.series) == 2
+
+        clock[0] += 30
+        registry.sync(('binance', 'BTC/USDT', '1m'), make_ohlcv(30, seed=1))
+        clock[0] += 45
+        registry.sync(('binance', 'BTC/USDT', '1m'), make_ohlcv(30, seed=1))
+        assert list(registry.series) == [('binance', 'BTC/USDT', '1m')]
@@ -565,6 +565,7 @@ class TestRunMarketAnalysis:
             mock_analyzer.initialize = AsyncMock(return_value=True)
             mock_analyzer.analyze_all_exchanges = AsyncMock(return_value={'binance': {'analysis': {}, 'config': {}}})
             mock_analyzer.print_analysis_summary = Mock()
+            mock_analyzer.exchange_manager.close_all_connections_async = AsyncMock()
             mock_analyzer_class.return_value = mock_analyzer
             
             result = await run_market_analysis()
@@ -573,6 +574,7 @@ class TestRunMarketAnalysis:
             mock_analyzer.initialize.assert_called_once()
             mock_analyzer.analyze_all_exchanges.assert_called_once_with('BTC/USDT')
             mock_analyzer.print_analysis_summary.assert_called_once()
+            mock_analyzer.exchange_manager.close_all_connections_async.assert_awaited_once()
     
     @pytest.mark.asyncio
     async def test_run_market_analysis_initialization_failure(self):
@@ -580,6 +582,7 @@ class TestRunMarketAnalysis:
         with patch('bots.market_analyzer.MultiExchangeMarketAnalyzer') as mock_analyzer_class:
             mock_analyzer = Mock()
             mock_analyzer.initialize = AsyncMock(return_value=False)
+            mock_analyzer.exchange_manager.close_all_connections_async = AsyncMock()
             mock_analyzer_class.return_value = mock_analyzer
             
             result = await run_market_analysis()
@@ -587,6 +590,7 @@ class TestRunMarketAnalysis:
             assert result is None
             mock_analyzer.initialize.assert_called_once()
             mock_analyzer.analyze_all_exchanges.assert_not_called()
+            mock_analyzer.exchange_manager.close_all_connections_async.assert_awaited_once()
 
 
 class TestMarketAnalyzerIntegration:
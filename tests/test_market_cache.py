@@ -0,0 +1,180 @@
+"""
+Tests for bots/market_cache.py
+"""
+
+import pytest
+import json
+import os
+import time
+from unittest.mock import Mock, AsyncMock, patch
+
+import ccxt
+
+from bots.market_cache import MarketCache
+from bots.exchange_manager import ExchangeManager
+
+
+SAMPLE_MARKETS = {
+    'BTC/USDT': {
+        'id': 'BTCUSDT', 'symbol': 'BTC/USDT', 'base': 'BTC', 'quote': 'USDT',
+        'baseId': 'BTC', 'quoteId': 'USDT', 'active': True, 'type': 'spot', 'spot': True,
+        'precision': {'amount': 0.00001, 'price': 0.01},
+        'limits': {'amount': {'min': 0.00001, 'max': 9000}, 'cost': {'min': 5}},
+        'info': {}
+    }
+}
+
+
+@pytest.fixture
+def cache_config(sample_config, temp_directory):
+    """Config file whose market cache lives in the temp directory"""
+    sample_config['bot_settings']['market_cache_dir'] = os.path.join(temp_directory, 'market_cache')
+    sample_config['bot_settings']['market_cache_ttl'] = 3600
+    config_path = os.path.join(temp_directory, "config.json")
+    with open(config_path, 'w') as f:
+        json.dump(sample_config, f)
+    return config_path
+
+
+class TestMarketCache:
+    """Test cases for MarketCache"""
+
+    def test_save_and_load(self, temp_directory):
+        """Test that markets, precision and limits survive a round trip"""
+        cache = MarketCache(temp_directory, ttl=60)
+        assert cache.save('binance', SAMPLE_MARKETS, {'BTC': {'id': 'BTC'}}) is True
+
+        payload = cache.load('binance')
+        assert payload['markets'] == SAMPLE_MARKETS
+        assert payload['currencies'] == {'BTC': {'id': 'BTC'}}
+        assert payload['ccxt_version'] == ccxt.__version__
+        assert cache.is_fresh(payload)
+        assert not any(name.endswith('.tmp') for name in os.listdir(temp_directory))
+
+    def test_load_missing(self, temp_directory):
+        """Test loading an exchange that has never been cached"""
+        assert MarketCache(temp_directory).load('binance') is None
+
+    def test_load_corrupted(self, temp_directory):
+        """Test that a broken cache file is ignored"""
+        with open(os.path.join(temp_directory, 'binance.json'), 'w') as f:
+            f.write('{not json')
+        assert MarketCache(temp_directory).load('binance') is None
+
+    def test_version_mismatch(self, temp_directory):
+        """Test that caches from another format or ccxt version are ignored"""
+        cache = MarketCache(temp_directory)
+        cache.save('binance', SAMPLE_MARKETS)
+        path = os.path.join(temp_directory, 'binance.json')
+
+        with open(path) as f:
+            payload = json.load(f)
+        payload['ccxt_version'] = '0.0.1'
+        with open(path, 'w') as f:
+            json.dump(payload, f)
+
+        assert cache.load('binance') is None
+
+    def test_expired(self, temp_directory):
+        """Test TTL handling"""
+        cache = MarketCache(temp_directory, ttl=60)
+        payload = {'saved_at': time.time() - 120}
+        assert not cache.is_fresh(payload)
+
+
+class TestExchangeManagerMarketCache:
+    """Test cases for market cache usage in ExchangeManager"""
+
+    def test_cache_disabled(self, sample_config, temp_directory):
+        """Test that market_cache_ttl=0 turns the cache off"""
+        sample_config['bot_settings']['market_cache_ttl'] = 0
+        config_path = os.path.join(temp_directory, "config.json")
+        with open(config_path, 'w') as f:
+            json.dump(sample_config, f)
+
+        assert ExchangeManager(config_path).market_cache is None
+
+    def test_fresh_cache_skips_download(self, cache_config):
+        """Test that a real ccxt instance starts from the cache without fetch_markets"""
+        manager = ExchangeManager(cache_config, backend='sync')
+        exchange = ccxt.binance()
+        manager.market_cache.save('binance', SAMPLE_MARKETS, environment=MarketCache.environment(exchange))
+
+        exchange.fetch_markets = Mock(side_effect=Exception("network"))
+
+        assert manager._load_cached_markets('binance', exchange) is True
+        assert exchange.load_markets()['BTC/USDT']['limits']['cost']['min'] == 5
+        exchange.fetch_markets.assert_not_called()
+
+    def test_stale_cache_refreshes_in_background(self, cache_config):
+        """Test that stale markets are used immediately and refreshed afterwards"""
+        manager = ExchangeManager(cache_config, backend='sync')
+        manager.market_cache.save('binance', SAMPLE_MARKETS, environment='live')
+        manager.market_cache.ttl = 0.001
+        time.sleep(0.01)
+
+        refreshed = dict(SAMPLE_MARKETS, **{'ETH/USDT': dict(SAMPLE_MARKETS['BTC/USDT'], symbol='ETH/USDT')})
+        exchange = Mock()
+        exchange.load_markets.return_value = refreshed
+        exchange.currencies = {}
+
+        with patch('threading.Thread') as mock_thread:
+            assert manager._load_cached_markets('binance', exchange) is True
+            exchange.set_markets.assert_called_once()
+            mock_thread.assert_called_once()
+            mock_thread.return_value.start.assert_called_once()
+
+            # รัน thread ที่ถูกสร้างขึ้นโดยตรง
+            kwargs = mock_thread.call_args.kwargs
+            kwargs['target'](*kwargs['args'])
+
+        exchange.load_markets.assert_called_once_with(True)
+        assert set(manager.market_cache.load('binance', 'live')['markets']) == {'BTC/USDT', 'ETH/USDT'}
+
+    @pytest.mark.asyncio
+    async def test_first_load_is_persisted(self, cache_config, sample_ticker_data):
+        """Test that markets loaded by ccxt on first use are written to the cache"""
+        manager = ExchangeManager(cache_config, backend='async')
+        exchange = Mock()
+        exchange.markets = SAMPLE_MARKETS
+        exchange.currencies = {}
+        exchange.fetch_ticker = AsyncMock(return_value=sample_ticker_data)
+        manager.exchanges['binance'] = {'instance': exchange, 'config': {}}
+
+        await manager.fetch_ticker('binance', 'BTC/USDT')
+        assert manager.market_cache.load('binance', 'live')['markets'] == SAMPLE_MARKETS
+
+        # บันทึกเพียงครั้งเดียวต่อ process
+        with patch.object(manager.market_cache, 'save') as mock_save:
+            await manager.fetch_ticker('binance', 'BTC/USDT')
+            mock_save.assert_not_called()
+
+    def test_sandbox_and_live_markets_are_cached_separately(self, cache_config):
+        """Test that toggling sandbox never loads the other environment's markets"""
+        manager = ExchangeManager(cache_config, backend='sync')
+        live, sandbox = ccxt.binance(), ccxt.binance({'sandbox': True})
+        assert MarketCache.environment(live) != MarketCache.environment(sandbox)
+
+        manager.market_cache.save('binance', SAMPLE_MARKETS, environment=MarketCache.environment(live))
+        assert manager._load_cached_markets('binance', sandbox) is False
+        assert manager._load_cached_markets('binance', live) is True
+
+    def test_environment_includes_api_hostname(self):
+        """Test that the cache environment follows the configured API hostname"""
+        exchange = ccxt.okx()
+        assert MarketCache.environment(exchange) == 'live-www.okx.com'
+        exchange.hostname = 'us.okx.com'
+        assert MarketCache.environment(exchange) == 'live-us.okx.com'
+
+    @patch('ccxt.binance')
+    def test_initialize_uses_cache(self, mock_binance_class, cache_config):
+        """Test that initialize_exchanges primes instances from the cache"""
+        mock_exchange = Mock()
+        mock_binance_class.return_value = mock_exchange
+
+        manager = ExchangeManager(cache_config, backend='sync')
+        manager.market_cache.save('binance', SAMPLE_MARKETS, environment='live')
+        assert manager.initialize_exchanges() is True
+
+        mock_exchange.set_markets.assert_called_once_with(SAMPLE_MARKETS, None)
+        mock_exchange.load_markets.assert_not_called()
@@ -0,0 +1,212 @@
+"""
+Tests for bots/market_stream.py and bots/stream_server.py
+"""
+
+import pytest
+import pytest_asyncio
+import asyncio
+import json
+import os
+
+from bots.market_stream import MarketStream, NormalizedAdapter, BinanceAdapter
+from bots.stream_server import MarketStreamServer
+from bots.exchange_manager import ExchangeManager
+
+
+@pytest_asyncio.fixture
+async def server():
+    """Local WebSocket stand-in server on a random port"""
+    server = MarketStreamServer()
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest_asyncio.fixture
+async def stream(server):
+    """MarketStream connected to the stand-in server"""
+    stream = MarketStream('binance', server.url, reconnect_delay=0.05)
+    yield stream
+    await stream.stop()
+
+
+async def wait_until(predicate, timeout=2.0):
+    """Poll until predicate() is true"""
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not met in time")
+
+
+class TestAdapters:
+    """Test cases for stream message adapters"""
+
+    def test_normalized_adapter(self):
+        """Test the stand-in protocol"""
+        adapter = NormalizedAdapter()
+        assert adapter.subscribe_message('ticker', 'BTC/USDT') == {
+            'op': 'subscribe', 'channel': 'ticker', 'symbol': 'BTC/USDT'
+        }
+        assert adapter.parse({'channel': 'ticker', 'symbol': 'BTC/USDT', 'data': {'last': 1}}) == [
+            ('ticker', 'BTC/USDT', {'last': 1})
+        ]
+        assert adapter.parse({'event': 'subscribed'}) == []
+
+    def test_binance_adapter(self):
+        """Test parsing of Binance combined-stream messages"""
+        adapter = BinanceAdapter()
+        message = adapter.subscribe_message('ticker', 'BTC/USDT')
+        assert message['method'] == 'SUBSCRIBE'
+        assert message['params'] == ['btcusdt@ticker']
+        adapter.subscribe_message('trades', 'BTC/USDT')
+        adapter.subscribe_message('book', 'BTC/USDT')
+
+        ticker = adapter.parse({'stream': 'btcusdt@ticker', 'data': {
+            'b': '49999', 'a': '50001', 'c': '50000', 'v': '10', 'q': '500000', 'E': 1
+        }})
+        assert ticker[0][0:2] == ('ticker', 'BTC/USDT')
+        assert ticker[0][2]['last'] == 50000.0
+
+        trade = adapter.parse({'stream': 'btcusdt@trade', 'data': {'p': '50000', 'q': '0.5', 'm': True, 'T': 2}})
+        assert trade[0][2][0]['side'] == 'sell'
+
+        book = adapter.parse({'stream': 'btcusdt@depth20@100ms', 'data': {
+            'lastUpdateId': 7, 'bids': [['49999', '1']], 'asks': [['50001', '2']]
+        }})
+        assert book[0][2] == {'type': 'snapshot', 'seq': 7, 'bids': [[49999.0, 1.0]], 'asks': [[50001.0, 2.0]]}
+
+        # stream ที่ไม่ได้ subscribe ไว้ถูกข้าม
+        assert adapter.parse({'stream': 'ethusdt@ticker', 'data': {}}) == []
+
+
+class TestMarketStream:
+    """Test cases for MarketStream against the stand-in server"""
+
+    @pytest.mark.asyncio
+    async def test_ticker_and_trades(self, server, stream):
+        """Test receiving live tickers and trades"""
+        await stream.subscribe('ticker', 'BTC/USDT')
+        await stream.subscribe('trades', 'BTC/USDT')
+        await stream.start()
+        await server.wait_for_subscribers('trades', 'BTC/USDT')
+
+        await server.publish_ticker('BTC/USDT', 50000)
+        await server.publish('trades', 'BTC/USDT', [{'price': 50000, 'amount': 0.1, 'side': 'buy', 'timestamp': 1}])
+        await wait_until(lambda: stream.get_trades('BTC/USDT'))
+
+        ticker = stream.get_ticker('BTC/USDT', max_age=5)
+        assert ticker['last'] == 50000
+        assert ticker['symbol'] == 'BTC/USDT'
+        assert ticker['bid'] < ticker['last'] < ticker['ask']
+        assert stream.get_trades('BTC/USDT')[0]['amount'] == 0.1
+        assert stream.stats['messages'] == 2
+
+    @pytest.mark.asyncio
+    async def test_book_snapshot_and_diff(self, server, stream):
+        """Test that book diffs update, add and delete price levels"""
+        await stream.subscribe('book', 'BTC/USDT')
+        await stream.start()
+        await server.wait_for_subscribers('book', 'BTC/USDT')
+
+        await server.publish_book('BTC/USDT', [[100, 1], [99, 2]], [[101, 1], [102, 3]], snapshot=True)
+        await server.publish_book('BTC/USDT', [[99, 0], [98, 5]], [[101, 4]])
+        await wait_until(lambda: (stream.get_book('BTC/USDT') or {}).get('seq') == 2)
+
+        book = stream.get_book('BTC/USDT')
+        assert book['bids'] == [(100, 1), (98, 5)]
+        assert book['asks'] == [(101, 4), (102, 3)]
+
+    @pytest.mark.asyncio
+    async def test_reconnect_and_resubscribe(self, server, stream):
+        """Test that a dropped connection is re-established with its subscriptions"""
+        await stream.subscribe('ticker', 'BTC/USDT')
+        await stream.start()
+        await server.wait_for_subscribers('ticker', 'BTC/USDT')
+
+        await server.drop_connections()
+        await wait_until(lambda: stream.stats['reconnects'] == 1)
+        await server.wait_for_subscribers('ticker', 'BTC/USDT')
+
+        await server.publish_ticker('BTC/USDT', 51000)
+        await wait_until(lambda: 'BTC/USDT' in stream.tickers)
+        assert stream.get_ticker('BTC/USDT')['last'] == 51000
+
+    @pytest.mark.asyncio
+    async def test_subscribe_while_connected(self, server, stream):
+        """Test that a new subscription is sent on the open connection"""
+        await stream.start()
+        await asyncio.wait_for(stream.connected.wait(), 2)
+
+        await stream.subscribe('ticker', 'ETH/USDT')
+        await server.wait_for_subscribers('ticker', 'ETH/USDT')
+
+    @pytest.mark.asyncio
+    async def test_listener_and_wait_for_update(self, server, stream):
+        """Test update notifications"""
+        received = []
+        stream.add_listener(lambda channel, symbol, data: received.append((channel, symbol)))
+        await stream.subscribe('ticker', 'BTC/USDT')
+        await stream.start()
+        await server.wait_for_subscribers('ticker', 'BTC/USDT')
+
+        assert await stream.wait_for_update(0.05) is False
+        await server.publish_ticker('BTC/USDT', 50000)
+        assert await stream.wait_for_update(2) is True
+        assert received == [('ticker', 'BTC/USDT')]
+
+    @pytest.mark.asyncio
+    async def test_invalid_channel(self, stream):
+        """Test that unknown channels are rejected"""
+        with pytest.raises(ValueError):
+            await stream.subscribe('candles', 'BTC/USDT')
+
+    @pytest.mark.asyncio
+    async def test_stale_ticker(self, server, stream):
+        """Test max_age on stream tickers"""
+        stream.tickers['BTC/USDT'] = {'last': 1}
+        stream.ticker_updated_at['BTC/USDT'] = 0
+        assert stream.get_ticker('BTC/USDT', max_age=5) is None
+        assert stream.get_ticker('BTC/USDT')['last'] == 1
+
+    @pytest.mark.asyncio
+    async def test_book_updates_do_not_refresh_ticker(self, server, stream):
+        """Test that a quiet ticker channel stays stale while the book keeps streaming"""
+        stream._handle_message(json.dumps({'channel': 'ticker', 'symbol': 'BTC/USDT', 'data': {'last': 1}}))
+        assert stream.get_ticker('BTC/USDT', max_age=5)['last'] == 1
+
+        stream.ticker_updated_at['BTC/USDT'] -= 10
+        stream._handle_message(json.dumps({'channel': 'book', 'symbol': 'BTC/USDT',
+                                           'data': {'type': 'snapshot', 'bids': [[99, 1]], 'asks': [[101, 1]]}}))
+        assert stream.get_ticker('BTC/USDT', max_age=5) is None
+
+
+class TestExchangeManagerStreams:
+    """Test cases for stream integration in ExchangeManager"""
+
+    @pytest.mark.asyncio
+    async def test_start_streams_from_config(self, server, sample_config, temp_directory):
+        """Test that configured streams start and feed the ticker hub"""
+        sample_config['exchanges']['binance']['stream'] = {
+            'enabled': True, 'url': server.url, 'adapter': 'normalized'
+        }
+        config_path = os.path.join(temp_directory, "config.json")
+        with open(config_path, 'w') as f:
+            json.dump(sample_config, f)
+
+        manager = ExchangeManager(config_path)
+        manager.exchanges['binance'] = {'instance': object(), 'config': sample_config['exchanges']['binance']}
+
+        try:
+            assert await manager.start_streams() == 1
+            stream = manager.get_stream('binance')
+            await server.wait_for_subscribers('ticker', 'ETH/USDT')
+            await server.wait_for_subscribers('book', 'BTC/USDT')
+
+            await server.publish_ticker('BTC/USDT', 50000)
+            await wait_until(lambda: 'BTC/USDT' in stream.tickers)
+            assert manager.ticker_hub.get('binance', 'BTC/USDT', max_age=5)['last'] == 50000
+        finally:
+            await manager.stop_streams()
+
+        assert manager.streams == {}
@@ -4,6 +4,7 @@ Tests for bots/multi_exchange_bot.py
 
 import pytest
 import asyncio
+import ccxt
 from unittest.mock import Mock, patch, AsyncMock
 from datetime import datetime
 
@@ -67,4 +68,205 @@ class TestRunMultiExchangeBot:
 
 # Note: These are placeholder tests. In a real implementation,
 # you would need to import the actual classes and functions
-# from bots.multi_exchange_bot and write comprehensive tests. 
\ No newline at end of file
+# from bots.multi_exchange_bot and write comprehensive tests. 
+
+class TestOrderReconciliation:
+    """Test cases for bulk order reconciliation"""
+
+    @pytest.fixture
+    def bot(self, temp_config_file):
+        from bots.multi_exchange_bot import MultiExchangeTradingBot
+        from bots.exchange_manager import ExchangeManager
+
+        manager = ExchangeManager(temp_config_file)
+        exchange = Mock()
+        exchange.has = {'fetchOpenOrders': True, 'fetchClosedOrders': True}
+        exchange.fetch_open_orders = AsyncMock(return_value=[
+            {'id': '1', 'status': 'open', 'filled': 0.5, 'remaining': 0.5},
+        ])
+        exchange.fetch_closed_orders = AsyncMock(return_value=[
+            {'id': '2', 'status': 'closed', 'side': 'buy', 'amount': 1, 'price': 100},
+            {'id': '3', 'status': 'canceled', 'side': 'sell', 'amount': 1, 'price': 110},
+        ])
+        exchange.fetch_order = AsyncMock(return_value={'id': '4', 'status': 'closed', 'side': 'sell',
+                                                       'amount': 1, 'price': 120})
+        manager.exchanges['binance'] = {'instance': exchange}
+
+        bot = MultiExchangeTradingBot(temp_config_file, exchange_manager=manager)
+        bot.performance['binance'] = {'total_trades': 0, 'profitable_trades': 0, 'total_profit': 0.0}
+        bot.active_orders['binance'] = {
+            'BTC/USDT': [{'id': '1', 'side': 'buy', 'price': 100, 'timestamp': 2000},
+                         {'id': '2', 'side': 'buy', 'price': 100, 'timestamp': 1000}],
+            'ETH/USDT': [{'id': '3', 'side': 'sell', 'price': 110, 'timestamp': 3000},
+                         {'id': '4', 'side': 'sell', 'price': 120, 'timestamp': 4000}],
+        }
+        return bot
+
+    @pytest.mark.asyncio
+    async def test_reconcile_in_bulk(self, bot):
+        """Test that reconciliation makes one request per exchange, not per order"""
+        exchange = bot.exchange_manager.exchanges['binance']['instance']
+        with patch.object(bot, '_handle_filled_order', AsyncMock()) as handle_filled:
+            await bot._reconcile_orders('binance')
+
+        exchange.fetch_open_orders.assert_awaited_once_with(None)
+        exchange.fetch_closed_orders.assert_awaited_once_with(None, 1000, None)
+        # ออเดอร์ 4 ไม่อยู่ในผลลัพธ์ bulk จึงถามทีละออเดอร์
+        exchange.fetch_order.assert_awaited_once_with('4', 'ETH/USDT')
+
+        assert [o['id'] for o in bot.active_orders['binance']['BTC/USDT']] == ['1']
+        assert bot.active_orders['binance']['BTC/USDT'][0]['filled'] == 0.5
+        assert bot.active_orders['binance']['ETH/USDT'] == []
+        assert [c.args[2]['id'] for c in handle_filled.await_args_list] == ['2', '4']
+
+    @pytest.mark.asyncio
+    async def test_no_requests_without_orders(self, bot):
+        """Test that nothing is fetched when there are no local orders"""
+        bot.active_orders['binance'] = {'BTC/USDT': []}
+        await bot._reconcile_orders('binance')
+        bot.exchange_manager.exchanges['binance']['instance'].fetch_open_orders.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_open_orders_per_symbol_fallback(self, bot):
+        """Test per-symbol open orders when the exchange requires a symbol"""
+        exchange = bot.exchange_manager.exchanges['binance']['instance']
+
+        def fetch_open_orders(symbol):
+            if symbol is None:
+                raise ccxt.ArgumentsRequired("symbol required")
+            ids = ['1', '2'] if symbol == 'BTC/USDT' else ['3', '4']
+            return [{'id': order_id, 'status': 'open'} for order_id in ids]
+
+        exchange.fetch_open_orders.side_effect = fetch_open_orders
+        await bot._reconcile_orders('binance')
+
+        assert exchange.fetch_open_orders.await_count == 3
+        exchange.fetch_closed_orders.assert_not_awaited()
+        assert len(bot.active_orders['binance']['ETH/USDT']) == 2
+
+    @pytest.mark.asyncio
+    async def test_closed_orders_per_symbol_fallback(self, bot):
+        """Test one closed-orders request per symbol when the exchange rejects the call without one"""
+        exchange = bot.exchange_manager.exchanges['binance']['instance']
+        closed = exchange.fetch_closed_orders.return_value
+
+        def fetch_closed_orders(symbol, since, limit):
+            if symbol is None:
+                raise ccxt.ArgumentsRequired("symbol required")
+            return [order for order in closed if (order['id'] == '2') == (symbol == 'BTC/USDT')]
+
+        exchange.fetch_closed_orders.side_effect = fetch_closed_orders
+        with patch.object(bot, '_handle_filled_order', AsyncMock()):
+            await bot._reconcile_orders('binance')
+
+        assert [c.args for c in exchange.fetch_closed_orders.await_args_list] == [
+            (None, 1000, None), ('BTC/USDT', 1000, None), ('ETH/USDT', 3000, None)
+        ]
+        exchange.fetch_order.assert_awaited_once_with('4', 'ETH/USDT')
+        assert bot.active_orders['binance']['ETH/USDT'] == []
+
+    @pytest.mark.asyncio
+    async def test_symbol_required_is_remembered(self, bot):
+        """Test that a rejected no-symbol call is not repeated on later cycles"""
+        exchange = bot.exchange_manager.exchanges['binance']['instance']
+
+        def fetch_open_orders(symbol):
+            if symbol is None:
+                raise ccxt.ArgumentsRequired("symbol required")
+            return [{'id': '1', 'status': 'open'}] if symbol == 'BTC/USDT' else []
+
+        def fetch_closed_orders(symbol, since, limit):
+            if symbol is None:
+                raise ccxt.ArgumentsRequired("symbol required")
+            return []
+
+        exchange.fetch_open_orders.side_effect = fetch_open_orders
+        exchange.fetch_closed_orders.side_effect = fetch_closed_orders
+        exchange.fetch_order.return_value = {'status': 'open'}
+        with patch.object(bot.exchange_manager.logger, 'error') as log_error:
+            await bot._reconcile_orders('binance')
+            exchange.fetch_open_orders.reset_mock()
+            exchange.fetch_closed_orders.reset_mock()
+            await bot._reconcile_orders('binance')
+
+        log_error.assert_not_called()
+        assert [c.args[0] for c in exchange.fetch_open_orders.await_args_list] == ['BTC/USDT', 'ETH/USDT']
+        assert [c.args[0] for c in exchange.fetch_closed_orders.await_args_list] == ['BTC/USDT', 'ETH/USDT']
+
+    @pytest.mark.asyncio
+    async def test_transient_error_keeps_orders_without_fallback(self, bot):
+        """Test that a generic failure of the bulk call does not trigger per-symbol requests"""
+        exchange = bot.exchange_manager.exchanges['binance']['instance']
+        exchange.fetch_open_orders.side_effect = ccxt.NetworkError("timeout")
+        await bot._reconcile_orders('binance')
+
+        exchange.fetch_open_orders.assert_awaited_once_with(None)
+        exchange.fetch_closed_orders.assert_not_awaited()
+        assert len(bot.active_orders['binance']['BTC/USDT']) == 2
+        assert not bot.exchange_manager.requires_symbol('binance', 'fetch_open_orders')
+
+    @pytest.mark.asyncio
+    async def test_symbol_required_from_ccxt_options(self, bot):
+        """Test that ccxt's warnWithoutSymbol option skips the no-symbol call entirely"""
+        exchange = bot.exchange_manager.exchanges['binance']['instance']
+        exchange.options = {'fetchOpenOrders': {'warnWithoutSymbol': True}}
+        exchange.fetch_open_orders.return_value = []
+        exchange.fetch_order.return_value = {'status': 'open'}
+        await bot._reconcile_orders('binance')
+
+        assert [c.args[0] for c in exchange.fetch_open_orders.await_args_list] == ['BTC/USDT', 'ETH/USDT']
+
+    @pytest.mark.asyncio
+    async def test_unsupported_exchange_checks_each_order(self, bot):
+        """Test the per-order fallback for exchanges without fetchOpenOrders"""
+        exchange = bot.exchange_manager.exchanges['binance']['instance']
+        exchange.has = {}
+        exchange.fetch_order = AsyncMock(return_value={'status': 'open'})
+        await bot._reconcile_orders('binance')
+
+        assert exchange.fetch_order.await_count == 4
+        exchange.fetch_open_orders.assert_not_awaited()
+
+
+class TestBatchOrders:
+    """Test that the bot places and cancels orders in batches"""
+
+    @pytest.mark.asyncio
+    async def test_trading_decision_places_both_sides_in_one_batch(self, temp_config_file):
+        """Test that buy and sell quotes go out in one batch call"""
+        from bots.multi_exchange_bot import MultiExchangeTradingBot
+
+        manager = Mock()
+        manager.get_order_book.return_value = None
+        manager.place_orders_batch = AsyncMock(return_value=[{'id': '1'}, None])
+        bot = MultiExchangeTradingBot(temp_config_file, exchange_manager=manager)
+
+        config = {'spreads': {'bid_spread': 0.01, 'ask_spread': 0.01}, 'risk_management': {'min_order_amount': 2}}
+        await bot._make_trading_decision('binance', 'BTC/USDT', 100, config)
+
+        manager.place_orders_batch.assert_awaited_once()
+        orders = manager.place_orders_batch.await_args.args[1]
+        assert [o['side'] for o in orders] == ['buy', 'sell']
+        assert bot.active_orders['binance']['BTC/USDT'] == [{'id': '1', 'side': 'buy', 'price': pytest.approx(99)}]
+
+    @pytest.mark.asyncio
+    async def test_cancel_all_orders_batches_per_exchange(self, temp_config_file):
+        """Test that shutdown cancels with one batch call per exchange"""
+        from bots.multi_exchange_bot import MultiExchangeTradingBot
+
+        manager = Mock()
+        manager.exchanges = {'binance': {}, 'okx': {}}
+        manager.cancel_orders_batch = AsyncMock(side_effect=lambda name, orders: [{'id': o['id']} for o in orders])
+        bot = MultiExchangeTradingBot(temp_config_file, exchange_manager=manager)
+        bot.active_orders = {
+            'binance': {'BTC/USDT': [{'id': '1'}, {'id': '2'}], 'ETH/USDT': [{'id': '3'}]},
+            'okx': {'BTC/USDT': [{'id': '4'}]},
+            'uniswap': {'ETH/USDT': [{'id': '5'}]},
+        }
+
+        await bot._cancel_all_orders()
+
+        assert manager.cancel_orders_batch.await_count == 2
+        manager.cancel_orders_batch.assert_any_await('binance', [
+            {'id': '1', 'symbol': 'BTC/USDT'}, {'id': '2', 'symbol': 'BTC/USDT'}, {'id': '3', 'symbol': 'ETH/USDT'}
+        ])
@@ -0,0 +1,278 @@
+"""
+Tests for bots/order_book.py
+"""
+
+import pytest
+from unittest.mock import Mock, AsyncMock
+
+from bots.order_book import BookSide, L2OrderBook
+from bots.market_stream import MarketStream
+
+
+@pytest.fixture
+def book():
+    """Order book with three levels on each side"""
+    book = L2OrderBook('BTC/USDT')
+    book.apply_snapshot(
+        [[100, 1], [99, 2], [98, 3]],
+        [[101, 1], [102, 2], [103, 3]],
+        seq=10
+    )
+    return book
+
+
+class TestBookSide:
+    """Test cases for BookSide"""
+
+    def test_bid_side_ordering(self):
+        """Test that bids are kept best (highest) first"""
+        side = BookSide(is_bid=True)
+        for price in [99, 101, 100]:
+            side.update(price, 1)
+        assert side.levels() == [(101, 1), (100, 1), (99, 1)]
+        assert side.best() == (101, 1)
+
+    def test_ask_side_ordering(self):
+        """Test that asks are kept best (lowest) first"""
+        side = BookSide(is_bid=False)
+        for price in [102, 100, 101]:
+            side.update(price, 1)
+        assert side.levels() == [(100, 1), (101, 1), (102, 1)]
+
+    def test_update_and_delete(self):
+        """Test replacing and removing a level"""
+        side = BookSide(is_bid=False)
+        side.update(100, 1)
+        side.update(100, 5)
+        assert side.size_at(100) == 5
+        side.update(100, 0)
+        assert len(side) == 0
+        side.update(100, 0)  # ลบระดับที่ไม่มีอยู่ต้องไม่ผิดพลาด
+        assert side.best() is None
+
+
+class TestL2OrderBook:
+    """Test cases for L2OrderBook"""
+
+    def test_snapshot(self, book):
+        """Test snapshot application"""
+        assert book.in_sync is True
+        assert book.seq == 10
+        assert book.best_bid() == (100, 1)
+        assert book.best_ask() == (101, 1)
+
+    def test_snapshot_replaces_book(self, book):
+        """Test that a new snapshot drops old levels"""
+        book.apply_snapshot([[90, 1]], [[91, 1]], seq=20)
+        assert book.levels('bids') == [(90, 1)]
+        assert book.levels('asks') == [(91, 1)]
+
+    def test_diff(self, book):
+        """Test that diffs add, change and delete levels"""
+        assert book.apply_diff([[100, 0], [99.5, 4]], [[101, 7]], seq=11) is True
+        assert book.best_bid() == (99.5, 4)
+        assert book.best_ask() == (101, 7)
+        assert book.seq == 11
+
+    def test_diff_before_snapshot(self):
+        """Test that diffs are ignored until a snapshot arrives"""
+        book = L2OrderBook('BTC/USDT')
+        assert book.apply_diff([[100, 1]], [], seq=1) is False
+        assert book.best_bid() is None
+
+    def test_stale_diff_ignored(self, book):
+        """Test that old or duplicate diffs are dropped without losing sync"""
+        assert book.apply_diff([[100, 9]], [], seq=10) is False
+        assert book.in_sync is True
+        assert book.best_bid() == (100, 1)
+
+    def test_sequence_gap(self, book):
+        """Test that a missing sequence number marks the book out of sync"""
+        assert book.apply_diff([[100, 9]], [], seq=12) is False
+        assert book.in_sync is False
+        assert book.gaps == 1
+        assert book.best_bid() == (100, 1)
+
+        # diff ถัดไปถูกข้ามจนกว่าจะได้ snapshot ใหม่
+        assert book.apply_diff([], [], seq=13) is False
+        book.apply_snapshot([[100, 2]], [[101, 2]], seq=13)
+        assert book.apply_diff([], [[101, 0]], seq=14) is True
+
+    def test_diff_without_seq(self, book):
+        """Test exchanges that do not send sequence numbers"""
+        assert book.apply_diff([[97, 1]], [], seq=None) is True
+        assert book.depth_at('bids', 97) == 1
+
+    def test_mid_and_spread(self, book):
+        """Test mid price and relative spread"""
+        assert book.mid_price() == 100.5
+        assert book.spread() == pytest.approx(1 / 100.5)
+        assert L2OrderBook('ETH/USDT').mid_price() is None
+        assert L2OrderBook('ETH/USDT').spread() is None
+
+    def test_depth(self, book):
+        """Test size at and through a price"""
+        assert book.depth_at('bids', 99) == 2
+        assert book.depth_at('asks', 99) == 0
+        assert book.depth_through('bids', 99) == 3
+        assert book.depth_through('bids', 98.5) == 3
+        assert book.depth_through('asks', 102) == 3
+        assert book.depth_through('asks', 200) == 6
+
+    def test_vwap(self, book):
+        """Test volume-weighted price for taking liquidity"""
+        assert book.vwap('asks', 1) == 101
+        assert book.vwap('asks', 3) == pytest.approx((101 + 2 * 102) / 3)
+        assert book.vwap('bids', 2) == pytest.approx((100 + 99) / 2)
+        assert book.vwap('asks', 0) == 101
+
+    def test_vwap_insufficient_liquidity(self, book):
+        """Test that vwap returns None when the book is too thin"""
+        assert book.vwap('bids', 100) is None
+
+    def test_max_depth(self):
+        """Test that levels beyond max_depth are dropped"""
+        book = L2OrderBook('BTC/USDT', max_depth=2)
+        book.apply_snapshot([[100, 1], [99, 1], [98, 1]], [[101, 1], [102, 1], [103, 1]])
+        assert book.levels('bids') == [(100, 1), (99, 1)]
+        assert book.levels('asks', 1) == [(101, 1)]
+
+    def test_diffs_after_max_depth_keep_known_levels(self):
+        """Test that diffs never insert levels past the truncated range and never truncate again"""
+        book = L2OrderBook('BTC/USDT', max_depth=2)
+        book.apply_snapshot([[100, 1], [99, 1], [98, 1]], [[101, 1], [102, 1], [103, 1]])
+        book.apply_diff([[98, 5], [99.5, 2]], [[101, 0], [103, 4]])
+
+        # 98 และ 103 ถูกตัดทิ้งตอน snapshot จึงไม่รู้ขนาดจริงของระดับที่อยู่ระหว่างนั้น
+        assert book.levels('bids') == [(100, 1), (99.5, 2), (99, 1)]
+        assert book.levels('asks') == [(102, 1)]
+
+        book.apply_snapshot([[100, 1], [99, 1]], [[101, 1], [102, 1]])
+        book.apply_diff([[98, 3]], [])
+        assert book.levels('bids') == [(100, 1), (99, 1), (98, 3)]
+
+    def test_deep_book_without_max_depth(self):
+        """Test that an unbounded diff-fed book keeps every level in order"""
+        book = L2OrderBook('BTC/USDT')
+        book.apply_snapshot([], [])
+        for tick in range(5000):
+            book.apply_diff([[10000 - tick * 0.5, 1]], [[10001 + (tick * 7919) % 5000, 1]])
+        book.apply_diff([[10000, 0]], [[10001, 0]])
+
+        assert len(book.bids) == 4999
+        assert book.best_bid() == (9999.5, 1)
+        assert book.best_ask() == (10002, 1)
+        assert book.depth_through('asks', 10010) == 9
+
+    def test_levels_with_extra_fields(self):
+        """Test levels sent as [price, size, count] strings"""
+        book = L2OrderBook('BTC/USDT')
+        book.apply_snapshot([['100.5', '1.5', 3]], [['101', '2', 1]])
+        assert book.best_bid() == (100.5, 1.5)
+
+    def test_invalid_side(self, book):
+        """Test that an unknown side raises ValueError"""
+        with pytest.raises(ValueError):
+            book.depth_at('middle', 100)
+
+
+class TestStreamBookResync:
+    """Test gap handling between MarketStream and ExchangeManager"""
+
+    def test_gap_notifies_once(self):
+        """Test that a gap triggers one resync request until a snapshot arrives"""
+        stream = MarketStream('binance', 'ws://localhost')
+        gaps = []
+        stream.add_gap_listener(gaps.append)
+
+        stream._apply_book('BTC/USDT', {'type': 'snapshot', 'bids': [[100, 1]], 'asks': [[101, 1]], 'seq': 1})
+        stream._apply_book('BTC/USDT', {'type': 'update', 'bids': [[100, 2]], 'asks': [], 'seq': 3})
+        stream._apply_book('BTC/USDT', {'type': 'update', 'bids': [[100, 3]], 'asks': [], 'seq': 4})
+
+        assert gaps == ['BTC/USDT']
+        assert stream.stats['gaps'] == 1
+        assert stream.get_order_book('BTC/USDT') is None
+        assert stream.get_book('BTC/USDT')['in_sync'] is False
+
+        stream.resync_book('BTC/USDT', [[100, 5]], [[101, 5]], 10)
+        assert stream.get_order_book('BTC/USDT').best_bid() == (100, 5)
+
+    def test_diff_before_snapshot_requests_resync(self):
+        """Test that a diff for an unknown book asks for a snapshot"""
+        stream = MarketStream('binance', 'ws://localhost')
+        gaps = []
+        stream.add_gap_listener(gaps.append)
+        stream._apply_book('ETH/USDT', {'type': 'update', 'bids': [[10, 1]], 'asks': [], 'seq': 5})
+        assert gaps == ['ETH/USDT']
+
+    @pytest.mark.asyncio
+    async def test_manager_resync_from_rest(self, temp_config_file):
+        """Test REST snapshot resync through ExchangeManager"""
+        from bots.exchange_manager import ExchangeManager
+
+        manager = ExchangeManager(temp_config_file)
+        exchange = Mock()
+        exchange.fetch_order_book = AsyncMock(return_value={
+            'bids': [[100, 2]], 'asks': [[101, 3]], 'nonce': 42
+        })
+        manager.exchanges['binance'] = {'instance': exchange}
+        stream = MarketStream('binance', 'ws://localhost')
+        manager.attach_stream('binance', stream)
+
+        assert manager.get_order_book('binance', 'BTC/USDT') is None
+        assert await manager.resync_order_book('binance', 'BTC/USDT') is True
+
+        book = manager.get_order_book('binance', 'BTC/USDT')
+        assert book.seq == 42
+        assert book.best_ask() == (101, 3)
+        assert await manager.resync_order_book('okx', 'BTC/USDT') is False
+
+
+class TestBookQuotes:
+    """Test that the trading bot quotes off the order book"""
+
+    def test_quotes_from_book(self, temp_config_file, book):
+        """Test mid-price quoting with slippage-aware spreads"""
+        from bots.multi_exchange_bot import MultiExchangeTradingBot
+
+        manager = Mock()
+        manager.get_order_book.return_value = book
+        bot = MultiExchangeTradingBot(temp_config_file, exchange_manager=manager)
+
+        # spread จาก config กว้างกว่า book ใช้ spread จาก config รอบราคากลาง
+        bid, ask = bot._quote_prices('binance', 'BTC/USDT', 50, 0.01, 0.01, 0.5)
+        assert bid == pytest.approx(100.5 * 0.99)
+        assert ask == pytest.approx(100.5 * 1.01)
+
+        # spread จาก config แคบกว่า book ใช้ spread ของ vwap (ขนาดนี้อยู่ในระดับแรก)
+        bid, ask = bot._quote_prices('binance', 'BTC/USDT', 50, 0.001, 0.001, 0.5)
+        assert bid == pytest.approx(100)
+        assert ask == pytest.approx(101)
+
+        # สภาพคล่องไม่พอคำนวณ vwap วางราคาภายใน spread ได้
+        bid, ask = bot._quote_prices('binance', 'BTC/USDT', 50, 0.001, 0.001, 10)
+        assert bid == pytest.approx(100.5 * 0.999)
+        assert ask == pytest.approx(100.5 * 1.001)
+        assert 100 < bid < ask < 101
+
+        # ราคาที่ถึงฝั่งตรงข้ามถอยไปต่อคิวที่ราคาดีที่สุดของฝั่งตัวเอง
+        bid, ask = bot._quote_prices('binance', 'BTC/USDT', 50, -0.01, -0.01, 10)
+        assert bid == pytest.approx(100)
+        assert ask == pytest.approx(101)
+
+        # ขนาดใหญ่ spread กว้างขึ้นตาม vwap
+        bid, ask = bot._quote_prices('binance', 'BTC/USDT', 50, 0.001, 0.001, 3)
+        assert bid == pytest.approx((100 + 2 * 99) / 3)
+        assert ask == pytest.approx((101 + 2 * 102) / 3)
+
+    def test_quotes_without_book(self, temp_config_file):
+        """Test fallback to the ticker price when no book is available"""
+        from bots.multi_exchange_bot import MultiExchangeTradingBot
+
+        manager = Mock()
+        manager.get_order_book.return_value = None
+        bot = MultiExchangeTradingBot(temp_config_file, exchange_manager=manager)
+
+        bid, ask = bot._quote_prices('binance', 'BTC/USDT', 1000, 0.01, 0.02, 1)
+        assert bid == pytest.approx(990)
+        assert ask == pytest.approx(1020)
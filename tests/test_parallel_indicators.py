@@ -0,0 +1,115 @@
+"""
+Tests for bots/parallel_indicators.py
+"""
+
+import pytest
+import time
+import numpy as np
+from unittest.mock import patch
+
+from bots.parallel_indicators import SIGNAL_DTYPE, ParallelIndicators, signal_records
+from bots.vector_scan import scan_matrix
+
+PARAMS = {'min_signal_strength': 0, 'min_volume_24h': 0}
+
+
+def make_matrix(rows=200, count=120, seed=3, nan_rows=()):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, (rows, count)), axis=1)
+    volume = rng.random((rows, count)) * 1e5
+    for row in nan_rows:
+        close[row, :count // 2] = np.nan
+    return close, volume
+
+
+def assert_same_records(actual, expected):
+    assert actual.dtype == SIGNAL_DTYPE
+    assert actual.tobytes() == expected.tobytes()
+
+
+class TestSignalRecords:
+    """Test cases for signal_records"""
+
+    def test_matches_scan_matrix(self):
+        close, volume = make_matrix(nan_rows=(0, 5))
+        result = scan_matrix([None] * len(close), np.empty(0), close, volume, **PARAMS)
+        records = signal_records(close, volume, **PARAMS)
+
+        rows = result.signal_indices()
+        assert len(rows) > 0
+        assert list(records['row']) == list(rows)
+        assert list(records['long']) == list(result.long[rows])
+        assert np.array_equal(records['strength'], result.signal_strength[rows, -1])
+        assert np.array_equal(records['macd'], result.macd[rows, -1])
+
+    def test_row_offset(self):
+        close, volume = make_matrix(rows=50)
+        full = signal_records(close, volume, **PARAMS)
+        records = signal_records(close[10:], volume[10:], row_offset=10, **PARAMS)
+        assert_same_records(records, full[full['row'] >= 10])
+
+
+class TestParallelIndicators:
+    """Test cases for ParallelIndicators"""
+
+    @pytest.mark.asyncio
+    async def test_matches_single_process(self):
+        """Test that chunked shared-memory workers return the same records bit for bit"""
+        close, volume = make_matrix(rows=300, nan_rows=(3, 150, 299))
+        parallel = ParallelIndicators(workers=2, chunk_rows=37, min_rows=1)
+        try:
+            records = await parallel.scan(close, volume, **PARAMS)
+        finally:
+            parallel.close()
+
+        assert_same_records(records, signal_records(close, volume, **PARAMS))
+
+    @pytest.mark.asyncio
+    async def test_small_matrix_stays_in_process(self):
+        close, volume = make_matrix(rows=10)
+        parallel = ParallelIndicators(workers=4, min_rows=64)
+
+        records = await parallel.scan(close, volume, **PARAMS)
+
+        assert parallel._pool is None
+        assert_same_records(records, signal_records(close, volume, **PARAMS))
+
+    @pytest.mark.asyncio
+    async def test_falls_back_when_pool_fails(self):
+        close, volume = make_matrix(rows=100)
+        parallel = ParallelIndicators(workers=2, min_rows=1)
+
+        with patch.object(parallel, '_scan_shared', side_effect=OSError('no /dev/shm')):
+            records = await parallel.scan(close, volume, **PARAMS)
+
+        assert_same_records(records, signal_records(close, volume, **PARAMS))
+
+    def test_chunks_cover_all_rows(self):
+        parallel = ParallelIndicators(workers=3)
+        chunks = parallel._chunks(100)
+        assert chunks[0][0] == 0 and chunks[-1][1] == 100
+        assert all(stop == start for (_, stop), (start, _) in zip(chunks, chunks[1:]))
+        assert len(chunks) == 12
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_benchmark(self):
+        """Pooled scan of 4,000 series × 500 bars is faster than one process when there are CPUs to spare"""
+        close, volume = make_matrix(rows=4000, count=500)
+
+        started = time.perf_counter()
+        expected = signal_records(close, volume, **PARAMS)
+        single = time.perf_counter() - started
+
+        parallel = ParallelIndicators(min_rows=1)
+        try:
+            await parallel.scan(close[:10], volume[:10], **PARAMS)  # เริ่ม worker ก่อนจับเวลา
+            started = time.perf_counter()
+            records = await parallel.scan(close, volume, **PARAMS)
+            pooled = time.perf_counter() - started
+        finally:
+            parallel.close()
+
+        assert_same_records(records, expected)
+        if parallel.workers >= 4:
+            assert pooled < single, f"single: {single * 1000:.0f} ms, {parallel.workers} workers: {pooled * 1000:.0f} ms"
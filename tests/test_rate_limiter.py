@@ -0,0 +1,201 @@
+"""
+Tests for bots/rate_limiter.py
+"""
+
+import pytest
+import asyncio
+import time
+
+from bots.rate_limiter import (
+    RateLimitScheduler, lane_for_method, weight_for_call,
+    LANE_ORDER, LANE_ORDER_STATUS, LANE_TICKER, LANE_OHLCV
+)
+
+
+class TestLaneForMethod:
+    """Test cases for method to lane mapping"""
+
+    def test_known_methods(self):
+        """Test that ccxt methods map to the expected lanes"""
+        assert lane_for_method('create_limit_buy_order') == LANE_ORDER
+        assert lane_for_method('cancel_order') == LANE_ORDER
+        assert lane_for_method('fetch_order') == LANE_ORDER_STATUS
+        assert lane_for_method('fetch_balance') == LANE_ORDER_STATUS
+        assert lane_for_method('fetch_ticker') == LANE_TICKER
+        assert lane_for_method('fetch_ohlcv') == LANE_OHLCV
+
+    def test_unknown_method_defaults_to_ticker(self):
+        """Test fallback lane for unmapped methods"""
+        assert lane_for_method('fetch_something_new') == LANE_TICKER
+
+
+class TestRateLimitScheduler:
+    """Test cases for RateLimitScheduler"""
+
+    @pytest.mark.asyncio
+    async def test_spacing_follows_rate_limit(self):
+        """Test that requests are spaced by rateLimit once the bucket is empty"""
+        scheduler = RateLimitScheduler(rate_limit_ms=20, capacity=1)
+
+        start = time.monotonic()
+        for _ in range(5):
+            await scheduler.acquire(LANE_OHLCV)
+        elapsed = time.monotonic() - start
+
+        # token แรกพร้อมใช้ทันที อีก 4 ครั้งต้องรอครั้งละ ~20ms
+        assert elapsed >= 0.07
+        assert scheduler.get_stats()['ohlcv']['completed'] == 5
+
+    @pytest.mark.asyncio
+    async def test_burst_capacity(self):
+        """Test that capacity allows an initial burst without waiting"""
+        scheduler = RateLimitScheduler(rate_limit_ms=1000, capacity=3)
+
+        start = time.monotonic()
+        for _ in range(3):
+            await scheduler.acquire(LANE_TICKER)
+        assert time.monotonic() - start < 0.05
+
+    @pytest.mark.asyncio
+    async def test_priority_lanes(self):
+        """Test that orders jump ahead of queued scan requests"""
+        scheduler = RateLimitScheduler(rate_limit_ms=20, capacity=1)
+        await scheduler.acquire(LANE_OHLCV)  # ใช้ token ที่มีอยู่ให้หมด
+
+        served = []
+
+        async def request(lane, tag):
+            await scheduler.acquire(lane)
+            served.append(tag)
+
+        tasks = [asyncio.create_task(request(LANE_OHLCV, f'scan{i}')) for i in range(3)]
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth()['ohlcv'] == 3
+
+        tasks.append(asyncio.create_task(request(LANE_TICKER, 'ticker')))
+        tasks.append(asyncio.create_task(request(LANE_ORDER, 'order')))
+        await asyncio.gather(*tasks)
+
+        assert served[:2] == ['order', 'ticker']
+        assert served[2:] == ['scan0', 'scan1', 'scan2']
+        assert scheduler.queue_depth()['ohlcv'] == 0
+
+    @pytest.mark.asyncio
+    async def test_wait_stats(self):
+        """Test that wait time is recorded per lane"""
+        scheduler = RateLimitScheduler(rate_limit_ms=30, capacity=1)
+        await asyncio.gather(*(scheduler.acquire(LANE_OHLCV) for _ in range(3)))
+
+        stats = scheduler.get_stats()['ohlcv']
+        assert stats['completed'] == 3
+        assert stats['queued'] == 0
+        assert stats['max_wait_ms'] >= 50
+        assert stats['avg_wait_ms'] > 0
+        assert scheduler.get_stats()['order']['completed'] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_request_releases_queue(self):
+        """Test that a cancelled waiter does not consume a token"""
+        scheduler = RateLimitScheduler(rate_limit_ms=50, capacity=1)
+        await scheduler.acquire(LANE_OHLCV)
+
+        waiter = asyncio.create_task(scheduler.acquire(LANE_OHLCV))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        await scheduler.acquire(LANE_ORDER)
+        stats = scheduler.get_stats()
+        assert stats['ohlcv']['queued'] == 0
+        assert stats['ohlcv']['completed'] == 1
+        assert stats['order']['completed'] == 1
+
+    def test_reused_across_event_loops(self):
+        """Test that a timer left pending in a closed loop doesn't stall the next asyncio.run"""
+        scheduler = RateLimitScheduler(rate_limit_ms=100, capacity=1)
+
+        async def first_run():
+            await scheduler.acquire(LANE_OHLCV)
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(scheduler.acquire(LANE_OHLCV), timeout=0.01)
+
+        asyncio.run(first_run())
+        assert scheduler._timer is not None
+
+        asyncio.run(asyncio.wait_for(scheduler.acquire(LANE_ORDER), timeout=1))
+        stats = scheduler.get_stats()
+        assert stats['order']['completed'] == 1
+        assert stats['ohlcv']['queued'] == 0
+
+    @pytest.mark.asyncio
+    async def test_unmetered_scheduler(self):
+        """Test that no rate limit means no waiting but stats are still kept"""
+        scheduler = RateLimitScheduler(rate_limit_ms=None)
+
+        start = time.monotonic()
+        await asyncio.gather(*(scheduler.acquire(LANE_TICKER) for _ in range(50)))
+        assert time.monotonic() - start < 0.05
+        assert scheduler.get_stats()['ticker']['completed'] == 50
+
+    @pytest.mark.asyncio
+    async def test_weight_above_capacity_waits_for_tokens(self):
+        """Test that an oversized weight waits for its full cost instead of blocking forever"""
+        scheduler = RateLimitScheduler(rate_limit_ms=10, capacity=2)
+        start = time.monotonic()
+        await asyncio.wait_for(scheduler.acquire(LANE_OHLCV, weight=10), timeout=1)
+        assert time.monotonic() - start >= 0.07
+
+    @pytest.mark.asyncio
+    async def test_weighted_calls_slow_the_loop(self):
+        """Test that heavy calls go out at their own cost, not the single-call rate"""
+        scheduler = RateLimitScheduler(rate_limit_ms=10, capacity=1)
+
+        start = time.monotonic()
+        for _ in range(3):
+            await scheduler.acquire(LANE_TICKER, weight=5)
+        # 3 × 5 tokens ที่ 100 tokens/วินาที ลบ token เริ่มต้น 1 ตัว
+        assert time.monotonic() - start >= 0.13
+
+        # หลัง request หนักไม่มี burst สะสมเกิน capacity
+        start = time.monotonic()
+        await scheduler.acquire(LANE_TICKER)
+        await scheduler.acquire(LANE_TICKER)
+        assert time.monotonic() - start >= 0.008
+
+    def test_acquire_sync_blocks_for_its_cost(self):
+        """Test the blocking path used by sync clients"""
+        scheduler = RateLimitScheduler(rate_limit_ms=10, capacity=1)
+
+        start = time.monotonic()
+        scheduler.acquire_sync(LANE_ORDER_STATUS, weight=1)
+        scheduler.acquire_sync(LANE_ORDER_STATUS, weight=5)
+        assert time.monotonic() - start >= 0.045
+        assert scheduler.get_stats()['order_status']['completed'] == 2
+
+    @pytest.mark.asyncio
+    async def test_sync_debt_delays_queued_requests(self):
+        scheduler = RateLimitScheduler(rate_limit_ms=10, capacity=1)
+        scheduler.acquire_sync(LANE_OHLCV, weight=1)
+        scheduler.tokens -= 5  # เหมือน acquire_sync ที่จองไว้จาก thread อื่น
+
+        start = time.monotonic()
+        await scheduler.acquire(LANE_ORDER)
+        assert time.monotonic() - start >= 0.05
+
+
+class TestWeightForCall:
+    """Test cases for request weights"""
+
+    def test_defaults(self):
+        assert weight_for_call('fetch_ohlcv', ('BTC/USDT', '1h')) == 1
+        assert weight_for_call('fetch_tickers', ()) == 16
+        assert weight_for_call('fetch_tickers', (['BTC/USDT'],)) == 1
+        assert weight_for_call('fetch_open_orders', (None,)) == 16
+        assert weight_for_call('fetch_open_orders', ('BTC/USDT',)) == pytest.approx(1.2)
+
+    def test_config_overrides(self):
+        weights = {'fetch_tickers': 40, 'fetch_open_orders': {'cost': 3, 'noSymbol': 40}}
+        assert weight_for_call('fetch_tickers', (), weights) == 40
+        assert weight_for_call('fetch_open_orders', (), weights) == 40
+        assert weight_for_call('fetch_open_orders', ('BTC/USDT',), weights) == 3
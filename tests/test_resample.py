@@ -0,0 +1,158 @@
+"""
+Tests for bots/resample.py
+"""
+
+import pytest
+import time
+import numpy as np
+import pandas as pd
+from unittest.mock import Mock, AsyncMock
+
+from bots.candle_cache import to_dataframe
+from bots.crypto_scanner import CryptoPairsScanner
+from bots.resample import (
+    bars_needed, bucket_starts, can_resample, plan_timeframes, resample_dataframe, resample_ohlcv
+)
+
+HOUR = 3_600_000
+DAY = 24 * HOUR
+
+
+def make_hourly(start, count, seed=1):
+    """Random-walk hourly candles starting at start (ms)"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    high = np.maximum(open_, close) + rng.random(count)
+    low = np.minimum(open_, close) - rng.random(count)
+    volume = rng.random(count) * 10
+    timestamps = start + np.arange(count) * HOUR
+    return np.column_stack([timestamps, open_, high, low, close, volume])
+
+
+class TestResample:
+    """Test cases for OHLCV aggregation"""
+
+    def test_matches_pandas_resample(self):
+        """Test OHLCV aggregation against pandas for 4h and 1d"""
+        candles = make_hourly(1_700_000_000_000 // DAY * DAY, 24 * 10)
+        df = to_dataframe(candles)
+
+        for timeframe, rule in (('4h', '4h'), ('1d', '1D')):
+            expected = df.resample(rule).agg({
+                'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
+            })
+            result = resample_dataframe(df, timeframe)
+            pd.testing.assert_frame_equal(result, expected, check_freq=False, check_names=False)
+
+    def test_partial_first_bucket_dropped(self):
+        """Test that a bucket missing its opening bars is not emitted"""
+        start = 1_700_000_000_000 // DAY * DAY
+        candles = make_hourly(start + 5 * HOUR, 24 + 19)
+
+        result = resample_ohlcv(candles, '1d')
+        assert len(result) == 1
+        assert result[0, 0] == start + DAY
+
+    def test_last_bucket_may_be_open(self):
+        """Test that the still-forming bucket is kept like an exchange would return it"""
+        start = 1_700_000_000_000 // DAY * DAY
+        candles = make_hourly(start, 24 + 3)
+
+        result = resample_ohlcv(candles, '1d')
+        assert len(result) == 2
+        assert result[-1, 1] == candles[24, 1]
+        assert result[-1, 4] == candles[-1, 4]
+        assert result[-1, 5] == pytest.approx(candles[24:, 5].sum())
+
+    def test_weekly_starts_monday(self):
+        """Test weekly alignment to Monday 00:00 UTC"""
+        monday = int(pd.Timestamp('2024-01-08', tz='UTC').timestamp() * 1000)
+        starts = bucket_starts(np.array([monday - 1, monday, monday + 6 * DAY]), '1w')
+        assert list(starts) == [monday - 7 * DAY, monday, monday]
+
+    def test_monthly_calendar_alignment(self):
+        """Test calendar-month buckets"""
+        feb = int(pd.Timestamp('2024-02-01', tz='UTC').timestamp() * 1000)
+        mar = int(pd.Timestamp('2024-03-01', tz='UTC').timestamp() * 1000)
+        starts = bucket_starts(np.array([feb, mar - 1, mar]), '1M')
+        assert list(starts) == [feb, feb, mar]
+
+    def test_session_offset(self):
+        """Test shifting the session start (e.g. UTC+8 daily candles)"""
+        start = 1_700_000_000_000 // DAY * DAY
+        starts = bucket_starts(np.array([start + 7 * HOUR, start + 8 * HOUR]), '1d', offset_ms=8 * HOUR)
+        assert list(starts) == [start - 16 * HOUR, start + 8 * HOUR]
+
+    def test_empty_input(self):
+        """Test resampling no candles"""
+        assert resample_ohlcv(np.empty((0, 6)), '4h').shape == (0, 6)
+
+
+class TestTimeframePlan:
+    """Test cases for choosing which timeframes to fetch"""
+
+    def test_can_resample(self):
+        assert can_resample('1h', '4h')
+        assert can_resample('1h', '1d')
+        assert can_resample('4h', '1w')
+        assert not can_resample('4h', '1h')
+        assert not can_resample('1h', '1h')
+        assert not can_resample('5h', '1d')
+        assert not can_resample('7h', '1w')
+
+    def test_bars_needed(self):
+        assert bars_needed('1h', '4h', 100) == 403
+        assert bars_needed('1h', '1d', 10) == 263
+
+    def test_plan_within_limit(self):
+        """Test that derivable timeframes share the finest base"""
+        assert plan_timeframes(['1d', '1h', '4h'], 30, 1000) == {'1h': ['4h', '1d']}
+
+    def test_plan_falls_back_to_direct_fetch(self):
+        """Test that timeframes needing too many base bars are fetched directly"""
+        assert plan_timeframes(['1h', '4h', '1d'], 100, 1000) == {'1h': ['4h'], '1d': []}
+        assert plan_timeframes(['1h', '4h'], 100, 0) == {'1h': [], '4h': []}
+
+
+class TestScannerResampling:
+    """Test that the scanner fetches only base timeframes"""
+
+    @pytest.mark.asyncio
+    async def test_fetch_timeframes_single_request(self, temp_config_file):
+        """Test that 1h, 4h and 1d come from one 1h request"""
+        scanner = CryptoPairsScanner(temp_config_file)
+        now = int(time.time() * 1000) // HOUR * HOUR
+        candles = make_hourly(now - 299 * HOUR, 300)
+
+        exchange = Mock()
+        exchange.fetch_ohlcv.return_value = candles.tolist()
+        scanner.exchange_manager.exchanges = {'binance': {'instance': exchange}}
+        scanner.exchange_manager.get_exchange = Mock(return_value=exchange)
+
+        frames = await scanner.fetch_timeframes('binance', 'BTC/USDT', ['1h', '4h', '1d'], 10)
+
+        exchange.fetch_ohlcv.assert_called_once()
+        assert exchange.fetch_ohlcv.call_args.args[1] == '1h'
+        assert exchange.fetch_ohlcv.call_args.kwargs['limit'] == 263
+        assert len(frames['1h']) == 10
+        assert len(frames['4h']) == 10
+        assert len(frames['1d']) == 10
+        assert frames['4h']['close'].iloc[-1] == candles[-1, 4]
+        assert frames['1d']['volume'].iloc[-2] == pytest.approx(
+            resample_ohlcv(candles, '1d')[-2, 5]
+        )
+
+    @pytest.mark.asyncio
+    async def test_failed_base_fetch_is_not_retried_per_timeframe(self, temp_config_file):
+        """Test that a failed base fetch yields empty frames for its derived timeframes"""
+        scanner = CryptoPairsScanner(temp_config_file)
+        scanner.config.exchanges = ['binance']
+        scanner.config.trading_pairs = ['BTC/USDT']
+        scanner.exchange_manager.get_enabled_exchanges = Mock(return_value=['binance'])
+        scanner.fetch_ohlcv_data = AsyncMock(return_value=None)
+
+        results = await scanner.scan_all_pairs(['1h', '4h'])
+
+        assert results == {}
+        assert scanner.fetch_ohlcv_data.call_count == 1
@@ -0,0 +1,177 @@
+"""
+Tests for bots/scan_executor.py
+"""
+
+import pytest
+import asyncio
+from functools import partial
+
+from bots.scan_executor import ScanExecutor, ScanProgress, ExchangeProgress
+
+
+class Tracker:
+    """Records how many jobs run at once, overall and per exchange"""
+
+    def __init__(self):
+        self.active = {}
+        self.peak = {}
+        self.total = 0
+        self.total_peak = 0
+
+    async def job(self, exchange_name, name, delay=0.01, result=None):
+        self.active[exchange_name] = self.active.get(exchange_name, 0) + 1
+        self.total += 1
+        self.peak[exchange_name] = max(self.peak.get(exchange_name, 0), self.active[exchange_name])
+        self.total_peak = max(self.total_peak, self.total)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.active[exchange_name] -= 1
+            self.total -= 1
+        return name if result is None else result
+
+    def jobs(self, exchange_name, count, delay=0.01):
+        return [(exchange_name, f"{exchange_name}-{i}", partial(self.job, exchange_name, f"{exchange_name}-{i}", delay))
+                for i in range(count)]
+
+
+async def collect(executor, jobs):
+    return [item async for item in executor.run(jobs)]
+
+
+class TestScanExecutor:
+    """Test cases for ScanExecutor"""
+
+    @pytest.mark.asyncio
+    async def test_limits(self):
+        """Test the overall and per-exchange concurrency limits"""
+        tracker = Tracker()
+        executor = ScanExecutor(max_concurrent=5, per_exchange=3, timeout=None)
+
+        results = await collect(executor, tracker.jobs('binance', 10) + tracker.jobs('okx', 10))
+
+        assert len(results) == 20
+        assert tracker.total_peak == 5
+        assert max(tracker.peak.values()) == 3
+        assert {name: stats.peak for name, stats in executor.progress.exchanges.items()} == tracker.peak
+
+    @pytest.mark.asyncio
+    async def test_exchange_override(self):
+        tracker = Tracker()
+        executor = ScanExecutor(max_concurrent=50, per_exchange=4, exchange_limits={'gateio': 1}, timeout=None)
+
+        await collect(executor, tracker.jobs('binance', 8) + tracker.jobs('gateio', 4))
+
+        assert tracker.peak == {'binance': 4, 'gateio': 1}
+
+    @pytest.mark.asyncio
+    async def test_slow_exchange_does_not_starve_others(self):
+        """Test that queued jobs of a saturated exchange don't hold the shared slots"""
+        tracker = Tracker()
+        release = asyncio.Event()
+
+        async def stuck(name):
+            await release.wait()
+            return name
+
+        slow = [('slow', f"slow-{i}", partial(stuck, f"slow-{i}")) for i in range(10)]
+        executor = ScanExecutor(max_concurrent=3, per_exchange=2, timeout=None)
+        runner = executor.run(slow + tracker.jobs('fast', 5))
+
+        names = [(await runner.__anext__())[0] for _ in range(5)]
+        assert all(name.startswith('fast') for name in names)
+        assert executor.progress.exchanges['slow'].in_flight == 2
+
+        release.set()
+        rest = [name async for name, _ in runner]
+        assert len(rest) == 10
+
+    @pytest.mark.asyncio
+    async def test_timeout_and_failure_are_counted(self):
+        async def hang():
+            await asyncio.sleep(10)
+
+        async def fail():
+            raise RuntimeError('boom')
+
+        async def ok():
+            return 1
+
+        executor = ScanExecutor(timeout=0.05)
+        results = await collect(executor, [('binance', 'hang', hang), ('binance', 'fail', fail), ('binance', 'ok', ok)])
+
+        assert results == [('ok', 1)]
+        progress = executor.progress
+        assert (progress.total, progress.done, progress.failed, progress.timed_out) == (3, 3, 2, 1)
+        assert progress.remaining() == 0 and progress.eta == 0.0
+        assert progress.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_closing_cancels_running_jobs(self):
+        cancelled = []
+
+        async def slow(name):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(name)
+                raise
+
+        async def fast():
+            return 'done'
+
+        executor = ScanExecutor(timeout=None)
+        runner = executor.run([('a', 'fast', fast), ('a', 'slow1', partial(slow, 'slow1')),
+                               ('b', 'slow2', partial(slow, 'slow2'))])
+        assert await runner.__anext__() == ('fast', 'done')
+        await runner.aclose()
+
+        assert sorted(cancelled) == ['slow1', 'slow2']
+        assert executor.progress.finished is not None
+
+    @pytest.mark.asyncio
+    async def test_jobs_are_created_lazily(self):
+        """Test that coroutines are only created when a slot opens"""
+        created = []
+
+        def factory(name):
+            created.append(name)
+            return asyncio.sleep(0.01, result=name)
+
+        executor = ScanExecutor(max_concurrent=2, per_exchange=2, timeout=None)
+        runner = executor.run([('binance', i, partial(factory, i)) for i in range(6)])
+        await runner.__anext__()
+        assert len(created) <= 4
+        await runner.aclose()
+
+    @pytest.mark.asyncio
+    async def test_stats(self):
+        tracker = Tracker()
+        executor = ScanExecutor(timeout=None)
+        await collect(executor, tracker.jobs('binance', 4))
+
+        stats = executor.get_stats()
+        assert stats['total'] == stats['done'] == 4
+        assert stats['failed'] == 0 and stats['eta'] == 0.0
+        assert stats['throughput'] > 0
+        assert stats['exchanges']['binance']['avg_latency_ms'] > 0
+
+
+class TestScanProgress:
+    """Test cases for ScanProgress"""
+
+    def test_eta(self):
+        progress = ScanProgress(started=0.0, finished=10.0)
+        progress.exchanges['binance'] = ExchangeProgress(total=40, done=10)
+
+        assert progress.throughput == 1.0
+        assert progress.eta == 30.0
+        assert progress.remaining('binance') == 30
+        assert progress.remaining('okx') == 0
+
+    def test_eta_unknown_before_first_result(self):
+        progress = ScanProgress()
+        progress.exchanges['binance'] = ExchangeProgress(total=5)
+
+        assert progress.eta is None
+        assert progress.to_dict()['eta'] is None
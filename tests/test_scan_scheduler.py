@@ -0,0 +1,108 @@
+"""
+Tests for bots/scan_scheduler.py
+"""
+
+import pytest
+import asyncio
+from datetime import datetime, timezone
+
+from bots.scan_scheduler import CloseScheduler, next_close, sleep_until
+
+
+def ms(*args):
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def seconds(*args):
+    return ms(*args) / 1000
+
+
+class TestNextClose:
+    """Test cases for next_close"""
+
+    @pytest.mark.parametrize('timeframe, now, expected', [
+        ('1m', (2024, 3, 5, 10, 7, 30), (2024, 3, 5, 10, 8)),
+        ('15m', (2024, 3, 5, 10, 7, 30), (2024, 3, 5, 10, 15)),
+        ('1h', (2024, 3, 5, 10, 0), (2024, 3, 5, 11, 0)),
+        ('4h', (2024, 3, 5, 10, 7), (2024, 3, 5, 12, 0)),
+        ('1d', (2024, 3, 5, 23, 59, 59), (2024, 3, 6)),
+        ('1w', (2024, 3, 6, 12), (2024, 3, 11)),  # วันจันทร์
+        ('1M', (2024, 2, 10), (2024, 3, 1)),
+        ('1M', (2024, 12, 31, 23), (2025, 1, 1)),
+        ('3M', (2024, 5, 20), (2024, 7, 1)),
+    ])
+    def test_next_close(self, timeframe, now, expected):
+        assert next_close(timeframe, ms(*now)) == ms(*expected)
+
+    def test_offset(self):
+        """Test daily bars that start at 08:00 UTC"""
+        assert next_close('1d', ms(2024, 3, 5, 9), offset_ms=8 * 3_600_000) == ms(2024, 3, 6, 8)
+
+
+class TestCloseScheduler:
+    """Test cases for CloseScheduler"""
+
+    def test_groups_timeframes_closing_together(self):
+        scheduler = CloseScheduler(['1h', '4h', '1d'], grace_seconds=5)
+        scheduler.reset(seconds(2024, 3, 5, 23, 30))
+
+        wake_at, due = scheduler.advance(seconds(2024, 3, 5, 23, 31))
+        assert wake_at == seconds(2024, 3, 6, 0, 0, 5)
+        assert due == ['1h', '4h', '1d']
+
+        wake_at, due = scheduler.advance(seconds(2024, 3, 6, 0, 2))
+        assert wake_at == seconds(2024, 3, 6, 1, 0, 5)
+        assert due == ['1h']
+
+    def test_daily_timeframe_scanned_once_per_day(self):
+        """Test that a day of scheduling wakes 24 times but scans 1d only once"""
+        scheduler = CloseScheduler(['15m', '1h', '1d'], grace_seconds=0)
+        now = seconds(2024, 3, 5)
+        scheduler.reset(now)
+
+        counts = {'15m': 0, '1h': 0, '1d': 0}
+        while now < seconds(2024, 3, 6):
+            now, due = scheduler.advance(now)
+            for timeframe in due:
+                counts[timeframe] += 1
+        assert counts == {'15m': 96, '1h': 24, '1d': 1}
+
+    def test_overrun_catches_up_immediately(self):
+        """Test that closes passed during a long scan run at once, merged into one round"""
+        scheduler = CloseScheduler(['1h', '4h'], grace_seconds=5)
+        scheduler.reset(seconds(2024, 3, 5, 3, 50))
+
+        now = seconds(2024, 3, 5, 5, 20)
+        wake_at, due = scheduler.advance(now)
+        assert wake_at == now
+        assert due == ['1h', '4h']
+
+        wake_at, due = scheduler.advance(now)
+        assert wake_at == seconds(2024, 3, 5, 6, 0, 5)
+        assert due == ['1h']
+
+    def test_close_during_grace_is_not_skipped(self):
+        """Test that a close just before the first advance is still scheduled"""
+        scheduler = CloseScheduler(['1h'], grace_seconds=5)
+        scheduler.reset(seconds(2024, 3, 5, 9, 59, 58))
+
+        wake_at, due = scheduler.advance(seconds(2024, 3, 5, 10, 0, 2))
+        assert wake_at == seconds(2024, 3, 5, 10, 0, 5)
+        assert due == ['1h']
+
+    def test_requires_timeframes(self):
+        with pytest.raises(ValueError):
+            CloseScheduler([]).advance()
+
+
+class TestSleepUntil:
+    """Test cases for sleep_until"""
+
+    @pytest.mark.asyncio
+    async def test_sleep_until(self):
+        stop = asyncio.Event()
+        assert await sleep_until(stop, 0.01) is False
+        assert await sleep_until(stop, -5) is False
+
+        stop.set()
+        assert await sleep_until(stop, 60) is True
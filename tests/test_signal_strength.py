@@ -0,0 +1,92 @@
+"""
+Tests for bots/signal_strength.py
+"""
+
+import pytest
+import timeit
+import numpy as np
+import pandas as pd
+
+from bots.signal_strength import SignalStrength, rolling_max, signal_strength
+
+
+def pandas_strength(macd, histogram, window=20):
+    """The scanner's former pandas implementation"""
+    df = pd.DataFrame({'macd': macd, 'macd_histogram': histogram})
+    histogram_abs = df['macd_histogram'].abs()
+    histogram_max = histogram_abs.rolling(window=window).max()
+    histogram_strength = (histogram_abs / histogram_max * 50).fillna(0)
+    momentum_abs = (df['macd'] - df['macd'].shift(1)).abs()
+    momentum_max = momentum_abs.rolling(window=window).max()
+    momentum_strength = (momentum_abs / momentum_max * 50).fillna(0)
+    return (histogram_strength + momentum_strength).clip(0, 100).to_numpy()
+
+
+def make_macd(count=500, seed=11):
+    rng = np.random.default_rng(seed)
+    macd = np.cumsum(rng.normal(0, 1, count))
+    histogram = rng.normal(0, 1, count)
+    macd[:25] = np.nan
+    histogram[:33] = np.nan
+    return macd, histogram
+
+
+class TestRollingMax:
+    """Test the block rolling maximum against pandas"""
+
+    @pytest.mark.parametrize('length', [5, 19, 20, 21, 57, 1000])
+    @pytest.mark.parametrize('window', [1, 3, 20])
+    def test_matches_pandas(self, length, window):
+        rng = np.random.default_rng(length)
+        values = rng.normal(size=length)
+        values[rng.random(length) < 0.05] = np.nan
+        expected = pd.Series(values).rolling(window).max().to_numpy()
+        assert np.array_equal(rolling_max(values, window), expected, equal_nan=True)
+
+    def test_matrix_rows(self):
+        values = np.random.default_rng(2).normal(size=(4, 90))
+        result = rolling_max(values, 20)
+        for row in range(len(values)):
+            expected = pd.Series(values[row]).rolling(20).max().to_numpy()
+            assert np.array_equal(result[row], expected, equal_nan=True)
+
+
+class TestSignalStrength:
+    """Test batch and streaming strength against the pandas formulation"""
+
+    def test_batch(self):
+        macd, histogram = make_macd()
+        assert np.array_equal(signal_strength(macd, histogram), pandas_strength(macd, histogram))
+
+    def test_batch_matrix(self):
+        rows = [make_macd(seed=seed) for seed in range(3)]
+        result = signal_strength(np.array([r[0] for r in rows]), np.array([r[1] for r in rows]))
+        for row, (macd, histogram) in enumerate(rows):
+            assert np.array_equal(result[row], pandas_strength(macd, histogram))
+
+    def test_streaming(self):
+        macd, histogram = make_macd()
+        strength = SignalStrength()
+        result = [strength.update(bar) for bar in zip(macd, histogram)]
+        assert np.array_equal(result, pandas_strength(macd, histogram))
+
+    def test_streaming_amend(self):
+        """Test that revising the open bar matches feeding the final value"""
+        macd, histogram = make_macd(120)
+        direct, revised = SignalStrength(), SignalStrength()
+        for bar in zip(macd, histogram):
+            expected = direct.update(bar)
+            revised.update((bar[0] + 1, bar[1] - 1))
+            assert revised.amend(bar) == expected
+
+    @pytest.mark.slow
+    def test_benchmark_100k_bars(self):
+        """Micro-benchmark: the block algorithm beats pandas rolling().max() on 100k bars"""
+        rng = np.random.default_rng(0)
+        macd = np.cumsum(rng.normal(size=100_000))
+        histogram = rng.normal(size=100_000)
+
+        pandas_time = min(timeit.repeat(lambda: pandas_strength(macd, histogram), number=5, repeat=5)) / 5
+        numpy_time = min(timeit.repeat(lambda: signal_strength(macd, histogram), number=5, repeat=5)) / 5
+        assert numpy_time < pandas_time, \
+            f"100k bars: pandas {pandas_time * 1000:.2f} ms, signal_strength {numpy_time * 1000:.2f} ms"
@@ -0,0 +1,141 @@
+"""
+Tests for bots/support_resistance.py
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from bots.market_analyzer import MultiExchangeMarketAnalyzer
+from bots.support_resistance import (
+    SupportResistanceIndex, cluster_levels, find_pivots, nearest_levels
+)
+
+
+def make_ohlc(count=400, seed=4):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    return pd.DataFrame({
+        'open': close,
+        'high': close + rng.random(count),
+        'low': close - rng.random(count),
+        'close': close,
+        'volume': rng.random(count) * 1000,
+    }, index=pd.date_range('2024-01-01', periods=count, freq='1min'))
+
+
+def pivot_set(index, price, scale):
+    return sorted(zip(index.tolist(), price.tolist(), scale.tolist()))
+
+
+def index_pivots(levels):
+    return sorted((key[0], price, scale) for key, (price, scale) in levels.pivots.items())
+
+
+class TestPivots:
+    """Test cases for vectorized swing detection"""
+
+    def test_matches_centered_rolling_window(self):
+        """Test scale-2 swings against pandas' centered 5-bar rolling max/min"""
+        df = make_ohlc()
+        index, price, scale = find_pivots(df['high'], df['low'])
+
+        swing_highs = np.flatnonzero(df['high'] == df['high'].rolling(5, center=True).max())
+        swing_lows = np.flatnonzero(df['low'] == df['low'].rolling(5, center=True).min())
+        expected = sorted([(i, df['high'].iloc[i]) for i in swing_highs] + [(i, df['low'].iloc[i]) for i in swing_lows])
+        assert sorted(zip(index.tolist(), price.tolist())) == expected
+
+    def test_scale_is_largest_confirmed_window(self):
+        high = np.array([1, 2, 3, 2, 1, 2, 9, 2, 1, 0, 1, 2, 3, 4, 5], dtype=float)
+        index, price, scale = find_pivots(high, high - 100, windows=(1, 2, 5))
+        highs = {i: s for i, p, s in zip(index, price, scale) if p > 0}
+        assert highs == {2: 2, 6: 5}
+
+    def test_short_input(self):
+        index, price, scale = find_pivots(np.ones(3), np.ones(3))
+        assert len(index) == 0
+
+
+class TestZones:
+    """Test cases for level clustering"""
+
+    def test_cluster_touches(self):
+        index = np.array([0, 5, 9, 20])
+        price = np.array([100.0, 100.3, 105.0, 100.2])
+        scale = np.array([2, 5, 2, 10])
+        zones = cluster_levels(index, price, scale, tolerance=0.005)
+
+        assert len(zones) == 2
+        assert zones[0].touches == 3
+        assert zones[0].low == 100.0 and zones[0].high == 100.3
+        assert zones[0].level == pytest.approx((100.0 + 100.3 + 100.2) / 3)
+        assert zones[0].scale == 10 and zones[0].last_index == 20
+        assert zones[1].touches == 1
+
+    def test_zone_width_is_bounded(self):
+        """Test that chained nearby pivots do not merge into one wide zone"""
+        price = 100 * 1.003 ** np.arange(10)
+        zones = cluster_levels(np.arange(10), price, np.ones(10, dtype=int), tolerance=0.005)
+        assert all((zone.high - zone.low) / zone.low <= 0.005 for zone in zones)
+        assert sum(zone.touches for zone in zones) == 10
+
+    def test_nearest_levels(self):
+        zones = cluster_levels(np.arange(5), np.array([90.0, 95.0, 99.0, 101.0, 120.0]), np.ones(5, dtype=int))
+        assert nearest_levels(zones, 100.0) == {"resistance": [101.0], "support": [99.0, 95.0]}
+
+
+class TestIncrementalIndex:
+    """Test that the per-bar index matches the batch detector"""
+
+    def test_streaming_matches_batch(self):
+        df = make_ohlc()
+        levels = SupportResistanceIndex(history=10_000)
+        for high, low in zip(df['high'], df['low']):
+            levels.update(high, low)
+        assert index_pivots(levels) == pivot_set(*find_pivots(df['high'], df['low']))
+
+    def test_amend_matches_final_bar(self):
+        df = make_ohlc(150)
+        direct, revised = SupportResistanceIndex(), SupportResistanceIndex()
+        for high, low in zip(df['high'], df['low']):
+            direct.update(high, low)
+            revised.update(high + 5, low - 5)
+            revised.amend(high, low)
+        assert revised.pivots == direct.pivots
+
+    def test_sync_feeds_only_new_bars(self):
+        df = make_ohlc(300)
+        levels = SupportResistanceIndex(history=10_000)
+        levels.sync(df.iloc[:200])
+
+        fed = []
+        original_update = levels.update
+        levels.update = lambda high, low: fed.append(high) or original_update(high, low)
+        levels.sync(df.iloc[100:])
+
+        assert len(fed) == 100
+        assert index_pivots(levels) == pivot_set(*find_pivots(df['high'], df['low']))
+
+    def test_history_expiry(self):
+        df = make_ohlc(300)
+        levels = SupportResistanceIndex(history=50)
+        for high, low in zip(df['high'], df['low']):
+            levels.update(high, low)
+        assert levels.pivots
+        assert min(key[0] for key in levels.pivots) > 300 - 1 - 50
+
+
+class TestAnalyzerLevels:
+    """Test the analyzer's support/resistance output"""
+
+    def test_keyed_and_batch_agree(self, temp_config_file):
+        analyzer = MultiExchangeMarketAnalyzer(temp_config_file)
+        df = make_ohlc(100)
+
+        batch = analyzer._find_support_resistance(df)
+        keyed = analyzer._find_support_resistance(df, ('binance', 'BTC/USDT', '1m'))
+
+        assert batch == keyed
+        assert len(batch['resistance']) <= 3 and len(batch['support']) <= 3
+        assert all(level > df['close'].iloc[-1] for level in batch['resistance'])
+        assert {zone['level'] for zone in batch['zones']} == set(batch['resistance'] + batch['support'])
@@ -0,0 +1,147 @@
+"""
+Tests for bots/ticker_hub.py
+"""
+
+import pytest
+import time
+from unittest.mock import Mock, AsyncMock, patch
+
+from bots.exchange_manager import ExchangeManager
+from bots.ticker_hub import TickerHub
+
+
+def make_ticker(symbol, last):
+    return {'symbol': symbol, 'last': last, 'bid': last - 1, 'ask': last + 1}
+
+
+@pytest.fixture
+def manager():
+    """ExchangeManager with a bulk-capable and a single-ticker exchange"""
+    manager = ExchangeManager()
+
+    bulk = Mock()
+    bulk.has = {'fetchTickers': True}
+    bulk.fetch_tickers = AsyncMock(return_value={
+        'BTC/USDT': make_ticker('BTC/USDT', 50000),
+        'ETH/USDT': make_ticker('ETH/USDT', 3000),
+        'XRP/USDT': make_ticker('XRP/USDT', 1),
+    })
+    bulk.fetch_ticker = AsyncMock()
+    manager.exchanges['binance'] = {'instance': bulk, 'config': {}, 'type': 'cex'}
+
+    single = Mock()
+    single.has = {'fetchTickers': False}
+    single.fetch_ticker = AsyncMock(side_effect=lambda symbol: make_ticker(symbol, 100))
+    manager.exchanges['gateio'] = {'instance': single, 'config': {}, 'type': 'cex'}
+
+    return manager
+
+
+class TestTickerHub:
+    """Test cases for TickerHub"""
+
+    def test_manager_has_hub(self, manager):
+        """Test that ExchangeManager owns a ticker hub"""
+        assert isinstance(manager.ticker_hub, TickerHub)
+        assert manager.ticker_hub.supports_bulk('binance') is True
+        assert manager.ticker_hub.supports_bulk('gateio') is False
+        assert manager.ticker_hub.supports_bulk('unknown') is False
+
+    @pytest.mark.asyncio
+    async def test_refresh_uses_single_bulk_call(self, manager):
+        """Test that all symbols come from one fetch_tickers request"""
+        hub = manager.ticker_hub
+        tickers = await hub.refresh('binance', ['BTC/USDT', 'ETH/USDT'])
+
+        exchange = manager.exchanges['binance']['instance']
+        exchange.fetch_tickers.assert_awaited_once_with(['BTC/USDT', 'ETH/USDT'])
+        exchange.fetch_ticker.assert_not_called()
+
+        # เก็บเฉพาะคู่ที่ขอ
+        assert set(tickers) == {'BTC/USDT', 'ETH/USDT'}
+        assert hub.get('binance', 'BTC/USDT')['last'] == 50000
+        assert manager.get_scheduler_stats()['binance']['ticker']['completed'] == 1
+
+    @pytest.mark.asyncio
+    async def test_refresh_fallback_per_symbol(self, manager):
+        """Test concurrent per-symbol fetches when fetch_tickers is unsupported"""
+        tickers = await manager.ticker_hub.refresh('gateio', ['BTC/USDT', 'ETH/USDT'])
+
+        assert set(tickers) == {'BTC/USDT', 'ETH/USDT'}
+        assert manager.exchanges['gateio']['instance'].fetch_ticker.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_refresh_fallback_on_bulk_error(self, manager):
+        """Test that a failing fetch_tickers falls back to single tickers"""
+        exchange = manager.exchanges['binance']['instance']
+        exchange.fetch_tickers.side_effect = Exception("symbols not supported")
+        exchange.fetch_ticker.side_effect = lambda symbol: make_ticker(symbol, 42)
+
+        tickers = await manager.ticker_hub.refresh('binance', ['BTC/USDT'])
+        assert tickers['BTC/USDT']['last'] == 42
+
+    @pytest.mark.asyncio
+    async def test_missing_symbols_fetched_individually(self, manager):
+        """Test that symbols absent from the bulk response are fetched one by one"""
+        exchange = manager.exchanges['binance']['instance']
+        exchange.fetch_ticker.side_effect = lambda symbol: make_ticker(symbol, 7)
+
+        tickers = await manager.ticker_hub.refresh('binance', ['BTC/USDT', 'DOGE/USDT'])
+        assert tickers['DOGE/USDT']['last'] == 7
+        exchange.fetch_ticker.assert_awaited_once_with('DOGE/USDT')
+
+    @pytest.mark.asyncio
+    async def test_snapshot_age(self, manager):
+        """Test max_age handling and snapshot access"""
+        hub = manager.ticker_hub
+        assert hub.get('binance', 'BTC/USDT') is None
+        assert hub.get_snapshot('binance') == {}
+
+        await hub.refresh('binance', ['BTC/USDT'])
+        assert hub.get('binance', 'BTC/USDT', max_age=60) is not None
+
+        hub.snapshots['binance']['updated_at'] = time.time() - 120
+        assert hub.get('binance', 'BTC/USDT', max_age=60) is None
+        assert hub.get('binance', 'BTC/USDT') is not None
+        assert set(hub.get_snapshot('binance')) == {'BTC/USDT'}
+
+
+    @pytest.mark.asyncio
+    async def test_refresh_all(self, manager):
+        """Test that every ticker of the exchange comes from one fetch_tickers call"""
+        hub = manager.ticker_hub
+        tickers = await hub.refresh_all('binance')
+
+        manager.exchanges['binance']['instance'].fetch_tickers.assert_awaited_once_with()
+        assert set(tickers) == {'BTC/USDT', 'ETH/USDT', 'XRP/USDT'}
+        assert hub.get('binance', 'XRP/USDT')['last'] == 1
+
+    @pytest.mark.asyncio
+    async def test_refresh_all_unsupported_or_failing(self, manager):
+        """Test that refresh_all never falls back to per-symbol requests"""
+        assert await manager.ticker_hub.refresh_all('gateio') == {}
+        manager.exchanges['gateio']['instance'].fetch_ticker.assert_not_called()
+
+        manager.exchanges['binance']['instance'].fetch_tickers.side_effect = Exception("API Error")
+        assert await manager.ticker_hub.refresh_all('binance') == {}
+
+class TestTradingBotTickerSnapshot:
+    """Test that the trading bot reads tickers from the hub"""
+
+    @pytest.mark.asyncio
+    async def test_process_symbol_reads_snapshot(self, manager):
+        """Test that _process_symbol makes no REST call when a snapshot exists"""
+        from bots.multi_exchange_bot import MultiExchangeTradingBot
+
+        bot = MultiExchangeTradingBot(exchange_manager=manager)
+        bot.trading_config = {'binance': {'BTC/USDT': {'grid_levels': 5}}}
+        await manager.ticker_hub.refresh('binance', ['BTC/USDT'])
+
+        with patch.object(bot, '_check_risk_limits', AsyncMock(return_value=True)), \
+             patch.object(bot, '_check_existing_orders', AsyncMock()), \
+             patch.object(bot, '_make_trading_decision', AsyncMock()) as mock_decision, \
+             patch.object(manager, 'fetch_ticker', AsyncMock()) as mock_fetch:
+            await bot._process_symbol('binance', 'BTC/USDT')
+
+        mock_fetch.assert_not_called()
+        assert mock_decision.await_args.args[2] == 50000
@@ -0,0 +1,65 @@
+"""
+Tests for bots/universe.py
+"""
+
+import pytest
+
+from bots.universe import filter_by_volume, quote_volume, spot_symbols
+
+
+def make_market(symbol, spot=True, active=True, quote='USDT'):
+    return {'symbol': symbol, 'spot': spot, 'type': 'spot' if spot else 'swap', 'active': active, 'quote': quote}
+
+
+class TestSpotSymbols:
+    """Test cases for spot_symbols"""
+
+    def test_filters_inactive_derivatives_and_quotes(self):
+        markets = {
+            'ETH/USDT': make_market('ETH/USDT'),
+            'BTC/USDT': make_market('BTC/USDT'),
+            'OLD/USDT': make_market('OLD/USDT', active=False),
+            'BTC/USDT:USDT': make_market('BTC/USDT:USDT', spot=False),
+            'ETH/BTC': make_market('ETH/BTC', quote='BTC'),
+        }
+
+        assert spot_symbols(markets, ['USDT']) == ['BTC/USDT', 'ETH/USDT']
+        assert spot_symbols(markets) == ['BTC/USDT', 'ETH/BTC', 'ETH/USDT']
+
+    def test_unknown_active_flag_is_kept(self):
+        """Test that markets with active=None (unknown) are treated as open"""
+        market = make_market('BTC/USDT', active=None)
+        assert spot_symbols({'BTC/USDT': market}) == ['BTC/USDT']
+        assert spot_symbols(None) == []
+
+
+class TestQuoteVolume:
+    """Test cases for quote_volume"""
+
+    @pytest.mark.parametrize('ticker, expected', [
+        ({'quoteVolume': 5000.0, 'baseVolume': 1.0, 'last': 1.0}, 5000.0),
+        ({'quoteVolume': None, 'baseVolume': 10.0, 'vwap': 3.0, 'last': 4.0}, 30.0),
+        ({'baseVolume': 10.0, 'last': 4.0}, 40.0),
+        ({'baseVolume': 10.0}, None),
+        ({}, None),
+        (None, None),
+    ])
+    def test_quote_volume(self, ticker, expected):
+        assert quote_volume(ticker) == expected
+
+
+class TestFilterByVolume:
+    """Test cases for filter_by_volume"""
+
+    def test_threshold_order_and_limit(self):
+        tickers = {
+            'A/USDT': {'quoteVolume': 2e6},
+            'B/USDT': {'quoteVolume': 5e4},
+            'C/USDT': {'quoteVolume': 9e6},
+            'D/USDT': {'baseVolume': 1e5, 'last': 10.0},
+        }
+        symbols = ['A/USDT', 'B/USDT', 'C/USDT', 'D/USDT', 'E/USDT']
+
+        assert filter_by_volume(symbols, tickers, 1e5) == ['C/USDT', 'A/USDT', 'D/USDT']
+        assert filter_by_volume(symbols, tickers, 1e5, max_pairs=2) == ['C/USDT', 'A/USDT']
+        assert filter_by_volume(symbols, tickers, 0) == ['C/USDT', 'A/USDT', 'D/USDT', 'B/USDT']
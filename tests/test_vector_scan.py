@@ -0,0 +1,184 @@
+"""
+Tests for bots/vector_scan.py
+"""
+
+import pytest
+import asyncio
+import time
+import numpy as np
+import pandas as pd
+import ta
+from unittest.mock import AsyncMock, Mock
+
+from bots.candle_cache import to_dataframe
+from bots.crypto_scanner import CryptoPairsScanner
+from bots.parallel_indicators import ParallelIndicators
+from bots.vector_scan import align_frames, ema_matrix, macd_matrix, scan_matrix
+
+HOUR = 3_600_000
+
+
+def make_closes(symbols=50, bars=100, seed=5):
+    rng = np.random.default_rng(seed)
+    return 100 + np.cumsum(rng.normal(0, 1, (symbols, bars)), axis=1)
+
+
+def make_frame(close, start=1_700_000_000_000, seed=0):
+    rng = np.random.default_rng(seed)
+    count = len(close)
+    candles = np.column_stack([
+        start + np.arange(count) * HOUR, close, close + 1, close - 1, close, rng.random(count) * 10000
+    ])
+    return to_dataframe(candles)
+
+
+def assert_identical(actual, expected):
+    assert np.array_equal(np.asarray(actual), np.asarray(expected, dtype=np.float64), equal_nan=True)
+
+
+class TestMatrixIndicators:
+    """Test the vectorized pipeline against the per-pair formulation"""
+
+    def test_ema_matches_pandas(self):
+        close = make_closes(10)
+        close[3, :15] = np.nan
+        close[4, 40] = np.nan
+        result = ema_matrix(close, 12)
+        for row in range(len(close)):
+            expected = pd.Series(close[row]).ewm(span=12, min_periods=12, adjust=False).mean()
+            assert_identical(result[row], expected)
+
+    def test_macd_matches_ta(self):
+        close = make_closes(20)
+        macd, signal, histogram = macd_matrix(close)
+        for row in range(len(close)):
+            expected = ta.trend.MACD(pd.Series(close[row]))
+            assert_identical(macd[row], expected.macd())
+            assert_identical(signal[row], expected.macd_signal())
+            assert_identical(histogram[row], expected.macd_diff())
+
+    def test_scan_matches_scanner(self, temp_config_file):
+        """Test signals, strength and crosses against CryptoPairsScanner.calculate_macd"""
+        scanner = CryptoPairsScanner(temp_config_file)
+        scanner.update_config(min_signal_strength=0, min_volume_24h=0)
+        close = make_closes(40)
+        frames = {f"C{row}/USDT": make_frame(close[row], seed=row) for row in range(len(close))}
+
+        symbols, timestamps, close_matrix, volume = align_frames(frames, 100)
+        result = scan_matrix(symbols, timestamps, close_matrix, volume, min_signal_strength=0, min_volume_24h=0)
+
+        for row, symbol in enumerate(symbols):
+            df = scanner.calculate_macd(frames[symbol])
+            assert_identical(result.macd[row], df['macd'])
+            assert_identical(result.signal_strength[row], df['signal_strength'])
+            assert (result.cross_up[row] == df['macd_cross_up'].to_numpy()).all()
+            assert (result.cross_down[row] == df['macd_cross_down'].to_numpy()).all()
+
+            expected = scanner.detect_macd_signals(df, symbol, 'binance', '1h')
+            signal_type = 'long' if result.long[row] else 'short' if result.short[row] else None
+            assert signal_type == (expected[0].signal_type if expected else None)
+
+        assert result.long.any() or result.short.any()
+
+    def test_thousand_symbols_under_a_second(self):
+        close = make_closes(1000, 100)
+        volume = np.ones_like(close) * 10000
+
+        started = time.process_time()
+        result = scan_matrix([str(row) for row in range(1000)], np.arange(100), close, volume)
+        assert time.process_time() - started < 1.0
+        assert result.macd.shape == (1000, 100)
+
+
+class TestAlignFrames:
+    """Test stacking per-pair frames onto one time grid"""
+
+    def test_missing_bars_are_nan(self):
+        full = make_frame(np.arange(10, dtype=np.float64))
+        gappy = full.drop(full.index[[0, 4]])
+        symbols, timestamps, close, volume = align_frames({'A': full, 'B': gappy, 'C': pd.DataFrame()}, 8)
+
+        assert symbols == ['A', 'B']
+        assert len(timestamps) == 8
+        assert_identical(close[0], np.arange(2, 10))
+        assert np.isnan(close[1, 2])
+        assert not np.isnan(close[1, [0, 1, 3, 4, 5, 6, 7]]).any()
+
+    def test_no_data(self):
+        symbols, timestamps, close, volume = align_frames({'A': None}, 100)
+        assert symbols == [] and close.shape == (0, 0)
+
+
+class TestScannerBatchMode:
+    """Test scan_all_pairs with batch_scan enabled"""
+
+    @pytest.mark.asyncio
+    async def test_batch_scan_signals(self, temp_config_file):
+        scanner = CryptoPairsScanner(temp_config_file)
+        close = make_closes(30)
+        frames = {f"C{row}/USDT": make_frame(close[row], seed=row) for row in range(len(close))}
+        scanner.update_config(exchanges=['binance'], trading_pairs=list(frames), timeframes=['1h'],
+                              min_signal_strength=0, min_volume_24h=0)
+        scanner.exchange_manager.get_enabled_exchanges = Mock(return_value=['binance'])
+
+        async def fetch_timeframes(exchange_name, symbol, timeframes, limit=100):
+            return {'1h': frames[symbol]}
+        scanner.fetch_timeframes = AsyncMock(side_effect=fetch_timeframes)
+
+        expected = await scanner.scan_all_pairs()
+        scanner.indicators.clear()
+        scanner.update_config(batch_scan=True)
+        results = await scanner.scan_all_pairs()
+
+        assert results.keys() == expected.keys()
+        for key in expected:
+            assert [(s.symbol, s.signal_type, s.strength, s.timestamp) for s in results[key]] == \
+                [(s.symbol, s.signal_type, s.strength, s.timestamp) for s in expected[key]]
+
+    @pytest.mark.asyncio
+    async def test_parallel_workers_match_batch(self, temp_config_file):
+        """Test that computing indicators in a process pool gives the same signals"""
+        scanner = CryptoPairsScanner(temp_config_file)
+        close = make_closes(30)
+        frames = {f"C{row}/USDT": make_frame(close[row], seed=row) for row in range(len(close))}
+        scanner.update_config(exchanges=['binance'], trading_pairs=list(frames), timeframes=['1h'],
+                              min_signal_strength=0, min_volume_24h=0, batch_scan=True)
+        scanner.exchange_manager.get_enabled_exchanges = Mock(return_value=['binance'])
+
+        async def fetch_timeframes(exchange_name, symbol, timeframes, limit=100):
+            return {'1h': frames[symbol]}
+        scanner.fetch_timeframes = AsyncMock(side_effect=fetch_timeframes)
+
+        expected = await scanner.scan_all_pairs()
+        scanner.update_config(parallel_workers=2)
+        scanner.parallel = ParallelIndicators(2, chunk_rows=7, min_rows=1)
+        try:
+            results = await scanner.scan_all_pairs()
+            assert scanner.parallel._pool is not None
+        finally:
+            scanner.parallel.close()
+
+        assert expected
+        assert results.keys() == expected.keys()
+        for key in expected:
+            assert [(s.symbol, s.signal_type, s.strength, s.macd_value, s.price, s.timestamp) for s in results[key]] == \
+                [(s.symbol, s.signal_type, s.strength, s.macd_value, s.price, s.timestamp) for s in expected[key]]
+
+    @pytest.mark.asyncio
+    async def test_failed_fetch_is_left_out(self, temp_config_file):
+        """Test that a pair whose fetch fails is dropped without losing the rest of the exchange"""
+        scanner = CryptoPairsScanner(temp_config_file)
+        close = make_closes(5)
+        frames = {f"C{row}/USDT": make_frame(close[row], seed=row) for row in range(len(close))}
+        scanner.update_config(trading_pairs=list(frames) + ['BAD/USDT'])
+
+        async def fetch_timeframes(exchange_name, symbol, timeframes, limit=100):
+            if symbol == 'BAD/USDT':
+                raise RuntimeError('boom')
+            await asyncio.sleep(0.001 * (5 - int(symbol[1])))
+            return {'1h': frames[symbol]}
+        scanner.fetch_timeframes = AsyncMock(side_effect=fetch_timeframes)
+
+        results = await scanner.scan_batch('binance', ['1h'])
+
+        assert results['1h'].symbols == list(frames)